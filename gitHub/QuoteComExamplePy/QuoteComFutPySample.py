@@ -1,14 +1,31 @@
-import clr
+import os
 import sys
 
-clr.AddReference("Package")      #必要引用dll
-clr.AddReference("PushClient")   #必要引用dll
-clr.AddReference("QuoteCom")     #必要引用dll
+# 元件來源: dll = pythonnet + KGI DLL（預設），sim = 純 Python 模擬器（../kgisim）
+KGI_BACKEND = os.environ.get('KGI_BACKEND', 'dll').lower()
 
-from Intelligence import QuoteCom   #from namespace import class
-from Intelligence import MARKET_FLAG   #from namespace import class
-from Intelligence import COM_STATUS #from namespace import class
+# ../kgisim 與 ../kgiperf
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+if KGI_BACKEND == 'sim':
+    from kgisim import QuoteCom, MARKET_FLAG, COM_STATUS
+else:
+    import clr
+
+    clr.AddReference("Package")      #必要引用dll
+    clr.AddReference("PushClient")   #必要引用dll
+    clr.AddReference("QuoteCom")     #必要引用dll
+
+    from Intelligence import QuoteCom   #from namespace import class
+    from Intelligence import MARKET_FLAG   #from namespace import class
+    from Intelligence import COM_STATUS #from namespace import class
 from time import sleep
+from quote_dispatch import PacketDispatcher, DROP
+from kgiperf import (stage as perfStage, now as perfNow, mark as perfMark, clear as perfClear,
+                     counter as perfCounter, CallbackQueue, DROP_OLDEST)
+from quote_packets import (PI20008View, P20026View, PI20070View, PI20020View, PI20021View,
+                           PI20022View, PI20023View, PI20030View, PI20080View, PI20082View,
+                           PI20090View, PI05005View, PI21020View)
 """
 QuoteCom是凱基整合行情報價的API元件，使用者可藉由QuoteCom達到即時接收行情及報價查詢功能等目的。
 使用QuoteCom元件前需要先安裝Pythonnet，指令如下:
@@ -19,11 +36,27 @@ pip install Pythonnet
 2.	PushClient.dll
 3.	Package.dll
 
+設定環境變數 KGI_BACKEND=sim 時改用 kgisim 模擬器，不需要 Pythonnet 與上述檔案。
+
+封包處理的延遲記錄在 kgiperf 的 quote.dispatch / quote.handler / quote.callback 階段，
+封包接收時間以 kgiperf.mark 記下，行情回呼中同步下單時可計算 tick_to_order。
+各 DT 的封包數記在 kgiperf 計數器 kgi_quote_packets_total（/metrics 輸出），ignore() / only() 丟棄的 DT 不計。
+
+queueSize > 0 時事件執行緒只把封包排入有界佇列（kgiperf.CallbackQueue），由消費執行緒分派與回呼；
+佇列滿時預設丟棄最舊的行情（overflow=DROP_OLDEST），排隊時間記錄在 quote.queue 階段。
 """
+PERF_DISPATCH = perfStage('quote.dispatch')
+PERF_HANDLER = perfStage('quote.handler')
+PERF_CALLBACK = perfStage('quote.callback')
+
+QUOTE_PACKETS = perfCounter('kgi_quote_packets_total', '收到的行情封包數（依 DT）', labels=('dt',))
+
+
 class QuotecomPyFut:
     """KGI期貨國內報價的Python API範例程式。
     """
-    def __init__(self, host, port, sid, token, callback=None) -> None:
+    def __init__(self, host, port, sid, token, callback=None, dts=None, lazy=False,
+                 queueSize=0, overflow=DROP_OLDEST, consumers=1) -> None:
         """程式初始化
 
         Args:
@@ -31,6 +64,13 @@ class QuotecomPyFut:
             port (num): 主機連線的port
             sid (str):  主機連線的sid
             token (str): 主機連線的token
+            dts (iterable, optional): 只處理這些DT代碼的封包，其餘直接丟棄。預設全部處理
+            lazy (bool, optional): False: 回呼與舊版相同的 dict（預設）；
+                                   True: 行情封包以延遲轉換的檢視物件(quote_packets)回呼，欄位讀取時才轉換，
+                                   支援 ['欄位'] / get() / keys()，但不是 dict（不可修改、json.dumps 前需 to_dict()）
+            queueSize (int, optional): 回呼佇列容量，0 表示在事件執行緒直接回呼（預設）
+            overflow (str, optional): 佇列滿時的處理方式，DROP_OLDEST（預設）或 BLOCK
+            consumers (int, optional): 消費執行緒數，大於 1 時不保證回呼順序
         """
         self.host = host
         self.port = port
@@ -40,15 +80,42 @@ class QuotecomPyFut:
              self.callback = lambda dic: print(dic)
         else:
             self.callback = callback
+        self.lazy = lazy
+        # DT代碼 → 處理函式的分派表
+        self.dispatcher = PacketDispatcher(on_unknown=self.onUnknownPacket)
+        self.dispatcher.register(1503, self.__P001503)   # 處理登入成功後的資訊
+        self.dispatcher.register(20020, self.__P20020)   # 成交價量揭示
+        self.dispatcher.register(20021, self.__P20021)   # 盤中最高(低)價揭示
+        self.dispatcher.register(20022, self.__P20022)   # 成交價量揭示 – 盤前 (格式同 PI20020)
+        self.dispatcher.register(20023, self.__P20023)   # 定時開盤價量揭示
+        self.dispatcher.register(20030, self.__P20030)   # 單一商品委託量累計
+        self.dispatcher.register(20080, self.__P20080)   # 委託簿揭示訊息
+        self.dispatcher.register(20082, self.__P20082)   # 委託簿揭示訊息-盤前 (格式同PI20080)
+        self.dispatcher.register(20090, self.__P20090)   # 台灣期貨交易所編制指數資訊揭示訊息
+        self.dispatcher.register(20026, self.__P20026)   # 查詢商品最後價格
+        self.dispatcher.register(20070, self.__P20070)   # 收盤行情料訊息
+        self.dispatcher.register(5005, self.__PI05005)   # 盤別資訊
+        self.dispatcher.register(21020, self.__P21020)   # 回補成交價量揭示
+        self.dispatcher.register(20008, self.__P20008)   # 期貨商品定義檔
+        if dts is not None:
+            self.dispatcher.only(dts)
         self.quoteCom =  QuoteCom("", port, sid, token)
         print("TradeCom API 初始化 Version (%s) ........" % (self.quoteCom.version))
+        self.callbackQueue = None
+        onMessage, onStatus, onRecover = self.onQuoteRcvMessage, self.onQuoteGetStatus, self.onQuoteRecoverStatus
+        if queueSize > 0:
+            # 事件執行緒只排入佇列；連線狀態與回補事件不丟棄
+            self.callbackQueue = CallbackQueue(queueSize, overflow, consumers, name='quote').start()
+            onMessage = self.callbackQueue.wrap(onMessage)
+            onStatus = self.callbackQueue.wrap(onStatus, block=True)
+            onRecover = self.callbackQueue.wrap(onRecover, block=True)
         # register event handler
         #狀態通知事件KGI QuoteCom API message event
-        self.quoteCom.OnRcvMessage += self.onQuoteRcvMessage
+        self.quoteCom.OnRcvMessage += onMessage
         #資料接收事件KGI QuoteCom API status event
-        self.quoteCom.OnGetStatus += self.onQuoteGetStatus
+        self.quoteCom.OnGetStatus += onStatus
         #資料回補事件KGI QuoteCom API status event
-        self.quoteCom.OnRecoverStatus += self.onQuoteRecoverStatus
+        self.quoteCom.OnRecoverStatus += onRecover
     
     def __str__(self):
         return 'KGI期貨國內報價的Python API範例程式。'
@@ -62,6 +129,8 @@ class QuotecomPyFut:
         """關閉API的元件
         """
         self.quoteCom.Dispose()
+        if self.callbackQueue is not None:
+            self.callbackQueue.stop()
     
     def doGetTFList(self, type) -> None:
         """查詢商品列表-市場別
@@ -213,6 +282,18 @@ class QuotecomPyFut:
     以下是處理主機回應的程式
     ######################
     """
+    def _emit(self, view, start):
+        """回呼行情封包，lazy=False 時轉成舊版 dict
+
+        Args:
+            view (PacketView): 封包檢視物件（由 DT 處理函式回傳）
+            start (int): 分派完成、開始執行處理函式的時間（perfNow）
+        """
+        t = perfNow()
+        PERF_HANDLER.record(t - start)
+        self.callback(view if self.lazy else view.to_dict())
+        PERF_CALLBACK.since(t)
+
     def __P001503(self, pkg):
         """處理登入成功後的資訊
 
@@ -244,25 +325,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20008): 請參考附錄PI20008
         """
-        res = {'DT': 'PI20008',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'SymbolIdx': pkg.SymbolIdx,
-         '_RISE_LIMIT_PRICE1': float(pkg._RISE_LIMIT_PRICE1),
-         '_REFERENCE_PRICE': float(pkg._REFERENCE_PRICE),
-         '_PROD_KIND': pkg._PROD_KIND,
-         '_FALL_LIMIT_PRICE1': float(pkg._FALL_LIMIT_PRICE1.ToString()),
-         '_RISE_LIMIT_PRICE2': float(pkg._RISE_LIMIT_PRICE2.ToString()),
-         '_FALL_LIMIT_PRICE1': float(pkg._FALL_LIMIT_PRICE1.ToString()),
-         '_RISE_LIMIT_PRICE3': float(pkg._RISE_LIMIT_PRICE3.ToString()),
-         '_FALL_LIMIT_PRICE3': float(pkg._FALL_LIMIT_PRICE3.ToString()),
-         '_PROD_KIND': pkg._PROD_KIND,
-         '_PROD_KIND': pkg._PROD_KIND,
-         'PriceDecimal': pkg.PriceDecimal,
-         'StrikePriceDecimal': pkg.StrikePriceDecimal,
-         '_PROD_NAME': pkg._PROD_NAME,
-         'END_DATE': pkg.END_DATE}
-        self.callback(res)
+        return PI20008View(pkg)
 
     def __P20026(self, pkg):
         """查詢商品最後價格
@@ -270,37 +333,7 @@ class QuotecomPyFut:
         Args:
             pkg (P20026): 請參考附錄P20026
         """
-        res = {'DT': 'P20026',
-         'Symbol': pkg.Symbol,
-         'PriceDecimal': pkg.PriceDecimal,
-         '_MatchPrice': pkg._MatchPrice,
-         'MatchPrice': pkg.MatchPrice,
-         'DayHighPrice': float(pkg.DayHighPrice.ToString()),
-         'MatchTotalQty': pkg.MatchTotalQty,
-         'Break_Mark': pkg.Break_Mark,
-         'FirstDerivedBuyPrice': float(pkg.FirstDerivedBuyPrice.ToString()),
-         'FirstDerivedBuyQty': pkg.FirstDerivedBuyQty,
-         'Session':pkg.Session,
-         'DayLowPrice': float(pkg.DayLowPrice.ToString()),
-         'FirstMatchPrice': float(pkg.FirstMatchPrice.ToString()),
-         'FirstMatchQty': pkg.FirstMatchQty,
-         'ReferencePrice': float(pkg.ReferencePrice.ToString()),
-         'BUY_DEPTH': pkg.BUY_DEPTH,
-         'SELL_DEPTH': pkg.SELL_DEPTH,
-         'FirstDerivedSellPrice': float(pkg.FirstDerivedSellPrice.ToString()),
-         'FirstDerivedSellQty': pkg.FirstDerivedSellQty}
-        i = 1
-        for v in pkg.BUY_DEPTH:
-            print('BUY_DEPTH' + str(i), ": " ,v.PRICE, " ### ", v.QUANTITY)
-            res['BUY_DEPTH_PR' + str(i)] = float(v.PRICE.ToString())
-            res['BUY_DEPTH_QTY' + str(i)] = v.QUANTITY
-            i += 1
-        
-        i = 1
-        for v in pkg.BUY_DEPTH:
-            res['SELL_DEPTH_PRI' + str(i)] = float(v.PRICE.ToString())
-            res['SELL_DEPTH_QTY' + str(i)] = v.QUANTITY
-        self.callback(res)
+        return P20026View(pkg)
 
     def __P20070(self, pkg):
         """收盤行情料訊息
@@ -308,30 +341,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20070): 請參考附錄PI20070
         """
-        res = {'DT': 'PI20070',
-         'Market': pkg.Market,
-         'PROD_ID': pkg.PROD_ID,
-         'TERM_HIGH_PRICE': pkg.TERM_HIGH_PRICE,
-         'TERM_LOW_PRICE': pkg.TERM_LOW_PRICE,
-         'DAY_HIGH_PRICE': pkg.DAY_HIGH_PRICE,
-         'DAY_LOW_PRICE': pkg.DAY_LOW_PRICE,
-         'OPEN_PRICE': pkg.OPEN_PRICE,
-         'BUY_PRICE':pkg.BUY_PRICE,
-         'SELL_PRICE': pkg.SELL_PRICE,
-         'CLOSE_PRICE': pkg.CLOSE_PRICE,
-         'BO_COUNT_TAL': pkg.BO_COUNT_TAL,
-         'BO_QNTY_TAL': pkg.BO_QNTY_TAL,
-         'SO_COUNT_TAL': pkg.SO_COUNT_TAL,
-         'SO_QNTY_TAL': pkg.SO_QNTY_TAL,
-         'TOTAL_COUNT': pkg.TOTAL_COUNT,
-         'TOTAL_QNTY': pkg.TOTAL_QNTY,
-         'COMBINE_BO_COUNT_TAL': pkg.COMBINE_BO_COUNT_TAL,
-         'COMBINE_BO_QNTY_TAL': pkg.COMBINE_BO_QNTY_TAL,
-         'COMBINE_SO_COUNT_TAL': pkg.COMBINE_SO_COUNT_TAL,
-         'COMBINE_SO_QNTY_TAL': pkg.COMBINE_SO_QNTY_TAL,
-         'COMBINE_TOTAL_QNTY': pkg.COMBINE_TOTAL_QNTY,
-         'DECIMAL_LOCATOR': pkg.DECIMAL_LOCATOR}
-        self.callback(res)
+        return PI20070View(pkg)
 
     def __P20020(self, pkg):
         """成交價量揭示
@@ -339,20 +349,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20020): 請參考附錄PI20020
         """
-        res = {'DT': 'PI20020',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'MatchTime': pkg.MatchTime,
-         'InfoSeq': pkg.InfoSeq,
-         'LastItem': pkg.LastItem,
-         'PriceSign': pkg.PriceSign,
-         'MatchQuantity': pkg.MatchQuantity,
-         'PriceDecimal':pkg.PriceDecimal,
-         'MatchTotalQty': pkg.MatchTotalQty,
-         'MatchBuyCnt': pkg.MatchBuyCnt,
-         'MatchSellCnt': pkg.MatchSellCnt,
-         'Price': float(pkg.Price.ToString())}
-        self.callback(res)
+        return PI20020View(pkg)
 
     def __P20021(self, pkg):
         """盤中最高(低)價揭示
@@ -360,14 +357,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20021): 請參考附錄PI20021
         """
-        res = {'DT': 'PI20021',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'DayLowPrice': float(pkg.DayLowPrice.ToString()),
-         'DayHighPrice': float(pkg.DayHighPrice.ToString()),
-         'MatchTime': pkg.MatchTime,
-         'PriceDecimal': pkg.PriceDecimal}
-        self.callback(res)
+        return PI20021View(pkg)
 
     def __P20022(self, pkg):
         """成交價量揭示
@@ -375,20 +365,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20022): 請參考附錄PI20022
         """
-        res = {'DT': 'PI20022',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'MatchTime': pkg.MatchTime,
-         'InfoSeq': pkg.InfoSeq,
-         'LastItem': pkg.LastItem,
-         'PriceSign': pkg.PriceSign,
-         'MatchQuantity': pkg.MatchQuantity,
-         'PriceDecimal': pkg.PriceDecimal,
-         'MatchTotalQty': pkg.MatchTotalQty,
-         'MatchBuyCnt': pkg.MatchBuyCnt,
-         'MatchSellCnt': pkg.MatchSellCnt,
-         'Price': float(pkg.Price.ToString())}
-        self.callback(res)
+        return PI20022View(pkg)
 
     def __P20023(self, pkg):
         """定時開盤價量揭示
@@ -396,14 +373,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20023): 請參考附錄PI20023
         """
-        res = {'DT': 'PI20023',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'FirstMatchPrice': pkg.FirstMatchPrice,
-         'FirstMatchQty': pkg.FirstMatchQty,
-         'MatchTime': pkg.MatchTime,
-         'PriceDecimal': pkg.PriceDecimal}
-        self.callback(res)
+        return PI20023View(pkg)
 
     def __P20030(self, pkg):
         """單一商品委託量累計
@@ -411,14 +381,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20030): 請參考附錄PI20030
         """
-        res = {'DT': 'PI20030',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'BUY_ORDER': pkg.BUY_ORDER,
-         'BUY_QUANTITY': pkg.BUY_QUANTITY,
-         'SELL_ORDER': pkg.SELL_ORDER,
-         'SELL_QUANTITY': pkg.SELL_QUANTITY}
-        self.callback(res)
+        return PI20030View(pkg)
 
     def __P20080(self, pkg):
         """委託簿揭示訊息
@@ -426,17 +389,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20080): 請參考附錄PI20080
         """
-        res = {'DT': 'PI20080',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'BUY_DEPTH': pkg.BUY_DEPTH,
-         'SELL_DEPTH': pkg.SELL_DEPTH,
-         'FIRST_DERIVED_BUY_PRICE': pkg.FIRST_DERIVED_BUY_PRICE,
-         'FIRST_DERIVED_BUY_DTY': pkg.FIRST_DERIVED_BUY_DTY,
-         'FIRST_DERIVED_SELL_PRICE': pkg.FIRST_DERIVED_SELL_PRICE,
-         'FIRST_DERIVED_SELL_QTY': pkg.FIRST_DERIVED_SELL_QTY,
-         'DATA_TIME': pkg.DATA_TIME}
-        self.callback(res)
+        return PI20080View(pkg)
 
     def __P20082(self, pkg):
         """委託簿揭示訊息-盤前
@@ -444,17 +397,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20082): 請參考附錄PI20082
         """
-        res = {'DT': 'PI20082',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'BUY_DEPTH': pkg.BUY_DEPTH,
-         'SELL_DEPTH': pkg.SELL_DEPTH,
-         'FIRST_DERIVED_BUY_PRICE': pkg.FIRST_DERIVED_BUY_PRICE,
-         'FIRST_DERIVED_BUY_DTY': pkg.FIRST_DERIVED_BUY_DTY,
-         'FIRST_DERIVED_SELL_PRICE': pkg.FIRST_DERIVED_SELL_PRICE,
-         'FIRST_DERIVED_SELL_QTY': pkg.FIRST_DERIVED_SELL_QTY,
-         'DATA_TIME': pkg.DATA_TIME}
-        self.callback(res)
+        return PI20082View(pkg)
 
     def __P20090(self, pkg):
         """台灣期貨交易所編制指數資訊揭示訊息
@@ -462,12 +405,7 @@ class QuotecomPyFut:
         Args:
             pkg (PI20090): 請參考附錄PI20090
         """
-        res = {'DT': 'PI20090',
-         'Market': pkg.Market,
-         'INDEX_ID': pkg.INDEX_ID,
-         'INDEX_PRICE': pkg.INDEX_PRICE,
-         'INDEX_TIME': pkg.INDEX_TIME}
-        self.callback(res)
+        return PI20090View(pkg)
         
     def __PI05005(self, pkg):
         """盤別資訊
@@ -475,92 +413,63 @@ class QuotecomPyFut:
         Args:
             pkg (PI05005): 請參考附錄PI05005
         """
-        res = {'DT': 'PI05005',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'FallLimitPrice': pkg.FallLimitPrice,
-         'RiseLimitPrice': pkg.RiseLimitPrice,
-         'RefPrice': pkg.RefPrice,
-         'PriceDecimal': pkg.PriceDecimal,
-         'Session': pkg.Session,
-         'Status': pkg.Status}
-        self.callback(res)
+        return PI05005View(pkg)
 
-    def __PI05005(self, pkg):
-        """盤別資訊
+    def __P21020(self, pkg):
+        """回補成交價量揭示
 
         Args:
-            pkg (PI05005): 請參考附錄PI05005
+            pkg (PI20020): 請參考附錄PI20020
         """
-        res = {'DT': 'PI05005',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'FallLimitPrice': float(pkg.FallLimitPrice.ToString()),
-         'RiseLimitPrice': float(pkg.RiseLimitPrice.ToString()),
-         'RefPrice': float(pkg.RefPrice.ToString()),
-         'PriceDecimal': pkg.PriceDecimal,
-         'Session': pkg.Session,
-         'Status': pkg.Status}
-        self.callback(res)
+        return PI21020View(pkg)
 
-    def __P21020(self, pkg):
-        """回補成交價量揭示
+    def registerHandler(self, dt, handler) -> None:
+        """註冊(或覆蓋)某個DT代碼的處理函式
 
         Args:
-            pkg (PI20020): 請參考附錄PI20020
+            dt (int): 封包DT代碼，例如 20020
+            handler (callable): 處理函式，參數為 pkg；回傳封包檢視物件時交給 callback，
+                回傳 None 表示已自行處理
         """
-        res = {'DT': 'PI21020',
-         'Market': pkg.Market,
-         'Symbol': pkg.Symbol,
-         'MatchTime': pkg.MatchTime,
-         'InfoSeq': pkg.InfoSeq,
-         'LastItem': pkg.LastItem,
-         'PriceSign': pkg.PriceSign,
-         'MatchQuantity': pkg.MatchQuantity,
-         'PriceDecimal':pkg.PriceDecimal,
-         'MatchTotalQty': pkg.MatchTotalQty,
-         'MatchBuyCnt': pkg.MatchBuyCnt,
-         'MatchSellCnt': pkg.MatchSellCnt,
-         'Price': float(pkg.Price.ToString())}
-        self.callback(res)
+        self.dispatcher.register(dt, handler)
+
+    def unregisterHandler(self, dt) -> None:
+        """移除某個DT代碼的處理函式
+
+        Args:
+            dt (int): 封包DT代碼
+        """
+        self.dispatcher.unregister(dt)
+
+    def onUnknownPacket(self, pkg):
+        """未註冊DT代碼的封包
+
+        Args:
+            pkg (_type_): _description_
+        """
+        print('UNKOWN pkg: ', pkg, ', val: ', pkg.DT)
 
     def onQuoteRcvMessage(self, sender, pkg):
-        """接收KGI QuoteCom API message event
+        """接收KGI QuoteCom API message event，依 pkg.DT 查表分派
 
         Args:
             sender (_type_): _description_
             pkg (_type_): _description_
         """
-        if pkg.DT == 1503 : # 處理登入成功後的資訊
-            self.__P001503(pkg)
-        elif pkg.DT == 20020 : # 成交價量揭示
-            self.__P20020(pkg)
-        elif pkg.DT == 20021 : # 盤中最高(低)價揭示
-            self.__P20021(pkg)
-        elif pkg.DT == 20022 : # 成交價量揭示 – 盤前 (格式同 PI20020)
-            self.__P20022(pkg)
-        elif pkg.DT == 20023 : # 定時開盤價量揭示
-            self.__P20023(pkg)
-        elif pkg.DT == 20030 : # 單一商品委託量累計
-            self.__P20030(pkg)
-        elif pkg.DT == 20080 : # 委託簿揭示訊息
-            self.__P20080(pkg)
-        elif pkg.DT == 20082 : # 委託簿揭示訊息-盤前 (格式同PI20080)
-            self.__P20082(pkg)
-        elif pkg.DT == 20090 : # 台灣期貨交易所編制指數資訊揭示訊息
-            self.__P20090(pkg)
-        elif pkg.DT == 20026 : #查詢商品最後價格
-            self.__P20026(pkg)
-        elif pkg.DT == 20070 : #收盤行情料訊息
-            self.__P20070(pkg)
-        elif pkg.DT == 5005 :  #盤別資訊
-            self.__PI05005(pkg)
-        elif pkg.DT == 21020 : #查詢單一商品基本資料
-            self.__P21020(pkg)
-        elif pkg.DT == 20008 : #期貨商品定義檔
-            self.__P20008(pkg)
-        else:
-            print('UNKOWN pkg: ', pkg, ', val: ', pkg.DT)
+        t = perfNow()
+        dt = pkg.DT
+        handler = self.dispatcher.handler(dt)
+        if handler is DROP:
+            # ignore() / only() 丟棄的封包不記錄延遲也不計數
+            return
+        perfMark(t)
+        QUOTE_PACKETS.inc(dt)
+        start = PERF_DISPATCH.since(t)
+        # 行情封包的處理函式回傳封包檢視物件，其餘（登入、未知封包）自行處理並回傳 None
+        view = handler(pkg)
+        if view is not None:
+            self._emit(view, start)
+        perfClear()
             
                 
     def onQuoteRecoverStatus(self, sender, topic, status, count):
@@ -1,13 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import clr
-
-clr.AddReference("Package")      #必要引用dll
-clr.AddReference("PushClient")   #必要引用dll
-clr.AddReference("QuoteCom")     #必要引用dll
-
-from QuoteComFutPySample import QuotecomPyFut
+from QuoteComFutPySample import QuotecomPyFut   #DLL 引用在 QuoteComFutPySample（KGI_BACKEND=sim 時不需要）
 from time import sleep
 """
 KGI期貨API的Python範例程式。
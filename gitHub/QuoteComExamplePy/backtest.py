@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+backtest.py - MACD 策略回測引擎
+以歷史 K 線（HistoryCatalog）或 tick（tick_store）依序重播，經過 IndicatorEngine 產生交叉訊號，
+交由 SimulatedExecutor 以與 execute.py 相同的規則下單：
+  黃金交叉 -> 有倉位先平倉，再買進 1 口；死亡交叉 -> 有倉位先平倉，再賣出 1 口
+並套用 config.py 的停損 / 停利 / 追蹤停損與強制平倉時間。
+交易紀錄格式與 TradeLogger.daily_trades 相同（每點 200 元）。
+
+主迴圈只處理純量（不為每筆 tick / K 線建立 dict），一年的 1 分 K 可在數秒內完成。
+
+執行方式:
+    python backtest.py <商品> <週期> <開始日期> <結束日期> [資料目錄]
+    python backtest.py --ticks <tick 目錄> <週期>
+"""
+
+import json
+import sys
+from datetime import datetime, timedelta
+
+from indicators import IndicatorEngine, GOLDEN, DEATH
+
+POINT_VALUE = 200  # 每點損益（與 TradeLogger 相同）
+CHUNK_SIZE = 65536  # run_candles 每次轉換成 list 的 K 線根數
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _format_time(seconds):
+    """epoch 秒數（本機時間）轉成 TradeLogger 使用的時間字串"""
+    return (_EPOCH + timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class SimulatedExecutor:
+    """模擬執行器：與 TradeExecutor 相同的訊號處理規則，成交價為傳入的價格"""
+
+    def __init__(self, qty=1, point_value=POINT_VALUE):
+        self.qty = qty
+        self.point_value = point_value
+        self.side = None          # 'B' 多單 / 'S' 空單 / None
+        self.entry_price = 0.0
+        self.entry_time = 0       # epoch 秒
+        self.best_price = 0.0     # 持倉期間最有利價格（追蹤停損用）
+        self.now = 0              # 目前時間（epoch 秒），由回測引擎更新
+        self.trades = []          # 與 TradeLogger.daily_trades 相同格式
+        self.total_pnl = 0.0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+
+    def check_position(self):
+        """與 TradeExecutor.check_position 相同的回傳格式"""
+        return {
+            'has_position': self.side is not None,
+            'position_side': self.side,
+            'position_qty': self.qty if self.side is not None else 0
+        }
+
+    def _open(self, side, price):
+        self.side = side
+        self.entry_price = price
+        self.best_price = price
+        self.entry_time = self.now
+
+    def close_all_positions(self, price=None):
+        """平掉倉位並記錄損益"""
+        if self.side is None:
+            return True
+        if self.side == 'B':
+            pnl = (price - self.entry_price) * self.point_value * self.qty
+            side = 'long'
+        else:
+            pnl = (self.entry_price - price) * self.point_value * self.qty
+            side = 'short'
+        self.trades.append({
+            'open_time': _format_time(self.entry_time),
+            'close_time': _format_time(self.now),
+            'side': side,
+            'entry_price': self.entry_price,
+            'exit_price': price,
+            'qty': self.qty,
+            'pnl': pnl
+        })
+        self.total_pnl += pnl
+        if self.total_pnl > self.peak_pnl:
+            self.peak_pnl = self.total_pnl
+        elif self.peak_pnl - self.total_pnl > self.max_drawdown:
+            self.max_drawdown = self.peak_pnl - self.total_pnl
+        self.side = None
+        return True
+
+    def _execute_signal(self, side, price, label):
+        actions = []
+        if self.side is not None:
+            actions.append({'action': '平倉', 'side': 'S' if self.side == 'B' else 'B',
+                            'qty': self.qty, 'price': price})
+            self.close_all_positions(price)
+        self._open(side, price)
+        actions.append({'action': label, 'side': side, 'qty': self.qty, 'price': price})
+        return {'success': True, 'actions': actions, 'price': price}
+
+    def execute_golden_cross_signal(self, price=None):
+        """黃金交叉：有倉位先平倉，再買進"""
+        return self._execute_signal('B', price, '買入')
+
+    def execute_death_cross_signal(self, price=None):
+        """死亡交叉：有倉位先平倉，再賣出"""
+        return self._execute_signal('S', price, '賣出')
+
+    def summary(self):
+        """回測摘要（欄位與 TradeLogger.get_daily_summary 相同，不含日期）"""
+        total = len(self.trades)
+        wins = sum(1 for t in self.trades if t['pnl'] > 0)
+        losses = sum(1 for t in self.trades if t['pnl'] < 0)
+        return {
+            'total_pnl': self.total_pnl,
+            'total_trades': total,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'win_rate': (wins / total * 100) if total > 0 else 0,
+            'max_drawdown': self.max_drawdown,
+            'current_position': self.check_position()
+        }
+
+
+class Backtester:
+    """回測引擎"""
+
+    def __init__(self, stop_loss=None, take_profit=None, trailing_stop=None, trailing_activation=0,
+                 force_close_times=(), suspend_minutes=0, engine=None, qty=1, **engine_params):
+        """
+        初始化回測引擎
+
+        Args:
+            stop_loss / take_profit / trailing_stop: 停損、停利、追蹤停損點數（None 不啟用）
+            trailing_activation: 最有利價格超過開倉價多少點後才啟動追蹤停損（0 = 一有獲利就啟動）
+            force_close_times: 強制平倉時間 [(小時, 分鐘), ...]
+            suspend_minutes: 強制平倉後暫停交易的分鐘數
+            engine: IndicatorEngine（None 時以 engine_params 建立）
+            qty: 每次下單口數
+        """
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.trailing_stop = trailing_stop
+        self.trailing_activation = trailing_activation
+        self.force_close_times = [h * 60 + m for h, m in force_close_times]
+        self.suspend_minutes = max(suspend_minutes, 1) if self.force_close_times else 0
+        self.engine = engine if engine is not None else IndicatorEngine(**engine_params)
+        self.executor = SimulatedExecutor(qty=qty)
+
+    @classmethod
+    def from_config(cls, cfg=None, **overrides):
+        """以 config.py 的設定建立回測引擎（overrides 可覆寫個別參數）"""
+        if cfg is None:
+            import config as cfg
+        params = {
+            'stop_loss': cfg.MACD_STOP_LOSS,
+            'take_profit': cfg.MACD_TAKE_PROFIT,
+            'trailing_stop': cfg.MACD_TRAILING_STOP,
+            'trailing_activation': getattr(cfg, 'MACD_TRAILING_ACTIVATION', 0),
+            'force_close_times': [cfg.FORCE_CLOSE_TIME_1, cfg.FORCE_CLOSE_TIME_2] if cfg.ENABLE_TIME_MANAGEMENT else [],
+            'suspend_minutes': cfg.SUSPEND_TRADING_MINUTES,
+            'short_period': cfg.MACD_SHORT_PERIOD,
+            'long_period': cfg.MACD_LONG_PERIOD,
+            'signal_period': cfg.MACD_SIGNAL_PERIOD,
+            'rsi_period': cfg.RSI_PERIOD,
+            'rsi_overbought': cfg.RSI_OVERBOUGHT,
+            'rsi_oversold': cfg.RSI_OVERSOLD,
+            'enable_rsi_filter': cfg.ENABLE_RSI_FILTER,
+        }
+        params.update(overrides)
+        return cls(**params)
+
+    def _suspended(self, minute_of_day):
+        """是否在強制平倉後的暫停時段內"""
+        for start in self.force_close_times:
+            if 0 <= (minute_of_day - start) % 1440 < self.suspend_minutes:
+                return True
+        return False
+
+    def _check_exit(self, low, high):
+        """
+        檢查停損 / 停利 / 追蹤停損，回傳出場價（None 表示不出場）
+        同一根 K 線同時觸及時以停損優先（保守估計）
+        追蹤停損在最有利價格超過開倉價 trailing_activation 點之後才啟動（從最高 / 最低點回撤，保護已有獲利）
+        """
+        ex = self.executor
+        entry = ex.entry_price
+        trailing = self.trailing_stop is not None
+        if ex.side == 'B':
+            if self.stop_loss is not None and low <= entry - self.stop_loss:
+                return entry - self.stop_loss
+            if trailing and ex.best_price - entry > self.trailing_activation and \
+                    low <= ex.best_price - self.trailing_stop:
+                return ex.best_price - self.trailing_stop
+            if self.take_profit is not None and high >= entry + self.take_profit:
+                return entry + self.take_profit
+            if high > ex.best_price:
+                ex.best_price = high
+        else:
+            if self.stop_loss is not None and high >= entry + self.stop_loss:
+                return entry + self.stop_loss
+            if trailing and entry - ex.best_price > self.trailing_activation and \
+                    high >= ex.best_price + self.trailing_stop:
+                return ex.best_price + self.trailing_stop
+            if self.take_profit is not None and low <= entry - self.take_profit:
+                return entry - self.take_profit
+            if low < ex.best_price:
+                ex.best_price = low
+        return None
+
+    def _on_bar(self, seconds, high, low, close):
+        """處理一根 K 線（或一筆 tick：high = low = close）"""
+        ex = self.executor
+        ex.now = seconds
+        minute_of_day = (seconds // 60) % 1440
+        suspended = self.force_close_times and self._suspended(minute_of_day)
+
+        if ex.side is not None:
+            if suspended:
+                ex.close_all_positions(close)
+            else:
+                price = self._check_exit(low, high)
+                if price is not None:
+                    ex.close_all_positions(price)
+
+        cross = self.engine.update(close)
+        if cross is not None and not suspended:
+            if cross is GOLDEN:
+                ex.execute_golden_cross_signal(close)
+            elif cross is DEATH:
+                ex.execute_death_cross_signal(close)
+
+    def run_candles(self, times, highs, lows, closes):
+        """
+        以 K 線回測（訊號於收盤價成交，停損停利以當根高低價判斷）
+
+        Args:
+            times: epoch 秒（int）或 datetime64 陣列
+            highs / lows / closes: 價格序列
+
+        Returns:
+            dict: 回測摘要
+        """
+        on_bar = self._on_bar
+        # 逐段轉成 list 再迭代：mmap 陣列不會整個複製到處理程序的記憶體
+        for start in range(0, len(times), CHUNK_SIZE):
+            end = start + CHUNK_SIZE
+            for t, h, l, c in zip(_to_seconds(times[start:end]), _to_list(highs[start:end]),
+                                  _to_list(lows[start:end]), _to_list(closes[start:end])):
+                on_bar(t, h, l, c)
+        return self.executor.summary()
+
+    def run_ticks(self, times_us, prices, timeframe=1):
+        """
+        以 tick 回測：每筆 tick 檢查停損停利，K 線收盤時更新指標
+
+        Args:
+            times_us: 成交時間（微秒，tick_store 格式）
+            prices: 成交價
+            timeframe: 指標使用的 K 線週期（分鐘）
+
+        Returns:
+            dict: 回測摘要
+        """
+        ex = self.executor
+        engine = self.engine
+        bar_us = timeframe * 60 * 1000000
+        bucket = None
+        last_price = 0.0
+        last_seconds = 0
+        for t, price in zip(_to_list(times_us), _to_list(prices)):
+            b = t // bar_us
+            if b != bucket:
+                if bucket is not None:
+                    # 上一根 K 線收盤：更新指標並依訊號下單
+                    ex.now = last_seconds
+                    cross = engine.update(last_price)
+                    if cross is not None and not (self.force_close_times and
+                                                  self._suspended((last_seconds // 60) % 1440)):
+                        if cross is GOLDEN:
+                            ex.execute_golden_cross_signal(last_price)
+                        elif cross is DEATH:
+                            ex.execute_death_cross_signal(last_price)
+                bucket = b
+            seconds = t // 1000000
+            ex.now = seconds
+            if ex.side is not None:
+                if self.force_close_times and self._suspended((seconds // 60) % 1440):
+                    ex.close_all_positions(price)
+                elif self._check_exit(price, price) is not None:
+                    ex.close_all_positions(price)  # tick 模式以觸發的成交價出場
+            last_price = price
+            last_seconds = seconds
+        return ex.summary()
+
+
+def _to_list(values):
+    if isinstance(values, list):
+        return values
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _to_seconds(times):
+    """datetime64 / datetime / 秒數序列轉成 epoch 秒數 list"""
+    if hasattr(times, 'dtype') and str(times.dtype).startswith('datetime64'):
+        return times.astype('datetime64[s]').astype('int64').tolist()
+    times = _to_list(times)
+    if times and isinstance(times[0], datetime):
+        return [int((t - _EPOCH).total_seconds()) for t in times]
+    return times
+
+
+def main():
+    import config
+
+    if len(sys.argv) >= 3 and sys.argv[1] == '--ticks':
+        from tick_store import TickStoreReader
+        timeframe = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+        with TickStoreReader(sys.argv[2]) as reader:
+            backtester = Backtester.from_config(config)
+            summary = backtester.run_ticks(reader.time_us, reader.prices(), timeframe)
+        source = f"tick: {sys.argv[2]} ({timeframe}分K 指標)"
+    elif len(sys.argv) >= 5:
+        from indicator_batch import load_candle_arrays
+        symbol, timeframe, start, end = sys.argv[1], int(sys.argv[2]), sys.argv[3], sys.argv[4]
+        data_dir = sys.argv[5] if len(sys.argv) > 5 else "historical_data"
+        arrays = load_candle_arrays(symbol, timeframe, start, end, data_dir)
+        backtester = Backtester.from_config(config)
+        summary = backtester.run_candles(arrays['time'], arrays['high'], arrays['low'], arrays['close'])
+        source = f"{symbol} {timeframe}分K {start} ~ {end}（{len(arrays['close'])} 根）"
+    else:
+        print(__doc__)
+        return
+
+    print(f"\n{'=' * 60}")
+    print(f"📊 回測結果 - {source}")
+    print(f"{'=' * 60}")
+    print(f"總損益: {summary['total_pnl']:+,.0f} 元")
+    print(f"最大回撤: {summary['max_drawdown']:,.0f} 元")
+    print(f"交易次數: {summary['total_trades']} 次")
+    print(f"獲利次數: {summary['winning_trades']} 次")
+    print(f"虧損次數: {summary['losing_trades']} 次")
+    print(f"勝率: {summary['win_rate']:.1f}%")
+    print(f"{'=' * 60}")
+
+    trades_file = f"backtest_trades_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    with open(trades_file, 'w', encoding='utf-8') as f:
+        json.dump(backtester.executor.trades, f, indent=4, ensure_ascii=False)
+    print(f">>> 交易紀錄: {trades_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_callback_queue.py - 回呼佇列（kgiperf.CallbackQueue）對事件執行緒的影響
+以 kgisim 重播 tick，使用者回呼模擬 handle_last_price 的 print（寫到 os.devnull），比較：
+    inline           事件執行緒直接回呼（舊模式）
+    queue drop       queueSize > 0，佇列滿時丟棄最舊的行情
+    queue block      queueSize > 0，佇列滿時等待（不丟棄）
+列出事件處理函式每次占用事件執行緒的時間（模擬 DLL 接收執行緒被占住的時間）、回呼筆數、
+丟棄筆數與排隊時間。
+不需要 .NET 與 DLL。
+
+執行方式: python bench_callback_queue.py [筆數] [佇列容量] [每秒筆數，0 表示不限速]
+"""
+
+import contextlib
+import os
+import sys
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+from QuoteComFutPySample import QuotecomPyFut
+import kgiperf
+from kgiperf import DROP_OLDEST, BLOCK, Stage, now
+from kgisim import default_market, synthetic_ticks, TickReplayer
+
+SYMBOL = 'TMFB6'
+
+
+def run(count, rate, queueSize=0, overflow=DROP_OLDEST):
+    market = default_market()
+    received = [0]
+    devnull = open(os.devnull, 'w', encoding='utf-8')
+
+    def callback(view):
+        if view['DT'] != 'PI20020':
+            return
+        received[0] += 1
+        # 與 handle_last_price 相同份量的輸出
+        with contextlib.redirect_stdout(devnull):
+            print(f"時間: {view.MatchTime} | 價格: {view.Price} | 量: {view.MatchQuantity}")
+            print(f"總量: {view.MatchTotalQty} | 買: {view.MatchBuyCnt} | 賣: {view.MatchSellCnt}")
+            print("-" * 60)
+
+    with contextlib.redirect_stdout(devnull):
+        q = QuotecomPyFut('sim', 0, 'API', '', callback=callback, lazy=True, queueSize=queueSize, overflow=overflow)
+        q.quoteCom.Connect2Quote('sim', 0, 'bench', '', ' ', '')
+        q.quoteCom.SubQuote(SYMBOL)
+
+    # 量測事件處理函式占用事件執行緒的時間
+    event = q.quoteCom.OnRcvMessage
+    inner = event.handlers
+    busy = Stage('event')
+
+    def timed(*args):
+        t = now()
+        for handler in inner:
+            handler(*args)
+        busy.since(t)
+    event.handlers = (timed,)
+
+    kgiperf.reset()
+    replayer = TickReplayer(market, SYMBOL, synthetic_ticks(count, seed=3), rate or None)
+    replayer.run()
+    stats = None
+    if q.callbackQueue is not None:
+        q.callbackQueue.join()
+        stats = q.callbackQueue.stats()
+    waited = kgiperf.snapshot().get('quote.queue')
+    with contextlib.redirect_stdout(devnull):
+        q.logout()
+        q.dispose()
+    return replayer, received[0], stats, waited, busy.snapshot()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 4096
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+
+    print("-" * 96)
+    print(f"{'模式':<14}{'事件 p50 µs':>12}{'p99 µs':>10}{'總耗時 s':>10}{'回呼筆數':>10}{'丟棄':>10}"
+          f"{'最高排隊':>10}{'排隊 p50 µs':>14}{'p99 µs':>10}")
+    for name, size, overflow in (('inline', 0, DROP_OLDEST), ('queue drop', capacity, DROP_OLDEST),
+                                 ('queue block', capacity, BLOCK)):
+        replayer, received, stats, waited, busy = run(count, rate, size, overflow)
+        dropped = stats['dropped'] if stats else 0
+        high = stats['high_water'] if stats else 0
+        p50 = waited['p50'] / 1000 if waited and waited['count'] else 0
+        p99 = waited['p99'] / 1000 if waited and waited['count'] else 0
+        print(f"{name:<14}{busy['p50'] / 1000:>12.1f}{busy['p99'] / 1000:>10.1f}{replayer.elapsed:>10.2f}"
+              f"{received:>10,}{dropped:>10,}{high:>10,}{p50:>14.1f}{p99:>10.1f}")
+    print("-" * 96)
+    print(f"{count:,} 筆 tick，佇列容量 {capacity:,}，{'不限速' if not rate else f'{rate:,.0f} 筆/秒'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_dispatch.py - 報價封包分派效能測試
+以模擬的 DT 分布（開盤時段 20020/20080 佔多數）重播封包，
+比較舊的 if/elif 鏈與 PacketDispatcher 查表分派的每筆成本。
+
+執行方式: python bench_dispatch.py [封包數]
+"""
+
+import random
+import sys
+from time import perf_counter
+
+from quote_dispatch import PacketDispatcher
+
+# 開盤時段的 DT 分布（權重）
+DT_MIX = {
+    20020: 45,  # 成交價量揭示
+    20080: 40,  # 委託簿揭示訊息
+    20021: 4,
+    20030: 4,
+    20022: 2,
+    20082: 2,
+    20090: 2,
+    5005: 1,
+}
+
+# 舊版 onQuoteRcvMessage 的比對順序
+LEGACY_ORDER = [1503, 20020, 20021, 20022, 20023, 20030, 20080, 20082,
+                20090, 20026, 20070, 5005, 21020, 20008]
+
+
+class FakePkg:
+    """只帶 DT 欄位的模擬封包"""
+    __slots__ = ('DT',)
+
+    def __init__(self, dt):
+        self.DT = dt
+
+
+def handler(pkg):
+    pass
+
+
+def legacy_dispatch(pkg):
+    """舊版 if/elif 鏈（處理函式皆為空函式）"""
+    if pkg.DT == 1503:
+        handler(pkg)
+    elif pkg.DT == 20020:
+        handler(pkg)
+    elif pkg.DT == 20021:
+        handler(pkg)
+    elif pkg.DT == 20022:
+        handler(pkg)
+    elif pkg.DT == 20023:
+        handler(pkg)
+    elif pkg.DT == 20030:
+        handler(pkg)
+    elif pkg.DT == 20080:
+        handler(pkg)
+    elif pkg.DT == 20082:
+        handler(pkg)
+    elif pkg.DT == 20090:
+        handler(pkg)
+    elif pkg.DT == 20026:
+        handler(pkg)
+    elif pkg.DT == 20070:
+        handler(pkg)
+    elif pkg.DT == 5005:
+        handler(pkg)
+    elif pkg.DT == 21020:
+        handler(pkg)
+    elif pkg.DT == 20008:
+        handler(pkg)
+    else:
+        print('UNKOWN pkg: ', pkg, ', val: ', pkg.DT)
+
+
+def make_packets(count, seed=1):
+    rnd = random.Random(seed)
+    dts = rnd.choices(list(DT_MIX), weights=list(DT_MIX.values()), k=count)
+    return [FakePkg(dt) for dt in dts]
+
+
+def run(name, func, packets):
+    start = perf_counter()
+    for pkg in packets:
+        func(pkg)
+    elapsed = perf_counter() - start
+    print(f"{name:<28} {elapsed * 1e9 / len(packets):8.1f} ns/封包")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    packets = make_packets(count)
+
+    table = PacketDispatcher()
+    for dt in LEGACY_ORDER:
+        table.register(dt, handler)
+
+    only_ticks = PacketDispatcher()
+    for dt in LEGACY_ORDER:
+        only_ticks.register(dt, handler)
+    only_ticks.only({20020})
+
+    print(f"重播 {count:,} 筆封包")
+    print("-" * 50)
+    base = run("if/elif 鏈", legacy_dispatch, packets)
+    new = run("PacketDispatcher", table.dispatch, packets)
+    run("PacketDispatcher(只收20020)", only_ticks.dispatch, packets)
+    print("-" * 50)
+    print(f"加速倍數: {base / new:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_indicators.py - 串流指標引擎的正確性與速度檢查
+以隨機漫步的收盤價，將 IndicatorEngine 逐根更新的結果與 NumPy 向量化參考實作比對
+（EMA/Wilder 平滑以分塊的矩陣形式計算），並量測每根 K 線的更新成本。
+MACD / 訊號線 / 柱狀體誤差不超過 EMA_TOLERANCE、RSI 誤差不超過 RSI_TOLERANCE、RSI 起始位置與
+交叉訊號完全相同才算通過；不符時結束代碼為 1。
+
+執行方式: python bench_indicators.py [K 線數]
+"""
+
+import sys
+from time import perf_counter
+
+import numpy as np
+
+import config
+from indicators import IndicatorEngine, GOLDEN, DEATH
+
+BLOCK = 64
+
+# 容許的最大絕對誤差（收盤價約 23000，兩種算法的捨入誤差約 1e-11）
+EMA_TOLERANCE = 1e-8
+RSI_TOLERANCE = 1e-9
+
+
+def recursive_filter(x, alpha, beta, prev):
+    """y[t] = alpha * x[t] + beta * y[t-1]，以 BLOCK 筆為一組用矩陣乘法計算"""
+    j = np.arange(BLOCK)
+    lower = np.tril(beta ** (j[:, None] - j[None, :]).clip(min=0))
+    lower[j[:, None] < j[None, :]] = 0.0
+    carry = beta ** (j + 1)
+    out = np.empty(len(x))
+    for start in range(0, len(x), BLOCK):
+        xb = x[start:start + BLOCK]
+        n = len(xb)
+        yb = carry[:n] * prev + alpha * (lower[:n, :n] @ xb)
+        out[start:start + n] = yb
+        prev = yb[-1]
+    return out
+
+
+def ema_ref(x, period):
+    alpha = 2.0 / (period + 1)
+    out = np.empty(len(x))
+    out[0] = x[0]
+    out[1:] = recursive_filter(x[1:], alpha, 1.0 - alpha, x[0])
+    return out
+
+
+def reference(close, short, long_, signal, rsi_period):
+    """向量化參考實作，回傳 (macd, signal, hist, rsi, crosses)"""
+    macd = ema_ref(close, short) - ema_ref(close, long_)
+    sig = ema_ref(macd, signal)
+    hist = macd - sig
+
+    change = np.diff(close)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+    n = rsi_period
+    rsi = np.full(len(close), np.nan)
+    avg_gain = np.empty(len(change) - n + 1)
+    avg_loss = np.empty(len(change) - n + 1)
+    avg_gain[0] = gain[:n].mean()
+    avg_loss[0] = loss[:n].mean()
+    avg_gain[1:] = recursive_filter(gain[n:], 1.0 / n, (n - 1.0) / n, avg_gain[0])
+    avg_loss[1:] = recursive_filter(loss[n:], 1.0 / n, (n - 1.0) / n, avg_loss[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value = np.where(avg_loss == 0.0, np.where(avg_gain == 0.0, 50.0, 100.0), value)
+    rsi[n:] = value
+
+    ready = np.arange(len(close)) >= long_ + signal - 2
+    crosses = np.zeros(len(close), dtype=np.int8)
+    up = (hist[:-1] <= 0.0) & (hist[1:] > 0.0) & ready[1:]
+    down = (hist[:-1] >= 0.0) & (hist[1:] < 0.0) & ready[1:]
+    crosses[1:][up] = 1
+    crosses[1:][down] = -1
+    return macd, sig, hist, rsi, crosses
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rnd = np.random.default_rng(1)
+    close = 23000.0 + np.cumsum(rnd.integers(-5, 6, count)).astype(float)
+
+    engine = IndicatorEngine.from_config(config, enable_rsi_filter=False)
+    macd = np.empty(count)
+    signal = np.empty(count)
+    hist = np.empty(count)
+    rsi = np.full(count, np.nan)
+    crosses = np.zeros(count, dtype=np.int8)
+    values = close.tolist()
+
+    start = perf_counter()
+    for i, c in enumerate(values):
+        cross = engine.update(c)
+        macd[i] = engine.macd
+        signal[i] = engine.signal
+        hist[i] = engine.hist
+        if engine.rsi is not None:
+            rsi[i] = engine.rsi
+        if cross is GOLDEN:
+            crosses[i] = 1
+        elif cross is DEATH:
+            crosses[i] = -1
+    elapsed = perf_counter() - start
+
+    plain = IndicatorEngine.from_config(config)
+    start = perf_counter()
+    for c in values:
+        plain.update(c)
+    update_only = perf_counter() - start
+
+    ref_macd, ref_signal, ref_hist, ref_rsi, ref_crosses = reference(
+        close, config.MACD_SHORT_PERIOD, config.MACD_LONG_PERIOD,
+        config.MACD_SIGNAL_PERIOD, config.RSI_PERIOD)
+
+    valid = ~np.isnan(ref_rsi)
+    same_start = bool((np.isnan(rsi) == np.isnan(ref_rsi)).all())
+    rsi_error = np.abs(rsi[valid] - ref_rsi[valid]).max() if same_start else np.inf
+    cross_diff = int((crosses != ref_crosses).sum())
+    checks = [
+        (f"MACD 最大誤差:   {np.abs(macd - ref_macd).max():.3e}", np.abs(macd - ref_macd).max() <= EMA_TOLERANCE),
+        (f"訊號線最大誤差:  {np.abs(signal - ref_signal).max():.3e}",
+         np.abs(signal - ref_signal).max() <= EMA_TOLERANCE),
+        (f"柱狀體最大誤差:  {np.abs(hist - ref_hist).max():.3e}", np.abs(hist - ref_hist).max() <= EMA_TOLERANCE),
+        (f"RSI 最大誤差:    {rsi_error:.3e}", rsi_error <= RSI_TOLERANCE),
+        (f"RSI 起始位置相同: {same_start}", same_start),
+        (f"交叉訊號不一致:  {cross_diff} / {int((ref_crosses != 0).sum())}", cross_diff == 0),
+    ]
+
+    print(f"{count:,} 根 K 線，MACD({config.MACD_SHORT_PERIOD},{config.MACD_LONG_PERIOD},"
+          f"{config.MACD_SIGNAL_PERIOD}) RSI({config.RSI_PERIOD})，容許誤差 EMA {EMA_TOLERANCE:g} / RSI {RSI_TOLERANCE:g}")
+    print("-" * 56)
+    for text, ok in checks:
+        print(f"{'✓' if ok else '✗'} {text}")
+    print(f"  每根更新成本:    {update_only * 1e9 / count:8.1f} ns（含讀值 {elapsed * 1e9 / count:.1f} ns）")
+    print("-" * 56)
+    failed = sum(not ok for _, ok in checks)
+    if failed:
+        print(f"✗ {failed} 項與參考實作不符")
+        sys.exit(1)
+    print("✓ 串流指標與向量化參考實作相符")
+
+
+if __name__ == '__main__':
+    main()
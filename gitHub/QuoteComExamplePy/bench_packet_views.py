@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_packet_views.py - 封包檢視物件與舊版 dict 的配置/速度比較
+以模擬的 PI20020 封包（.NET Decimal 以帶 ToString() 的物件代替），
+比較舊版一次建好整個 dict 與 PI20020View 只讀 Price / MatchTotalQty 的成本。
+
+執行方式: python bench_packet_views.py [筆數]
+"""
+
+import sys
+import tracemalloc
+from time import perf_counter
+
+from quote_packets import PI20020View
+
+
+class FakeDecimal:
+    """模擬 System.Decimal"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def ToString(self):
+        return str(self.value)
+
+
+class FakePkg:
+    """模擬 PI20020 封包
+
+    欄位經由 __getattr__ 取得，用來近似 pythonnet 存取 .NET 屬性的額外成本
+    （實際跨界成本更高，因此本測試低估了延遲轉換的效益）。
+    """
+
+    def __init__(self, i):
+        self._fields = {
+            'DT': 20020,
+            'Market': 'F',
+            'Symbol': 'TMFB6',
+            'MatchTime': 90000000 + i,
+            'InfoSeq': i,
+            'LastItem': 0,
+            'PriceSign': 0,
+            'MatchQuantity': 1,
+            'PriceDecimal': 0,
+            'MatchTotalQty': 1000 + i,
+            'MatchBuyCnt': i,
+            'MatchSellCnt': i,
+            'Price': FakeDecimal(23000 + i % 50),
+        }
+
+    def __getattr__(self, name):
+        try:
+            return self._fields[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def legacy_dict(pkg):
+    """舊版 __P20020 的 dict 建構"""
+    return {'DT': 'PI20020',
+            'Market': pkg.Market,
+            'Symbol': pkg.Symbol,
+            'MatchTime': pkg.MatchTime,
+            'InfoSeq': pkg.InfoSeq,
+            'LastItem': pkg.LastItem,
+            'PriceSign': pkg.PriceSign,
+            'MatchQuantity': pkg.MatchQuantity,
+            'PriceDecimal': pkg.PriceDecimal,
+            'MatchTotalQty': pkg.MatchTotalQty,
+            'MatchBuyCnt': pkg.MatchBuyCnt,
+            'MatchSellCnt': pkg.MatchSellCnt,
+            'Price': float(pkg.Price.ToString())}
+
+
+def consume_dict(pkg):
+    res = legacy_dict(pkg)
+    return res['Price'], res['MatchTotalQty']
+
+
+def consume_view(pkg):
+    res = PI20020View(pkg)
+    return res.Price, res.MatchTotalQty
+
+
+def measure_time(func, packets):
+    start = perf_counter()
+    for pkg in packets:
+        func(pkg)
+    return (perf_counter() - start) * 1e9 / len(packets)
+
+
+def measure_alloc(factory, packets):
+    """回呼端保留物件時，每筆 tick 的配置量 (bytes)"""
+    kept = []
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    for pkg in packets:
+        obj = factory(pkg)
+        obj['Price']
+        obj['MatchTotalQty']
+        kept.append(obj)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (current - base) / len(packets)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    packets = [FakePkg(i) for i in range(count)]
+
+    print(f"模擬 {count:,} 筆 PI20020，回呼只讀 Price / MatchTotalQty")
+    print("-" * 56)
+    t_dict = measure_time(consume_dict, packets)
+    t_view = measure_time(consume_view, packets)
+    print(f"{'舊版 dict':<18} {t_dict:8.1f} ns/tick")
+    print(f"{'PI20020View':<18} {t_view:8.1f} ns/tick  ({t_dict / t_view:.2f}x)")
+
+    a_dict = measure_alloc(legacy_dict, packets)
+    a_view = measure_alloc(PI20020View, packets)
+    print(f"{'舊版 dict':<18} {a_dict:8.1f} bytes/tick")
+    print(f"{'PI20020View':<18} {a_view:8.1f} bytes/tick")
+    print("-" * 56)
+
+
+if __name__ == '__main__':
+    main()
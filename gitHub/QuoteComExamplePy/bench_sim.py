@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_sim.py - 以 kgisim 模擬器量測報價路徑的吞吐量
+產生隨機漫步 tick（或重播 tick CSV），經 SimMarket → QuoteCom 事件 → QuotecomPyFut 分派
+→ PI20020View 回呼，比較指定速率與實際達成的每秒筆數。不需要 .NET 與 DLL。
+
+執行方式: python bench_sim.py [筆數] [每秒筆數，0 表示不限速] [tick CSV]
+"""
+
+import os
+import sys
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+from QuoteComFutPySample import QuotecomPyFut
+from kgisim import default_market, synthetic_ticks, csv_ticks, TickReplayer
+
+SYMBOL = 'TMFB6'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    source = sys.argv[3] if len(sys.argv) > 3 else None
+
+    received = [0, 0]
+
+    def callback(view):
+        if view['DT'] == 'PI20020':
+            received[0] += 1
+            received[1] += view.MatchQuantity
+
+    q = QuotecomPyFut('sim', 0, 'API', '', callback=callback, lazy=True)
+    q.quoteCom.Connect2Quote('sim', 0, 'bench', '', ' ', '')
+    q.quoteCom.SubQuote(SYMBOL)
+
+    if source:
+        ticks = csv_ticks(source)
+    else:
+        ticks = synthetic_ticks(count)
+    replayer = TickReplayer(default_market(), SYMBOL, ticks, rate or None)
+    replayer.run()
+
+    print("-" * 56)
+    print(f"來源:           {source or '隨機漫步'}")
+    print(f"指定速率:       {'不限速' if not rate else f'{rate:,.0f} 筆/秒'}")
+    print(f"發布筆數:       {replayer.sent:,}")
+    print(f"收到成交封包:   {received[0]:,}（{received[1]:,} 口）")
+    print(f"耗時:           {replayer.elapsed:.2f} 秒")
+    print(f"實際速率:       {replayer.actual_rate:,.0f} 筆/秒")
+    print(f"每筆成本:       {replayer.elapsed * 1e6 / max(replayer.sent, 1):.2f} µs")
+    print("-" * 56)
+    q.logout()
+
+
+if __name__ == '__main__':
+    main()
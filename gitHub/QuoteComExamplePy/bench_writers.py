@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_writers.py - K 線/Tick 寫入吞吐量測試
+以模擬的 tick 比較舊版寫檔方式與 BufferedCSVWriter + TimestampFormatter：
+  - Tick: 舊版每批重新開檔、每列 strftime；新版長駐檔案、快取分鐘前綴
+  - K 線: 舊版每根 K 線開檔/附加/關檔；新版寫入緩衝
+
+執行方式: python bench_writers.py [tick 數]
+"""
+
+import csv
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from data_writers import BufferedCSVWriter, TimestampFormatter
+
+TICK_HEADER = ['時間', '價格', '數量', '累計量']
+CANDLE_HEADER = ['時間', '開盤價', '最高價', '最低價', '收盤價', '成交量']
+BATCH_SIZE = 3000  # 舊版每 60 秒一批，約等於每秒 50 筆 tick
+
+
+def make_ticks(count):
+    start = datetime(2025, 1, 2, 8, 45)
+    ticks = []
+    total = 0
+    for i in range(count):
+        total += 1 + i % 3
+        ticks.append({
+            'time': start + timedelta(milliseconds=i * 20),
+            'price': 23000.0 + i % 50,
+            'quantity': 1 + i % 3,
+            'total_qty': total
+        })
+    return ticks
+
+
+def legacy_ticks(filename, ticks):
+    """舊版 _save_tick_batch：每批開檔、每列 strftime"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(TICK_HEADER)
+    for i in range(0, len(ticks), BATCH_SIZE):
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            for tick in ticks[i:i + BATCH_SIZE]:
+                writer.writerow([
+                    tick['time'].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
+                    tick['price'],
+                    tick['quantity'],
+                    tick['total_qty']
+                ])
+
+
+def buffered_ticks(filename, ticks):
+    """新版：長駐寫入器 + 快取分鐘前綴"""
+    writer = BufferedCSVWriter(filename, TICK_HEADER, buffer_rows=10000)
+    fmt = TimestampFormatter()
+    for i in range(0, len(ticks), BATCH_SIZE):
+        writer.write_rows([
+            (fmt.format_ms(tick['time']), tick['price'], tick['quantity'], tick['total_qty'])
+            for tick in ticks[i:i + BATCH_SIZE]
+        ])
+    writer.close()
+
+
+def legacy_candles(filename, candles):
+    """舊版 _save_candle：每根 K 線開檔/附加/關檔"""
+    with open(filename, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow(CANDLE_HEADER)
+    for candle in candles:
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([
+                candle['time'].strftime('%Y-%m-%d %H:%M:%S'),
+                candle['open'], candle['high'], candle['low'], candle['close'], candle['volume']
+            ])
+
+
+def buffered_candles(filename, candles):
+    """新版：寫入緩衝"""
+    writer = BufferedCSVWriter(filename, CANDLE_HEADER)
+    fmt = TimestampFormatter()
+    for candle in candles:
+        writer.write_row([
+            fmt.format_s(candle['time']),
+            candle['open'], candle['high'], candle['low'], candle['close'], candle['volume']
+        ])
+    writer.close()
+
+
+def run(name, func, filename, rows):
+    if os.path.exists(filename):
+        os.remove(filename)
+    start = perf_counter()
+    func(filename, rows)
+    elapsed = perf_counter() - start
+    rate = len(rows) / elapsed
+    print(f"{name:<28} {rate:14,.0f} 列/秒")
+    return rate
+
+
+def same_file(a, b):
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        return fa.read() == fb.read()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    ticks = make_ticks(count)
+    candles = [{'time': t['time'].replace(second=0, microsecond=0), 'open': t['price'],
+                'high': t['price'], 'low': t['price'], 'close': t['price'], 'volume': t['quantity']}
+               for t in ticks[:max(1, count // 50)]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        old_tick = os.path.join(tmp, 'old_tick.csv')
+        new_tick = os.path.join(tmp, 'new_tick.csv')
+        old_candle = os.path.join(tmp, 'old_candle.csv')
+        new_candle = os.path.join(tmp, 'new_candle.csv')
+
+        print(f"Tick 寫入 ({count:,} 筆)")
+        print("-" * 50)
+        base = run("舊版（每批開檔 + strftime）", legacy_ticks, old_tick, ticks)
+        new = run("BufferedCSVWriter", buffered_ticks, new_tick, ticks)
+        print(f"加速倍數: {new / base:.2f}x  輸出相同: {same_file(old_tick, new_tick)}")
+
+        print(f"\nK 線寫入 ({len(candles):,} 根)")
+        print("-" * 50)
+        base = run("舊版（每根開檔/關檔）", legacy_candles, old_candle, candles)
+        new = run("BufferedCSVWriter", buffered_candles, new_candle, candles)
+        print(f"加速倍數: {new / base:.2f}x  輸出相同: {same_file(old_candle, new_candle)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""
+candle_aggregator.py - 多週期 K 線建構器
+以 tick 更新多個時間週期的 K 線，成交量使用累計量 (MatchTotalQty) 的差額，
+並處理日盤/夜盤切換時累計量歸零的情況。
+不依賴報價元件，可供記錄程式、策略與回測共用。
+"""
+
+
+class CandleAggregator:
+    """多商品、多週期 K 線建構器
+
+    K 線格式與 HistoryDataRecorder 相同:
+        {'time': datetime, 'open': float, 'high': float, 'low': float, 'close': float, 'volume': int}
+    """
+
+    def __init__(self, timeframes=(1,), on_close=None):
+        """
+        初始化 K 線建構器
+
+        Args:
+            timeframes: K 線週期列表（分鐘）
+            on_close: K 線收盤時的回呼函式 on_close(symbol, timeframe, candle)
+        """
+        self.timeframes = list(timeframes)
+        self.on_close = on_close
+        self.current = {}      # {symbol: {tf: candle}} 目前尚未收盤的 K 線
+        self._keys = {}        # {symbol: {tf: int}} 目前 K 線的時間區間代碼
+        self.last_total = {}   # {symbol: int} 上一筆累計成交量
+        self.sessions = {}     # {symbol: 盤別}
+
+    def delta_volume(self, symbol, total_qty=None, qty=None):
+        """
+        由累計成交量計算本筆成交量，並更新該商品的最後累計量
+
+        Args:
+            symbol: 商品代碼
+            total_qty: 累計成交量（MatchTotalQty），None 表示沒有累計量
+            qty: 單筆成交量（MatchQuantity），沒有累計量或第一筆時使用
+
+        Returns:
+            int: 本筆成交量
+        """
+        if total_qty is None:
+            return qty or 0
+        last = self.last_total.get(symbol)
+        self.last_total[symbol] = total_qty
+        if last is None:
+            # 第一筆無法得知之前的累計量
+            return qty or 0
+        if total_qty >= last:
+            return total_qty - last
+        # 累計量變小：新的盤別開始，累計量已歸零
+        return total_qty
+
+    def update(self, symbol, price, timestamp, total_qty=None, qty=None):
+        """
+        以一筆 tick 一次更新所有時間週期的 K 線
+
+        Args:
+            symbol: 商品代碼
+            price: 成交價
+            timestamp: 成交時間 (datetime)
+            total_qty: 累計成交量
+            qty: 單筆成交量
+
+        Returns:
+            int: 本筆計入 K 線的成交量
+        """
+        volume = self.delta_volume(symbol, total_qty, qty)
+
+        candles = self.current.get(symbol)
+        if candles is None:
+            candles = self.current[symbol] = {tf: None for tf in self.timeframes}
+            self._keys[symbol] = {tf: None for tf in self.timeframes}
+        keys = self._keys[symbol]
+
+        minute_of_day = timestamp.hour * 60 + timestamp.minute
+        day = timestamp.toordinal() * 1440
+        for tf in self.timeframes:
+            start = minute_of_day - minute_of_day % tf
+            key = day + start
+            candle = candles[tf]
+            if key == keys[tf]:
+                if price > candle['high']:
+                    candle['high'] = price
+                elif price < candle['low']:
+                    candle['low'] = price
+                candle['close'] = price
+                candle['volume'] += volume
+                continue
+
+            # 新的 K 線，先收掉上一根
+            if candle is not None and self.on_close is not None:
+                self.on_close(symbol, tf, candle)
+            candles[tf] = {
+                'time': timestamp.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0),
+                'open': price,
+                'high': price,
+                'low': price,
+                'close': price,
+                'volume': volume
+            }
+            keys[tf] = key
+        return volume
+
+    def on_session(self, symbol, session):
+        """
+        盤別資訊（PI05005）：盤別改變時收掉目前的 K 線並將累計量歸零
+
+        Args:
+            symbol: 商品代碼
+            session: 盤別
+        """
+        previous = self.sessions.get(symbol)
+        self.sessions[symbol] = session
+        if previous is not None and previous != session:
+            self.flush(symbol)
+            self.last_total[symbol] = 0
+
+    def flush(self, symbol=None):
+        """
+        收掉尚未收盤的 K 線（盤別結束或程式結束時使用）
+
+        Args:
+            symbol: 商品代碼，None 表示全部商品
+        """
+        symbols = [symbol] if symbol is not None else list(self.current)
+        for sym in symbols:
+            candles = self.current.get(sym)
+            if not candles:
+                continue
+            for tf in self.timeframes:
+                if candles[tf] is not None and self.on_close is not None:
+                    self.on_close(sym, tf, candles[tf])
+                candles[tf] = None
+                self._keys[sym][tf] = None
+
+    def get_current(self, symbol):
+        """取得商品目前尚未收盤的 K 線 {tf: candle}"""
+        return self.current.get(symbol, {tf: None for tf in self.timeframes})
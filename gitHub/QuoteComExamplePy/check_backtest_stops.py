@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_backtest_stops.py - Backtester 停損 / 追蹤停損的出場價
+以固定的 K 線高低價逐一檢查 _check_exit：
+    尚未獲利時觸及「開倉價 ∓ 追蹤點數」但未觸及固定停損 → 不出場（追蹤停損尚未啟動）
+    觸及固定停損 → 以停損價出場
+    獲利後從最高 / 最低點回撤追蹤點數 → 以追蹤停損價出場
+    設定 trailing_activation 時，獲利未超過啟動點數前不觸發
+多單、空單，config.py 目前設定與 sweep.py 進取型設定各檢查一次。不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_backtest_stops.py
+"""
+
+import sys
+
+from backtest import Backtester
+
+ENTRY = 20000.0
+
+
+def exits(bt, side, bars):
+    """開倉後依序送入 (low, high)，回傳每根的出場價（出場後不再檢查）"""
+    ex = bt.executor
+    ex._open(side, ENTRY)
+    prices = []
+    for low, high in bars:
+        price = bt._check_exit(low, high)
+        prices.append(price)
+        if price is not None:
+            ex.close_all_positions(price)
+            break
+    return prices
+
+
+def cases(stop_loss, trail, activation=0):
+    """(名稱, 多空, [(low, high), ...], 預期每根出場價)；多單以開倉價為中心對稱產生空單"""
+    rows = [
+        ('未獲利回撤追蹤點數', [(-trail, 0), (-(stop_loss - 1), 0)], [None, None]),
+        ('觸及固定停損', [(-trail, 0), (-stop_loss, 0)], [None, -stop_loss]),
+        ('獲利後回撤', [(0, 40), (40 - trail + 1, 40), (40 - trail, 40)], [None, None, 40 - trail]),
+    ]
+    if activation:
+        rows.append(('獲利未達啟動點數', [(0, activation), (activation - trail, activation)], [None, None]))
+    for name, bars, want in rows:
+        yield name, 'B', [(ENTRY + lo, ENTRY + hi) for lo, hi in bars], \
+            [None if w is None else ENTRY + w for w in want]
+        yield name, 'S', [(ENTRY - hi, ENTRY - lo) for lo, hi in bars], \
+            [None if w is None else ENTRY - w for w in want]
+
+
+def main():
+    configs = [('config.py', Backtester.from_config())]
+    configs.append(('進取型', Backtester(stop_loss=80, trailing_stop=40)))
+    configs.append(('啟動 20 點', Backtester(stop_loss=50, trailing_stop=30, trailing_activation=20)))
+
+    failed = 0
+    print("-" * 72)
+    for label, bt in configs:
+        if bt.stop_loss is None or bt.trailing_stop is None:
+            print(f"{label}: 未同時設定停損與追蹤停損，略過")
+            continue
+        print(f"{label}: 停損 {bt.stop_loss} 點，追蹤停損 {bt.trailing_stop} 點，啟動 {bt.trailing_activation} 點")
+        for name, side, bars, want in cases(bt.stop_loss, bt.trailing_stop, bt.trailing_activation):
+            bt.take_profit = None
+            got = exits(bt, side, bars)
+            ok = got == want
+            failed += not ok
+            print(f"  {'✓' if ok else '✗'} {'多單' if side == 'B' else '空單'} {name:<12} 出場: {got}"
+                  + ('' if ok else f"  預期: {want}"))
+    print("-" * 72)
+    if failed:
+        print(f"✗ {failed} 項不符")
+        sys.exit(1)
+    print("✓ 停損與追蹤停損出場價皆符合")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_candle_aggregator.py - CandleAggregator 與逐筆分組的參考結果比對（隨機 tick 序列）
+每組隨機序列包含：
+    多個商品交錯、時間間隔從 0 秒到數小時（含跨日）
+    累計量（MatchTotalQty）遞增、無預警歸零（新盤別但沒有 PI05005）、部分商品沒有累計量（只有單筆量）
+    PI05005 盤別切換（收掉目前的 K 線並重新計算累計量）；沒有 PI05005 的商品只有無預警歸零
+參考結果不經過 CandleAggregator：成交量使用產生序列時的真實單筆量，K 線以
+(盤別段落, 日期, 週期起點) 分組後直接取 OHLCV，比對每個商品、每個週期的所有 K 線。
+不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_candle_aggregator.py [序列組數] [每組 tick 數] [亂數種子]
+"""
+
+import random
+import sys
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from candle_aggregator import CandleAggregator
+
+TIMEFRAMES = (1, 3, 5, 7, 15, 60)
+SYMBOLS = ('TXFB6', 'MXFB6', 'TMFB6')
+SESSIONS = ('0', '1')
+
+
+def make_stream(rng, count):
+    """
+    產生隨機事件序列：('tick', symbol, price, time, total_qty, qty, true_qty) 或 ('session', symbol, 盤別)
+    true_qty 為該筆真實成交量（參考結果使用）
+    """
+    events = []
+    t = datetime(2026, 1, 5, 8, 45) + timedelta(seconds=rng.randrange(86400))
+    state = {s: {'price': 20000 + rng.randrange(-500, 500), 'cum': rng.randrange(0, 5000),
+                 'session': rng.choice(SESSIONS), 'has_total': rng.random() > 0.2,
+                 'pi05005': rng.random() < 0.7} for s in SYMBOLS}
+    # 有盤別資訊的商品在第一筆 tick 之前收到 PI05005（與訂閱時相同）
+    for s in SYMBOLS:
+        if state[s]['pi05005']:
+            events.append(('session', s, state[s]['session']))
+    for _ in range(count):
+        r = rng.random()
+        if r < 0.6:
+            t += timedelta(seconds=rng.randrange(0, 3))
+        elif r < 0.95:
+            t += timedelta(seconds=rng.randrange(3, 400))
+        else:
+            t += timedelta(minutes=rng.randrange(30, 900))
+        symbol = rng.choice(SYMBOLS)
+        st = state[symbol]
+
+        r = rng.random()
+        if r < 0.01 and st['pi05005']:
+            # 盤別切換：累計量從 0 開始
+            st['session'] = '1' if st['session'] == '0' else '0'
+            st['cum'] = 0
+            events.append(('session', symbol, st['session']))
+        elif r < 0.02 and st['cum'] > 100:
+            # 無預警歸零（新盤別的第一筆，累計量小於上一筆）
+            st['cum'] = 0
+
+        qty = rng.randrange(1, 11)
+        st['cum'] += qty
+        st['price'] += rng.choice((-2, -1, -0.5, 0, 0, 0.5, 1, 2))
+        total = st['cum'] if st['has_total'] else None
+        events.append(('tick', symbol, st['price'], t, total, qty, qty))
+    return events
+
+
+def run_aggregator(events):
+    closed = {}
+    aggregator = CandleAggregator(TIMEFRAMES, on_close=lambda s, tf, c: closed.setdefault((s, tf), []).append(dict(c)))
+    for event in events:
+        if event[0] == 'session':
+            aggregator.on_session(event[1], event[2])
+        else:
+            _, symbol, price, t, total, qty, _ = event
+            aggregator.update(symbol, price, t, total, qty)
+    aggregator.flush()
+    return closed
+
+
+def reference(events):
+    """逐筆分組的 K 線（與 CandleAggregator 無共用程式碼）"""
+    ticks = {s: [] for s in SYMBOLS}
+    segment = {s: 0 for s in SYMBOLS}
+    session = {}
+    for event in events:
+        symbol = event[1]
+        if event[0] == 'session':
+            if session.get(symbol) is not None and session[symbol] != event[2]:
+                segment[symbol] += 1
+            session[symbol] = event[2]
+            continue
+        _, _, price, t, _, _, true_qty = event
+        ticks[symbol].append((segment[symbol], t, price, true_qty))
+
+    result = {}
+    for symbol, rows in ticks.items():
+        for tf in TIMEFRAMES:
+            def key(row, tf=tf):
+                minute = row[1].hour * 60 + row[1].minute
+                return row[0], row[1].date(), minute // tf * tf
+            candles = []
+            for (_, day, start), group in groupby(rows, key):
+                group = list(group)
+                prices = [g[2] for g in group]
+                candles.append({
+                    'time': datetime(day.year, day.month, day.day, start // 60, start % 60),
+                    'open': prices[0],
+                    'high': max(prices),
+                    'low': min(prices),
+                    'close': prices[-1],
+                    'volume': sum(g[3] for g in group)
+                })
+            if candles:
+                result[(symbol, tf)] = candles
+    return result
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+    failed = 0
+    candles = 0
+    for i in range(rounds):
+        rng = random.Random(seed * 100003 + i)
+        events = make_stream(rng, count)
+        got = run_aggregator(events)
+        want = reference(events)
+        candles += sum(len(v) for v in want.values())
+        if got != want:
+            failed += 1
+            if failed <= 3:
+                for k in sorted(set(got) | set(want)):
+                    a, b = got.get(k, []), want.get(k, [])
+                    if a != b:
+                        first = next((j for j, (x, y) in enumerate(zip(a, b)) if x != y), min(len(a), len(b)))
+                        print(f"✗ 第 {i} 組 {k[0]} {k[1]}分K 第 {first} 根: "
+                              f"{a[first] if first < len(a) else '（無）'} ≠ {b[first] if first < len(b) else '（無）'}")
+                        break
+
+    print("-" * 60)
+    print(f"{rounds} 組隨機序列 × {count:,} 筆 tick，週期 {TIMEFRAMES}，共 {candles:,} 根 K 線")
+    if failed:
+        print(f"✗ {failed} 組與參考結果不同")
+        sys.exit(1)
+    print("✓ 所有 K 線 OHLCV 與參考結果相同")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_history_replay.py - HistoryDataRecorder 推播模式的重播檢查
+以 kgisim 的 SimMarket / QuoteCom 重播固定的 tick 序列（同一個 QuoteCom 另外訂閱一個商品，
+其成交不應進入本記錄器），結束後讀回 K 線與 tick CSV，逐列比對預期結果。
+不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_history_replay.py
+"""
+
+import contextlib
+import csv
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+import config
+from history import HistoryDataRecorder
+from kgisim import SimMarket, QuoteCom
+
+SYMBOL = config.STOCK_CODE
+OTHER = 'TXFK6'
+DAY = datetime(2026, 10, 19)  # 星期一日盤
+NOW = DAY.replace(hour=9, minute=5)
+
+# (時間, 價格, 單筆量)；累計量由 SimMarket 累加
+TICKS = [
+    (DAY.replace(hour=9, minute=0, second=10), 23000.0, 2),
+    (DAY.replace(hour=9, minute=0, second=40), 23005.0, 1),
+    (DAY.replace(hour=9, minute=1, second=5), 22998.0, 3),
+    (DAY.replace(hour=9, minute=2, second=59, microsecond=250000), 23010.0, 1),
+    (DAY.replace(hour=9, minute=3, second=0), 23002.0, 4),
+    (DAY.replace(hour=9, minute=4, second=30), 23001.0, 2),
+]
+
+# 預期 K 線：時間, 開, 高, 低, 收, 量（第一筆以單筆量計入，之後為累計量差額）
+EXPECTED_CANDLES = {
+    1: [
+        ('2026-10-19 09:00:00', 23000.0, 23005.0, 23000.0, 23005.0, 3),
+        ('2026-10-19 09:01:00', 22998.0, 22998.0, 22998.0, 22998.0, 3),
+        ('2026-10-19 09:02:00', 23010.0, 23010.0, 23010.0, 23010.0, 1),
+        ('2026-10-19 09:03:00', 23002.0, 23002.0, 23002.0, 23002.0, 4),
+        ('2026-10-19 09:04:00', 23001.0, 23001.0, 23001.0, 23001.0, 2),
+    ],
+    3: [
+        ('2026-10-19 09:00:00', 23000.0, 23010.0, 22998.0, 23010.0, 7),
+        ('2026-10-19 09:03:00', 23002.0, 23002.0, 23001.0, 23001.0, 6),
+    ],
+}
+EXPECTED_TICKS = [
+    ('2026-10-19 09:00:10.000', 23000.0, 2, 2),
+    ('2026-10-19 09:00:40.000', 23005.0, 1, 3),
+    ('2026-10-19 09:01:05.000', 22998.0, 3, 6),
+    ('2026-10-19 09:02:59.250', 23010.0, 1, 7),
+    ('2026-10-19 09:03:00.000', 23002.0, 4, 11),
+    ('2026-10-19 09:04:30.000', 23001.0, 2, 13),
+]
+
+
+def read_rows(path, convert):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [convert(row) for row in reader]
+
+
+def candle_row(row):
+    return (row[0], float(row[1]), float(row[2]), float(row[3]), float(row[4]), int(row[5]))
+
+
+def tick_row(row):
+    return (row[0], float(row[1]), int(row[2]), int(row[3]))
+
+
+def main():
+    config.TICK_FORMAT = 'csv'
+    config.CALLBACK_QUEUE_SIZE = 0
+    market = SimMarket(clock=lambda: NOW)
+    quote_com = QuoteCom(market=market, feed_rate=0)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+            recorder = HistoryDataRecorder(timeframes=[1, 3], data_dir=data_dir, mode='stream',
+                                           quote_com=quote_com, clock=lambda: NOW)
+            quote_com.Connect2Quote('sim', 0, 'check', '', ' ', '')
+            quote_com.SubQuote(SYMBOL)
+            quote_com.SubQuote(OTHER)
+            for i, (t, price, qty) in enumerate(TICKS):
+                market.publish(SYMBOL, price, qty, t)
+                # 同一個 QuoteCom 上其他商品的成交
+                market.publish(OTHER, 17000.0 + i, 5, t)
+            with recorder.lock:
+                recorder.aggregator.flush()
+            recorder.dispose()
+
+        candles = {tf: read_rows(recorder._get_candle_filename(tf), candle_row) for tf in (1, 3)}
+        ticks = read_rows(recorder._get_tick_filename(), tick_row)
+
+    failed = 0
+    print("-" * 72)
+    for tf, want in EXPECTED_CANDLES.items():
+        ok = candles[tf] == want
+        failed += not ok
+        print(f"{'✓' if ok else '✗'} {tf}分K: {len(candles[tf])} 根（預期 {len(want)} 根）")
+        if not ok:
+            for got_row, want_row in zip(candles[tf] + [None] * len(want), want + [None] * len(candles[tf])):
+                if got_row != want_row:
+                    print(f"    {got_row} ≠ {want_row}")
+    ok = ticks == EXPECTED_TICKS
+    failed += not ok
+    print(f"{'✓' if ok else '✗'} Tick: {len(ticks)} 筆（預期 {len(EXPECTED_TICKS)} 筆）")
+    if not ok:
+        for row in ticks:
+            print(f"    {row}{'' if row in EXPECTED_TICKS else '  ← 不應出現'}")
+    print("-" * 72)
+    if failed:
+        print("✗ 記錄結果與預期不同")
+        sys.exit(1)
+    print("✓ K 線與 tick 記錄皆符合預期")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_indicator_batch.py - indicator_batch 批次計算與 IndicatorEngine 逐根更新的結果位元相同
+以隨機收盤價（含連續平盤、只漲、只跌的區段）與各種邊界長度檢查：
+    0 根、1 根、2 根、RSI 週期 -1 / 0 / +1 根、MACD 可用前後    暖機期間的 NaN 與交叉起點
+    macd / signal / hist / rsi 逐根以 == 比較（RSI 尚未有值的位置批次為 NaN、串流為 None）
+    crosses（未過濾）、signals（RSI 過濾後）逐根相同
+    warm_up() 產生的狀態與逐根 update() 後的 snapshot() 相同，之後繼續更新的結果也相同
+最後量測 compute() 與逐根 update() 的耗時。不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_indicator_batch.py [隨機序列數]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+import indicator_batch
+from indicators import IndicatorEngine, GOLDEN, DEATH
+
+PARAMS = dict(short_period=5, long_period=10, signal_period=5, rsi_period=14,
+              rsi_overbought=70, rsi_oversold=30, enable_rsi_filter=True)
+EDGE_LENGTHS = [0, 1, 2, 13, 14, 15, 16, 17, 18, 30]
+RANDOM_SERIES = 200
+CONTINUE_BARS = 50
+BENCH_BARS = 200_000
+CROSS_CODE = {GOLDEN: 1, DEATH: -1, None: 0}
+
+
+def random_close(rng, n):
+    """隨機收盤價，約三成機率插入平盤 / 只漲 / 只跌的區段"""
+    steps = rng.choice([-2.0, -1.0, 0.0, 1.0, 2.0], size=n) * rng.choice([1.0, 0.5, 0.25], size=n)
+    for _ in range(rng.integers(0, 4)):
+        start = int(rng.integers(0, max(n, 1)))
+        end = start + int(rng.integers(1, 30))
+        steps[start:end] = rng.choice([0.0, 1.0, -1.0])
+    return 23000.0 + np.cumsum(steps)
+
+
+def stream(close, engine=None):
+    """逐根 update()，回傳每根的數值與交叉"""
+    engine = engine if engine is not None else IndicatorEngine(**PARAMS)
+    rows = []
+    for c in close.tolist():
+        signal = engine.update(c)
+        rows.append((engine.macd, engine.signal, engine.hist, engine.rsi,
+                     CROSS_CODE[engine.cross], CROSS_CODE[signal]))
+    return engine, rows
+
+
+def same(a, b):
+    """位元相同（NaN 與 None 視為相同）"""
+    if b is None:
+        return bool(np.isnan(a))
+    return float(a) == b
+
+
+def compare(close):
+    """回傳第一個不符的說明，全部相同時為 None"""
+    batch = indicator_batch.compute(close, **PARAMS)
+    engine, rows = stream(close)
+    for i, (macd, signal, hist, rsi, cross, filtered) in enumerate(rows):
+        for name, got, want in (('macd', batch['macd'][i], macd), ('signal', batch['signal'][i], signal),
+                                ('hist', batch['hist'][i], hist), ('rsi', batch['rsi'][i], rsi)):
+            if not same(got, want):
+                return f"第 {i} 根 {name}: 批次 {got!r}，串流 {want!r}"
+        if batch['crosses'][i] != cross or batch['signals'][i] != filtered:
+            return (f"第 {i} 根交叉: 批次 {batch['crosses'][i]}/{batch['signals'][i]}，"
+                    f"串流 {cross}/{filtered}")
+
+    warmed = indicator_batch.warm_up(close, **PARAMS)
+    if warmed.snapshot() != engine.snapshot():
+        diff = sorted(k for k, v in warmed.snapshot().items() if engine.snapshot()[k] != v)
+        return f"warm_up 狀態不同: {diff}"
+    more = random_close(np.random.default_rng(len(close)), CONTINUE_BARS) - 23000.0 + \
+        (close[-1] if len(close) else 23000.0)
+    if stream(more, warmed)[1] != stream(more, engine)[1]:
+        return "warm_up 之後繼續更新的結果不同"
+    return None
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else RANDOM_SERIES
+    rng = np.random.default_rng(20261017)
+    failed = 0
+
+    print("-" * 72)
+    for n in EDGE_LENGTHS:
+        error = compare(random_close(rng, n))
+        failed += error is not None
+        print(f"{'✓' if error is None else '✗'} {n:>3} 根" + ('' if error is None else f"  {error}"))
+
+    errors = []
+    for _ in range(count):
+        error = compare(random_close(rng, int(rng.integers(20, 2000))))
+        if error is not None:
+            errors.append(error)
+    failed += len(errors)
+    print(f"{'✓' if not errors else '✗'} 隨機序列 {count} 組（20 ~ 2000 根）"
+          + ('' if not errors else f"  {len(errors)} 組不符，例: {errors[0]}"))
+
+    close = random_close(rng, BENCH_BARS)
+    start = time.perf_counter()
+    indicator_batch.compute(close, **PARAMS)
+    batch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    engine = IndicatorEngine(**PARAMS)
+    for c in close.tolist():
+        engine.update(c)
+    stream_time = time.perf_counter() - start
+    print("-" * 72)
+    print(f"  {BENCH_BARS:,} 根: compute() {batch_time * 1e3:7.1f} ms，逐根 update() {stream_time * 1e3:7.1f} ms"
+          f"（{stream_time / batch_time:.1f} 倍）")
+    print("-" * 72)
+    if failed:
+        print(f"✗ {failed} 項不符")
+        sys.exit(1)
+    print("✓ 批次計算與逐根更新的結果位元相同")
+
+
+if __name__ == '__main__':
+    main()
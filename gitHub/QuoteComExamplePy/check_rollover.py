@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_rollover.py - HistoryDataRecorder 依交易日切換檔案（可替換的 clock）
+以 kgisim 推播 tick，逐步調整 clock 跨過：
+    週三 14:59 → 15:00         夜盤開始，交易日切換為週四
+    週五 14:59 → 15:00 → 週六凌晨 → 週一 08:45    週五夜盤與週一日盤同屬週一交易日
+    週一 15:00                  交易日切換為週二
+每一步檢查目前交易日、檔名，以及 _check_rollover 之後仍開啟的寫入器：
+最後寫入距今未滿 IDLE_SECONDS 秒的保持開啟（新交易日的檔案在第一筆資料寫入時才開啟），
+其餘（包括前一交易日的檔案）因閒置而被關閉。
+結束後檢查各交易日 K 線 / tick 檔的筆數。不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_rollover.py
+"""
+
+import contextlib
+import csv
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+import config
+from history import HistoryDataRecorder
+from kgisim import SimMarket, QuoteCom
+
+SYMBOL = config.STOCK_CODE
+IDLE_SECONDS = 60
+
+# (clock, 預期交易日)；每一步在 clock 時間推播一筆 tick
+STEPS = [
+    (datetime(2026, 10, 21, 14, 58, 30), '20261021'),   # 週三日盤
+    (datetime(2026, 10, 21, 14, 59, 40), '20261021'),
+    (datetime(2026, 10, 21, 15, 0, 5), '20261022'),     # 夜盤開始 → 週四
+    (datetime(2026, 10, 21, 15, 2, 0), '20261022'),
+    (datetime(2026, 10, 23, 14, 59, 0), '20261023'),    # 週五日盤
+    (datetime(2026, 10, 23, 15, 0, 0), '20261026'),     # 週五夜盤 → 週一
+    (datetime(2026, 10, 23, 23, 59, 30), '20261026'),
+    (datetime(2026, 10, 24, 0, 30, 0), '20261026'),     # 週六凌晨（週五夜盤）
+    (datetime(2026, 10, 26, 8, 45, 0), '20261026'),     # 週一日盤
+    (datetime(2026, 10, 26, 15, 0, 0), '20261027'),     # 週一夜盤 → 週二
+]
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return sum(1 for _ in csv.reader(f)) - 1
+
+
+def main():
+    config.TICK_FORMAT = 'csv'
+    config.CALLBACK_QUEUE_SIZE = 0
+    config.WRITER_IDLE_SECONDS = IDLE_SECONDS
+    now = [STEPS[0][0]]
+    clock = lambda: now[0]
+    market = SimMarket(clock=clock)
+    quote_com = QuoteCom(market=market, feed_rate=0)
+
+    failed = 0
+    print("-" * 80)
+    with tempfile.TemporaryDirectory() as data_dir:
+        with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+            recorder = HistoryDataRecorder(timeframes=[1], data_dir=data_dir, mode='stream',
+                                           quote_com=quote_com, clock=clock)
+            quote_com.Connect2Quote('sim', 0, 'check', '', ' ', '')
+            quote_com.SubQuote(SYMBOL)
+
+        # 寫入器最後使用時間：建構時開啟第一個交易日的檔案，之後 tick 寫入目前交易日、
+        # 收盤的 K 線寫入上一步的交易日
+        last_used = {('tick', None, STEPS[0][1]): STEPS[0][0], ('candle', 1, STEPS[0][1]): STEPS[0][0]}
+        previous = None
+        for i, (t, day) in enumerate(STEPS):
+            now[0] = t
+            with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+                market.publish(SYMBOL, 23000.0 + i, 1, t)   # 收掉上一步的 K 線
+                recorder._save_tick_batch()
+                recorder._check_rollover()
+
+            last_used[('tick', None, day)] = t
+            if previous is not None:
+                last_used[('candle', 1, previous)] = t      # 上一步的 K 線剛寫入
+            want_open = {k for k, used in last_used.items() if (t - used).total_seconds() < IDLE_SECONDS}
+            got_open = set(recorder.writers.keys())
+            names_ok = recorder.tick_filename.endswith(f'_{day}.csv') and \
+                recorder.candle_filenames[1].endswith(f'_{day}.csv')
+            ok = recorder.trading_day == day and names_ok and got_open == want_open
+            failed += not ok
+            print(f"{'✓' if ok else '✗'} {t:%a %Y-%m-%d %H:%M:%S}  交易日 {recorder.trading_day}（預期 {day}）"
+                  f"  開啟中: {', '.join(sorted(f'{k[0]}:{k[2]}' for k in got_open))}")
+            if got_open != want_open:
+                print(f"    預期開啟: {', '.join(sorted(f'{k[0]}:{k[2]}' for k in want_open))}")
+            previous = day
+
+        with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+            with recorder.lock:
+                recorder.aggregator.flush()
+            recorder.dispose()
+
+        days = {}
+        for _, day in STEPS:
+            days[day] = days.get(day, 0) + 1
+        print("-" * 80)
+        for day, n in days.items():
+            ticks = count_rows(recorder._get_tick_filename(day))
+            candles = count_rows(recorder._get_candle_filename(1, day))
+            ok = ticks == n and candles == n
+            failed += not ok
+            print(f"{'✓' if ok else '✗'} 交易日 {day}: tick {ticks} 筆、1分K {candles} 根（預期各 {n}）")
+        extra = sorted(name for name in os.listdir(data_dir)
+                       if name.endswith('.csv') and not any(day in name for day in days))
+        if extra:
+            failed += 1
+            print(f"✗ 不應存在的檔案: {extra}")
+
+    print("-" * 80)
+    if failed:
+        print(f"✗ {failed} 項不符")
+        sys.exit(1)
+    print("✓ 交易日切換、檔名與寫入器關閉皆符合預期")
+
+
+if __name__ == '__main__':
+    main()
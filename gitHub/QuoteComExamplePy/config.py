@@ -30,6 +30,38 @@ QUERY_INTERVAL = 5
 # 每隔多少秒查詢一次最後價格
 QUOTE_QUERY_INTERVAL = 5
 
+# 報價接收模式
+# "stream": 直接使用訂閱後推播的成交封包（PI20020/PI20022）建立 K 線，不漏掉任何成交
+# "poll":   每 QUOTE_QUERY_INTERVAL 秒主動查詢一次最後價格（舊模式）
+QUOTE_MODE = "stream"
+
+# 串流模式下，超過幾秒沒有收到推播成交時改用主動查詢補價（備援）
+STREAM_FALLBACK_SECONDS = 15
+
+# 資料寫入緩衝設定
+# K 線/Tick 檔案保持開啟，緩衝達到筆數或秒數時才寫入磁碟（程式結束時一定寫入）
+WRITER_BUFFER_ROWS = 1000
+WRITER_FLUSH_SECONDS = 5
+
+# 檔案閒置超過幾秒即關閉（換交易日後，前一個交易日的檔案會在此時間後關閉）
+WRITER_IDLE_SECONDS = 600
+
+# 日誌等級："DEBUG" 另外顯示每筆 tick 的即時資訊，"INFO" 只顯示 K 線收盤與狀態
+# 也可用環境變數 KGI_LOG_FILE 另存 JSON lines 日誌（見 kgilog）
+LOG_LEVEL = "INFO"
+
+# 回呼佇列：> 0 時報價事件執行緒只把封包排入佇列，由背景執行緒處理（K 線、寫檔、print）
+# 0 = 在事件執行緒直接處理（舊模式）
+CALLBACK_QUEUE_SIZE = 0
+# 佇列滿時的處理方式："drop_oldest" 丟棄最舊的封包，"block" 等待（不漏 tick，但會拖住 API 接收）
+CALLBACK_QUEUE_POLICY = "drop_oldest"
+
+# Tick 儲存格式
+# "csv":    文字 CSV（*_tick_YYYYMMDD.csv）
+# "binary": 欄式二進位（*_tick_YYYYMMDD.ticks/，讀取時直接以 NumPy 對應，見 tick_store.py）
+# "both":   兩種都寫
+TICK_FORMAT = "csv"
+
 
 # ============================================================
 # 伺服器設定（通常不需要修改）
@@ -84,6 +116,7 @@ MACD_SIGNAL_PERIOD = 5   # 訊號線週期（快速模式：5，標準：9）
 MACD_STOP_LOSS = 50        # 停損點數（預設 50 點，設為 None 不啟用）
 MACD_TAKE_PROFIT = 150     # 停利點數（預設 100 點，設為 None 不啟用）
 MACD_TRAILING_STOP = 30  # 追蹤停損點數（預設 None 不啟用，建議 30 點）
+MACD_TRAILING_ACTIVATION = 0  # 獲利超過幾點後才啟動追蹤停損（0 = 價格一超過開倉價就啟動）
 
 # 停利停損說明：
 # 1. 固定停損 (MACD_STOP_LOSS): 虧損達到設定點數時立即平倉，防止損失擴大
@@ -96,6 +129,7 @@ MACD_TRAILING_STOP = 30  # 追蹤停損點數（預設 None 不啟用，建議 3
 #    範例：設定 30 點，從最高點（多單）或最低點（空單）回撤 30 點時停損
 #    多單例子：開倉 27000，漲到 27100，回落到 27070 時觸發追蹤停損
 #    空單例子：開倉 27000，跌到 26900，反彈到 26930 時觸發追蹤停損
+#    價格尚未超過開倉價（或 MACD_TRAILING_ACTIVATION 點）前不啟動，由固定停損處理
 # 
 # 建議配置：
 # - 保守型：STOP_LOSS=30, TAKE_PROFIT=60, TRAILING_STOP=None
@@ -0,0 +1,213 @@
+"""
+data_writers.py - 長駐緩衝的 CSV 寫入器
+檔案只開啟一次，資料先放在記憶體緩衝，達到筆數、時間間隔或關閉時才寫入磁碟；
+時間欄位以快取的「年月日 時:分」前綴組字串，避免每一列都呼叫 strftime。
+"""
+
+import csv
+import os
+import threading
+from collections import OrderedDict
+from time import time
+
+
+class TimestampFormatter:
+    """時間字串格式化（快取到分鐘的前綴）
+
+    同一分鐘內的 tick 只需要補上秒數與毫秒，輸出與
+    strftime('%Y-%m-%d %H:%M:%S') / strftime('%Y-%m-%d %H:%M:%S.%f')[:-3] 相同。
+    """
+    __slots__ = ('_key', '_prefix')
+
+    def __init__(self):
+        self._key = None
+        self._prefix = ''
+
+    def _minute_prefix(self, dt):
+        key = (dt.minute, dt.hour, dt.day, dt.month, dt.year)
+        if key != self._key:
+            self._key = key
+            self._prefix = '%04d-%02d-%02d %02d:%02d:' % (dt.year, dt.month, dt.day, dt.hour, dt.minute)
+        return self._prefix
+
+    def format_s(self, dt):
+        """YYYY-MM-DD HH:MM:SS"""
+        return self._minute_prefix(dt) + '%02d' % dt.second
+
+    def format_ms(self, dt):
+        """YYYY-MM-DD HH:MM:SS.mmm"""
+        return self._minute_prefix(dt) + '%02d.%03d' % (dt.second, dt.microsecond // 1000)
+
+
+def epoch_ms(dt):
+    """datetime 轉 epoch 毫秒整數（本機時間）"""
+    return int(dt.timestamp() * 1000)
+
+
+class BufferedCSVWriter:
+    """長駐開啟的 CSV 寫入器
+
+    可同時被推播執行緒與主迴圈呼叫（內部有鎖）。
+    """
+
+    def __init__(self, filename, header=None, buffer_rows=1000, flush_interval=5.0, clock=time):
+        """
+        初始化寫入器
+
+        Args:
+            filename: 檔案名稱（附加模式開啟，新檔案會先寫入標題列）
+            header: 標題列
+            buffer_rows: 緩衝筆數，達到時寫入磁碟
+            flush_interval: 最長緩衝秒數，超過時寫入磁碟
+            clock: 取得目前時間（秒）的函式
+        """
+        self.filename = filename
+        self.buffer_rows = buffer_rows
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self.rows_written = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+
+        is_new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self._file = open(filename, 'a', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._file)
+        if is_new and header:
+            self._writer.writerow(header)
+            self._file.flush()
+        self._last_flush = clock()
+
+    @property
+    def closed(self):
+        return self._file is None
+
+    def write_row(self, row):
+        """寫入一列（先放入緩衝）"""
+        with self._lock:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.buffer_rows or self.clock() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def write_rows(self, rows):
+        """寫入多列（先放入緩衝）"""
+        with self._lock:
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.buffer_rows or self.clock() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def maybe_flush(self):
+        """超過緩衝時間時寫入磁碟（供主迴圈定時呼叫）"""
+        with self._lock:
+            if self._buffer and self.clock() - self._last_flush >= self.flush_interval:
+                self._flush_locked()
+
+    def flush(self):
+        """立即寫入磁碟"""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._file is None:
+            return
+        if self._buffer:
+            self._writer.writerows(self._buffer)
+            self.rows_written += len(self._buffer)
+            self._buffer = []
+        self._file.flush()
+        self._last_flush = self.clock()
+
+    def close(self):
+        """寫入剩餘資料並關閉檔案"""
+        with self._lock:
+            if self._file is None:
+                return
+            self._flush_locked()
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class WriterCache:
+    """開啟中檔案的快取（依分割鍵，例如 (種類, 週期, 交易日)）
+
+    超過 max_open 個時關閉最久未使用的寫入器；超過 idle_seconds 沒有寫入的
+    寫入器由 close_idle() 關閉（例如換日後的前一個交易日檔案）。
+    寫入器需要提供 close()，另外可提供 maybe_flush() 或 flush()。
+    """
+
+    def __init__(self, factory, max_open=8, idle_seconds=300, clock=time, on_close=None):
+        """
+        初始化快取
+
+        Args:
+            factory: 建立寫入器的函式 factory(key)
+            max_open: 最多同時開啟的寫入器數量
+            idle_seconds: 閒置超過幾秒即關閉
+            clock: 取得目前時間（秒）的函式
+            on_close: 寫入器關閉後的回呼 on_close(key, writer)
+        """
+        self.factory = factory
+        self.max_open = max_open
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.on_close = on_close
+        self._writers = OrderedDict()  # key -> [writer, 最後使用時間]
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._writers)
+
+    def __contains__(self, key):
+        return key in self._writers
+
+    def keys(self):
+        with self._lock:
+            return list(self._writers)
+
+    def get(self, key):
+        """取得（必要時開啟）分割鍵對應的寫入器"""
+        with self._lock:
+            item = self._writers.get(key)
+            if item is None:
+                item = self._writers[key] = [self.factory(key), self.clock()]
+                while len(self._writers) > self.max_open:
+                    self._close(next(iter(self._writers)))
+            else:
+                item[1] = self.clock()
+                self._writers.move_to_end(key)
+            return item[0]
+
+    def _close(self, key):
+        writer, _ = self._writers.pop(key)
+        writer.close()
+        if self.on_close is not None:
+            self.on_close(key, writer)
+
+    def close(self, key):
+        """關閉指定的寫入器"""
+        with self._lock:
+            if key in self._writers:
+                self._close(key)
+
+    def close_idle(self):
+        """關閉閒置的寫入器，回傳關閉的數量"""
+        with self._lock:
+            now = self.clock()
+            cold = [key for key, (_, used) in self._writers.items() if now - used >= self.idle_seconds]
+            for key in cold:
+                self._close(key)
+            return len(cold)
+
+    def maybe_flush(self):
+        """讓各寫入器依自己的規則寫入磁碟"""
+        with self._lock:
+            for writer, _ in self._writers.values():
+                flush = getattr(writer, 'maybe_flush', None) or getattr(writer, 'flush', None)
+                if flush is not None:
+                    flush()
+
+    def close_all(self):
+        """關閉所有寫入器"""
+        with self._lock:
+            for key in list(self._writers):
+                self._close(key)
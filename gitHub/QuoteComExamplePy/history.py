@@ -4,7 +4,6 @@ history.py - 歷史報價資料記錄程式
 可供未來載入到 MACD 等技術分析策略中使用
 """
 
-import clr
 import sys
 from time import sleep, time
 from datetime import datetime, timedelta
@@ -12,32 +11,45 @@ from collections import deque
 import json
 import os
 import csv
+import threading
 
-# 引用必要的 DLL
-clr.AddReference("Package")
-clr.AddReference("PushClient")
-clr.AddReference("QuoteCom")
-
-from Intelligence import QuoteCom, MARKET_FLAG, COM_STATUS
+# 引用 QuoteCom 元件（DLL 或模擬器，依 KGI_BACKEND 環境變數）
+from QuoteComFutPySample import QuoteCom, MARKET_FLAG, COM_STATUS
+from kgiperf import CallbackQueue
+from kgilog import get_logger, DEBUG
 
 # 導入配置檔
 import config
+from quote_dispatch import PacketDispatcher
+from quote_packets import PI20020View, PI05005View
+from candle_aggregator import CandleAggregator
+from data_writers import BufferedCSVWriter, TimestampFormatter, WriterCache
+from tick_store import TickStoreWriter, STORE_SUFFIX
+from history_catalog import HistoryCatalog
+from trading_calendar import trading_day_str
+
+# 每筆 tick 的即時資訊為 DEBUG 等級（config.LOG_LEVEL = "DEBUG" 時顯示）
+log = get_logger('history', getattr(config, 'LOG_LEVEL', None))
 
 
 class HistoryDataRecorder:
     """歷史資料記錄器 - 記錄即時報價並轉換為 K 線"""
     
-    def __init__(self, timeframes=[3, 5], data_dir="historical_data"):
+    def __init__(self, timeframes=[3, 5], data_dir="historical_data", mode=None, quote_com=None,
+                 clock=datetime.now):
         """
         初始化歷史資料記錄器
         
         Args:
             timeframes: K 線週期列表（分鐘），預設 [3, 5] 分鐘
             data_dir: 資料儲存目錄
+            mode: "stream" 使用推播成交建立 K 線，"poll" 定時查詢最後價格，預設讀取 config.QUOTE_MODE
+            quote_com: 報價元件，預設建立 QuoteCom（可傳入模擬的事件來源重播資料）
+            clock: 取得目前時間的函式（回傳 datetime），測試換日時可替換
         """
-        print("=" * 70)
-        print("QuoteCom 歷史資料記錄程式")
-        print("=" * 70)
+        log.info("=" * 70)
+        log.info("QuoteCom 歷史資料記錄程式")
+        log.info("=" * 70)
         
         # 從 config 讀取配置
         self.host = config.SERVER_HOST
@@ -48,6 +60,9 @@ class HistoryDataRecorder:
         self.password = config.PASSWORD
         self.stock_code = config.STOCK_CODE
         self.query_interval = config.QUOTE_QUERY_INTERVAL
+        self.mode = mode or getattr(config, 'QUOTE_MODE', 'poll')
+        self.stream_fallback = getattr(config, 'STREAM_FALLBACK_SECONDS', 15)
+        self.clock = clock
         
         # K 線設定
         self.timeframes = timeframes if isinstance(timeframes, list) else [timeframes]
@@ -56,106 +71,175 @@ class HistoryDataRecorder:
         # 建立資料目錄
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
-            print(f">>> 建立資料目錄: {data_dir}")
+            log.info(">>> 建立資料目錄: %s", data_dir)
         
         # 初始化 QuoteCom
-        self.quoteCom = QuoteCom("", self.port, self.sid, self.token)
-        print(f"QuoteCom API 版本: {self.quoteCom.version}")
-        print(f"商品代碼: {self.stock_code}")
-        print(f"K 線週期: {', '.join([str(tf) + '分' for tf in self.timeframes])}")
-        print(f"資料儲存目錄: {self.data_dir}")
-        
-        # K 線資料 - 為每個時間週期維護獨立的 K 線
-        self.current_candles = {tf: None for tf in self.timeframes}
+        self.quoteCom = quote_com if quote_com is not None else QuoteCom("", self.port, self.sid, self.token)
+        log.info("QuoteCom API 版本: %s", self.quoteCom.version)
+        log.info("商品代碼: %s", self.stock_code)
+        log.info("K 線週期: %s", ', '.join([str(tf) + '分' for tf in self.timeframes]))
+        log.info("資料儲存目錄: %s", self.data_dir)
+        log.info("報價模式: %s", '推播成交' if self.mode == 'stream' else '定時查詢')
+        
+        # K 線資料 - 為每個時間週期維護獨立的 K 線（成交量為每根 K 線的增量）
+        self.aggregator = CandleAggregator(self.timeframes, on_close=self._on_candle_close)
         self.candles = {tf: deque(maxlen=10000) for tf in self.timeframes}  # 保留最近 10000 根 K 線
+        self.candle_listeners = []  # K 線收盤回呼 listener(symbol, timeframe, candle)，例如 IndicatorEngine.on_candle
         
         # Tick 資料記錄（選用）
         self.tick_data = deque(maxlen=50000)  # 保留最近 50000 筆 tick
         self.record_tick = True  # 是否記錄原始 tick 資料
+        self.tick_format = getattr(config, 'TICK_FORMAT', 'csv')  # "csv" / "binary" / "both"
+        self.price_decimal = None  # 由報價封包的 PriceDecimal 取得
+        self.writer_buffer_rows = getattr(config, 'WRITER_BUFFER_ROWS', 1000)
+        self.writer_flush_seconds = getattr(config, 'WRITER_FLUSH_SECONDS', 5)
+        self.writer_idle_seconds = getattr(config, 'WRITER_IDLE_SECONDS', 600)
+        self.time_format = TimestampFormatter()
+        self.lock = threading.Lock()  # 推播執行緒與主迴圈共用 tick/K 線資料
         
         # 統計資訊
         self.tick_count = 0
         self.candle_counts = {tf: 0 for tf in self.timeframes}
         self.start_time = None
         
-        # 檔案名稱 - 為每個時間週期維護獨立的檔案
-        self.candle_filenames = {tf: self._get_candle_filename(tf) for tf in self.timeframes}
-        self.tick_filename = self._get_tick_filename()
+        # 檔案名稱 - 以交易日分割（夜盤屬於下一個交易日），為每個時間週期維護獨立的檔案
+        self._set_trading_day(trading_day_str(self.clock()))
+        self.catalog = HistoryCatalog(self.data_dir)  # K 線檔案索引（供 load 依時間範圍讀取）
+        
+        # 開啟中的檔案 {(種類, 週期, 交易日): 寫入器}，閒置或超過數量時關閉
+        self.writers = WriterCache(self._open_writer,
+                                   max_open=(len(self.timeframes) + 2) * 2,
+                                   idle_seconds=self.writer_idle_seconds,
+                                   clock=lambda: self.clock().timestamp(),
+                                   on_close=self._on_writer_close)
         
         # 初始化檔案
         self._init_data_files()
         
-        print("=" * 70 + "\n")
-        
-        # 註冊事件處理器
-        self.quoteCom.OnRcvMessage += self.on_receive_message
-        self.quoteCom.OnGetStatus += self.on_get_status
-        self.quoteCom.OnRecoverStatus += self.on_recover_status
+        log.info("=" * 70 + "\n")
+        
+        # 封包分派表
+        self.dispatcher = PacketDispatcher(on_unknown=lambda pkg: None)
+        self.dispatcher.register(1503, self.handle_login_response)  # 登入成功
+        self.dispatcher.register(20026, self.handle_last_price)     # 查詢商品最後價格
+        self.dispatcher.register(20020, self.handle_match)          # 成交價量揭示
+        self.dispatcher.register(20022, self.handle_match)          # 成交價量揭示 – 盤前
+        self.dispatcher.register(5005, self.handle_session)         # 盤別資訊（日盤/夜盤切換）
+        
+        # 註冊事件處理器（設定 CALLBACK_QUEUE_SIZE 時事件執行緒只排入佇列，由背景執行緒處理）
+        self.callback_queue = None
+        on_message, on_status, on_recover = self.on_receive_message, self.on_get_status, self.on_recover_status
+        queue_size = getattr(config, 'CALLBACK_QUEUE_SIZE', 0)
+        if queue_size > 0:
+            self.callback_queue = CallbackQueue(queue_size, getattr(config, 'CALLBACK_QUEUE_POLICY', 'drop_oldest'),
+                                                name='quote').start()
+            on_message = self.callback_queue.wrap(on_message)
+            on_status = self.callback_queue.wrap(on_status, block=True)
+            on_recover = self.callback_queue.wrap(on_recover, block=True)
+        self.quoteCom.OnRcvMessage += on_message
+        self.quoteCom.OnGetStatus += on_status
+        self.quoteCom.OnRecoverStatus += on_recover
         
         self.is_logged_in = False
         self.is_downloaded = False
         self.keep_running = True
         self.last_query_time = 0
         self.last_save_time = time()
+        self.last_push_time = 0  # 最後一次收到推播成交的時間
+    
+    def _get_candle_filename(self, timeframe, day=None):
+        """取得 K 線資料檔案名稱（day 為交易日 YYYYMMDD，預設目前交易日）"""
+        day = day or self.trading_day
+        return os.path.join(self.data_dir, f"{self.stock_code}_candle_{timeframe}m_{day}.csv")
+    
+    def _get_tick_filename(self, day=None):
+        """取得 Tick 資料檔案名稱（day 為交易日 YYYYMMDD，預設目前交易日）"""
+        day = day or self.trading_day
+        return os.path.join(self.data_dir, f"{self.stock_code}_tick_{day}.csv")
+    
+    def _set_trading_day(self, day):
+        """設定目前交易日，並更新顯示/摘要用的檔案名稱"""
+        self.trading_day = day
+        self.candle_filenames = {tf: self._get_candle_filename(tf, day) for tf in self.timeframes}
+        self.tick_filename = self._get_tick_filename(day)
+        self.tick_store_path = os.path.splitext(self.tick_filename)[0] + STORE_SUFFIX
     
-    def _get_candle_filename(self, timeframe):
-        """取得 K 線資料檔案名稱"""
-        today = datetime.now().strftime('%Y%m%d')
-        return os.path.join(self.data_dir, f"{self.stock_code}_candle_{timeframe}m_{today}.csv")
+    def _open_writer(self, key):
+        """開啟 (種類, 週期, 交易日) 對應的寫入器（WriterCache 使用）"""
+        kind, timeframe, day = key
+        if kind == 'candle':
+            filename = self._get_candle_filename(timeframe, day)
+            exists = os.path.exists(filename)
+            writer = BufferedCSVWriter(
+                filename, ['時間', '開盤價', '最高價', '最低價', '收盤價', '成交量'],
+                buffer_rows=self.writer_buffer_rows, flush_interval=self.writer_flush_seconds)
+            if not exists:
+                log.info(">>> 建立 %s分K 線資料檔案: %s", timeframe, filename)
+            else:
+                log.info(">>> %s分K 線資料檔案已存在: %s", timeframe, filename)
+            return writer
+        if kind == 'tick':
+            filename = self._get_tick_filename(day)
+            exists = os.path.exists(filename)
+            writer = BufferedCSVWriter(
+                filename, ['時間', '價格', '數量', '累計量'],
+                buffer_rows=self.writer_buffer_rows * 10, flush_interval=self.writer_flush_seconds)
+            if not exists:
+                log.info(">>> 建立 Tick 資料檔案: %s", filename)
+            return writer
+        # 二進位 tick（需要 PriceDecimal）
+        path = os.path.splitext(self._get_tick_filename(day))[0] + STORE_SUFFIX
+        return TickStoreWriter(path, self.price_decimal or 0)
     
-    def _get_tick_filename(self):
-        """取得 Tick 資料檔案名稱"""
-        today = datetime.now().strftime('%Y%m%d')
-        return os.path.join(self.data_dir, f"{self.stock_code}_tick_{today}.csv")
+    def _on_writer_close(self, key, writer):
+        """寫入器關閉（換日或閒置）後，更新該 K 線檔案的索引"""
+        if key[0] != 'candle':
+            return
+        try:
+            self.catalog.update_file(writer.filename)
+        except Exception as e:
+            log.error(">>> 更新資料索引時發生錯誤: %s", e)
     
     def _init_data_files(self):
-        """初始化資料檔案（寫入標題列）"""
+        """初始化資料檔案（寫入標題列），並開啟目前交易日的寫入器"""
         # K 線資料檔案 - 為每個時間週期建立檔案
-        for tf, filename in self.candle_filenames.items():
-            if not os.path.exists(filename):
-                with open(filename, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['時間', '開盤價', '最高價', '最低價', '收盤價', '成交量'])
-                print(f">>> 建立 {tf}分K 線資料檔案: {filename}")
-            else:
-                print(f">>> {tf}分K 線資料檔案已存在: {filename}")
+        for tf in self.timeframes:
+            self.writers.get(('candle', tf, self.trading_day))
         
         # Tick 資料檔案
-        if self.record_tick and not os.path.exists(self.tick_filename):
-            with open(self.tick_filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(['時間', '價格', '數量', '累計量'])
-            print(f">>> 建立 Tick 資料檔案: {self.tick_filename}")
+        if self.record_tick and self.tick_format in ('csv', 'both'):
+            self.writers.get(('tick', None, self.trading_day))
+    
+    def _check_rollover(self):
+        """交易日改變時切換檔案，並關閉閒置的舊檔案"""
+        day = trading_day_str(self.clock())
+        if day != self.trading_day:
+            log.info("\n>>> 交易日切換: %s -> %s", self.trading_day, day)
+            self._set_trading_day(day)
+        self.writers.close_idle()
     
     def on_receive_message(self, sender, pkg):
         """接收報價訊息事件"""
         try:
-            if pkg.DT == 1503:  # 登入成功
-                self.handle_login_response(pkg)
-            elif pkg.DT == 20026:  # 查詢商品最後價格
-                self.handle_last_price(pkg)
-            elif pkg.DT == 5005:  # 盤別資訊
-                pass  # 忽略盤別資訊
+            self.dispatcher.dispatch(pkg)
         except Exception as e:
-            print(f"處理訊息時發生錯誤: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("處理訊息時發生錯誤: %s", e)
     
     def handle_login_response(self, pkg):
         """處理登入回應"""
-        print("\n登入回應:")
-        print(f"結果: {self.quoteCom.GetSubQuoteMsg(pkg.Code)}")
+        log.info("\n登入回應:")
+        log.info("結果: %s", self.quoteCom.GetSubQuoteMsg(pkg.Code))
         
         if pkg.Code == 0:
             self.is_logged_in = True
-            self.start_time = datetime.now()
-            print(">>> 登入成功！\n")
+            self.start_time = self.clock()
+            log.info(">>> 登入成功！\n")
         else:
-            print(">>> 登入失敗！\n")
+            log.error(">>> 登入失敗！\n")
     
     def handle_last_price(self, pkg):
         """處理最後價格查詢並記錄資料"""
-        timestamp = datetime.now()
+        timestamp = self.clock()
         
         # 安全地轉換成交價格
         try:
@@ -163,126 +247,205 @@ class HistoryDataRecorder:
         except:
             match_price = float(pkg.MatchPrice)
         
-        total_qty = pkg.MatchTotalQty
-        
-        # 記錄 tick 資料
-        if self.record_tick:
-            tick = {
-                'time': timestamp,
-                'price': match_price,
-                'quantity': 1,  # 單筆數量（QuoteCom 不提供此欄位，設為 1）
-                'total_qty': total_qty
-            }
-            self.tick_data.append(tick)
-            self.tick_count += 1
+        if self.price_decimal is None:
+            self.price_decimal = pkg.PriceDecimal
         
-        # 更新所有時間週期的 K 線
-        for tf in self.timeframes:
-            self._update_candle(match_price, timestamp, total_qty, tf)
-        
-        # 顯示即時資訊
-        candle_info = ' | '.join([f"{tf}分K:{self.candle_counts[tf]}" for tf in self.timeframes])
-        print(f"[{timestamp.strftime('%H:%M:%S')}] "
-              f"{self.stock_code} | 價格: {match_price:.2f} | 總量: {total_qty:,} | "
-              f"Tick數: {self.tick_count} | {candle_info}")
-    
-    def _update_candle(self, price, timestamp, volume=0, timeframe=5):
-        """更新指定時間週期的 K 線資料"""
-        # 計算當前 K 線的時間區間
-        candle_time = self._get_candle_time(timestamp, timeframe)
-        
-        # 如果是新的 K 線
-        if self.current_candles[timeframe] is None or self.current_candles[timeframe]['time'] != candle_time:
-            # 保存上一根 K 線
-            if self.current_candles[timeframe] is not None:
-                self.candles[timeframe].append(self.current_candles[timeframe])
-                self._save_candle(self.current_candles[timeframe], timeframe)
-                self.candle_counts[timeframe] += 1
-                print(f"\n>>> {timeframe}分K 線收盤: {self.current_candles[timeframe]['time'].strftime('%Y-%m-%d %H:%M')} | "
-                      f"開: {self.current_candles[timeframe]['open']:.2f} | "
-                      f"高: {self.current_candles[timeframe]['high']:.2f} | "
-                      f"低: {self.current_candles[timeframe]['low']:.2f} | "
-                      f"收: {self.current_candles[timeframe]['close']:.2f} | "
-                      f"量: {self.current_candles[timeframe]['volume']:,}\n")
-            
-            # 創建新 K 線
-            self.current_candles[timeframe] = {
-                'time': candle_time,
-                'open': price,
-                'high': price,
-                'low': price,
-                'close': price,
-                'volume': volume
-            }
+        # 單筆數量（查詢結果不提供此欄位，設為 1；K 線成交量由累計量差額計算）
+        self._record_tick(timestamp, match_price, 1, pkg.MatchTotalQty, from_push=False)
+    
+    def handle_match(self, pkg):
+        """處理推播的成交價量揭示（PI20020/PI20022），每筆成交都記錄（只記錄本記錄器的商品）"""
+        view = PI20020View(pkg)
+        if str(view.Symbol).strip() != self.stock_code:
+            return
+        timestamp = self._parse_match_time(view.MatchTime, self.clock())
+        self.last_push_time = time()
+        if self.price_decimal is None:
+            self.price_decimal = view.PriceDecimal
+        self._record_tick(timestamp, view.Price, view.MatchQuantity, view.MatchTotalQty)
+    
+    def handle_session(self, pkg):
+        """處理盤別資訊（PI05005），盤別切換時收掉目前的 K 線並重設累計量"""
+        view = PI05005View(pkg)
+        if str(view.Symbol).strip() != self.stock_code:
+            return
+        with self.lock:
+            self.aggregator.on_session(self.stock_code, view.Session)
+    
+    @property
+    def current_candles(self):
+        """目前尚未收盤的 K 線 {tf: candle}"""
+        return self.aggregator.get_current(self.stock_code)
+    
+    @staticmethod
+    def _parse_match_time(match_time, now):
+        """
+        將成交時間（HHMMSS、HHMMSSmmm 或 HHMMSSuuuuuu）轉成 datetime
+        
+        Args:
+            match_time: 封包的 MatchTime
+            now: 收到封包的本機時間，用來補上日期
+        """
+        digits = str(match_time).strip()
+        if not digits.isdigit():
+            return now
+        if len(digits) > 9:
+            whole, frac = digits[:-6], digits[-6:]
+        elif len(digits) > 6:
+            whole, frac = digits[:-3], digits[-3:]
         else:
-            # 更新當前 K 線
-            self.current_candles[timeframe]['high'] = max(self.current_candles[timeframe]['high'], price)
-            self.current_candles[timeframe]['low'] = min(self.current_candles[timeframe]['low'], price)
-            self.current_candles[timeframe]['close'] = price
-            # 更新成交量（使用累計量的差異）
-            if volume > self.current_candles[timeframe]['volume']:
-                self.current_candles[timeframe]['volume'] = volume
-    
-    def _get_candle_time(self, timestamp, timeframe):
-        """取得指定時間週期 K 線的時間標記（對齊到時間區間）"""
-        minutes = (timestamp.hour * 60 + timestamp.minute) // timeframe * timeframe
-        hour = minutes // 60
-        minute = minutes % 60
-        return timestamp.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            whole, frac = digits, ''
+        whole = whole.zfill(6)
+        try:
+            timestamp = now.replace(hour=int(whole[0:2]), minute=int(whole[2:4]), second=int(whole[4:6]),
+                                    microsecond=int(frac.ljust(6, '0')) if frac else 0)
+        except ValueError:
+            return now
+        # 跨午夜：成交時間比本機時間晚很多，代表是前一天的成交
+        if timestamp - now > timedelta(hours=12):
+            timestamp -= timedelta(days=1)
+        return timestamp
+    
+    def _record_tick(self, timestamp, price, quantity, total_qty, from_push=True):
+        """記錄一筆 tick 並更新所有時間週期的 K 線"""
+        with self.lock:
+            # 記錄 tick 資料
+            if self.record_tick:
+                tick = {
+                    'time': timestamp,
+                    'price': price,
+                    'quantity': quantity,
+                    'total_qty': total_qty
+                }
+                self.tick_data.append(tick)
+            self.tick_count += 1
+            
+            # 一次更新所有時間週期的 K 線（查詢結果沒有單筆量，只用累計量差額）
+            self.aggregator.update(self.stock_code, price, timestamp, total_qty,
+                                   quantity if from_push else None)
+        
+        # 顯示即時資訊（DEBUG 未開啟時不組字串）
+        if log.is_enabled(DEBUG):
+            candle_info = ' | '.join([f"{tf}分K:{self.candle_counts[tf]}" for tf in self.timeframes])
+            log.debug("[%s] %s | 價格: %.2f | 總量: %s | Tick數: %d | %s", timestamp.strftime('%H:%M:%S'),
+                      self.stock_code, price, f"{total_qty:,}", self.tick_count, candle_info,
+                      event='tick', symbol=self.stock_code, price=price, total_qty=total_qty)
+    
+    def _on_candle_close(self, symbol, timeframe, candle):
+        """K 線收盤：保存並顯示"""
+        self.candles[timeframe].append(candle)
+        self._save_candle(candle, timeframe)
+        self.candle_counts[timeframe] += 1
+        log.info("\n>>> %s分K 線收盤: %s | 開: %.2f | 高: %.2f | 低: %.2f | 收: %.2f | 量: %s\n",
+                 timeframe, candle['time'].strftime('%Y-%m-%d %H:%M'), candle['open'], candle['high'],
+                 candle['low'], candle['close'], f"{candle['volume']:,}", event='candle', symbol=symbol,
+                 timeframe=timeframe, open=candle['open'], high=candle['high'], low=candle['low'],
+                 close=candle['close'], volume=candle['volume'])
+        for listener in self.candle_listeners:
+            try:
+                listener(symbol, timeframe, candle)
+            except Exception as e:
+                log.error(">>> K 線回呼發生錯誤: %s", e)
+    
+    def add_candle_listener(self, listener):
+        """
+        註冊 K 線收盤回呼
+        
+        Args:
+            listener: listener(symbol, timeframe, candle)，例如 IndicatorEngine.from_config(timeframe=5).on_candle
+        """
+        self.candle_listeners.append(listener)
     
     def _save_candle(self, candle, timeframe):
-        """儲存指定時間週期的 K 線資料到檔案"""
+        """儲存指定時間週期的 K 線資料（寫入緩衝，由寫入器定時寫入檔案）"""
         try:
-            with open(self.candle_filenames[timeframe], 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    candle['time'].strftime('%Y-%m-%d %H:%M:%S'),
-                    candle['open'],
-                    candle['high'],
-                    candle['low'],
-                    candle['close'],
-                    candle['volume']
-                ])
+            self.writers.get(('candle', timeframe, trading_day_str(candle['time']))).write_row([
+                self.time_format.format_s(candle['time']),
+                candle['open'],
+                candle['high'],
+                candle['low'],
+                candle['close'],
+                candle['volume']
+            ])
         except Exception as e:
-            print(f">>> 儲存 {timeframe}分K 線資料時發生錯誤: {e}")
+            log.error(">>> 儲存 %s分K 線資料時發生錯誤: %s", timeframe, e)
     
     def _save_tick_batch(self):
         """批次儲存 tick 資料"""
         if not self.record_tick or len(self.tick_data) == 0:
             return
         
+        # 取出目前累積的 tick，推播執行緒繼續寫入新的 deque
+        with self.lock:
+            batch = self.tick_data
+            self.tick_data = deque(maxlen=batch.maxlen)
+        
         try:
-            with open(self.tick_filename, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                for tick in self.tick_data:
-                    writer.writerow([
-                        tick['time'].strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
-                        tick['price'],
-                        tick['quantity'],
-                        tick['total_qty']
+            # 依交易日分組（換日前後的 tick 寫入不同檔案）
+            days = {}
+            last_key = last_day = None
+            for tick in batch:
+                t = tick['time']
+                key = (t.date(), t.hour >= 15)
+                if key != last_key:
+                    last_key, last_day = key, trading_day_str(t)
+                days.setdefault(last_day, []).append(tick)
+            
+            for day, ticks in days.items():
+                if self.tick_format in ('csv', 'both'):
+                    fmt = TimestampFormatter()
+                    self.writers.get(('tick', None, day)).write_rows([
+                        (fmt.format_ms(tick['time']), tick['price'], tick['quantity'], tick['total_qty'])
+                        for tick in ticks
                     ])
+                
+                if self.tick_format in ('binary', 'both'):
+                    store = self.writers.get(('store', None, day))
+                    for tick in ticks:
+                        store.append(tick['time'], tick['price'], tick['quantity'], tick['total_qty'])
+                    store.flush()
             
-            print(f"\n>>> 已儲存 {len(self.tick_data)} 筆 tick 資料")
-            self.tick_data.clear()
+            log.info("\n>>> 已儲存 %s 筆 tick 資料", len(batch))
         except Exception as e:
-            print(f">>> 儲存 tick 資料時發生錯誤: {e}")
+            log.error(">>> 儲存 tick 資料時發生錯誤: %s", e)
+    
+    def _flush_writers(self, close=False):
+        """將寫入器的緩衝寫入檔案（close=True 時關閉檔案）"""
+        try:
+            if close:
+                self.writers.close_all()
+            else:
+                self.writers.maybe_flush()
+        except Exception as e:
+            log.error(">>> 寫入檔案時發生錯誤: %s", e)
+        if close:
+            self._update_catalog()
+    
+    def _update_catalog(self):
+        """以增量方式更新 K 線檔案索引"""
+        try:
+            for filename in self.candle_filenames.values():
+                self.catalog.update_file(filename, save=False)
+            self.catalog.save()
+        except Exception as e:
+            log.error(">>> 更新資料索引時發生錯誤: %s", e)
     
     def on_get_status(self, sender, status, msg):
         """接收狀態事件"""
         try:
             smsg = bytes(msg).decode('UTF-8', 'ignore')
             if smsg:  # 只顯示有內容的訊息
-                print(f"[狀態] {status.ToString()}: {smsg}")
+                log.info("[狀態] %s: %s", status.ToString(), smsg)
         except:
             pass
     
     def on_recover_status(self, sender, topic, status, count):
         """資料回補事件"""
-        print(f"[回補] 主題: {topic} | 狀態: {status.ToString()} | 數量: {count}")
+        log.info("[回補] 主題: %s | 狀態: %s | 數量: %s", topic, status.ToString(), count)
     
     def login(self):
         """登入報價系統"""
-        print("\n>>> 嘗試登入...")
+        log.info("\n>>> 嘗試登入...")
         self.quoteCom.Connect2Quote(self.host, self.port, self.account, 
                                      self.password, ' ', '')
         sleep(3)
@@ -290,34 +453,34 @@ class HistoryDataRecorder:
     
     def download_product_list(self):
         """下載商品基本資料"""
-        print("\n>>> 下載商品基本資料...")
+        log.info("\n>>> 下載商品基本資料...")
         res = self.quoteCom.RetriveQuoteList()
         if res == 0:
-            print(">>> 下載請求已送出，等待回應...")
+            log.info(">>> 下載請求已送出，等待回應...")
             sleep(3)
             self.quoteCom.LoadTaifexProductXMLT1()
             sleep(2)
             self.is_downloaded = True
-            print(">>> 商品資料下載完成！")
+            log.info(">>> 商品資料下載完成！")
         else:
-            print(f">>> 下載失敗: {self.quoteCom.GetSubQuoteMsg(res)}")
+            log.error(">>> 下載失敗: %s", self.quoteCom.GetSubQuoteMsg(res))
         return self.is_downloaded
     
     def subscribe_quote(self, symbol_id):
         """訂閱商品報價"""
-        print(f"\n>>> 訂閱商品: {symbol_id}")
+        log.info("\n>>> 訂閱商品: %s", symbol_id)
         res = self.quoteCom.SubQuote(symbol_id)
         if res == 0:
-            print(f">>> 訂閱成功！")
+            log.info(">>> 訂閱成功！")
             sleep(1)
             return True
         else:
-            print(f">>> 訂閱失敗: {self.quoteCom.GetSubQuoteMsg(res)}")
+            log.error(">>> 訂閱失敗: %s", self.quoteCom.GetSubQuoteMsg(res))
             return False
     
     def unsubscribe_quote(self, symbol_id):
         """取消訂閱商品報價"""
-        print(f"\n>>> 取消訂閱商品: {symbol_id}")
+        log.info("\n>>> 取消訂閱商品: %s", symbol_id)
         self.quoteCom.UnsubQuotes(symbol_id)
         sleep(1)
     
@@ -327,30 +490,39 @@ class HistoryDataRecorder:
         if res == 0:
             sleep(0.5)
         else:
-            print(f">>> 查詢失敗: {self.quoteCom.GetSubQuoteMsg(res)}")
+            log.error(">>> 查詢失敗: %s", self.quoteCom.GetSubQuoteMsg(res))
     
     def start_recording(self, symbol_id):
         """開始記錄歷史資料"""
-        print(f"\n{'=' * 70}")
-        print(f"開始記錄歷史資料")
-        print(f"{'=' * 70}")
-        print(f"商品代碼: {symbol_id}")
-        print(f"K 線週期: {', '.join([str(tf) + '分' for tf in self.timeframes])}")
-        print(f"查詢間隔: {self.query_interval} 秒")
+        log.info('\n' + '=' * 70)
+        log.info("開始記錄歷史資料")
+        log.info('=' * 70)
+        log.info("商品代碼: %s", symbol_id)
+        log.info("K 線週期: %s", ', '.join([str(tf) + '分' for tf in self.timeframes]))
+        if self.mode == 'stream':
+            log.info("報價模式: 推播成交（%s 秒無成交時改為查詢）", self.stream_fallback)
+        else:
+            log.info("查詢間隔: %s 秒", self.query_interval)
         for tf in self.timeframes:
-            print(f"{tf}分K 線檔案: {self.candle_filenames[tf]}")
-        if self.record_tick:
-            print(f"Tick 檔案: {self.tick_filename}")
-        print(f"{'=' * 70}")
-        print(">>> 按 Ctrl+C 停止記錄並匯出資料")
-        print(f"{'=' * 70}\n")
+            log.info("%s分K 線檔案: %s", tf, self.candle_filenames[tf])
+        self._print_tick_files()
+        log.info('=' * 70)
+        log.info(">>> 按 Ctrl+C 停止記錄並匯出資料")
+        log.info('=' * 70 + '\n')
         
         try:
             while self.keep_running:
                 current_time = time()
                 
+                # 串流模式只在推播中斷時才主動查詢（備援）
+                if self.mode == 'stream':
+                    need_query = (current_time - self.last_push_time >= self.stream_fallback and
+                                  current_time - self.last_query_time >= self.query_interval)
+                else:
+                    need_query = current_time - self.last_query_time >= self.query_interval
+                
                 # 檢查是否到達查詢間隔
-                if current_time - self.last_query_time >= self.query_interval:
+                if need_query:
                     # 查詢最後價格
                     self.query_last_price(symbol_id)
                     self.last_query_time = current_time
@@ -360,15 +532,19 @@ class HistoryDataRecorder:
                     self._save_tick_batch()
                     self.last_save_time = current_time
                 
+                # 寫入器超過緩衝時間時寫入檔案；換交易日時切換檔案
+                self._flush_writers()
+                self._check_rollover()
+                
                 # 每 5 分鐘顯示統計資訊
-                if self.start_time and (datetime.now() - self.start_time).seconds % 300 < self.query_interval:
+                if self.start_time and (self.clock() - self.start_time).seconds % 300 < self.query_interval:
                     self._print_statistics()
                 
                 # 短暫休息避免 CPU 過度使用
                 sleep(0.5)
                 
         except KeyboardInterrupt:
-            print("\n\n>>> 使用者中斷記錄")
+            log.info("\n\n>>> 使用者中斷記錄")
             self.keep_running = False
     
     def _print_statistics(self):
@@ -376,37 +552,51 @@ class HistoryDataRecorder:
         if not self.start_time:
             return
         
-        duration = datetime.now() - self.start_time
+        duration = self.clock() - self.start_time
         hours = duration.seconds // 3600
         minutes = (duration.seconds % 3600) // 60
         
-        print(f"\n{'=' * 70}")
-        print(f"統計資訊")
-        print(f"{'=' * 70}")
-        print(f"記錄時間: {hours} 小時 {minutes} 分鐘")
-        print(f"Tick 數量: {self.tick_count:,}")
+        log.info('\n' + '=' * 70)
+        log.info("統計資訊")
+        log.info('=' * 70)
+        log.info("記錄時間: %s 小時 %s 分鐘", hours, minutes)
+        log.info("Tick 數量: %s", f'{self.tick_count:,}')
         for tf in self.timeframes:
-            print(f"{tf}分K 線數量: {self.candle_counts[tf]}")
-            print(f"{tf}分K 線檔案: {self.candle_filenames[tf]}")
-        if self.record_tick:
-            print(f"Tick 檔案: {self.tick_filename}")
-        print(f"{'=' * 70}\n")
+            log.info("%s分K 線數量: %s", tf, self.candle_counts[tf])
+            log.info("%s分K 線檔案: %s", tf, self.candle_filenames[tf])
+        self._print_tick_files()
+        if self.callback_queue is not None:
+            stats = self.callback_queue.stats()
+            log.info("回呼佇列: 目前 %s / 最高 %s / 容量 %s，丟棄 %s 筆",
+                     stats['depth'], stats['high_water'], stats['capacity'], f"{stats['dropped']:,}")
+        log.info('=' * 70 + '\n')
+    
+    def _print_tick_files(self):
+        """顯示 tick 檔案位置"""
+        if not self.record_tick:
+            return
+        if self.tick_format in ('csv', 'both'):
+            log.info("Tick 檔案: %s", self.tick_filename)
+        if self.tick_format in ('binary', 'both'):
+            log.info("Tick 二進位目錄: %s", self.tick_store_path)
     
     def export_summary(self):
         """匯出摘要資訊"""
-        print(f"\n{'=' * 70}")
-        print("匯出資料摘要")
-        print(f"{'=' * 70}")
+        log.info('\n' + '=' * 70)
+        log.info("匯出資料摘要")
+        log.info('=' * 70)
         
         summary = {
             'stock_code': self.stock_code,
             'timeframes': self.timeframes,
             'start_time': self.start_time.strftime('%Y-%m-%d %H:%M:%S') if self.start_time else None,
-            'end_time': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'end_time': self.clock().strftime('%Y-%m-%d %H:%M:%S'),
+            'mode': self.mode,
             'tick_count': self.tick_count,
             'candle_counts': self.candle_counts,
             'candle_files': self.candle_filenames,
-            'tick_file': self.tick_filename if self.record_tick else None
+            'tick_file': self.tick_filename if self.record_tick and self.tick_format in ('csv', 'both') else None,
+            'tick_store': self.tick_store_path if self.record_tick and self.tick_format in ('binary', 'both') else None
         }
         
         # 儲存摘要檔案
@@ -419,43 +609,50 @@ class HistoryDataRecorder:
             with open(summary_filename, 'w', encoding='utf-8') as f:
                 json.dump(summary, f, indent=4, ensure_ascii=False)
             
-            print(f"商品代碼: {summary['stock_code']}")
-            print(f"K 線週期: {', '.join([str(tf) + '分' for tf in summary['timeframes']])}")
-            print(f"記錄期間: {summary['start_time']} ~ {summary['end_time']}")
-            print(f"Tick 數量: {summary['tick_count']:,}")
+            log.info("商品代碼: %s", summary['stock_code'])
+            log.info("K 線週期: %s", ', '.join([str(tf) + '分' for tf in summary['timeframes']]))
+            log.info("記錄期間: %s ~ %s", summary['start_time'], summary['end_time'])
+            log.info("Tick 數量: %s", f"{summary['tick_count']:,}")
             for tf in self.timeframes:
-                print(f"{tf}分K 線數量: {summary['candle_counts'][tf]}")
-            print(f"\n>>> 摘要檔案: {summary_filename}")
+                log.info("%s分K 線數量: %s", tf, summary['candle_counts'][tf])
+            log.info("\n>>> 摘要檔案: %s", summary_filename)
             for tf in self.timeframes:
-                print(f">>> {tf}分K 線檔案: {summary['candle_files'][tf]}")
+                log.info(">>> %s分K 線檔案: %s", tf, summary['candle_files'][tf])
             if summary['tick_file']:
-                print(f">>> Tick 檔案: {summary['tick_file']}")
-            print(f"{'=' * 70}\n")
+                log.info(">>> Tick 檔案: %s", summary['tick_file'])
+            if summary['tick_store']:
+                log.info(">>> Tick 二進位目錄: %s", summary['tick_store'])
+            log.info('=' * 70 + '\n')
             
         except Exception as e:
-            print(f">>> 匯出摘要時發生錯誤: {e}")
+            log.error(">>> 匯出摘要時發生錯誤: %s", e)
     
     def logout(self):
         """登出系統"""
-        print("\n>>> 登出系統...")
+        log.info("\n>>> 登出系統...")
         self.quoteCom.Logout()
         sleep(1)
     
     def dispose(self):
         """釋放資源"""
-        print(">>> 釋放資源...")
+        log.info(">>> 釋放資源...")
         self.keep_running = False
         
+        # 先處理完佇列中的封包
+        if self.callback_queue is not None:
+            self.callback_queue.stop()
+        
         # 儲存剩餘的 tick 資料
         if self.record_tick and len(self.tick_data) > 0:
             self._save_tick_batch()
+        self._flush_writers(close=True)
         
         self.quoteCom.Dispose()
 
 
 def main():
     """主程式"""
-    print("\n啟動歷史資料記錄程式...\n")
+    log.info("\n啟動歷史資料記錄程式...\n")
     
     # 建立記錄器（可自訂 K 線週期和儲存目錄）
     recorder = HistoryDataRecorder(
@@ -466,12 +663,12 @@ def main():
     try:
         # 1. 登入
         if not recorder.login():
-            print("登入失敗，程式結束")
+            log.error("登入失敗，程式結束")
             return
         
         # 2. 下載商品資料
         if not recorder.download_product_list():
-            print("下載商品資料失敗，程式結束")
+            log.error("下載商品資料失敗，程式結束")
             return
         
         # 3. 訂閱商品報價
@@ -484,9 +681,7 @@ def main():
             recorder.unsubscribe_quote(symbol)
         
     except Exception as e:
-        print(f"\n發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n發生錯誤: %s", e)
     
     finally:
         # 匯出摘要
@@ -495,7 +690,7 @@ def main():
         # 清理資源
         recorder.logout()
         recorder.dispose()
-        print("\n程式結束")
+        log.info("\n程式結束")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,293 @@
+"""
+history_catalog.py - 歷史 K 線資料目錄索引
+為 historical_data/ 中的 {symbol}_candle_{tf}m_{date}.csv 建立索引（catalog.json）：
+每個檔案記錄商品、週期、日期、最早/最晚時間，以及每隔固定筆數的 (時間, 位元組位置)
+稀疏索引。查詢某段時間的 K 線時，只開啟時間範圍重疊的檔案，並從最接近的位置開始讀取。
+檔案持續附加時只索引新增的部分（增量更新）。
+
+執行方式:
+    python history_catalog.py [資料目錄]                                  更新並顯示索引
+    python history_catalog.py [資料目錄] <商品> <週期> <開始> <結束>       查詢 K 線
+"""
+
+import json
+import os
+import re
+import sys
+from bisect import bisect_right
+from datetime import date, datetime, time as dtime
+
+# ../kgilog
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kgilog import get_logger
+
+log = get_logger('catalog')
+
+CATALOG_VERSION = 1
+CANDLE_FILE_PATTERN = re.compile(r'^(?P<symbol>.+)_candle_(?P<tf>\d+)m_(?P<date>\d{8})\.csv$')
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _time_key(value, end=False):
+    """
+    轉成可直接比較的時間字串（與 K 線檔案的時間欄位格式相同）
+
+    Args:
+        value: datetime、date 或字串
+        end: date 作為結束時間時，代表當天的最後一刻
+    """
+    if isinstance(value, datetime):
+        return value.strftime(TIME_FORMAT)
+    if isinstance(value, date):
+        return datetime.combine(value, dtime.max if end else dtime.min).strftime(TIME_FORMAT)
+    value = str(value).strip()
+    if len(value) == 10 and end:
+        return value + ' 23:59:59'
+    return value
+
+
+def _parse_candle(fields):
+    """CSV 欄位轉成 K 線 dict（與 HistoryDataRecorder 格式相同）"""
+    return {
+        'time': datetime.strptime(fields[0], TIME_FORMAT),
+        'open': float(fields[1]),
+        'high': float(fields[2]),
+        'low': float(fields[3]),
+        'close': float(fields[4]),
+        'volume': int(float(fields[5]))
+    }
+
+
+class HistoryCatalog:
+    """歷史 K 線資料目錄"""
+
+    def __init__(self, data_dir="historical_data", index_name="catalog.json", sparse_every=256):
+        """
+        初始化資料目錄
+
+        Args:
+            data_dir: 資料目錄
+            index_name: 索引檔案名稱（存放在資料目錄中）
+            sparse_every: 每隔幾筆記錄一個稀疏索引點
+        """
+        self.data_dir = data_dir
+        self.index_path = os.path.join(data_dir, index_name)
+        self.sparse_every = sparse_every
+        self.files = {}
+        self._load_index()
+
+    def _load_index(self):
+        """讀取既有索引檔（版本不符或損壞時重建）"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('version') == CATALOG_VERSION and index.get('sparse_every') == self.sparse_every:
+                self.files = index.get('files', {})
+        except (OSError, ValueError) as e:
+            log.warning(">>> 索引檔讀取失敗，將重新建立: %s", e)
+            self.files = {}
+
+    def save(self):
+        """寫入索引檔（先寫暫存檔再取代，避免中斷時損壞）"""
+        index = {'version': CATALOG_VERSION, 'sparse_every': self.sparse_every, 'files': self.files}
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def refresh(self, save=True):
+        """
+        掃描資料目錄並更新索引（新檔案建立索引、既有檔案只索引新增部分、刪除的檔案移除）
+
+        Returns:
+            int: 有更新的檔案數
+        """
+        if not os.path.isdir(self.data_dir):
+            return 0
+        names = set()
+        changed = 0
+        for name in os.listdir(self.data_dir):
+            if CANDLE_FILE_PATTERN.match(name):
+                names.add(name)
+                if self.update_file(os.path.join(self.data_dir, name), save=False):
+                    changed += 1
+        for name in list(self.files):
+            if name not in names:
+                del self.files[name]
+                changed += 1
+        if changed and save:
+            self.save()
+        return changed
+
+    def update_file(self, path, save=True):
+        """
+        更新單一檔案的索引（記錄器換檔或寫入後呼叫）
+
+        Returns:
+            bool: 索引是否有變動
+        """
+        name = os.path.basename(path)
+        match = CANDLE_FILE_PATTERN.match(name)
+        if not match or not os.path.exists(path):
+            return False
+        size = os.path.getsize(path)
+        entry = self.files.get(name)
+        if entry is not None and entry['size'] == size:
+            return False
+        if entry is None or size < entry['size']:
+            entry = {
+                'symbol': match.group('symbol'),
+                'timeframe': int(match.group('tf')),
+                'date': match.group('date'),
+                'size': 0,
+                'rows': 0,
+                'min_time': None,
+                'max_time': None,
+                'sorted': True,
+                'offsets': []
+            }
+        indexed = self._index_rows(path, entry)
+        self.files[name] = entry
+        if save:
+            self.save()
+        return indexed
+
+    def _index_rows(self, path, entry):
+        """從上次索引的位置開始，索引新增的完整列"""
+        with open(path, 'rb') as f:
+            f.seek(entry['size'])
+            offset = entry['size']
+            added = 0
+            while True:
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # 尚未寫完的列，下次再索引
+                row_offset = offset
+                offset += len(line)
+                if row_offset == 0:
+                    continue  # 標題列
+                key = line.split(b',', 1)[0].decode('utf-8')
+                if entry['max_time'] is not None and key < entry['max_time']:
+                    entry['sorted'] = False
+                if entry['min_time'] is None or key < entry['min_time']:
+                    entry['min_time'] = key
+                if entry['max_time'] is None or key > entry['max_time']:
+                    entry['max_time'] = key
+                if entry['rows'] % self.sparse_every == 0:
+                    entry['offsets'].append([key, row_offset])
+                entry['rows'] += 1
+                added += 1
+        entry['size'] = offset
+        return added > 0 or entry['rows'] == 0
+
+    def partitions(self, symbol=None, timeframe=None, start=None, end=None):
+        """
+        列出符合條件的分割檔（依日期排序）
+
+        Returns:
+            list: [(檔名, 索引資料), ...]
+        """
+        start_key = _time_key(start) if start is not None else None
+        end_key = _time_key(end, end=True) if end is not None else None
+        result = []
+        for name, entry in self.files.items():
+            if symbol is not None and entry['symbol'] != symbol:
+                continue
+            if timeframe is not None and entry['timeframe'] != int(timeframe):
+                continue
+            if entry['rows'] == 0:
+                continue
+            if start_key is not None and entry['max_time'] < start_key:
+                continue
+            if end_key is not None and entry['min_time'] > end_key:
+                continue
+            result.append((name, entry))
+        result.sort(key=lambda item: (item[1]['min_time'], item[0]))
+        return result
+
+    def load(self, symbol, timeframe, start=None, end=None, refresh=True):
+        """
+        讀取指定商品、週期、時間範圍內的 K 線（含起訖時間）
+
+        Args:
+            symbol: 商品代碼
+            timeframe: K 線週期（分鐘）
+            start: 開始時間（datetime、date 或 'YYYY-MM-DD HH:MM:SS' 字串）
+            end: 結束時間（date 代表當天結束）
+            refresh: 讀取前先更新索引
+
+        Returns:
+            list: K 線 dict 列表（依時間排序）
+        """
+        if refresh:
+            self.refresh()
+        start_key = _time_key(start) if start is not None else None
+        end_key = _time_key(end, end=True) if end is not None else None
+
+        candles = []
+        for name, entry in self.partitions(symbol, timeframe, start, end):
+            candles.extend(self._read_range(os.path.join(self.data_dir, name), entry, start_key, end_key))
+        candles.sort(key=lambda c: c['time'])
+        return candles
+
+    def _read_range(self, path, entry, start_key, end_key):
+        """只讀取檔案中需要的位元組範圍"""
+        offsets = entry['offsets']
+        begin = offsets[0][1]
+        sorted_rows = entry['sorted']
+        if sorted_rows and start_key is not None:
+            # 最後一個時間 < 開始時間的稀疏點（同一時間的列可能橫跨稀疏點）
+            pos = bisect_right([o[0] for o in offsets], start_key) - 1
+            while pos > 0 and offsets[pos][0] >= start_key:
+                pos -= 1
+            if pos > 0:
+                begin = offsets[pos][1]
+
+        rows = []
+        with open(path, 'rb') as f:
+            f.seek(begin)
+            pos = begin
+            while pos < entry['size']:
+                raw = f.readline()
+                pos += len(raw)
+                line = raw.decode('utf-8').rstrip('\r\n')
+                if not line:
+                    continue
+                fields = line.split(',')
+                key = fields[0]
+                if start_key is not None and key < start_key:
+                    continue
+                if end_key is not None and key > end_key:
+                    if sorted_rows:
+                        break
+                    continue
+                rows.append(_parse_candle(fields))
+        return rows
+
+
+def main():
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else "historical_data"
+    catalog = HistoryCatalog(data_dir)
+    changed = catalog.refresh()
+    log.info(">>> 資料目錄: %s（更新 %s 個檔案）", data_dir, changed)
+
+    if len(sys.argv) >= 6:
+        symbol, tf, start, end = sys.argv[2], int(sys.argv[3]), sys.argv[4], sys.argv[5]
+        candles = catalog.load(symbol, tf, start, end, refresh=False)
+        log.info(">>> %s %s分K %s ~ %s: %s 根", symbol, tf, start, end, len(candles))
+        for candle in candles[:5]:
+            log.info("    %s 開:%s 高:%s 低:%s 收:%s 量:%s", candle['time'], candle['open'], candle['high'],
+                     candle['low'], candle['close'], candle['volume'])
+        if len(candles) > 5:
+            log.info("    ...")
+        return
+
+    for name, entry in catalog.partitions():
+        log.info("%-40s %7s 根  %s ~ %s", name, entry['rows'], entry['min_time'], entry['max_time'])
+
+
+if __name__ == '__main__':
+    main()
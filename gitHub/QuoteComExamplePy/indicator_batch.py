@@ -0,0 +1,187 @@
+"""
+indicator_batch.py - 批次計算歷史 K 線的 MACD / RSI
+逐元素的運算（alpha * x、漲跌幅、初始平均、RSI 換算、交叉判斷、RSI 過濾）以 NumPy 向量化，
+只有 EMA / Wilder 平滑的遞迴部分以緊密迴圈計算，且運算順序與 indicators.py 完全相同，
+因此結果與串流引擎逐根更新的數值位元相同，可直接由 warm_up() 產生引擎狀態。
+遞迴仍是逐元素的 Python 呼叫，整體只比逐根 update() 快約 1.5 倍（20 萬根約 0.14 秒對 0.21 秒），
+主要好處是一次取得整段序列；位元相同與耗時由 check_indicator_batch.py 檢查。
+"""
+
+from itertools import accumulate
+
+import numpy as np
+
+from indicators import IndicatorEngine
+
+
+def _recurse(scaled, beta, first):
+    """y[0] = first，y[t] = scaled[t] + beta * y[t-1]（scaled 已乘上 alpha）"""
+    values = scaled.tolist()
+    values[0] = first
+    return np.fromiter(accumulate(values, lambda y, a: a + beta * y), np.float64, len(values))
+
+
+def ema_series(values, period):
+    """EMA 序列（以第一筆為初始值，與 indicators.EMA 相同）"""
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return values.copy()
+    alpha = 2.0 / (period + 1)
+    beta = 1.0 - alpha
+    return _recurse(alpha * values, beta, float(values[0]))
+
+
+def macd_series(close, short_period, long_period, signal_period):
+    """
+    MACD 序列
+
+    Returns:
+        tuple: (macd, signal, hist)
+    """
+    macd = ema_series(close, short_period) - ema_series(close, long_period)
+    signal = ema_series(macd, signal_period)
+    return macd, signal, macd - signal
+
+
+def _wilder(values, period, seed):
+    """Wilder 平滑 avg[t] = (avg[t-1] * (n - 1) + x[t]) / n，第一筆為 seed"""
+    m = period - 1
+    return np.fromiter(accumulate(values.tolist(), lambda avg, x: (avg * m + x) / period, initial=seed),
+                       np.float64, len(values) + 1)
+
+
+def rsi_series(close, period):
+    """
+    Wilder RSI 序列（尚未有值的位置為 NaN）
+
+    Returns:
+        tuple: (rsi, avg_gain, avg_loss, gain_sum, loss_sum)，
+               gain_sum / loss_sum 為最後狀態的初始累計值（暖機用）
+    """
+    close = np.asarray(close, dtype=np.float64)
+    rsi = np.full(len(close), np.nan)
+    change = np.diff(close)
+    gain = np.where(change > 0, change, 0.0)
+    loss = np.where(change < 0, -change, 0.0)
+
+    # 初始累計（np.cumsum 依序相加，與串流版逐筆累加相同）
+    seed_n = min(len(change), period)
+    gain_cum = np.cumsum(gain[:seed_n])
+    loss_cum = np.cumsum(loss[:seed_n])
+    gain_sum = float(gain_cum[-1]) if seed_n else 0.0
+    loss_sum = float(loss_cum[-1]) if seed_n else 0.0
+    if len(change) < period:
+        return rsi, None, None, gain_sum, loss_sum
+
+    avg_gain = _wilder(gain[period:], period, gain_sum / period)
+    avg_loss = _wilder(loss[period:], period, loss_sum / period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    value = np.where(avg_loss == 0.0, np.where(avg_gain == 0.0, 50.0, 100.0), value)
+    rsi[period:] = value
+    return rsi, avg_gain, avg_loss, gain_sum, loss_sum
+
+
+def cross_series(hist, ready_from):
+    """
+    交叉序列：1 黃金交叉、-1 死亡交叉、0 無
+
+    Args:
+        hist: MACD 柱狀體序列
+        ready_from: 指標可用的第一個索引
+    """
+    crosses = np.zeros(len(hist), dtype=np.int8)
+    if len(hist) < 2:
+        return crosses
+    prev, cur = hist[:-1], hist[1:]
+    ready = np.arange(1, len(hist)) >= ready_from
+    crosses[1:][(prev <= 0.0) & (cur > 0.0) & ready] = 1
+    crosses[1:][(prev >= 0.0) & (cur < 0.0) & ready] = -1
+    return crosses
+
+
+def compute(close, short_period=5, long_period=10, signal_period=5, rsi_period=14,
+            rsi_overbought=70, rsi_oversold=30, enable_rsi_filter=True):
+    """
+    批次計算所有指標
+
+    Returns:
+        dict: macd / signal / hist / rsi 序列、crosses（未過濾）、signals（RSI 過濾後）
+    """
+    close = np.asarray(close, dtype=np.float64)
+    macd, signal, hist = macd_series(close, short_period, long_period, signal_period)
+    rsi = rsi_series(close, rsi_period)[0]
+    crosses = cross_series(hist, long_period + signal_period - 2)
+    signals = crosses.copy()
+    if enable_rsi_filter:
+        has_rsi = ~np.isnan(rsi)
+        signals[(crosses == 1) & has_rsi & (rsi >= rsi_overbought)] = 0
+        signals[(crosses == -1) & has_rsi & (rsi <= rsi_oversold)] = 0
+    return {'macd': macd, 'signal': signal, 'hist': hist, 'rsi': rsi,
+            'crosses': crosses, 'signals': signals}
+
+
+def warm_up(close, engine=None, **params):
+    """
+    以歷史收盤價暖機，回傳與逐根 update() 後狀態相同的 IndicatorEngine
+
+    Args:
+        close: 歷史收盤價（依時間排序）
+        engine: 尚未更新過的引擎（提供參數與回呼），None 時以 params 建立
+        params: IndicatorEngine 參數
+    """
+    if engine is None:
+        engine = IndicatorEngine(**params)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        return engine
+
+    fast = ema_series(close, engine.short_period)
+    slow = ema_series(close, engine.long_period)
+    macd = fast - slow
+    signal = ema_series(macd, engine.signal_period)
+    hist = macd - signal
+    rsi, avg_gain, avg_loss, gain_sum, loss_sum = rsi_series(close, engine.rsi_period)
+
+    state = engine.snapshot()
+    state.update({
+        'candle_count': n,
+        'fast': float(fast[-1]),
+        'slow': float(slow[-1]),
+        'signal': float(signal[-1]),
+        'macd': float(macd[-1]),
+        'hist': float(hist[-1]),
+        'ema_count': n,
+        'signal_count': n,
+        'prev_hist': float(hist[-1]),
+        'rsi_prev_close': float(close[-1]),
+        'rsi_count': n - 1,
+        'rsi_gain_sum': gain_sum,
+        'rsi_loss_sum': loss_sum,
+        'rsi_avg_gain': float(avg_gain[-1]) if avg_gain is not None else None,
+        'rsi_avg_loss': float(avg_loss[-1]) if avg_loss is not None else None,
+        'rsi': float(rsi[-1]) if not np.isnan(rsi[-1]) else None,
+    })
+    return engine.restore(state)
+
+
+def load_candle_arrays(symbol, timeframe, start=None, end=None, data_dir="historical_data", catalog=None):
+    """
+    由歷史 K 線檔案讀取陣列（透過 HistoryCatalog 只讀取需要的範圍）
+
+    Returns:
+        dict: time (datetime64[s])、open / high / low / close (float64)、volume (int64)
+    """
+    if catalog is None:
+        from history_catalog import HistoryCatalog
+        catalog = HistoryCatalog(data_dir)
+    candles = catalog.load(symbol, timeframe, start, end)
+    return {
+        'time': np.array([c['time'] for c in candles], dtype='datetime64[s]'),
+        'open': np.fromiter((c['open'] for c in candles), np.float64, len(candles)),
+        'high': np.fromiter((c['high'] for c in candles), np.float64, len(candles)),
+        'low': np.fromiter((c['low'] for c in candles), np.float64, len(candles)),
+        'close': np.fromiter((c['close'] for c in candles), np.float64, len(candles)),
+        'volume': np.fromiter((c['volume'] for c in candles), np.int64, len(candles)),
+    }
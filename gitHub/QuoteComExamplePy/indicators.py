@@ -0,0 +1,298 @@
+"""
+indicators.py - 串流技術指標引擎（MACD / RSI / 交叉偵測）
+每根收盤 K 線只做 O(1) 的遞迴更新，不保留歷史序列；
+狀態可用 snapshot() 匯出、restore() 還原（例如程式重啟或由歷史資料暖機）。
+參數預設讀取 config.py 的 MACD_* / RSI_* 設定。
+"""
+
+GOLDEN = 'golden'  # 黃金交叉（MACD 由下往上穿越訊號線）
+DEATH = 'death'    # 死亡交叉（MACD 由上往下穿越訊號線）
+
+
+class EMA:
+    """指數移動平均 value = alpha * x + beta * value，以第一筆資料為初始值"""
+    __slots__ = ('period', 'alpha', 'beta', 'value', 'count')
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2.0 / (period + 1)
+        self.beta = 1.0 - self.alpha
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        if self.count == 0:
+            self.value = float(x)
+        else:
+            self.value = self.alpha * x + self.beta * self.value
+        self.count += 1
+        return self.value
+
+
+class MACD:
+    """MACD = EMA(短) - EMA(長)，訊號線 = EMA(MACD)，柱狀體 = MACD - 訊號線"""
+    __slots__ = ('fast', 'slow', 'signal_ema', 'macd', 'signal', 'hist')
+
+    def __init__(self, short_period=12, long_period=26, signal_period=9):
+        self.fast = EMA(short_period)
+        self.slow = EMA(long_period)
+        self.signal_ema = EMA(signal_period)
+        self.macd = None
+        self.signal = None
+        self.hist = None
+
+    @property
+    def count(self):
+        return self.fast.count
+
+    @property
+    def ready(self):
+        """長期 EMA 與訊號線都累積足夠的 K 線"""
+        return self.fast.count >= self.slow.period + self.signal_ema.period - 1
+
+    def update(self, close):
+        self.macd = self.fast.update(close) - self.slow.update(close)
+        self.signal = self.signal_ema.update(self.macd)
+        self.hist = self.macd - self.signal
+        return self.hist
+
+
+class RSI:
+    """Wilder RSI：前 period 筆漲跌幅取平均作為初始值，之後以 Wilder 平滑更新"""
+    __slots__ = ('period', 'prev_close', 'count', 'gain_sum', 'loss_sum', 'avg_gain', 'avg_loss', 'value')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.count = 0        # 已累積的漲跌筆數
+        self.gain_sum = 0.0
+        self.loss_sum = 0.0
+        self.avg_gain = None
+        self.avg_loss = None
+        self.value = None
+
+    @property
+    def ready(self):
+        return self.value is not None
+
+    def update(self, close):
+        prev = self.prev_close
+        self.prev_close = close
+        if prev is None:
+            return None
+        change = close - prev
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        self.count += 1
+        n = self.period
+        if self.count < n:
+            self.gain_sum += gain
+            self.loss_sum += loss
+            return None
+        if self.count == n:
+            self.gain_sum += gain
+            self.loss_sum += loss
+            self.avg_gain = self.gain_sum / n
+            self.avg_loss = self.loss_sum / n
+        else:
+            self.avg_gain = (self.avg_gain * (n - 1) + gain) / n
+            self.avg_loss = (self.avg_loss * (n - 1) + loss) / n
+        self.value = rsi_value(self.avg_gain, self.avg_loss)
+        return self.value
+
+
+def rsi_value(avg_gain, avg_loss):
+    """由平均漲幅/跌幅計算 RSI（沒有跌幅時為 100，沒有漲跌時為 50）"""
+    if avg_loss == 0.0:
+        return 50.0 if avg_gain == 0.0 else 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class IndicatorEngine:
+    """MACD + RSI 串流指標引擎
+
+    每根收盤 K 線呼叫 update(close)，回傳通過 RSI 過濾的交叉訊號
+    (GOLDEN / DEATH / None)；目前的數值可由 macd / signal / hist / rsi 讀取。
+    """
+
+    def __init__(self, short_period=5, long_period=10, signal_period=5, rsi_period=14,
+                 rsi_overbought=70, rsi_oversold=30, enable_rsi_filter=True,
+                 timeframe=None, on_signal=None):
+        """
+        初始化指標引擎
+
+        Args:
+            short_period / long_period / signal_period: MACD 參數
+            rsi_period: RSI 週期
+            rsi_overbought: RSI 超買線，RSI >= 此值時過濾黃金交叉
+            rsi_oversold: RSI 超賣線，RSI <= 此值時過濾死亡交叉
+            enable_rsi_filter: 是否啟用 RSI 過濾
+            timeframe: on_candle 只處理此週期的 K 線（None 表示全部）
+            on_signal: 交叉訊號回呼 on_signal(cross, candle, engine)
+        """
+        self.short_period = short_period
+        self.long_period = long_period
+        self.signal_period = signal_period
+        self.rsi_period = rsi_period
+        self.rsi_overbought = rsi_overbought
+        self.rsi_oversold = rsi_oversold
+        self.enable_rsi_filter = enable_rsi_filter
+        self.timeframe = timeframe
+        self.on_signal = on_signal
+
+        self.macd_line = MACD(short_period, long_period, signal_period)
+        self.rsi_line = RSI(rsi_period)
+        self.prev_hist = None
+        self.cross = None       # 本根 K 線的交叉（未過濾）
+        self.filtered = False   # 本根 K 線的交叉是否被 RSI 過濾
+        self.candle_count = 0
+
+    @classmethod
+    def from_config(cls, cfg=None, **kwargs):
+        """以 config.py 的設定建立引擎（kwargs 可覆寫個別參數）"""
+        if cfg is None:
+            import config as cfg
+        params = {
+            'short_period': cfg.MACD_SHORT_PERIOD,
+            'long_period': cfg.MACD_LONG_PERIOD,
+            'signal_period': cfg.MACD_SIGNAL_PERIOD,
+            'rsi_period': cfg.RSI_PERIOD,
+            'rsi_overbought': cfg.RSI_OVERBOUGHT,
+            'rsi_oversold': cfg.RSI_OVERSOLD,
+            'enable_rsi_filter': cfg.ENABLE_RSI_FILTER,
+        }
+        params.update(kwargs)
+        return cls(**params)
+
+    @property
+    def ready(self):
+        return self.macd_line.ready
+
+    @property
+    def macd(self):
+        return self.macd_line.macd
+
+    @property
+    def signal(self):
+        return self.macd_line.signal
+
+    @property
+    def hist(self):
+        return self.macd_line.hist
+
+    @property
+    def rsi(self):
+        return self.rsi_line.value
+
+    def update(self, close):
+        """
+        以一根收盤 K 線更新指標
+
+        Args:
+            close: 收盤價
+
+        Returns:
+            str: 通過過濾的交叉訊號 GOLDEN / DEATH，沒有訊號時為 None
+        """
+        self.candle_count += 1
+        hist = self.macd_line.update(close)
+        rsi = self.rsi_line.update(close)
+
+        cross = None
+        prev = self.prev_hist
+        if prev is not None and self.macd_line.ready:
+            if prev <= 0.0 < hist:
+                cross = GOLDEN
+            elif prev >= 0.0 > hist:
+                cross = DEATH
+        self.prev_hist = hist
+        self.cross = cross
+        self.filtered = False
+
+        if cross is not None and self.enable_rsi_filter and rsi is not None:
+            if cross is GOLDEN and rsi >= self.rsi_overbought:
+                self.filtered = True
+            elif cross is DEATH and rsi <= self.rsi_oversold:
+                self.filtered = True
+        return None if self.filtered else cross
+
+    def on_candle(self, symbol, timeframe, candle):
+        """
+        K 線收盤回呼（可直接註冊到 CandleAggregator / HistoryDataRecorder）
+
+        Returns:
+            str: 通過過濾的交叉訊號或 None
+        """
+        if self.timeframe is not None and timeframe != self.timeframe:
+            return None
+        cross = self.update(candle['close'])
+        if cross is not None and self.on_signal is not None:
+            self.on_signal(cross, candle, self)
+        return cross
+
+    def snapshot(self):
+        """匯出目前狀態（可轉成 JSON）"""
+        macd = self.macd_line
+        rsi = self.rsi_line
+        return {
+            'params': {
+                'short_period': self.short_period,
+                'long_period': self.long_period,
+                'signal_period': self.signal_period,
+                'rsi_period': self.rsi_period,
+                'rsi_overbought': self.rsi_overbought,
+                'rsi_oversold': self.rsi_oversold,
+                'enable_rsi_filter': self.enable_rsi_filter,
+                'timeframe': self.timeframe,
+            },
+            'candle_count': self.candle_count,
+            'fast': macd.fast.value,
+            'slow': macd.slow.value,
+            'signal': macd.signal_ema.value,
+            'macd': macd.macd,
+            'hist': macd.hist,
+            'ema_count': macd.fast.count,
+            'signal_count': macd.signal_ema.count,
+            'prev_hist': self.prev_hist,
+            'rsi_prev_close': rsi.prev_close,
+            'rsi_count': rsi.count,
+            'rsi_gain_sum': rsi.gain_sum,
+            'rsi_loss_sum': rsi.loss_sum,
+            'rsi_avg_gain': rsi.avg_gain,
+            'rsi_avg_loss': rsi.avg_loss,
+            'rsi': rsi.value,
+        }
+
+    def restore(self, state):
+        """還原 snapshot() 匯出的狀態（參數必須相同）"""
+        params = state['params']
+        if (params['short_period'], params['long_period'], params['signal_period'], params['rsi_period']) != \
+                (self.short_period, self.long_period, self.signal_period, self.rsi_period):
+            raise ValueError("指標參數與狀態不符")
+        macd = self.macd_line
+        rsi = self.rsi_line
+        self.candle_count = state['candle_count']
+        macd.fast.value = state['fast']
+        macd.slow.value = state['slow']
+        macd.signal_ema.value = state['signal']
+        macd.fast.count = macd.slow.count = state['ema_count']
+        macd.signal_ema.count = state['signal_count']
+        macd.macd = state['macd']
+        macd.signal = state['signal']
+        macd.hist = state['hist']
+        self.prev_hist = state['prev_hist']
+        rsi.prev_close = state['rsi_prev_close']
+        rsi.count = state['rsi_count']
+        rsi.gain_sum = state['rsi_gain_sum']
+        rsi.loss_sum = state['rsi_loss_sum']
+        rsi.avg_gain = state['rsi_avg_gain']
+        rsi.avg_loss = state['rsi_avg_loss']
+        rsi.value = state['rsi']
+        self.cross = None
+        self.filtered = False
+        return self
+
+    @classmethod
+    def from_snapshot(cls, state, on_signal=None):
+        """以 snapshot() 匯出的狀態建立引擎"""
+        return cls(on_signal=on_signal, **state['params']).restore(state)
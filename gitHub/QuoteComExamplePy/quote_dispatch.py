@@ -0,0 +1,74 @@
+"""
+quote_dispatch.py - 報價封包分派表
+以 DT 代碼查表（dict）分派封包處理函式，取代逐一比對的 if/elif 鏈，
+每個封包只需一次 pkg.DT 讀取與一次查表。
+"""
+
+
+def _drop(pkg):
+    """不需要的封包直接丟棄"""
+
+
+# ignore() / only() 設定的丟棄處理函式；接收端可用 handler is DROP 判斷後直接返回
+DROP = _drop
+
+
+class PacketDispatcher:
+    """DT 代碼 → 處理函式的分派表，可在執行期間註冊或移除處理函式"""
+
+    def __init__(self, on_unknown=None):
+        """
+        初始化分派表
+
+        Args:
+            on_unknown: 未註冊 DT 的處理函式，預設印出 UNKOWN pkg 訊息
+        """
+        self.handlers = {}
+        self.on_unknown = on_unknown if on_unknown is not None else self._print_unknown
+
+    def register(self, dt, handler):
+        """
+        註冊 DT 代碼的處理函式（已存在則覆蓋）
+
+        Args:
+            dt (int): 封包 DT 代碼，例如 20020
+            handler: 處理函式，參數為 pkg
+        """
+        self.handlers[dt] = handler
+
+    def unregister(self, dt):
+        """移除 DT 代碼的處理函式，之後該 DT 視為未知封包"""
+        self.handlers.pop(dt, None)
+
+    def ignore(self, *dts):
+        """指定的 DT 直接丟棄，不做任何處理"""
+        for dt in dts:
+            self.handlers[dt] = _drop
+
+    def only(self, dts):
+        """
+        只保留指定 DT 的處理函式，其餘 DT（包括未註冊的）一律丟棄
+
+        Args:
+            dts: 需要處理的 DT 代碼集合
+        """
+        keep = set(dts)
+        for dt in list(self.handlers):
+            if dt not in keep:
+                self.handlers[dt] = _drop
+        self.on_unknown = _drop
+
+    def handler(self, dt):
+        """DT 代碼對應的處理函式（未註冊回傳 on_unknown）"""
+        return self.handlers.get(dt, self.on_unknown)
+
+    def dispatch(self, pkg):
+        """依 pkg.DT 分派封包"""
+        self.handlers.get(pkg.DT, self.on_unknown)(pkg)
+
+    def on_message(self, sender, pkg):
+        """可直接掛在 OnRcvMessage 事件上的處理函式"""
+        self.handlers.get(pkg.DT, self.on_unknown)(pkg)
+
+    def _print_unknown(self, pkg):
+        print('UNKOWN pkg: ', pkg, ', val: ', pkg.DT)
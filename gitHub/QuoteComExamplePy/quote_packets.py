@@ -0,0 +1,242 @@
+"""
+quote_packets.py - 報價封包的延遲轉換檢視物件
+每種封包一個 __slots__ 類別（不建立 dict），欄位在第一次被讀取時才跨過 pythonnet
+取值並轉型，轉換後的值快取在 view 上，之後的讀取不再經過 .NET。
+QuotecomPyFut(lazy=True) 時回呼此物件（預設 lazy=False 仍回呼 dict）。
+保留 to_dict() 與 dict 風格的 ['欄位'] / get() 存取，只讀取欄位的回呼可直接沿用；
+需要修改內容、json.dumps 或 isinstance(x, dict) 的回呼請先呼叫 to_dict()。
+"""
+
+
+def _dec(value):
+    """.NET Decimal 轉 float"""
+    return float(value.ToString())
+
+
+_UNSET = object()
+
+
+class _LazyField:
+    """延遲欄位：第一次讀取時向 pkg 取值、轉型，並快取在 view._vals"""
+    __slots__ = ('index', 'name', 'convert')
+
+    def __init__(self, index, name, convert):
+        self.index = index
+        self.name = name
+        self.convert = convert
+
+    def __get__(self, view, owner=None):
+        if view is None:
+            return self
+        value = view._vals[self.index]
+        if value is _UNSET:
+            value = getattr(view._pkg, self.name)
+            if self.convert is not None:
+                value = self.convert(value)
+            view._vals[self.index] = value
+        return value
+
+
+class PacketView:
+    """封包檢視基底類別
+
+    子類別以 FIELDS 宣告欄位、CONVERTERS 指定需要轉型的欄位；
+    每個欄位在類別建立時換成 _LazyField，快取值放在固定長度的 _vals 串列中。
+    """
+    __slots__ = ('_pkg', '_vals')
+    DT = ''
+    FIELDS = ()
+    CONVERTERS = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'FIELDS' in cls.__dict__:
+            for index, name in enumerate(cls.FIELDS):
+                setattr(cls, name, _LazyField(index, name, cls.CONVERTERS.get(name)))
+        cls._EMPTY = [_UNSET] * len(cls.FIELDS)
+
+    def __init__(self, pkg):
+        self._pkg = pkg
+        self._vals = self._EMPTY.copy()
+
+    def __getitem__(self, key):
+        if key == 'DT':
+            return self.DT
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key == 'DT' or key in self.FIELDS
+
+    def get(self, key, default=None):
+        """與 dict.get 相同"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return ('DT',) + tuple(self.FIELDS)
+
+    def detach(self):
+        """讀取所有欄位並放開 pkg 參考，之後不再需要存取 .NET 物件"""
+        for name in self.FIELDS:
+            getattr(self, name)
+        self._pkg = None
+        return self
+
+    def to_dict(self):
+        """轉成與舊版相同格式的 dict"""
+        res = {'DT': self.DT}
+        for name in self.FIELDS:
+            res[name] = getattr(self, name)
+        return res
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+
+class PI20008View(PacketView):
+    """期貨商品定義檔"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'SymbolIdx', '_RISE_LIMIT_PRICE1', '_REFERENCE_PRICE',
+        '_PROD_KIND', '_FALL_LIMIT_PRICE1', '_RISE_LIMIT_PRICE2', '_RISE_LIMIT_PRICE3',
+        '_FALL_LIMIT_PRICE3', 'PriceDecimal', 'StrikePriceDecimal', '_PROD_NAME', 'END_DATE')
+    DT = 'PI20008'
+    CONVERTERS = {
+        '_RISE_LIMIT_PRICE1': _dec,
+        '_REFERENCE_PRICE': _dec,
+        '_FALL_LIMIT_PRICE1': _dec,
+        '_RISE_LIMIT_PRICE2': _dec,
+        '_RISE_LIMIT_PRICE3': _dec,
+        '_FALL_LIMIT_PRICE3': _dec,
+    }
+
+
+class P20026View(PacketView):
+    """查詢商品最後價格"""
+    __slots__ = ()
+    FIELDS = (
+        'Symbol', 'PriceDecimal', '_MatchPrice', 'MatchPrice', 'DayHighPrice',
+        'MatchTotalQty', 'Break_Mark', 'FirstDerivedBuyPrice', 'FirstDerivedBuyQty',
+        'Session', 'DayLowPrice', 'FirstMatchPrice', 'FirstMatchQty', 'ReferencePrice',
+        'BUY_DEPTH', 'SELL_DEPTH', 'FirstDerivedSellPrice', 'FirstDerivedSellQty')
+    DT = 'P20026'
+    CONVERTERS = {
+        'DayHighPrice': _dec,
+        'FirstDerivedBuyPrice': _dec,
+        'DayLowPrice': _dec,
+        'FirstMatchPrice': _dec,
+        'ReferencePrice': _dec,
+        'FirstDerivedSellPrice': _dec,
+    }
+
+    def to_dict(self):
+        """轉成 dict，並展開五檔價量"""
+        res = super().to_dict()
+        i = 1
+        for v in self.BUY_DEPTH:
+            res['BUY_DEPTH_PR' + str(i)] = float(v.PRICE.ToString())
+            res['BUY_DEPTH_QTY' + str(i)] = v.QUANTITY
+            i += 1
+        i = 1
+        for v in self.SELL_DEPTH:
+            res['SELL_DEPTH_PRI' + str(i)] = float(v.PRICE.ToString())
+            res['SELL_DEPTH_QTY' + str(i)] = v.QUANTITY
+            i += 1
+        return res
+
+
+class PI20070View(PacketView):
+    """收盤行情料訊息"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'PROD_ID', 'TERM_HIGH_PRICE', 'TERM_LOW_PRICE', 'DAY_HIGH_PRICE',
+        'DAY_LOW_PRICE', 'OPEN_PRICE', 'BUY_PRICE', 'SELL_PRICE', 'CLOSE_PRICE',
+        'BO_COUNT_TAL', 'BO_QNTY_TAL', 'SO_COUNT_TAL', 'SO_QNTY_TAL', 'TOTAL_COUNT',
+        'TOTAL_QNTY', 'COMBINE_BO_COUNT_TAL', 'COMBINE_BO_QNTY_TAL', 'COMBINE_SO_COUNT_TAL',
+        'COMBINE_SO_QNTY_TAL', 'COMBINE_TOTAL_QNTY', 'DECIMAL_LOCATOR')
+    DT = 'PI20070'
+
+
+class PI20020View(PacketView):
+    """成交價量揭示"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'MatchTime', 'InfoSeq', 'LastItem', 'PriceSign',
+        'MatchQuantity', 'PriceDecimal', 'MatchTotalQty', 'MatchBuyCnt', 'MatchSellCnt',
+        'Price')
+    DT = 'PI20020'
+    CONVERTERS = {'Price': _dec}
+
+
+class PI20022View(PI20020View):
+    """成交價量揭示 – 盤前 (格式同 PI20020)"""
+    __slots__ = ()
+    DT = 'PI20022'
+
+
+class PI21020View(PI20020View):
+    """回補成交價量揭示 (格式同 PI20020)"""
+    __slots__ = ()
+    DT = 'PI21020'
+
+
+class PI20021View(PacketView):
+    """盤中最高(低)價揭示"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'DayLowPrice', 'DayHighPrice', 'MatchTime', 'PriceDecimal')
+    DT = 'PI20021'
+    CONVERTERS = {'DayLowPrice': _dec, 'DayHighPrice': _dec}
+
+
+class PI20023View(PacketView):
+    """定時開盤價量揭示"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'FirstMatchPrice', 'FirstMatchQty', 'MatchTime', 'PriceDecimal')
+    DT = 'PI20023'
+
+
+class PI20030View(PacketView):
+    """單一商品委託量累計"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'BUY_ORDER', 'BUY_QUANTITY', 'SELL_ORDER', 'SELL_QUANTITY')
+    DT = 'PI20030'
+
+
+class PI20080View(PacketView):
+    """委託簿揭示訊息"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'BUY_DEPTH', 'SELL_DEPTH', 'FIRST_DERIVED_BUY_PRICE',
+        'FIRST_DERIVED_BUY_DTY', 'FIRST_DERIVED_SELL_PRICE', 'FIRST_DERIVED_SELL_QTY',
+        'DATA_TIME')
+    DT = 'PI20080'
+
+
+class PI20082View(PI20080View):
+    """委託簿揭示訊息-盤前 (格式同PI20080)"""
+    __slots__ = ()
+    DT = 'PI20082'
+
+
+class PI20090View(PacketView):
+    """台灣期貨交易所編制指數資訊揭示訊息"""
+    __slots__ = ()
+    FIELDS = ('Market', 'INDEX_ID', 'INDEX_PRICE', 'INDEX_TIME')
+    DT = 'PI20090'
+
+
+class PI05005View(PacketView):
+    """盤別資訊"""
+    __slots__ = ()
+    FIELDS = (
+        'Market', 'Symbol', 'FallLimitPrice', 'RiseLimitPrice', 'RefPrice',
+        'PriceDecimal', 'Session', 'Status')
+    DT = 'PI05005'
+    CONVERTERS = {'FallLimitPrice': _dec, 'RiseLimitPrice': _dec, 'RefPrice': _dec}
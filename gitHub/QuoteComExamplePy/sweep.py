@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+sweep.py - MACD / RSI / 停損停利參數掃描
+以網格或隨機抽樣的參數組合執行 backtest.py，分散到多個處理程序（ProcessPoolExecutor）。
+K 線資料先存成 .npy，各處理程序以 mmap 共用（不經過 pickle 傳送資料）；
+每完成一組就寫入檢查點（JSON Lines），中斷後重新執行會跳過已完成的組合。
+結果依損益、最大回撤、交易次數排序。
+
+參數名稱可使用 config.py 的設定名稱（例如 MACD_STOP_LOSS）或 Backtester 的參數名稱（stop_loss）。
+
+執行方式:
+    python sweep.py <商品> <週期> <開始日期> <結束日期> [--random N] [--workers N]
+                    [--checkpoint 檔案] [--data-dir 目錄] [--top N]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+import numpy as np
+
+import config
+from backtest import Backtester
+
+# config.py 設定名稱 -> Backtester 參數名稱
+CONFIG_KEYS = {
+    'MACD_SHORT_PERIOD': 'short_period',
+    'MACD_LONG_PERIOD': 'long_period',
+    'MACD_SIGNAL_PERIOD': 'signal_period',
+    'MACD_STOP_LOSS': 'stop_loss',
+    'MACD_TAKE_PROFIT': 'take_profit',
+    'MACD_TRAILING_STOP': 'trailing_stop',
+    'MACD_TRAILING_ACTIVATION': 'trailing_activation',
+    'ENABLE_RSI_FILTER': 'enable_rsi_filter',
+    'RSI_PERIOD': 'rsi_period',
+    'RSI_OVERBOUGHT': 'rsi_overbought',
+    'RSI_OVERSOLD': 'rsi_oversold',
+}
+
+# config.py 說明中的建議配置
+STOP_PRESETS = {
+    '保守型': {'stop_loss': 30, 'take_profit': 60, 'trailing_stop': None},
+    '平衡型': {'stop_loss': 50, 'take_profit': 100, 'trailing_stop': None},
+    '進取型': {'stop_loss': 80, 'take_profit': None, 'trailing_stop': 40},
+}
+RSI_PRESETS = {
+    '保守型': {'rsi_overbought': 65, 'rsi_oversold': 35},
+    '平衡型': {'rsi_overbought': 70, 'rsi_oversold': 30},
+    '積極型': {'rsi_overbought': 80, 'rsi_oversold': 20},
+}
+
+# 預設掃描網格
+DEFAULT_GRID = {
+    'MACD_STOP_LOSS': [None, 30, 50, 80],
+    'MACD_TAKE_PROFIT': [None, 60, 100, 150],
+    'MACD_TRAILING_STOP': [None, 30, 40],
+    'RSI_OVERBOUGHT': [65, 70, 80],
+    'RSI_OVERSOLD': [35, 30, 20],
+}
+
+ARRAY_NAMES = ('time', 'high', 'low', 'close')
+
+# 各處理程序共用的 mmap 陣列（由 _init_worker 載入，run_candles 逐段轉換）
+_arrays = None
+
+
+def normalize(params):
+    """config 設定名稱轉成 Backtester 參數名稱"""
+    return {CONFIG_KEYS.get(k, k): v for k, v in params.items()}
+
+
+def grid(space):
+    """網格的所有組合"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def sample(space, count, seed=0):
+    """從網格隨機抽樣 count 組（不重複）"""
+    combos = grid(space)
+    if count >= len(combos):
+        return combos
+    return random.Random(seed).sample(combos, count)
+
+
+def presets():
+    """config.py 說明中的停損停利 x RSI 建議配置組合"""
+    runs = []
+    for stop_name, stop in STOP_PRESETS.items():
+        for rsi_name, rsi in RSI_PRESETS.items():
+            runs.append(dict(stop, **rsi, preset=f"{stop_name}/{rsi_name}"))
+    return runs
+
+
+def run_key(params):
+    """參數組合的唯一鍵（檢查點用）"""
+    return json.dumps(normalize(params), sort_keys=True, ensure_ascii=False)
+
+
+def save_arrays(arrays, cache_dir):
+    """將 K 線陣列存成 .npy（供各處理程序 mmap）"""
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, 'time.npy'), np.asarray(arrays['time']).astype('datetime64[s]').astype('int64'))
+    for name in ARRAY_NAMES[1:]:
+        np.save(os.path.join(cache_dir, f'{name}.npy'), np.asarray(arrays[name], dtype=np.float64))
+    return cache_dir
+
+
+def _init_worker(cache_dir):
+    """處理程序初始化：以唯讀 mmap 載入 K 線陣列（各處理程序共用同一份分頁快取）"""
+    global _arrays
+    _arrays = {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+
+
+def _run_batch(batch):
+    """在處理程序中執行一批參數組合"""
+    results = []
+    for params in batch:
+        overrides = {k: v for k, v in normalize(params).items() if k != 'preset'}
+        backtester = Backtester.from_config(config, **overrides)
+        start = perf_counter()
+        summary = backtester.run_candles(_arrays['time'], _arrays['high'], _arrays['low'], _arrays['close'])
+        summary.pop('current_position', None)
+        summary['params'] = params
+        summary['seconds'] = perf_counter() - start
+        results.append(summary)
+    return results
+
+
+def load_checkpoint(path):
+    """讀取檢查點，回傳 {鍵: 結果}"""
+    done = {}
+    if path and os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue  # 中斷時寫到一半的最後一行
+                done[run_key(result['params'])] = result
+    return done
+
+
+def rank(results):
+    """依損益（高到低）、最大回撤（低到高）、交易次數（多到少）排序"""
+    return sorted(results, key=lambda r: (-r['total_pnl'], r['max_drawdown'], -r['total_trades']))
+
+
+def sweep(runs, cache_dir, workers=None, checkpoint=None, batch_size=None):
+    """
+    執行參數掃描
+
+    Args:
+        runs: 參數組合列表
+        cache_dir: save_arrays() 儲存的陣列目錄
+        workers: 處理程序數，預設為 CPU 核心數
+        checkpoint: 檢查點檔案（JSON Lines），None 表示不儲存
+        batch_size: 每個工作包含的組合數，預設依組合數與處理程序數自動決定
+
+    Returns:
+        list: 排序後的結果（包含檢查點中已完成的組合）
+    """
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(checkpoint)
+    pending = [p for p in runs if run_key(p) not in done]
+    if done:
+        print(f">>> 檢查點已完成 {len(done)} 組，剩餘 {len(pending)} 組")
+
+    if pending:
+        batch_size = batch_size or max(1, min(16, len(pending) // (workers * 4)))
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        out = open(checkpoint, 'a', encoding='utf-8') if checkpoint else None
+        finished = 0
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(cache_dir,)) as pool:
+                futures = [pool.submit(_run_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    for result in future.result():
+                        done[run_key(result['params'])] = result
+                        if out is not None:
+                            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    if out is not None:
+                        out.flush()
+                    finished += 1
+                    print(f">>> 進度 {finished}/{len(batches)} 批", end='\r')
+        finally:
+            if out is not None:
+                out.close()
+        print()
+
+    wanted = {run_key(p) for p in runs}
+    return rank([r for k, r in done.items() if k in wanted])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MACD / RSI / 停損停利參數掃描")
+    parser.add_argument('symbol')
+    parser.add_argument('timeframe', type=int)
+    parser.add_argument('start')
+    parser.add_argument('end')
+    parser.add_argument('--random', type=int, default=0, help="隨機抽樣組數（0 表示完整網格）")
+    parser.add_argument('--presets', action='store_true', help="只執行 config.py 說明中的建議配置")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--checkpoint', default=None, help="檢查點檔案（預設依商品與期間命名）")
+    parser.add_argument('--data-dir', default="historical_data")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    from indicator_batch import load_candle_arrays
+    arrays = load_candle_arrays(args.symbol, args.timeframe, args.start, args.end, args.data_dir)
+    if len(arrays['close']) == 0:
+        print(">>> 指定期間沒有 K 線資料")
+        return
+    tag = f"{args.symbol}_{args.timeframe}m_{args.start}_{args.end}".replace(':', '').replace(' ', '_')
+    cache_dir = save_arrays(arrays, os.path.join(args.data_dir, 'sweep_cache', tag))
+    checkpoint = args.checkpoint or os.path.join(args.data_dir, f"sweep_{tag}.jsonl")
+
+    if args.presets:
+        runs = presets()
+    elif args.random:
+        runs = sample(DEFAULT_GRID, args.random)
+    else:
+        runs = grid(DEFAULT_GRID)
+
+    print(f">>> {args.symbol} {args.timeframe}分K {len(arrays['close']):,} 根，{len(runs)} 組參數")
+    start = perf_counter()
+    results = sweep(runs, cache_dir, args.workers, checkpoint)
+    print(f">>> 完成，耗時 {perf_counter() - start:.1f} 秒，檢查點: {checkpoint}")
+
+    print(f"\n{'=' * 90}")
+    print(f"{'排名':<4} {'損益':>12} {'最大回撤':>12} {'交易':>6} {'勝率':>7}  參數")
+    print(f"{'=' * 90}")
+    for i, r in enumerate(results[:args.top], 1):
+        print(f"{i:<4} {r['total_pnl']:>+12,.0f} {r['max_drawdown']:>12,.0f} {r['total_trades']:>6} "
+              f"{r['win_rate']:>6.1f}%  {json.dumps(r['params'], ensure_ascii=False)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""
+tick_store.py - 欄式二進位 Tick 儲存格式
+每個交易日一個目錄（例如 TMFB6_tick_20250102.ticks/），每個欄位一個只附加的檔案：
+    time.i64   成交時間，1970-01-01 起算的微秒數（本機時間，不含時區）
+    price.i64  成交價 × 10^PriceDecimal 的整數
+    qty.i64    單筆成交量
+    total.i64  累計成交量
+每個欄位檔案開頭為 32 bytes 的標頭，之後為 little-endian int64 陣列。
+讀取時以 mmap 對應檔案，直接提供 NumPy 陣列（不複製、不解析字串）。
+
+執行方式:
+    python tick_store.py import <tick.csv> [PriceDecimal]   匯入舊版 CSV
+    python tick_store.py info <目錄>                         顯示內容摘要
+"""
+
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+MAGIC = b'KGTK'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8s16x')  # magic, 版本, PriceDecimal, 欄位名稱, 保留
+HEADER_SIZE = HEADER.size             # 32 bytes
+COLUMNS = ('time', 'price', 'qty', 'total')
+STORE_SUFFIX = '.ticks'
+
+_EPOCH = datetime(1970, 1, 1)
+_ONE_US = timedelta(microseconds=1)
+
+
+def to_epoch_us(dt):
+    """datetime 轉 1970-01-01 起算的微秒數（不做時區轉換）"""
+    return (dt - _EPOCH) // _ONE_US
+
+
+def from_epoch_us(value):
+    """微秒數轉回 datetime"""
+    return _EPOCH + timedelta(microseconds=int(value))
+
+
+def _column_path(path, column):
+    return os.path.join(path, column + '.i64')
+
+
+def _read_header(f, column):
+    raw = f.read(HEADER_SIZE)
+    if len(raw) != HEADER_SIZE:
+        raise ValueError(f"{f.name}: 標頭不完整")
+    magic, version, price_decimal, name = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{f.name}: 不是 tick 儲存檔案")
+    if version != VERSION:
+        raise ValueError(f"{f.name}: 不支援的版本 {version}")
+    if name.rstrip(b'\0').decode('ascii') != column:
+        raise ValueError(f"{f.name}: 欄位名稱不符")
+    return price_decimal
+
+
+class TickStoreWriter:
+    """Tick 儲存寫入器（只附加）"""
+
+    def __init__(self, path, price_decimal=0, buffer_ticks=4096):
+        """
+        開啟或建立 tick 儲存目錄
+
+        Args:
+            path: 儲存目錄
+            price_decimal: 價格小數位數（PriceDecimal），既有目錄以標頭為準
+            buffer_ticks: 緩衝筆數，達到時寫入磁碟
+        """
+        self.path = path
+        self.buffer_ticks = buffer_ticks
+        os.makedirs(path, exist_ok=True)
+
+        existing = [c for c in COLUMNS if os.path.exists(_column_path(path, c))]
+        if existing:
+            with open(_column_path(path, existing[0]), 'rb') as f:
+                price_decimal = _read_header(f, existing[0])
+        self.price_decimal = price_decimal
+        self._scale = 10 ** price_decimal
+
+        self._files = {}
+        rows = []
+        for column in COLUMNS:
+            filename = _column_path(path, column)
+            if os.path.exists(filename):
+                with open(filename, 'rb') as f:
+                    if _read_header(f, column) != price_decimal:
+                        raise ValueError(f"{filename}: PriceDecimal 與其他欄位不符")
+            else:
+                with open(filename, 'wb') as f:
+                    f.write(HEADER.pack(MAGIC, VERSION, price_decimal, column.encode('ascii')))
+            rows.append((os.path.getsize(filename) - HEADER_SIZE) // 8)
+
+        # 上次寫入中斷時各欄位長度可能不同，截斷到最短的欄位
+        self.count = min(rows)
+        for column in COLUMNS:
+            f = open(_column_path(path, column), 'r+b')
+            f.truncate(HEADER_SIZE + self.count * 8)
+            f.seek(0, os.SEEK_END)
+            self._files[column] = f
+
+        self._buffers = {column: array('q') for column in COLUMNS}
+
+    def append(self, timestamp, price, quantity, total_qty):
+        """
+        附加一筆 tick
+
+        Args:
+            timestamp: 成交時間 (datetime) 或微秒數 (int)
+            price: 成交價
+            quantity: 單筆成交量
+            total_qty: 累計成交量
+        """
+        buffers = self._buffers
+        buffers['time'].append(timestamp if isinstance(timestamp, int) else to_epoch_us(timestamp))
+        buffers['price'].append(round(price * self._scale))
+        buffers['qty'].append(int(quantity))
+        buffers['total'].append(int(total_qty))
+        if len(buffers['time']) >= self.buffer_ticks:
+            self.flush()
+
+    def flush(self):
+        """將緩衝寫入磁碟"""
+        if self._files is None:
+            return
+        buffered = len(self._buffers['time'])
+        for column in COLUMNS:
+            f = self._files[column]
+            f.write(self._buffers[column].tobytes())
+            f.flush()
+            self._buffers[column] = array('q')
+        self.count += buffered
+
+    def close(self):
+        """寫入剩餘資料並關閉檔案"""
+        if self._files is None:
+            return
+        self.flush()
+        for f in self._files.values():
+            f.close()
+        self._files = None
+
+
+class TickStoreReader:
+    """Tick 儲存讀取器（mmap + NumPy，不複製資料）"""
+
+    def __init__(self, path):
+        import numpy as np
+
+        self.path = path
+        self._maps = []
+        self.columns = {}
+        price_decimal = None
+        for column in COLUMNS:
+            filename = _column_path(path, column)
+            with open(filename, 'rb') as f:
+                decimal = _read_header(f, column)
+                size = os.path.getsize(filename)
+                if size > HEADER_SIZE:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._maps.append(mm)
+                    data = np.frombuffer(mm, dtype='<i8', count=(size - HEADER_SIZE) // 8, offset=HEADER_SIZE)
+                else:
+                    data = np.empty(0, dtype='<i8')
+            if price_decimal is not None and decimal != price_decimal:
+                raise ValueError(f"{filename}: PriceDecimal 與其他欄位不符")
+            price_decimal = decimal
+            self.columns[column] = data
+
+        # 寫入中斷時以最短的欄位為準
+        n = min(len(data) for data in self.columns.values())
+        for column in COLUMNS:
+            self.columns[column] = self.columns[column][:n]
+        self.price_decimal = price_decimal
+
+    def __len__(self):
+        return len(self.columns['time'])
+
+    @property
+    def time_us(self):
+        """成交時間（微秒，int64）"""
+        return self.columns['time']
+
+    @property
+    def price_raw(self):
+        """成交價 × 10^PriceDecimal（int64）"""
+        return self.columns['price']
+
+    @property
+    def quantity(self):
+        return self.columns['qty']
+
+    @property
+    def total_qty(self):
+        return self.columns['total']
+
+    def prices(self):
+        """成交價（float64，會建立新陣列）"""
+        return self.columns['price'] / float(10 ** self.price_decimal)
+
+    def close(self):
+        """釋放 mmap（之後不可再使用先前取得的陣列）"""
+        self.columns = {column: None for column in COLUMNS}
+        for mm in self._maps:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # 外部仍持有陣列，等陣列釋放後才會關閉
+        self._maps = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def store_path_for(csv_path):
+    """舊版 tick CSV 對應的儲存目錄名稱"""
+    return os.path.splitext(csv_path)[0] + STORE_SUFFIX
+
+
+def import_csv(csv_path, store_path=None, price_decimal=0):
+    """
+    匯入舊版 tick CSV（時間, 價格, 數量, 累計量）
+
+    Args:
+        csv_path: CSV 檔案
+        store_path: 儲存目錄，預設為 CSV 同名的 .ticks 目錄
+        price_decimal: 價格小數位數
+
+    Returns:
+        int: 匯入筆數
+    """
+    store_path = store_path or store_path_for(csv_path)
+    writer = TickStoreWriter(store_path, price_decimal, buffer_ticks=65536)
+    count = 0
+    try:
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)  # 標題列
+            for row in reader:
+                if not row:
+                    continue
+                text = row[0]
+                fmt = '%Y-%m-%d %H:%M:%S.%f' if '.' in text else '%Y-%m-%d %H:%M:%S'
+                writer.append(datetime.strptime(text, fmt), float(row[1]), int(row[2]), int(row[3]))
+                count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('import', 'info'):
+        print(__doc__)
+        return
+
+    if sys.argv[1] == 'import':
+        csv_path = sys.argv[2]
+        price_decimal = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+        count = import_csv(csv_path, price_decimal=price_decimal)
+        print(f">>> 已匯入 {count:,} 筆 tick: {store_path_for(csv_path)}")
+    else:
+        with TickStoreReader(sys.argv[2]) as reader:
+            print(f"目錄: {reader.path}")
+            print(f"筆數: {len(reader):,}")
+            print(f"PriceDecimal: {reader.price_decimal}")
+            if len(reader):
+                print(f"時間: {from_epoch_us(reader.time_us[0])} ~ {from_epoch_us(reader.time_us[-1])}")
+                prices = reader.prices()
+                print(f"價格: {prices.min()} ~ {prices.max()}")
+
+
+if __name__ == '__main__':
+    main()
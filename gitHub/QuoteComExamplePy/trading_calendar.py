@@ -0,0 +1,56 @@
+"""
+trading_calendar.py - 期交所交易日計算
+夜盤（15:00 ~ 次日 05:00）的成交屬於下一個營業日，
+因此資料檔案以「交易日」而不是日曆日分割。
+國定假日不在此計算（只跳過週六、週日）。
+"""
+
+from datetime import datetime, timedelta
+
+# 夜盤開始時間 (小時, 分鐘)，之後的成交算下一個交易日
+NIGHT_SESSION_START = (15, 0)
+
+# 夜盤結束時間 (小時, 分鐘)，之前的成交屬於前一晚開始的夜盤
+NIGHT_SESSION_END = (5, 0)
+
+
+def _next_weekday(day):
+    """遇到週末時順延到週一"""
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def trading_day(dt):
+    """
+    取得成交時間所屬的交易日
+
+    Args:
+        dt: 成交時間 (datetime)
+
+    Returns:
+        date: 交易日
+    """
+    hm = (dt.hour, dt.minute)
+    day = dt.date()
+    if hm >= NIGHT_SESSION_START:
+        day += timedelta(days=1)
+    return _next_weekday(day)
+
+
+def session_of(dt):
+    """
+    取得成交時間所屬的盤別
+
+    Returns:
+        str: "night" 夜盤 或 "day" 日盤
+    """
+    hm = (dt.hour, dt.minute)
+    if hm >= NIGHT_SESSION_START or hm < NIGHT_SESSION_END:
+        return "night"
+    return "day"
+
+
+def trading_day_str(dt=None):
+    """交易日字串 YYYYMMDD（檔名用），dt 預設為現在"""
+    return trading_day(dt or datetime.now()).strftime('%Y%m%d')
@@ -1,30 +1,49 @@
-import clr
+import os
 import sys
+import threading
 import uuid
+from collections import deque, OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from datetime import datetime
-from System import Decimal
-from System import UInt16
-from System import Int64
-
-clr.AddReference("Package")      #必要引用dll
-clr.AddReference("PushClient")   #必要引用dll
-clr.AddReference("TradeCom")     #必要引用dll
-
-
-from Smart import TaiFexCom
-from Intelligence import MARKET_FLAG
-from Intelligence import ProListQueryField 
-from Intelligence import ORDER_TYPE
-from Intelligence import MARKET_FLAG
-from Intelligence import SIDE_FLAG
-from Intelligence import PRICE_FLAG
-from Intelligence import TIME_IN_FORCE
-from Intelligence import POSITION_EFFECT
-from Intelligence import TIME_IN_FORCE
-from Intelligence import OFFICE_FLAG
-from Intelligence import Currency_Excode
-
-from time import sleep
+
+# 元件來源: dll = pythonnet + KGI DLL（預設），sim = 純 Python 模擬器（../kgisim）
+KGI_BACKEND = os.environ.get('KGI_BACKEND', 'dll').lower()
+
+# ../kgisim 與 ../kgiperf
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+if KGI_BACKEND == 'sim':
+    from kgisim import Decimal, UInt16, Int64
+    from kgisim import (TaiFexCom, MARKET_FLAG, ProListQueryField, ORDER_TYPE, SIDE_FLAG, PRICE_FLAG,
+                        TIME_IN_FORCE, POSITION_EFFECT, OFFICE_FLAG, Currency_Excode)
+else:
+    import clr
+    from System import Decimal
+    from System import UInt16
+    from System import Int64
+
+    clr.AddReference("Package")      #必要引用dll
+    clr.AddReference("PushClient")   #必要引用dll
+    clr.AddReference("TradeCom")     #必要引用dll
+
+
+    from Smart import TaiFexCom
+    from Intelligence import MARKET_FLAG
+    from Intelligence import ProListQueryField 
+    from Intelligence import ORDER_TYPE
+    from Intelligence import MARKET_FLAG
+    from Intelligence import SIDE_FLAG
+    from Intelligence import PRICE_FLAG
+    from Intelligence import TIME_IN_FORCE
+    from Intelligence import POSITION_EFFECT
+    from Intelligence import TIME_IN_FORCE
+    from Intelligence import OFFICE_FLAG
+    from Intelligence import Currency_Excode
+
+from kgiperf import (stage as perfStage, now as perfNow, origin as perfOrigin, counter as perfCounter,
+                     CallbackQueue, BLOCK)
+from show_error_codes import get_error_description
+
 """
 TradeCom是凱基提供交易的API元件，使用者可藉由TradeCom達到即時下單及帳務查詢功能等目的。
 使用TradeCom元件前需要先安裝Pythonnet，指令如下:
@@ -34,34 +53,170 @@ pip install Pythonnet
 1.	TradeCom.dll
 2.	PushClient.dll
 3.	Package.dll
+
+設定環境變數 KGI_BACKEND=sim 時改用 kgisim 模擬器，不需要 Pythonnet 與上述檔案。
+
+查詢與下單另有 *Async 版本（orderAsync / posSumAsync / fMarginAsync ...），回傳 (代碼, Future)，
+Future 由對應的主機回覆（PT02002 / PT02006 依 RequestId，查詢依回覆類型先進先出）完成，
+以 waitReply(future) 等待（逾時回傳 None）。
+
+下單路徑的延遲記錄在 kgiperf 的 order.build / order.call / order.ack / order.fill 階段，
+在行情回呼中同步下單時另記錄 tick_to_order（行情封包接收 → 呼叫 tradecom.Order）。
+送出 / 確認的委託筆數與券商錯誤代碼記在 kgiperf 計數器（/metrics 輸出）。
+
+queueSize > 0 時事件執行緒只把回報排入有界佇列（kgiperf.CallbackQueue），由消費執行緒處理與回呼；
+佇列滿時預設讓事件執行緒等待，不丟棄任何回報（overflow=BLOCK），排隊時間記錄在 trade.queue 階段。
+此模式下回呼中不可呼叫 order / waitReply 等待回覆（回覆排在同一佇列後面），請用 orderAsync。
 """
+PERF_BUILD = perfStage('order.build')
+PERF_CALL = perfStage('order.call')
+PERF_ACK = perfStage('order.ack')
+PERF_FILL = perfStage('order.fill')
+PERF_TICK_TO_ORDER = perfStage('tick_to_order')
+
+ORDERS_SENT = perfCounter('kgi_orders_sent_total', '送出的委託筆數（tradecom.Order 回傳 0）')
+ORDERS_ACKED = perfCounter('kgi_orders_acked_total', '收到下單第二回覆（PT02002）的委託筆數', labels=('result',))
+BROKER_ERRORS = perfCounter('kgi_broker_errors_total', '券商回傳的錯誤代碼次數', labels=('dt', 'code'),
+                            annotate=lambda key: {'description': get_error_description(key[1])})
+
+# 等待第一筆成交回報計時的委託上限（超過時淘汰最舊的）
+MAX_TIMED_ORDERS = 10000
+
+
+class PendingReplies:
+    """等待主機回覆的請求表
+
+    查詢的回覆沒有序號，依回覆類型（DT）先進先出對應；下單 / 刪改單依 RequestId 對應。
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.byType = {}     # {DT: deque[Future]}
+        self.byRequest = {}  # {RequestId: Future}
+
+    def expect(self, dt):
+        """登記等待一筆 dt 回覆（須在送出請求之前登記）"""
+        future = Future()
+        future.dt = dt
+        future.requestId = None
+        with self.lock:
+            self.byType.setdefault(dt, deque()).append(future)
+        return future
+
+    def expectRequest(self, requestId, tag=None):
+        """登記等待 RequestId 的回覆，tag 會隨回覆（res['Tag']）交給 callback"""
+        future = Future()
+        future.dt = None
+        future.requestId = requestId
+        future.tag = tag
+        future.sentAt = 0
+        with self.lock:
+            self.byRequest[requestId] = future
+        return future
+
+    @property
+    def depth(self):
+        """等待回覆的請求數"""
+        with self.lock:
+            return len(self.byRequest) + sum(len(queue) for queue in self.byType.values())
+
+    def tagOf(self, requestId):
+        future = self.byRequest.get(requestId)
+        return future.tag if future is not None else None
+
+    def sentAtOf(self, requestId):
+        """送單時間（perf_counter_ns），不存在回傳 0"""
+        future = self.byRequest.get(requestId)
+        return future.sentAt if future is not None else 0
+
+    def resolve(self, dt, res):
+        """以回覆完成最早登記的 dt 請求（該請求已逾時取消時，這筆晚到的回覆屬於它，直接丟棄）"""
+        with self.lock:
+            queue = self.byType.get(dt)
+            if not queue:
+                return False
+            future = queue.popleft()
+        if not future.set_running_or_notify_cancel():
+            return False
+        future.set_result(res)
+        return True
+
+    def resolveRequest(self, requestId, res):
+        """以回覆完成 RequestId 的請求"""
+        with self.lock:
+            future = self.byRequest.pop(requestId, None)
+        if future is None or not future.set_running_or_notify_cancel():
+            return False
+        future.set_result(res)
+        return True
+
+    def discard(self, future):
+        """取消等待並移出等待表（送出失敗，主機不會回覆）"""
+        with self.lock:
+            if future.requestId is not None:
+                if self.byRequest.get(future.requestId) is future:
+                    del self.byRequest[future.requestId]
+            else:
+                queue = self.byType.get(future.dt)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+        return future.cancel()
+
+    def cancel(self, future):
+        """逾時取消等待
+
+        依 DT 對應的請求只取消、留在佇列中：主機稍後仍會送來這筆回覆，由它消耗（resolve 略過已取消的），
+        否則會被交給下一個等待同一 DT 的請求。依 RequestId 對應的請求直接移除。
+
+        Returns:
+            bool: 是否已取消（False 表示回覆剛好到達，future 已有結果）
+        """
+        if future.requestId is not None:
+            return self.discard(future)
+        return future.cancel()
+
+
 class TradecomPyFut:
     """KGI期貨國內交易的Python API範例程式。
     """
-    def __init__(self, host, port, sid, timeout=5000, callback = lambda dic: print(dic)) -> None:
+    def __init__(self, host, port, sid, timeout=5000, callback = lambda dic: print(dic),
+                 queueSize=0, overflow=BLOCK, consumers=1) -> None:
         """程式初始化
 
         Args:
             host (str): 主機連線的host
             port (num): 主機連線的port
             sid (str):  主機連線的sid
+            queueSize (int, optional): 回呼佇列容量，0 表示在事件執行緒直接處理（預設）
+            overflow (str, optional): 佇列滿時的處理方式，BLOCK（預設，不丟棄）或 DROP_OLDEST
+            consumers (int, optional): 消費執行緒數，大於 1 時不保證回報順序
         """
         self.host = host
         self.port = port
         self.sid = sid
         self.callback = callback
+        self.replies = PendingReplies()
+        self.orderSentAt = OrderedDict()  # {OrderNo: 送單時間}，第一筆成交回報時計時
+        self.replyTimeout = timeout / 1000  # 等待主機回覆的預設秒數
         self.tradecom =  TaiFexCom("", port, sid)
         self.tradecom.ConnectTimeout = timeout
         print("TradeCom API 初始化 Version (%s) ........" % (self.tradecom.version))
+        self.callbackQueue = None
+        handlers = (self.onTradeRcvMessage, self.onTradeGetStatus, self.onTradeRecoverStatus,
+                    self.onTradeRcvServerTime)
+        if queueSize > 0:
+            # 事件執行緒只排入佇列，由消費執行緒處理
+            self.callbackQueue = CallbackQueue(queueSize, overflow, consumers, name='trade').start()
+            handlers = tuple(self.callbackQueue.wrap(handler) for handler in handlers)
+        onMessage, onStatus, onRecover, onServerTime = handlers
         # register event handler
         #狀態通知事件KGI Tradecom API message event
-        self.tradecom.OnRcvMessage += self.onTradeRcvMessage
+        self.tradecom.OnRcvMessage += onMessage
         #資料接收事件KGI Tradecom API status event
-        self.tradecom.OnGetStatus += self.onTradeGetStatus
+        self.tradecom.OnGetStatus += onStatus
         #資料回補事件KGI Tradecom API Recover event
-        self.tradecom.OnRecoverStatus += self.onTradeRecoverStatus
+        self.tradecom.OnRecoverStatus += onRecover
          #資料回補事件KGI Tradecom API Server Time event
-        self.tradecom.OnRcvServerTime += self.onTradeRcvServerTime
+        self.tradecom.OnRcvServerTime += onServerTime
         self.debug = True
 
     def reciprocate(self, brokerId, account, month, txside, txqty):
@@ -247,6 +402,47 @@ class TradecomPyFut:
         return self.tradecom.RetriveCOVER(market, brokerId, account
                                           , trader, comId, comYm, strikePrice
                                           , cp, exchange)
+
+    def waitReply(self, future, timeout=None):
+        """等待 *Async 回傳的 Future
+
+        Args:
+            future (Future): *Async 回傳的 Future
+            timeout (float, optional): 秒數，None 表示使用 replyTimeout
+
+        Returns:
+            dict: 回覆（與 callback 收到的相同），逾時回傳 None
+        """
+        try:
+            return future.result(self.replyTimeout if timeout is None else timeout)
+        except FutureTimeoutError:
+            if self.replies.cancel(future):
+                return None
+            return future.result()  # 逾時與回覆同時發生
+
+    def _query(self, dt, send, *args):
+        future = self.replies.expect(dt)
+        res = send(*args)
+        if res != 0:
+            self.replies.discard(future)
+            return res, None
+        return res, future
+
+    def posSumAsync(self, market, brokerId, account, trader= ''):
+        """最新部位彙總查詢，回傳 (代碼, Future[P001616])"""
+        return self._query('P001616', self.posSum, market, brokerId, account, trader)
+
+    def posDetailAsync(self, market, brokerId, account, trader= ''):
+        """部位明細查詢，回傳 (代碼, Future[P001618])"""
+        return self._query('P001618', self.posDetail, market, brokerId, account, trader)
+
+    def fMarginAsync(self, market, brokerId, account, trader= ''):
+        """權益數查詢，回傳 (代碼, Future[P001626])"""
+        return self._query('P001626', self.fMargin, market, brokerId, account, trader)
+
+    def coverAsync(self, market, brokerId, account, trader= ''):
+        """平倉查詢，回傳 (代碼, Future[P001614])"""
+        return self._query('P001614', self.cover, market, brokerId, account, trader)
         
     def order(self, type, market, brokerId, account
               , symbolId, bs, pricefl, price, tif
@@ -278,6 +474,27 @@ class TradecomPyFut:
                             委託回報	FUT_ORDER_RPT	PT02010
                             成交回報	FUT_DEAL_RPT	PT02011
         """
+        res, future = self.orderAsync(type, market, brokerId, account, symbolId, bs, pricefl, price, tif,
+                                      qty, pf, off, webid, cnt, orderno)
+        if res != 0:
+            return False
+        # 等待下單第二回覆，逾時仍視為已送出
+        self.waitReply(future)
+        return True
+
+    def orderAsync(self, type, market, brokerId, account
+              , symbolId, bs, pricefl, price, tif
+              , qty, pf, off, webid = '', cnt= '', orderno= '', tag=None):
+        """國內期權下單，不等待回覆（參數同 order）
+
+        Args:
+            tag (optional): 呼叫端資料，回覆時放在 res['Tag'] 交給 callback
+
+        Returns:
+            tuple: (代碼, Future)，代碼 0 表示送出，Future 由 PT02002（新單）或 PT02006（刪改單）完成；
+                   代碼非 0 時 Future 為 None
+        """
+        start = perfNow()
         print(f'type: {type}, market: {market}, brokerId: {brokerId}, account: {account}')
         print(f'symbolId: {symbolId}, bs: {bs}, pricefl: {pricefl}, price: {price}, tif: {tif}')
         print(f'qty: {qty}, pf: {pf}, off: {off}, webid: {webid}, cnt: {cnt}, orderno: {orderno}')
@@ -294,17 +511,25 @@ class TradecomPyFut:
         rid = self.tradecom.GetRequestId()
         REQID = Int64(rid)
         print(f"送單 RequestId=[{rid}]")
+        future = self.replies.expectRequest(rid, tag)
+        t = PERF_BUILD.since(start)
+        origin = perfOrigin()
+        if origin:
+            PERF_TICK_TO_ORDER.record(t - origin)
+        future.sentAt = t
         if type == 'O':
             res = self.tradecom.Order(TYPE, MARKET, REQID, brokerId, account, '', symbolId, BS, PRF, PRICE, TF, QTY, PF, OFF)
         else:
             res = self.tradecom.Order(TYPE, MARKET, REQID, brokerId, account, '', symbolId, BS, PRF, PRICE, TF, QTY, PF, OFF, webid, cnt, orderno)
+        PERF_CALL.since(t)
         if res != 0:
+            BROKER_ERRORS.inc('Order', str(res))
             print("委託失敗: ", self.tradecom.GetOrderErrMsg(res))
-            return False
-        else:
-            print("委託成功: ")
-            sleep(1)
-            return True
+            self.replies.discard(future)
+            return res, None
+        ORDERS_SENT.inc()
+        print("委託成功: ")
+        return res, future
      
     def officeFlag(self, off):
         """風控(目前沒有作用)
@@ -578,6 +803,8 @@ class TradecomPyFut:
         """關閉API的元件
         """
         self.tradecom.Dispose()
+        if self.callbackQueue is not None:
+            self.callbackQueue.stop()
     
     def logout(self) -> None:
         """登出API平台
@@ -589,6 +816,9 @@ class TradecomPyFut:
         Args:
             uid (_type_): _description_
             pwd (_type_): _description_
+
+        Returns:
+            dict: 登入回覆（P001503 或 STATUS），逾時回傳 None
         """
         #是否註冊即時回報
         self.tradecom.AutoSubReport=True
@@ -596,8 +826,10 @@ class TradecomPyFut:
         self.tradecom.AutoRecoverReport=True
         #是否回下載商品檔
         self.tradecom.AutoRetriveProductInfo=True
+        future = self.replies.expect('P001503')
         self.tradecom.LoginDirect(self.host, self.port, uid, pwd, ' ')
-        sleep(2)
+        # 等待登入回覆 P001503（或 CONNECT_FAIL / LOGIN_FAIL 狀態），逾時回傳 None
+        return self.waitReply(future)
         
     def getAccList(self):
         """登入帳號查詢
@@ -605,6 +837,22 @@ class TradecomPyFut:
         return self.tradecom.GetAccountList()
     
     
+    def callbackBacklog(self):
+        """
+        尚未處理的回覆 / 回呼數（/metrics 抓取時呼叫）
+
+        Returns:
+            dict: {'replies': 等待主機回覆的請求數, 'queue': 回呼佇列中的筆數（queueSize > 0 時）,
+                   'stream': 模擬器尚未送達的回呼數（僅 KGI_BACKEND=sim）}
+        """
+        backlog = {'replies': self.replies.depth}
+        if self.callbackQueue is not None:
+            backlog['queue'] = self.callbackQueue.depth
+        stream = getattr(self.tradecom, 'stream', None)
+        if stream is not None:
+            backlog['stream'] = stream.pending
+        return backlog
+
     def getMsg(self, code):
         return self.tradecom.GetMessageMap(code)
     
@@ -655,7 +903,10 @@ class TradecomPyFut:
             res['ACCFL' + num] = sub.AccountFlag
             res['IB' + num] = sub.IB
             i += 1
+        if pkg.Code != 0:
+            BROKER_ERRORS.inc('P001503', str(pkg.Code))
         self.callback(res)
+        self.replies.resolve('P001503', res)
     
     def P001701(self, pkg):
         """_summary_
@@ -730,7 +981,21 @@ class TradecomPyFut:
          'ErrorCode': pkg.ErrorCode,
          'ErrorMsg': self.getMsg(pkg.ErrorCode)
         }
+        res['Tag'] = self.replies.tagOf(pkg.RequestId)
+        if pkg.ErrorCode == 0:
+            ORDERS_ACKED.inc('ok')
+        else:
+            ORDERS_ACKED.inc('error')
+            BROKER_ERRORS.inc('PT02002', str(pkg.ErrorCode))
+        sentAt = self.replies.sentAtOf(pkg.RequestId)
+        if sentAt:
+            PERF_ACK.since(sentAt)
+            if pkg.ErrorCode == 0:
+                self.orderSentAt[pkg.OrderNo] = sentAt
+                if len(self.orderSentAt) > MAX_TIMED_ORDERS:
+                    self.orderSentAt.popitem(last=False)
         self.callback(res)
+        self.replies.resolveRequest(pkg.RequestId, res)
         
     def PT02006(self, pkg):
         """期/選刪改單
@@ -746,7 +1011,11 @@ class TradecomPyFut:
          'ErrorCode': pkg.ErrorCode,
          'ErrorMsg': self.getMsg(pkg.ErrorCode)
         }
+        res['Tag'] = self.replies.tagOf(pkg.RequestId)
+        if pkg.ErrorCode != 0:
+            BROKER_ERRORS.inc('PT02006', str(pkg.ErrorCode))
         self.callback(res)
+        self.replies.resolveRequest(pkg.RequestId, res)
         
     def PT02010(self, pkg):
         """委託回報
@@ -810,6 +1079,9 @@ class TradecomPyFut:
          'Qty2': pkg.Qty2,
          'BS2': pkg.BS2
         }
+        sentAt = self.orderSentAt.pop(pkg.OrderNo, 0)
+        if sentAt:
+            PERF_FILL.since(sentAt)
         self.callback(res)
     
     def P001614(self, pkg):
@@ -842,6 +1114,7 @@ class TradecomPyFut:
                 res['QTY' + num] =  pkg.QTY
                 i += 1
         self.callback(res)
+        self.replies.resolve('P001614', res)
         
     def P001616(self, pkg):
         """分帳客戶最新部位彙總
@@ -878,6 +1151,7 @@ class TradecomPyFut:
                 res['DealPrice' + num] =  getattr(sub, 'DealPrice', 0)
                 i += 1
         self.callback(res)
+        self.replies.resolve('P001616', res)
         
     def P001618(self, pkg):
         """分帳客戶部位明細
@@ -947,6 +1221,7 @@ class TradecomPyFut:
                 res['ComYM2' + num] =  pkg.ComYM2
                 i += 1
         self.callback(res)
+        self.replies.resolve('P001618', res)
     
     def P001624(self, pkg):
         """平倉明細查詢
@@ -1068,6 +1343,7 @@ class TradecomPyFut:
                 res['AddMargin' + num] = sub.AddMargin
                 i += 1
         self.callback(res)
+        self.replies.resolve('P001626', res)
     
     def P001628(self, pkg):
         """台外幣互轉作業
@@ -1264,6 +1540,8 @@ class TradecomPyFut:
          'msg': smsg
         }
         self.callback(res)
+        if res['status'] in ('CONNECT_FAIL', 'LOGIN_FAIL'):
+            self.replies.resolve('P001503', res)
     
     def onTradeRecoverStatus(self, sender, topic, status, count): 
         """資料回補事件
@@ -1280,7 +1558,7 @@ class TradecomPyFut:
         }
         self.callback(res)
         
-    def onTradeRcvServerTime(self, time, quality):
+    def onTradeRcvServerTime(self, sender, time, quality):
         res = {'DT': 'SERVERTIME',
          'time': time,
          'quality': quality
@@ -1,12 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import clr
 import sys
 import builtins
 
-from System import UInt16
-from TradeComFutPySample import TradecomPyFut
+from TradeComFutPySample import TradecomPyFut, UInt16
 from time import sleep
 
 """
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_latency.py - kgiperf 計時成本與「行情封包 → 下單」各階段延遲
+1. 計時成本：now() + Stage.since() 與 with Stage.span() 每次的額外耗時，超過 1 µs 時結束代碼為 1
+2. 熱路徑：kgisim 行情（TickReplayer）→ QuotecomPyFut 分派 → 回呼中每 N 筆 tick 以
+   TradecomPyFut.orderAsync 送出範圍市價單 → 撮合 → PT02002 / PT02011，列出各階段 p50 / p99
+不需要 .NET 與 DLL。
+
+執行方式: python bench_latency.py [tick 筆數] [每幾筆 tick 下單] [回報延遲毫秒]
+"""
+
+import contextlib
+import os
+import sys
+from time import perf_counter_ns
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+if len(sys.argv) > 3:
+    os.environ['KGI_SIM_LATENCY_MS'] = sys.argv[3]
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'QuoteComExamplePy'))
+
+from QuoteComFutPySample import QuotecomPyFut
+from TradeComFutPySample import TradecomPyFut, UInt16
+import kgiperf
+from kgiperf import Stage, now
+from kgisim import default_market, synthetic_ticks, TickReplayer
+
+SYMBOL = 'TMFB6'
+START_PRICE = 23000.0
+OVERHEAD_LIMIT_NS = 1000
+
+
+def overhead(n=1_000_000):
+    """每次計時的額外耗時（奈秒），扣除空迴圈"""
+    stage = Stage('overhead')
+    t = perf_counter_ns()
+    for _ in range(n):
+        pass
+    empty = perf_counter_ns() - t
+
+    t = perf_counter_ns()
+    for _ in range(n):
+        stage.since(now())
+    since = (perf_counter_ns() - t - empty) / n
+
+    t = perf_counter_ns()
+    for _ in range(n):
+        with stage.span():
+            pass
+    span = (perf_counter_ns() - t - empty) / n
+    return since, span
+
+
+def hot_path(ticks, every):
+    """行情回呼中每 every 筆 tick 送出一筆範圍市價單"""
+    market = default_market()
+    market.publish(SYMBOL, START_PRICE, 1)
+
+    trader = TradecomPyFut('sim', UInt16(0), 'API', callback=lambda res: None)
+    trader.doLogin('bench', '')
+    seen = [0]
+
+    def on_quote(view):
+        if view['DT'] != 'PI20020':
+            return
+        seen[0] += 1
+        if seen[0] % every == 0:
+            side = 'B' if (seen[0] // every) % 2 else 'S'
+            trader.orderAsync('O', 'F', 'F004022', '0000000', SYMBOL, side, 'MR', 0, 'I', 1, 'A', 'SP')
+
+    quote = QuotecomPyFut('sim', 0, 'API', '', callback=on_quote)
+    quote.quoteCom.Connect2Quote('sim', 0, 'bench', '', ' ', '')
+    quote.quoteCom.SubQuote(SYMBOL)
+
+    kgiperf.reset()
+    TickReplayer(market, SYMBOL, synthetic_ticks(ticks, start_price=START_PRICE, seed=7)).run()
+    trader.tradecom.stream.flush(10)
+    quote.logout()
+    trader.tradecom.stream.close()
+    return seen[0]
+
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    every = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    since, span = overhead()
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        received = hot_path(ticks, every)
+
+    print("-" * 72)
+    print(f"計時成本:  now() + since() {since:6.0f} ns    with span() {span:6.0f} ns"
+          f"（上限 {OVERHEAD_LIMIT_NS} ns）")
+    print(f"行情:      {received:,} 筆 PI20020，每 {every} 筆下單一次，"
+          f"回報延遲 {os.environ.get('KGI_SIM_LATENCY_MS', '0')} ms")
+    print("-" * 72)
+    print(kgiperf.report())
+    print("-" * 72)
+    return 0 if max(since, span) < OVERHEAD_LIMIT_NS else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
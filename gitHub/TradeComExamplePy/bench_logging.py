@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_logging.py - 下單回報回呼（FuturesTrader.on_callback）的日誌成本
+以 PT02002 → PT02010 → PT02011 的回報序列呼叫 on_callback（DEBUG_MODE 開啟，與預設設定相同），
+主控台輸出導向行緩衝的檔案（與終端機相同，每行寫出一次；可另加每次寫出的延遲模擬較慢的主控台），比較：
+    sync       在回呼中直接格式化並寫出（與原本 print 相同）
+    async      kgilog 背景執行緒寫出
+    gated      等級設為 WARNING，回報紀錄在格式化之前就被略過
+列出每次回呼的 p50 / p99 與總耗時（async 另含最後等待寫完的時間）。不需要 .NET 與 DLL。
+
+執行方式: python bench_logging.py [回報組數] [每次寫出延遲 µs]
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+from time import perf_counter, sleep
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+    from money import FuturesTrader, log
+import kgilog
+from kgilog import DEBUG, WARNING
+from kgiperf import Stage, now
+
+SYMBOL = 'TMFB6'
+
+
+def reports(i):
+    """第 i 筆委託的下單回覆、委託回報與成交回報"""
+    request_id = 100000 + i
+    order_no = f'A{i:05d}'
+    side = 'B' if i % 2 else 'S'
+    return (
+        {'DT': 'PT02002', 'RequestId': request_id, 'OrderNo': order_no, 'ErrorCode': 0, 'ErrorMsg': '',
+         'Tag': {'symbol': SYMBOL, 'side': side, 'qty': 1, 'position_effect': 'A'}},
+        {'DT': 'PT02010', 'OrderNo': order_no, 'Symbol': SYMBOL, 'Side': side, 'Price': 23000,
+         'AfterQty': 1, 'ReportTime': '090000000'},
+        {'DT': 'PT02011', 'OrderNo': order_no, 'Symbol': SYMBOL, 'Side': side, 'DealPrice': 23000,
+         'DealQty': 1, 'CumQty': 1, 'ReportTime': '090000001'},
+    )
+
+
+class SlowConsole:
+    """每次寫出延遲 delay 秒的主控台（I/O 等待期間釋放 GIL，與真正的主控台相同）"""
+
+    def __init__(self, stream, delay):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def run(trader, count, console):
+    stage = Stage('callback')
+    messages = [reports(i) for i in range(count)]
+    start = perf_counter()
+    with contextlib.redirect_stdout(console):
+        for batch in messages:
+            for data in batch:
+                t = now()
+                trader.on_callback(data)
+                stage.since(t)
+        returned = perf_counter() - start
+        kgilog.flush(60)
+    return stage.snapshot(), returned, perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    delay = float(sys.argv[2]) / 1e6 if len(sys.argv) > 2 else 0.0
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        trader = FuturesTrader()
+    path = os.path.join(tempfile.mkdtemp(prefix='kgilog-'), 'console.txt')
+    console = open(path, 'w', encoding='utf-8', buffering=1)
+    stream = SlowConsole(console, delay) if delay else console
+
+    print("-" * 78)
+    print(f"{'模式':<10}{'p50 µs':>10}{'p99 µs':>10}{'回呼總耗時 s':>14}{'含寫完 s':>12}{'每組 µs':>12}")
+    for name, background, level in (('sync', False, DEBUG), ('async', True, DEBUG), ('gated', True, WARNING)):
+        kgilog.configure(background=background)
+        log.set_level(level)
+        snap, returned, total = run(trader, count, stream)
+        print(f"{name:<10}{snap['p50'] / 1000:>10.1f}{snap['p99'] / 1000:>10.1f}{returned:>14.3f}{total:>12.3f}"
+              f"{returned * 1e6 / count:>12.1f}")
+    print("-" * 78)
+    print(f"{count:,} 組回報（PT02002 + PT02010 + PT02011），寫出延遲 {delay * 1e6:.0f} µs，"
+          f"主控台輸出: {path}（{os.path.getsize(path):,} bytes）")
+    console.close()
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        trader.trader.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_orders.py - 以 kgisim 撮合引擎對 FuturesTrader 做下單路徑壓力測試
+多條執行緒同時呼叫 FuturesTrader.place_order（MR / M / SP 與 ROD / IOC / FOK 混合），
+背景以 TickReplayer 推送行情讓留在委託簿的委託陸續成交，回報依設定的延遲送達。
+結束後以撮合引擎的委託為準，檢查 pending_orders / order_no_map 是否一致：
+    對應錯誤    order_no_map 的 RequestId 與委託不符，或 pending_orders 記錄的買賣別 / 倉別不符
+    缺少暫存    有 order_no_map 但沒有 pending_orders
+    殘留        委託已全部成交或取消，但仍留在 order_no_map
+    未對應成交  成交回報送達時 order_no_map 沒有該委託書號
+每筆下單等待下單第二回覆（PT02002）後才返回，回報延遲越大需要越多執行緒。
+不需要 .NET 與 DLL。
+
+執行方式: python bench_orders.py [委託筆數] [執行緒數] [回報延遲毫秒] [行情每秒筆數]
+"""
+
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+if len(sys.argv) > 3:
+    os.environ['KGI_SIM_LATENCY_MS'] = sys.argv[3]
+
+import money_config as config
+from money import FuturesTrader
+from trade_logger import TradeLogger
+from kgisim import default_market, synthetic_ticks, TickReplayer
+from kgisim.trade import SIDE_TEXT, EFFECT_TEXT
+
+# 壓力測試不受單日口數限制，也不輸出逐筆訊息
+config.MAX_DAILY_QTY = 10 ** 9
+config.DEBUG_MODE = False
+config.SHOW_ORDER_REPORT = False
+config.SHOW_DEAL_REPORT = False
+config.SHOW_PRODUCTION_WARNING = False
+config.REQUIRE_CONFIRMATION = False
+config.AUTO_CHECK_MARGIN = False
+
+START_PRICE = 23000.0
+
+
+def order_mix(count, seed=0):
+    """委託組合：(side, price_type, price_offset, tif, position_effect)"""
+    rnd = random.Random(seed)
+    for _ in range(count):
+        side = rnd.choice('BS')
+        effect = 'C' if rnd.random() < 0.1 else 'A'
+        r = rnd.random()
+        if r < 0.5:
+            yield side, 'MR', 0, 'I', effect
+        elif r < 0.65:
+            yield side, 'M', 0, 'I', effect
+        elif r < 0.9:
+            yield side, 'SP', rnd.randint(-3, 3), 'R', effect
+        else:
+            yield side, 'SP', rnd.randint(-1, 2), 'F', effect
+
+
+def check(trader, tradecom, orphan_fills):
+    """以撮合引擎的委託為準檢查 FuturesTrader 的委託對應表"""
+    problems = {'對應錯誤': 0, '缺少暫存': 0, '殘留': 0, '未對應成交': orphan_fills}
+    mapped = set()
+    for order_no, request_id in trader.order_no_map.items():
+        order = tradecom.orders.get(order_no)
+        mapped.add(request_id)
+        if order is None or order.request_id != request_id:
+            problems['對應錯誤'] += 1
+            continue
+        info = trader.pending_orders.get(request_id)
+        if info is None:
+            problems['缺少暫存'] += 1
+        elif info['side'] != SIDE_TEXT[order.side] or info['position_effect'] != EFFECT_TEXT[order.effect]:
+            problems['對應錯誤'] += 1
+        if order.status != 'working':
+            problems['殘留'] += 1
+    problems['對應錯誤'] += sum(1 for request_id in trader.pending_orders if request_id not in mapped)
+    return problems
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    feed_rate = float(sys.argv[4]) if len(sys.argv) > 4 else 2000
+
+    market = default_market()
+    market.publish('TMFB6', START_PRICE, 1)
+
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')), \
+            tempfile.TemporaryDirectory() as log_dir:
+        trader = FuturesTrader(logger=TradeLogger(log_dir))
+        tradecom = trader.trader.tradecom
+
+        # 在 FuturesTrader 處理之前記錄成交回報是否能對應到委託
+        orphan = [0]
+        handle = trader.trader.callback
+
+        def observe(data):
+            if data.get('DT') == 'PT02011' and data.get('OrderNo') not in trader.order_no_map:
+                orphan[0] += 1
+            handle(data)
+
+        trader.trader.callback = observe
+        trader.login()
+        symbol = trader.trader.futSymbol(config.DEFAULT_SYMBOL, config.DEFAULT_MONTH)
+
+        feed = TickReplayer(market, symbol, synthetic_ticks(start_price=START_PRICE, seed=1),
+                            feed_rate).start()
+
+        sent = [0]
+        sent_lock = threading.Lock()
+
+        def submit(args):
+            side, price_type, offset, tif, effect = args
+            price = (market.last_price(symbol) or START_PRICE) + offset if price_type == 'SP' else 0
+            if effect == 'C':
+                ok = trader.close_position(side=side, price_type=price_type, price=price, symbol=symbol)
+            else:
+                ok = trader.place_order(symbol=symbol, side=side, price_type=price_type, price=price,
+                                        qty=1, tif=tif, position_effect=effect)
+            if ok:
+                with sent_lock:
+                    sent[0] += 1
+
+        start = perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(submit, order_mix(count)))
+        elapsed = perf_counter() - start
+
+        feed.stop()
+        feed.join()
+        tradecom.stream.flush(10)
+        problems = check(trader, tradecom, orphan[0])
+        fills = tradecom.engine.trades
+        trader.trader.callback = handle
+        tradecom.stream.close()
+
+    working = sum(1 for order in tradecom.orders.values() if order.status == 'working')
+    print("-" * 56)
+    print(f"委託筆數:       {sent[0]:,} / {count:,}（{threads} 條執行緒）")
+    print(f"回報延遲:       {tradecom.stream.latency * 1000:.1f} ms")
+    print(f"耗時:           {elapsed:.2f} 秒")
+    print(f"下單速率:       {sent[0] / elapsed:,.0f} 筆/秒")
+    print(f"成交筆數:       {fills:,}（仍在委託簿 {working:,} 筆）")
+    print(f"行情推送:       {feed.sent:,} 筆")
+    print(f"order_no_map:   {len(trader.order_no_map):,}  pending_orders: {len(trader.pending_orders):,}")
+    print("一致性檢查:")
+    for name, value in problems.items():
+        print(f"  {name}: {value:,}")
+    print("-" * 56)
+    return 1 if any(problems.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
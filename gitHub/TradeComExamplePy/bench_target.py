@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_target.py - 以 kgisim 比較反手（多 ↔ 空）的委託筆數與耗時
+    原流程    close_all_positions（平倉）→ sleep(1) → 開倉 1 口
+    目標部位  TradeExecutor.set_target_position(±1)：一筆淨委託（買 / 賣 2 口，倉別 A），
+              等待成交回報使部位到達目標
+MAX_ORDER_QTY 小於 2 時淨委託會拆成多筆。不需要 .NET 與 DLL。
+
+執行方式: python bench_target.py [反手次數] [回報延遲毫秒] [MAX_ORDER_QTY]
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+from time import perf_counter, sleep
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+if len(sys.argv) > 2:
+    os.environ['KGI_SIM_LATENCY_MS'] = sys.argv[2]
+
+import money_config as config
+from execute import TradeExecutor
+from kgisim import default_market
+
+config.MAX_DAILY_QTY = 10 ** 9
+config.DEBUG_MODE = False
+config.SHOW_ORDER_REPORT = False
+config.SHOW_DEAL_REPORT = False
+config.SHOW_PRODUCTION_WARNING = False
+config.REQUIRE_CONFIRMATION = False
+config.AUTO_CHECK_MARGIN = False
+
+START_PRICE = 23000.0
+
+
+def legacy_reversal(executor, side):
+    """原本的黃金 / 死亡交叉流程：有倉位先平倉，等待 1 秒，再開倉 1 口"""
+    position = executor.check_position()
+    if position['has_position']:
+        executor.close_all_positions()
+        sleep(1)
+    executor.trader.place_order(side=side, price_type='MR', qty=1)
+
+
+def target_reversal(executor, side):
+    executor.set_target_position(1 if side == 'B' else -1)
+
+
+def run(executor, reversal, count):
+    """執行 count 次反手，回傳 (委託筆數, 耗時秒數, 最後部位)"""
+    tradecom = executor.trader.trader.tradecom
+    # 先建立多單 1 口
+    target_reversal(executor, 'B')
+    sent = len(tradecom.orders)
+    start = perf_counter()
+    for i in range(count):
+        reversal(executor, 'S' if i % 2 == 0 else 'B')
+    executor.trader.positions.wait_for(config.DEFAULT_SYMBOL, -1 if count % 2 else 1, 5)
+    elapsed = perf_counter() - start
+    return len(tradecom.orders) - sent, elapsed, executor.trader.positions.get(config.DEFAULT_SYMBOL)[0]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    config.MAX_ORDER_QTY = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir, \
+            contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        os.chdir(work_dir)
+        try:
+            executor = TradeExecutor()
+            symbol = executor.trader.trader.futSymbol(config.DEFAULT_SYMBOL, config.DEFAULT_MONTH)
+            default_market().publish(symbol, START_PRICE, 1)
+            results['原流程'] = run(executor, legacy_reversal, count)
+            results['目標部位'] = run(executor, target_reversal, count)
+            executor.set_target_position(0)
+            executor.dispose()
+        finally:
+            os.chdir(cwd)
+
+    print("-" * 56)
+    print(f"反手次數: {count}  MAX_ORDER_QTY: {config.MAX_ORDER_QTY}  "
+          f"回報延遲: {os.environ.get('KGI_SIM_LATENCY_MS', '0')} ms")
+    for name, (orders, elapsed, position) in results.items():
+        print(f"{name:<6}  委託 {orders:>3} 筆（每次反手 {orders / count:.1f} 筆）  "
+              f"耗時 {elapsed:6.2f} 秒（每次 {elapsed / count * 1000:7.1f} ms）  最後部位 {position:+d}")
+    print("-" * 56)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_trade_journal.py - TradeLogger journal 的寫入、摘要與重播成本
+    寫入     開倉 / 平倉紀錄的每筆耗時（舊做法：每筆訊息重新開檔寫入）
+    摘要     get_daily_summary（舊做法：兩次掃描 daily_trades）
+    重播     以 1,000,000 筆 journal 紀錄（開倉 / 平倉各半）重建狀態，並與直接計算的結果比對
+另外以寫入測試的 journal 重新建立 TradeLogger，比對重建的統計、交易紀錄與持倉是否與寫入時累加的相同。
+不需要 .NET 與 DLL；結果不符時結束代碼為 1。
+
+執行方式: python bench_trade_journal.py [重播筆數] [寫入筆數]
+"""
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+# ../kgilog
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import kgilog
+from kgilog import WARNING
+from trade_logger import TradeLogger, POINT_VALUE, TIME_FORMAT, log
+
+DAY = datetime(2026, 10, 19, 9, 0, 0)
+
+
+def clock():
+    return DAY
+
+
+def trades(pairs, seed=7):
+    """(side, 開倉價, 平倉價) 的隨機序列"""
+    rng = random.Random(seed)
+    price = 23000
+    for _ in range(pairs):
+        side = 'long' if rng.random() < 0.5 else 'short'
+        entry = price + rng.randint(-5, 5)
+        price = entry + rng.randint(-20, 20)
+        yield side, entry, price
+
+
+def expected(pairs):
+    """不經過 journal 直接計算的結果（與舊版 TradeLogger 相同的算法）"""
+    pnls = []
+    total = peak = drawdown = 0.0
+    for side, entry, exit_price in trades(pairs):
+        pnl = (exit_price - entry if side == 'long' else entry - exit_price) * POINT_VALUE
+        pnls.append(pnl)
+        total += pnl
+        if total > peak:
+            peak = total
+        elif peak - total > drawdown:
+            drawdown = peak - total
+    return {
+        'total_pnl': total,
+        'total_trades': len(pnls),
+        'winning_trades': sum(1 for p in pnls if p > 0),
+        'losing_trades': sum(1 for p in pnls if p < 0),
+        'max_drawdown': drawdown
+    }
+
+
+def write_journal(path, pairs):
+    timestamp = DAY.strftime(TIME_FORMAT)
+    with open(path, 'w', encoding='utf-8') as f:
+        for side, entry, exit_price in trades(pairs):
+            f.write(f"{timestamp}\tO\t{side}\t{entry}\t1\n{timestamp}\tC\t{exit_price}\t1\n")
+
+
+def aggregates(logger):
+    """比對用的狀態：摘要、每筆交易與最高損益"""
+    return logger.get_daily_summary(), list(logger.daily_trades), logger.peak_pnl
+
+
+def bench_write(directory, count):
+    """
+    每筆紀錄的寫入耗時：舊做法（每筆開檔）與 journal（保持開啟）
+
+    Returns:
+        tuple: (舊做法秒數, journal 秒數, 寫入時累加的狀態, 由 journal 重建的狀態)
+    """
+    pairs = count // 2
+    path = os.path.join(directory, 'old.log')
+    start = perf_counter()
+    for side, entry, exit_price in trades(pairs):
+        for message in (f"📈 開倉 | 價格: {entry}", f"⏹️ 平倉 | 平倉: {exit_price}"):
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(f"[{timestamp}] {message}\n")
+    old = perf_counter() - start
+
+    logger = TradeLogger(os.path.join(directory, 'write'), clock=clock)
+    start = perf_counter()
+    for side, entry, exit_price in trades(pairs):
+        if side == 'long':
+            logger.open_long(entry)
+        else:
+            logger.open_short(entry)
+        logger.close_position(exit_price)
+    new = perf_counter() - start
+    # 加碼、部分平倉，最後留下未平的持倉
+    logger.open_long(23000, 2)
+    logger.open_long(23010, 1)
+    logger.close_position(23020, 1)
+    live = aggregates(logger)
+    logger.close()
+
+    rebuilt = TradeLogger(os.path.join(directory, 'write'), clock=clock)
+    state = aggregates(rebuilt)
+    rebuilt.close()
+    return old, new, live, state
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 20_000
+    pairs = entries // 2
+    log.set_level(WARNING)
+    kgilog.configure(console='off')
+    directory = tempfile.mkdtemp(prefix='trade-journal-')
+    try:
+        old, new, live, rebuilt = bench_write(directory, writes)
+
+        replay_dir = os.path.join(directory, 'replay')
+        os.makedirs(replay_dir)
+        write_journal(os.path.join(replay_dir, DAY.strftime("%Y%m%d") + '.journal'), pairs)
+        size = os.path.getsize(os.path.join(replay_dir, DAY.strftime("%Y%m%d") + '.journal'))
+
+        start = perf_counter()
+        logger = TradeLogger(replay_dir, clock=clock)
+        replay = perf_counter() - start
+
+        start = perf_counter()
+        summary = logger.get_daily_summary()
+        summary_time = perf_counter() - start
+
+        trades_list = logger.daily_trades
+        start = perf_counter()
+        sum(1 for t in trades_list if t['pnl'] > 0)
+        sum(1 for t in trades_list if t['pnl'] < 0)
+        scan_time = perf_counter() - start
+        logger.close()
+
+        want = expected(pairs)
+        mismatch = {k: (summary[k], v) for k, v in want.items() if summary[k] != v}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print("-" * 70)
+    print(f"寫入 {writes:,} 筆    每筆開檔 {old * 1e6 / writes:8.1f} µs    journal {new * 1e6 / writes:8.1f} µs"
+          f"（含文字日誌）")
+    print(f"摘要 {len(trades_list):,} 筆交易    掃描 {scan_time * 1e3:8.2f} ms    累加統計 {summary_time * 1e3:8.3f} ms")
+    print(f"重播 {logger.replayed:,} 筆紀錄（{size / 1e6:.1f} MB）    {replay:.2f} s"
+          f"（{replay * 1e6 / max(logger.replayed, 1):.2f} µs/筆）")
+    print(f"總損益 {summary['total_pnl']:+,.0f} 元 | 勝 {summary['winning_trades']:,} | "
+          f"敗 {summary['losing_trades']:,} | 最大回撤 {summary['max_drawdown']:,.0f} 元")
+    print("-" * 70)
+    failed = False
+    if mismatch or logger.replayed != pairs * 2 or logger.current_position is not None:
+        print(f"✗ 重播結果與直接計算不同: {mismatch}")
+        failed = True
+    else:
+        print("✓ 重播結果與直接計算相同")
+    position = live[0]['current_position'] or {}
+    if rebuilt != live:
+        diff = {k: (v, rebuilt[0][k]) for k, v in live[0].items() if rebuilt[0][k] != v}
+        print(f"✗ 重建的狀態與寫入時累加的不同: 摘要 {diff}，交易紀錄"
+              f"{'相同' if rebuilt[1] == live[1] else '不同'}，最高損益 {live[2]} / {rebuilt[2]}")
+        failed = True
+    else:
+        print(f"✓ 重建的摘要、{len(live[1]):,} 筆交易紀錄與持倉（{position.get('side')} "
+              f"{position.get('qty')} 口 @ {position.get('price')}）與寫入時累加的相同")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_webhook.py - Webhook 服務讀取端點的延遲壓力測試
+以 N 條同時連線（keep-alive）交替請求 GET /health 與 GET /position，
+同時另一條連線持續送出 /long、/short 讓委託佇列一直有下單進行中，
+統計讀取請求的 p50 / p99 延遲。
+
+未指定網址時在子行程以 kgisim 啟動 webhook_async.py（不需要 .NET 與 DLL）；
+指定網址時測試已在執行的服務（例如 Flask 版 tradingview_webhook.py，需 REQUIRE_SECRET=false）。
+
+執行方式: python bench_webhook.py [連線數] [每條連線請求數] [網址]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+async def request(reader, writer, method, path, body=None):
+    """在既有連線上送出一個請求，回傳 (狀態碼, 回應內容)"""
+    payload = json.dumps(body).encode('utf-8') if body is not None else b''
+    writer.write((f'{method} {path} HTTP/1.1\r\nHost: bench\r\n'
+                  f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n').encode('latin-1')
+                 + payload)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith('content-length:'):
+            length = int(line.split(':', 1)[1])
+    data = await reader.readexactly(length) if length else b''
+    return status, data
+
+
+async def reader_client(host, port, count, latencies, errors, start):
+    """一條 keep-alive 連線，交替查詢 /health 與 /position"""
+    await start.wait()
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+    try:
+        for i in range(count):
+            path = '/health' if i % 2 == 0 else '/position'
+            t = perf_counter()
+            status, _ = await request(reader, writer, 'GET', path)
+            latencies.append(perf_counter() - t)
+            if status >= 500:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def order_client(host, port, stop, accepted):
+    """持續送出做多 / 做空訊號，讓下單一直在進行中"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = 0
+        while not stop.is_set():
+            path = '/long' if i % 2 == 0 else '/short'
+            status, _ = await request(reader, writer, 'POST', path, {'qty': 1, 'seq': i})
+            if status in (200, 202):
+                accepted.append(status)
+            i += 1
+            await asyncio.sleep(0.02)
+    finally:
+        writer.close()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, max(0, int(round(p / 100 * len(values) + 0.5)) - 1))
+    return values[k]
+
+
+async def run(host, port, connections, count):
+    latencies, errors, accepted = [], [], []
+    start = asyncio.Event()
+    stop = asyncio.Event()
+    orders = asyncio.create_task(order_client(host, port, stop, accepted))
+    clients = [asyncio.create_task(reader_client(host, port, count, latencies, errors, start))
+               for _ in range(connections)]
+    await asyncio.sleep(0.2)
+    began = perf_counter()
+    start.set()
+    await asyncio.gather(*clients)
+    elapsed = perf_counter() - began
+    stop.set()
+    await orders
+    return latencies, errors, len(accepted), elapsed
+
+
+async def wait_ready(host, port, timeout=30):
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await request(reader, writer, 'GET', '/health')
+            writer.close()
+            if status == 200:
+                return True
+        except OSError:
+            await asyncio.sleep(0.2)
+    return False
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    url = sys.argv[3] if len(sys.argv) > 3 else None
+
+    server = None
+    work_dir = None
+    if url:
+        parts = urlsplit(url)
+        host, port = parts.hostname, parts.port or 80
+        target = url
+    else:
+        host, port = '127.0.0.1', free_port()
+        target = f'webhook_async.py（kgisim）http://{host}:{port}'
+        work_dir = tempfile.TemporaryDirectory()
+        env = dict(os.environ, KGI_BACKEND='sim', REQUIRE_SECRET='false',
+                   PYTHONPATH=os.pathsep.join([os.path.dirname(HERE), HERE, os.environ.get('PYTHONPATH', '')]))
+        server = subprocess.Popen([sys.executable, os.path.join(HERE, 'webhook_async.py'),
+                                   '--host', host, '--port', str(port)],
+                                  cwd=work_dir.name, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    try:
+        if not asyncio.run(wait_ready(host, port)):
+            print("✗ 服務未就緒")
+            return 1
+        latencies, errors, accepted, elapsed = asyncio.run(run(host, port, connections, count))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(10)
+            work_dir.cleanup()
+
+    total = len(latencies)
+    print("-" * 56)
+    print(f"目標:           {target}")
+    print(f"同時連線:       {connections}（每條 {count} 個請求，/health 與 /position 交替）")
+    print(f"讀取請求:       {total:,} 筆，耗時 {elapsed:.2f} 秒（{total / elapsed:,.0f} 筆/秒）")
+    print(f"延遲 p50:       {percentile(latencies, 50) * 1000:8.2f} ms")
+    print(f"延遲 p99:       {percentile(latencies, 99) * 1000:8.2f} ms")
+    print(f"延遲 max:       {max(latencies) * 1000:8.2f} ms")
+    print(f"同時送出訊號:   {accepted} 筆已受理")
+    print(f"5xx 回應:       {len(errors)}")
+    print("-" * 56)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -5,15 +5,13 @@
 用於查詢正確的分公司代碼
 """
 
-import clr
-from System import UInt16
 from time import sleep
 
 # 匯入設定檔
 import money_config as config
 
 # 匯入交易API
-from TradeComFutPySample import TradecomPyFut
+from TradeComFutPySample import TradecomPyFut, UInt16
 
 
 def callback(data):
@@ -5,9 +5,7 @@
 使用與登入測試相同的方式查詢帳號資訊
 """
 
-import clr
-from System import UInt16
-from TradeComFutPySample import TradecomPyFut
+from TradeComFutPySample import TradecomPyFut, UInt16
 from time import sleep
 import money_config as config
 
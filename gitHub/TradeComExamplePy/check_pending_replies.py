@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_pending_replies.py - 查詢逾時後晚到的回覆不會交給下一個請求
+查詢回覆（P001616 等）沒有序號，依 DT 先進先出對應等待中的請求。依序檢查：
+    逾時 → 晚到的回覆 → 第二個請求    晚到的回覆由已逾時的請求消耗，第二個請求拿到自己的回覆
+    送出失敗                          請求移出佇列，下一筆回覆交給下一個請求
+    RequestId 請求逾時                 晚到的回覆不對應任何請求
+以 kgisim 建立 TradecomPyFut，直接呼叫 waitReply / _query 與 PendingReplies.resolve 模擬主機回覆。
+不需要 .NET 與 DLL；不符時結束代碼為 1。
+
+執行方式: python check_pending_replies.py
+"""
+
+import contextlib
+import os
+import sys
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+from TradeComFutPySample import TradecomPyFut
+
+DT = 'P001616'
+TIMEOUT = 0.05
+
+
+def main():
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        trader = TradecomPyFut('sim', 0, 'check')
+    replies = trader.replies
+    results = []
+
+    # 逾時 → 晚到的回覆 → 第二個請求
+    res, first = trader._query(DT, lambda: 0)
+    timed_out = trader.waitReply(first, TIMEOUT)
+    res, second = trader._query(DT, lambda: 0)
+    replies.resolve(DT, {'reply': 'late'})
+    replies.resolve(DT, {'reply': 'second'})
+    got = trader.waitReply(second, TIMEOUT)
+    results.append(("逾時的請求回傳 None", timed_out, None))
+    results.append(("晚到的回覆由逾時的請求消耗，第二個請求收到自己的回覆", got, {'reply': 'second'}))
+
+    # 送出失敗
+    failed = trader._query(DT, lambda: -1)
+    res, third = trader._query(DT, lambda: 0)
+    replies.resolve(DT, {'reply': 'third'})
+    results.append(("送出失敗回傳 (-1, None)", failed, (-1, None)))
+    results.append(("送出失敗的請求不消耗回覆", trader.waitReply(third, TIMEOUT), {'reply': 'third'}))
+
+    # RequestId 請求逾時
+    future = replies.expectRequest(12345)
+    timed_out = trader.waitReply(future, TIMEOUT)
+    late = replies.resolveRequest(12345, {'RequestId': 12345})
+    results.append(("RequestId 請求逾時後晚到的回覆不對應任何請求", (timed_out, late), (None, False)))
+
+    results.append(("所有請求都已完成", replies.depth, 0))
+
+    failed_count = 0
+    print("-" * 72)
+    for name, got, want in results:
+        ok = got == want
+        failed_count += not ok
+        print(f"{'✓' if ok else '✗'} {name}" + ('' if ok else f"\n    得到 {got}，預期 {want}"))
+    print("-" * 72)
+    with contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        trader.dispose()
+    if failed_count:
+        print(f"✗ {failed_count} 項不符")
+        sys.exit(1)
+    print("✓ 逾時、晚到的回覆與送出失敗的對應皆符合預期")
+
+
+if __name__ == '__main__':
+    main()
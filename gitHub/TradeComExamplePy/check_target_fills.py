@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+check_target_fills.py - 多口淨委託分多筆成交時，TradeLogger 持倉與部位簿一致
+以 kgisim 撮合（造市委託每檔 1 口，多口委託必定分成多筆 PT02011），MAX_ORDER_QTY = 2，
+依序調整目標部位 +1 → -1 → +2 → -2 → 0（每一步前送出一筆行情重新掛出造市委託），
+每一步比對部位簿與 TradeLogger.current_position。
+不需要 .NET 與 DLL；不一致時結束代碼為 1。
+
+執行方式: python check_target_fills.py
+"""
+
+import contextlib
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('KGI_BACKEND', 'sim')
+
+import money_config as config
+from execute import TradeExecutor
+from kgisim import default_market, MatchingEngine
+
+config.MAX_ORDER_QTY = 2
+config.MAX_DAILY_QTY = 10 ** 9
+config.DEBUG_MODE = False
+config.SHOW_ORDER_REPORT = False
+config.SHOW_DEAL_REPORT = False
+config.SHOW_PRODUCTION_WARNING = False
+config.REQUIRE_CONFIRMATION = False
+config.AUTO_CHECK_MARGIN = False
+
+START_PRICE = 23000.0
+TARGETS = (1, -1, 2, -2, 0)
+
+
+def logged_position(logger):
+    """TradeLogger 持倉換成 (淨口數, 均價)"""
+    position = logger.current_position
+    if not position:
+        return 0, 0.0
+    qty = position['qty'] if position['side'] == 'long' else -position['qty']
+    return qty, float(position['price'])
+
+
+def main():
+    # 必須在建立交易物件之前設定（市場共用同一個撮合引擎）
+    MatchingEngine.for_market(default_market(), level_qty=1)
+
+    rows = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as work_dir, \
+            contextlib.redirect_stdout(open(os.devnull, 'w', encoding='utf-8')):
+        os.chdir(work_dir)
+        try:
+            executor = TradeExecutor()
+            tradecom = executor.trader.trader.tradecom
+            symbol = executor.trader.trader.futSymbol(config.DEFAULT_SYMBOL, config.DEFAULT_MONTH)
+            default_market().publish(symbol, START_PRICE, 1)
+            for target in TARGETS:
+                # 每一步前送出一筆行情，造市委託依最後成交價重新掛出
+                default_market().publish(symbol, default_market().last_price(symbol) or START_PRICE, 1)
+                result = executor.set_target_position(target, timeout=5)
+                # 等待同一批成交回報都交給 on_callback（TradeLogger 在部位簿之後更新）
+                tradecom.stream.flush(10)
+                if executor.trader.trader.callbackQueue is not None:
+                    executor.trader.trader.callbackQueue.join(10)
+                book = executor.trader.positions.get(config.DEFAULT_SYMBOL)
+                rows.append((target, result['filled'], book, logged_position(executor.logger),
+                             len(executor.trader.pending_orders)))
+            executor.dispose()
+        finally:
+            os.chdir(cwd)
+
+    failed = False
+    print("-" * 72)
+    print(f"{'目標':>4}{'到達':>6}{'部位簿':>22}{'TradeLogger':>22}{'未完成委託':>12}")
+    for target, filled, book, logged, pending in rows:
+        ok = filled and book[0] == target and logged[0] == book[0] and \
+            (book[0] == 0 or abs(logged[1] - book[1]) < 1e-6)
+        failed |= not ok
+        print(f"{target:>+4d}{'是' if filled else '否':>6}{f'{book[0]:+d} @ {book[1]:.2f}':>22}"
+              f"{f'{logged[0]:+d} @ {logged[1]:.2f}':>22}{pending:>12}  {'✓' if ok else '✗'}")
+    print("-" * 72)
+    if failed or rows[-1][4]:
+        print("✗ TradeLogger 與部位簿不一致")
+        sys.exit(1)
+    print("✓ 每一步 TradeLogger 持倉都與部位簿相同")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,13 +8,15 @@ execute.py - 交易發送執行模組
 import sys
 import os
 from pathlib import Path
-from time import sleep
 from datetime import datetime
 
 # 導入 money 模組
 from money import FuturesTrader
 from trade_logger import TradeLogger
 import money_config as config
+from kgilog import get_logger, ask
+
+log = get_logger('execute')
 
 
 class TradeExecutor:
@@ -22,9 +24,9 @@ class TradeExecutor:
     
     def __init__(self):
         """初始化交易發送執行器"""
-        print("=" * 70)
-        print("交易發送執行器啟動中...")
-        print("=" * 70)
+        log.info("=" * 70)
+        log.info("交易發送執行器啟動中...")
+        log.info("=" * 70)
         
         # 初始化交易日誌記錄器
         self.logger = TradeLogger(log_dir="logs")
@@ -33,14 +35,14 @@ class TradeExecutor:
         self.trader = FuturesTrader(logger=self.logger)
         
         # 登入交易系統
-        print("\n>>> 正在登入交易系統...")
+        log.info("\n>>> 正在登入交易系統...")
         self.trader.login()
         
         if not self.trader.is_logged_in:
             raise Exception("登入失敗，無法啟動交易發送執行器")
         
-        print(">>> 交易發送執行器已就緒！")
-        print("=" * 70 + "\n")
+        log.info(">>> 交易發送執行器已就緒！")
+        log.info("=" * 70 + "\n")
         
         # 倉位資訊快取
         self.position_cache = {
@@ -50,27 +52,32 @@ class TradeExecutor:
             'last_check_time': None
         }
     
-    def check_position(self):
+    def check_position(self, max_age=None):
         """
-        檢查當前倉位
+        檢查當前倉位（讀取即時部位簿，資料超過 max_age 秒未校正時才向主機查詢）
+        
+        Args:
+            max_age: 容許的部位簿資料秒數，None 表示使用 POSITION_MAX_AGE
         
         Returns:
             dict: {
                 'has_position': bool,  # 是否有倉位
                 'position_side': str,  # 'B' 買方(多單) 或 'S' 賣方(空單)
                 'position_qty': int,   # 倉位數量
+                'positions': list,     # 所有倉位 [{'symbol', 'side', 'qty', 'avg_price'}, ...]
             }
         """
-        print("\n>>> 檢查倉位中...")
+        log.info("\n>>> 檢查倉位中...")
         
-        # 查詢部位彙總並取得結果
-        position_data = self.trader.query_position()
+        # 由即時部位簿取得部位
+        position_data = self.trader.get_positions(max_age)
         
         # 初始化結果
         result = {
             'has_position': False,
             'position_side': None,
-            'position_qty': 0
+            'position_qty': 0,
+            'positions': position_data['positions']
         }
         
         # 解析倉位資訊
@@ -85,10 +92,10 @@ class TradeExecutor:
         self.position_cache = result
         self.position_cache['last_check_time'] = datetime.now()
         
-        print(f">>> 倉位檢查結果: {'有倉位' if result['has_position'] else '無倉位'}")
+        log.info(">>> 倉位檢查結果: %s", '有倉位' if result['has_position'] else '無倉位')
         if result['has_position']:
             side_text = '多單' if result['position_side'] == 'B' else '空單'
-            print(f">>> 倉位類型: {side_text}, 數量: {result['position_qty']}口")
+            log.info(">>> 倉位類型: %s, 數量: %s口", side_text, result['position_qty'])
         
         return result
     
@@ -102,24 +109,18 @@ class TradeExecutor:
         Returns:
             bool: 是否執行成功
         """
-        print("\n>>> 準備平掉所有倉位...")
+        log.info("\n>>> 準備平掉所有倉位...")
         
         # 檢查倉位
         position = self.check_position()
         
         if not position['has_position']:
-            print(">>> 目前無倉位，無需平倉")
+            log.info(">>> 目前無倉位，無需平倉")
             return True
         
-        # 取得倉位詳細資訊
-        position_data = self.trader.position_data
-        if not position_data['positions']:
-            print(">>> 無法取得倉位詳細資訊")
-            return False
-        
         # 平掉所有倉位（使用 place_order 並設置 position_effect='C'）
         all_success = True
-        for pos in position_data['positions']:
+        for pos in position['positions']:
             base_symbol = pos['symbol']  # 例如: TMF
             side = pos['side']  # 'B' 或 'S'
             qty = pos['qty']
@@ -132,7 +133,8 @@ class TradeExecutor:
             # 空單(S) → 買進(B)平倉
             close_side = 'S' if side == 'B' else 'B'
             
-            print(f">>> 執行平倉 {base_symbol} ({full_symbol}) {'多單' if side == 'B' else '空單'} {qty} 口")
+            log.info(">>> 執行平倉 %s (%s) %s %s 口",
+                     base_symbol, full_symbol, '多單' if side == 'B' else '空單', qty)
             result = self.trader.place_order(
                 symbol=full_symbol,  # ✅ 使用完整代碼
                 side=close_side,
@@ -143,21 +145,113 @@ class TradeExecutor:
             
             if not result:
                 all_success = False
-                print(f">>> ✗ 平倉 {base_symbol} 失敗")
+                log.error(">>> ✗ 平倉 %s 失敗", base_symbol)
             else:
-                print(f">>> ✓ 平倉 {base_symbol} 指令已發送")
+                log.info(">>> ✓ 平倉 %s 指令已發送", base_symbol)
         
         return all_success
     
-    def execute_golden_cross_signal(self, price=None):
+    def set_target_position(self, target, symbol=None, price=None, price_type='MR', timeout=None):
+        """
+        將商品部位調整為目標口數（多單為正、空單為負、0 為平倉）
+        依部位簿計算最少的淨委託一次送出，例如空單 1 口 → 多單 1 口只送一筆買進 2 口（自動倉別 'A'）；
+        淨口數超過 MAX_ORDER_QTY 時拆成多筆。送出後等待成交回報使部位到達目標（不固定等待）。
+        
+        Args:
+            target: 目標口數
+            symbol: 商品代碼（ComID，例如 TMF；預設使用設定檔）
+            price: 參考價格（用於記錄）
+            price_type: 價格類型（預設範圍市價）
+            timeout: 等待部位到達目標的秒數，None 表示使用 ORDER_FILL_TIMEOUT
+        
+        Returns:
+            dict: {
+                'success': bool,
+                'actions': list,    # 送出的委託列表
+                'price': float,
+                'from': int,        # 調整前淨口數
+                'target': int,
+                'position': int,    # 調整後淨口數
+                'filled': bool      # 部位是否已到達目標
+            }
+        """
+        if symbol is None:
+            symbol = config.DEFAULT_SYMBOL
+        if timeout is None:
+            timeout = getattr(config, 'ORDER_FILL_TIMEOUT', 3)
+        target = int(target)
+        
+        # 由即時部位簿取得目前部位
+        self.check_position()
+        current, _ = self.trader.positions.get(symbol)
+        delta = target - current
+        
+        result = {
+            'success': True,
+            'actions': [],
+            'price': price,
+            'from': current,
+            'target': target,
+            'position': current,
+            'filled': True
+        }
+        
+        if delta == 0:
+            log.info(">>> %s 部位已是目標 %+d 口，無需下單", symbol, target, event='target', symbol=symbol, target=target)
+            return result
+        
+        side = 'B' if delta > 0 else 'S'
+        # 只減少部位（不反手）時使用平倉，其餘使用自動倉別
+        reduce_only = current != 0 and abs(target) < abs(current) and (target == 0 or (target > 0) == (current > 0))
+        position_effect = 'C' if reduce_only else 'A'
+        full_symbol = self.trader.trader.futSymbol(symbol, config.DEFAULT_MONTH)
+        
+        log.info(">>> 調整 %s 部位: %+d → %+d 口（%s %d 口，倉別 %s）", symbol, current, target,
+                 '買進' if side == 'B' else '賣出', abs(delta), position_effect,
+                 event='target', symbol=symbol, current=current, target=target)
+        
+        remaining = abs(delta)
+        while remaining > 0:
+            qty = min(remaining, config.MAX_ORDER_QTY)
+            ok = self.trader.place_order(
+                symbol=full_symbol,
+                side=side,
+                price_type=price_type,
+                price=price if price_type == 'SP' else 0,
+                qty=qty,
+                position_effect=position_effect
+            )
+            if not ok:
+                result['success'] = False
+                log.error(">>> ✗ %s %d 口失敗", '買進' if side == 'B' else '賣出', qty, event='order_failed', qty=qty)
+                break
+            result['actions'].append({
+                'action': '買入' if side == 'B' else '賣出',
+                'side': side,
+                'qty': qty,
+                'position_effect': position_effect,
+                'price': price
+            })
+            remaining -= qty
+        
+        # 等待成交回報使部位到達目標
+        if result['actions']:
+            result['filled'] = self.trader.positions.wait_for(symbol, target, timeout)
+            if not result['filled']:
+                log.warning(">>> ⚠️ %s 秒內部位未到達目標，請以成交回報確認", timeout,
+                            event='fill_timeout', symbol=symbol, target=target)
+        result['position'] = self.trader.positions.get(symbol)[0]
+        
+        return result
+    
+    def execute_golden_cross_signal(self, price=None, qty=1):
         """
-        執行黃金交叉訊號
-        1. 先檢查倉位
-        2. 若有倉位則先平倉
-        3. 執行市價買入1口
+        執行黃金交叉訊號：目標部位調整為多單 qty 口
+        （無倉位買進 qty 口；空單反手只送一筆淨買進；已是多單 qty 口則不下單）
         
         Args:
             price: 當前價格（用於記錄）
+            qty: 目標多單口數
             
         Returns:
             dict: {
@@ -166,66 +260,29 @@ class TradeExecutor:
                 'price': float    # 成交價格
             }
         """
-        print("\n" + "=" * 70)
-        print("⚡ 接收到黃金交叉訊號！")
-        print("=" * 70)
+        log.info("\n" + "=" * 70)
+        log.info("⚡ 接收到黃金交叉訊號！")
+        log.info("=" * 70)
         
-        actions = []
-        
-        # 步驟1: 檢查倉位
-        position = self.check_position()
+        result = self.set_target_position(int(qty), price=price)
         
-        # 步驟2: 若有倉位，先平倉
-        if position['has_position']:
-            print(f">>> 發現倉位，先執行平倉...")
-            close_result = self.close_all_positions()
-            if close_result:
-                actions.append({
-                    'action': '平倉',
-                    'side': 'S' if position['position_side'] == 'B' else 'B',
-                    'qty': position['position_qty'],
-                    'price': price
-                })
-                sleep(1)  # 等待平倉完成
-        
-        # 步驟3: 執行範圍市價買入1口
-        print(f">>> 執行範圍市價買入 1 口")
-        buy_result = self.trader.place_order(
-            side='B',
-            price_type='MR',
-            qty=1
-        )
-        
-        if buy_result:
-            actions.append({
-                'action': '買入',
-                'side': 'B',
-                'qty': 1,
-                'price': price
-            })
-            print("✓ 黃金交叉訊號執行成功")
-            success = True
+        if result['success']:
+            log.info("✓ 黃金交叉訊號執行成功")
         else:
-            print("✗ 黃金交叉訊號執行失敗")
-            success = False
+            log.error("✗ 黃金交叉訊號執行失敗")
         
-        print("=" * 70)
+        log.info("=" * 70)
         
-        return {
-            'success': success,
-            'actions': actions,
-            'price': price
-        }
+        return result
     
-    def execute_death_cross_signal(self, price=None):
+    def execute_death_cross_signal(self, price=None, qty=1):
         """
-        執行死亡交叉訊號
-        1. 先檢查倉位
-        2. 若有倉位則先平倉
-        3. 執行市價賣出1口
+        執行死亡交叉訊號：目標部位調整為空單 qty 口
+        （無倉位賣出 qty 口；多單反手只送一筆淨賣出；已是空單 qty 口則不下單）
         
         Args:
             price: 當前價格（用於記錄）
+            qty: 目標空單口數
             
         Returns:
             dict: {
@@ -234,63 +291,28 @@ class TradeExecutor:
                 'price': float    # 成交價格
             }
         """
-        print("\n" + "=" * 70)
-        print("⚡ 接收到死亡交叉訊號！")
-        print("=" * 70)
-        
-        actions = []
+        log.info("\n" + "=" * 70)
+        log.info("⚡ 接收到死亡交叉訊號！")
+        log.info("=" * 70)
         
-        # 步驟1: 檢查倉位
-        position = self.check_position()
+        result = self.set_target_position(-int(qty), price=price)
         
-        # 步驟2: 若有倉位，先平倉
-        if position['has_position']:
-            print(f">>> 發現倉位，先執行平倉...")
-            close_result = self.close_all_positions()
-            if close_result:
-                actions.append({
-                    'action': '平倉',
-                    'side': 'S' if position['position_side'] == 'B' else 'B',
-                    'qty': position['position_qty'],
-                    'price': price
-                })
-                sleep(1)  # 等待平倉完成
-        
-        # 步驟3: 執行範圍市價賣出1口
-        print(f">>> 執行範圍市價賣出 1 口")
-        sell_result = self.trader.place_order(
-            side='S',
-            price_type='MR',
-            qty=1
-        )
-        
-        if sell_result:
-            actions.append({
-                'action': '賣出',
-                'side': 'S',
-                'qty': 1,
-                'price': price
-            })
-            print("✓ 死亡交叉訊號執行成功")
-            success = True
+        if result['success']:
+            log.info("✓ 死亡交叉訊號執行成功")
         else:
-            print("✗ 死亡交叉訊號執行失敗")
-            success = False
+            log.error("✗ 死亡交叉訊號執行失敗")
         
-        print("=" * 70)
+        log.info("=" * 70)
         
-        return {
-            'success': success,
-            'actions': actions,
-            'price': price
-        }
+        return result
     
     def dispose(self):
         """清理資源"""
-        print("\n>>> 正在清理交易發送執行器資源...")
+        log.info("\n>>> 正在清理交易發送執行器資源...")
         if self.trader and self.trader.is_logged_in:
             self.trader.logout()
-        print(">>> 交易發送執行器已關閉")
+        self.logger.close()
+        log.info(">>> 交易發送執行器已關閉")
 
 
 # 全域執行器實例
@@ -349,22 +371,22 @@ def cleanup_executor():
 
 
 if __name__ == '__main__':
-    print("\n交易發送執行器測試程式")
-    print("=" * 70)
+    log.info("\n交易發送執行器測試程式")
+    log.info("=" * 70)
     
     try:
         # 初始化執行器
         executor = TradeExecutor()
         
-        print("\n測試選單:")
-        print("1. 檢查倉位")
-        print("2. 測試黃金交叉訊號")
-        print("3. 測試死亡交叉訊號")
-        print("4. 平掉所有倉位")
-        print("0. 結束測試")
+        log.info("\n測試選單:")
+        log.info("1. 檢查倉位")
+        log.info("2. 測試黃金交叉訊號")
+        log.info("3. 測試死亡交叉訊號")
+        log.info("4. 平掉所有倉位")
+        log.info("0. 結束測試")
         
         while True:
-            choice = input("\n請選擇測試項目 (0-4): ").strip()
+            choice = ask("\n請選擇測試項目 (0-4): ").strip()
             
             if choice == '1':
                 executor.check_position()
@@ -377,15 +399,13 @@ if __name__ == '__main__':
             elif choice == '0':
                 break
             else:
-                print("✗ 無效的選項")
+                log.error("✗ 無效的選項")
         
     except Exception as e:
-        print(f"\n✗ 測試過程發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 測試過程發生錯誤: %s", e)
     
     finally:
         # 清理資源
         if 'executor' in locals():
             executor.dispose()
-        print("\n測試結束")
+        log.info("\n測試結束")
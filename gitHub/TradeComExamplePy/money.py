@@ -5,17 +5,26 @@
 提供簡易的期貨交易介面，包含下單、查詢、風險控制等功能
 """
 
-import clr
 import sys
+import threading
+from collections import deque
 from datetime import datetime
 from time import sleep
-from System import UInt16
 
 # 匯入設定檔
 import money_config as config
 
-# 匯入交易API
-from TradeComFutPySample import TradecomPyFut
+# 匯入交易API（DLL 或模擬器，依 KGI_BACKEND 環境變數）
+from TradeComFutPySample import TradecomPyFut, UInt16
+from position_book import PositionBook
+from kgiperf import stage as perfStage, now as perfNow
+from kgilog import get_logger, ask, DEBUG
+
+# 部位查詢（P001616）來回延遲
+PERF_POSITION_QUERY = perfStage('position.query')
+
+# DEBUG_MODE 開啟時輸出 [DEBUG] 紀錄
+log = get_logger('money', DEBUG if config.DEBUG_MODE else None)
 
 
 class FuturesTrader:
@@ -36,7 +45,6 @@ class FuturesTrader:
         # 追蹤當前委託
         self.pending_orders = {}  # {RequestId: {'side': 'B'/'S', 'position_effect': 'O'/'C', 'qty': int}}
         self.order_no_map = {}  # {OrderNo: RequestId} 用於成交回報時查找
-        self.last_order_info = None  # 暫存最後一筆下單資訊
         
         # 倉位資訊
         self.position_data = {
@@ -44,9 +52,15 @@ class FuturesTrader:
             'positions': []  # 儲存所有倉位
         }
         
-        print("=" * 60)
-        print("期貨交易系統啟動中...")
-        print("=" * 60)
+        # 即時部位簿（成交回報累加，P001616 校正）
+        self.positions = PositionBook(max_age=getattr(config, 'POSITION_MAX_AGE', 30))
+        self._position_marks = deque()  # 尚未回應的 P001616 送出時的成交序號（依送出順序）
+        self._sync_stop = threading.Event()
+        self._sync_thread = None
+        
+        log.info("=" * 60)
+        log.info("期貨交易系統啟動中...")
+        log.info("=" * 60)
         
         # 初始化交易API
         self.trader = TradecomPyFut(
@@ -54,7 +68,8 @@ class FuturesTrader:
             UInt16(config.PORT),
             config.SID,
             timeout=5000,
-            callback=self.on_callback
+            callback=self.on_callback,
+            queueSize=getattr(config, 'CALLBACK_QUEUE_SIZE', 0)
         )
         self.trader.debug = config.DEBUG_MODE
         
@@ -65,12 +80,10 @@ class FuturesTrader:
         # 登入回應
         if dt == 'P001503':
             if data.get('Code') == 0:
-                print(f"\n✓ 登入成功！")
-                print(f"  帳號: {data.get('ID')}")
-                print(f"  姓名: {data.get('Name')}")
+                log.info("\n✓ 登入成功！\n  帳號: %s\n  姓名: %s", data.get('ID'), data.get('Name'))
                 self.is_logged_in = True
             else:
-                print(f"\n✗ 登入失敗: {data.get('MSG')}")
+                log.error("\n✗ 登入失敗: %s", data.get('MSG'))
                 self.is_logged_in = False
         
         # 下單回應
@@ -78,34 +91,29 @@ class FuturesTrader:
             request_id = data.get('RequestId')
             order_no = data.get('OrderNo')
             
-            print(f"\n下單回應:")
-            print(f"  RequestId: {request_id}")
-            print(f"  委託書號: {order_no}")
             if data.get('ErrorCode') == 0:
-                print(f"  狀態: ✓ 下單成功")
+                log.info("\n下單回應:\n  RequestId: %s\n  委託書號: %s\n  狀態: ✓ 下單成功", request_id, order_no,
+                         event='PT02002', request_id=request_id, order_no=order_no)
                 # 建立 OrderNo 到 RequestId 的映射
                 if request_id and order_no:
                     self.order_no_map[order_no] = request_id
                     
-                    # 如果有暫存的下單資訊，建立 pending_orders
-                    if self.last_order_info:
-                        self.pending_orders[request_id] = self.last_order_info
-                        if config.DEBUG_MODE:
-                            print(f"[DEBUG] 已建立 pending_order: {request_id} -> {self.last_order_info}")
-                        self.last_order_info = None
+                    # 下單資訊隨 RequestId 帶回（orderAsync 的 tag），建立 pending_orders
+                    order_info = data.get('Tag')
+                    if order_info:
+                        self.pending_orders[request_id] = order_info
+                        log.debug("[DEBUG] 已建立 pending_order: %s -> %s", request_id, order_info)
             else:
-                print(f"  狀態: ✗ 下單失敗 - {data.get('ErrorMsg')}")
-                self.last_order_info = None
+                log.error("\n下單回應:\n  RequestId: %s\n  委託書號: %s\n  狀態: ✗ 下單失敗 - %s",
+                          request_id, order_no, data.get('ErrorMsg'),
+                          event='PT02002', request_id=request_id, error_code=data.get('ErrorCode'))
         
         # 委託回報
         elif dt == 'PT02010' and config.SHOW_ORDER_REPORT:
-            print(f"\n委託回報:")
-            print(f"  委託書號: {data.get('OrderNo')}")
-            print(f"  商品代碼: {data.get('Symbol')}")
-            print(f"  買賣別: {'買進' if data.get('Side') == 'B' else '賣出'}")
-            print(f"  委託價: {data.get('Price')}")
-            print(f"  委託量: {data.get('AfterQty')}")
-            print(f"  回報時間: {data.get('ReportTime')}")
+            log.info("\n委託回報:\n  委託書號: %s\n  商品代碼: %s\n  買賣別: %s\n  委託價: %s\n  委託量: %s\n"
+                     "  回報時間: %s", data.get('OrderNo'), data.get('Symbol'),
+                     '買進' if data.get('Side') == 'B' else '賣出', data.get('Price'), data.get('AfterQty'),
+                     data.get('ReportTime'), event='PT02010', order_no=data.get('OrderNo'))
         
         # 成交回報
         elif dt == 'PT02011':
@@ -114,84 +122,93 @@ class FuturesTrader:
             deal_qty = data.get('DealQty')
             side = data.get('Side')
             
+            # 更新即時部位簿
+            self.positions.apply_fill(data.get('Symbol'), side, deal_qty, deal_price)
+            
             # 顯示成交回報（可選）
             if config.SHOW_DEAL_REPORT:
-                print(f"\n成交回報:")
-                print(f"  委託書號: {order_no}")
-                print(f"  商品代碼: {data.get('Symbol')}")
-                print(f"  買賣別: {'買進' if side == 'B' else '賣出'}")
-                print(f"  成交價: {deal_price}")
-                print(f"  成交量: {deal_qty}")
-                print(f"  累計成交: {data.get('CumQty')}")
-                print(f"  回報時間: {data.get('ReportTime')}")
+                log.info("\n成交回報:\n  委託書號: %s\n  商品代碼: %s\n  買賣別: %s\n  成交價: %s\n  成交量: %s\n"
+                         "  累計成交: %s\n  回報時間: %s", order_no, data.get('Symbol'),
+                         '買進' if side == 'B' else '賣出', deal_price, deal_qty, data.get('CumQty'),
+                         data.get('ReportTime'), event='PT02011', order_no=order_no, side=side,
+                         price=deal_price, qty=deal_qty)
             
             # 記錄到交易日誌（不受 SHOW_DEAL_REPORT 影響）
             if self.logger:
-                if config.DEBUG_MODE:
-                    print(f"[DEBUG] 檢查日誌記錄: order_no={order_no}")
-                    print(f"[DEBUG] order_no_map keys: {list(self.order_no_map.keys())}")
+                if log.is_enabled(DEBUG):
+                    log.debug("[DEBUG] 檢查日誌記錄: order_no=%s\n[DEBUG] order_no_map keys: %s",
+                              order_no, list(self.order_no_map.keys()))
                 
                 if order_no in self.order_no_map:
                     request_id = self.order_no_map[order_no]
                     
-                    if config.DEBUG_MODE:
-                        print(f"[DEBUG] 找到 request_id: {request_id}")
-                        print(f"[DEBUG] pending_orders keys: {list(self.pending_orders.keys())}")
+                    if log.is_enabled(DEBUG):
+                        log.debug("[DEBUG] 找到 request_id: %s\n[DEBUG] pending_orders keys: %s",
+                                  request_id, list(self.pending_orders.keys()))
                     
                     if request_id in self.pending_orders:
                         order_info = self.pending_orders[request_id]
                         position_effect = order_info.get('position_effect')
                         
-                        if config.DEBUG_MODE:
-                            print(f"[DEBUG] position_effect: {position_effect}, side: {side}")
+                        log.debug("[DEBUG] position_effect: %s, side: %s", position_effect, side)
+                        
+                        # 自動倉別遇到反向持倉：先記錄平倉，剩餘口數再記錄開倉（目標部位的反手單）
+                        current = self.logger.current_position
+                        if position_effect == 'A' and current and \
+                                current['side'] != ('long' if side == 'B' else 'short'):
+                            close_qty = min(int(deal_qty), current['qty'])
+                            self.logger.close_position(deal_price, close_qty)
+                            log.info("[日誌] 已記錄平倉")
+                            deal_qty = int(deal_qty) - close_qty
                         
                         # 開倉記錄
                         if position_effect in ['O', 'A']:  # 新倉或自動
-                            if side == 'B':
+                            if side == 'B' and deal_qty:
                                 self.logger.open_long(deal_price, deal_qty)
-                                print(f"[日誌] 已記錄做多開倉")
-                            elif side == 'S':
+                                log.info("[日誌] 已記錄做多開倉")
+                            elif side == 'S' and deal_qty:
                                 self.logger.open_short(deal_price, deal_qty)
-                                print(f"[日誌] 已記錄做空開倉")
+                                log.info("[日誌] 已記錄做空開倉")
                         
                         # 平倉記錄
                         elif position_effect == 'C':
                             if self.logger.current_position:
                                 self.logger.close_position(deal_price, deal_qty)
-                                print(f"[日誌] 已記錄平倉")
+                                log.info("[日誌] 已記錄平倉")
                             else:
-                                print(f"[日誌] ⚠️ 無持倉，無法記錄平倉")
+                                log.warning("[日誌] ⚠️ 無持倉，無法記錄平倉")
                         
-                        # 移除已處理的委託
-                        del self.pending_orders[request_id]
-                        del self.order_no_map[order_no]
+                        # 一筆委託可能分成多筆成交回報，累計成交達委託口數才移除
+                        filled = order_info.get('filled', 0) + int(data.get('DealQty') or 0)
+                        if data.get('CumQty') is not None:
+                            filled = max(filled, int(data['CumQty']))
+                        order_info['filled'] = filled
+                        if filled >= int(order_info.get('qty') or 0):
+                            del self.pending_orders[request_id]
+                            del self.order_no_map[order_no]
                     else:
-                        if config.DEBUG_MODE:
-                            print(f"[DEBUG] request_id 不在 pending_orders 中")
+                        log.debug("[DEBUG] request_id 不在 pending_orders 中")
                 else:
-                    if config.DEBUG_MODE:
-                        print(f"[DEBUG] order_no 不在 order_no_map 中")
+                    log.debug("[DEBUG] order_no 不在 order_no_map 中")
             else:
-                if config.DEBUG_MODE:
-                    print(f"[DEBUG] logger 未初始化")
+                log.debug("[DEBUG] logger 未初始化")
         
         # 權益數查詢
         elif dt == 'P001626':
             count = data.get('Count', 0)
-            if config.DEBUG_MODE:
-                print(f"\n[DEBUG] 權益數回報: Count={count}")
-                if count == 0:
-                    print(f"[DEBUG] 完整數據: {data}")
+            log.debug("\n[DEBUG] 權益數回報: Count=%s", count)
+            if count == 0:
+                log.debug("[DEBUG] 完整數據: %s", data)
             
             if count > 0:
-                print(f"\n權益數查詢結果:")
-                print(f"  權益總值: {data.get('EQUITY1', 'N/A')}")
-                print(f"  原始保證金: {data.get('IAMT1', 'N/A')}")
-                print(f"  維持保證金: {data.get('MAMT1', 'N/A')}")
-                print(f"  可用餘額: {data.get('EXCESS1', 'N/A')}")
-                print(f"  浮動損益: {data.get('FloatProfit1', 'N/A')}")
+                log.info("\n權益數查詢結果:")
+                log.info("  權益總值: %s", data.get('EQUITY1', 'N/A'))
+                log.info("  原始保證金: %s", data.get('IAMT1', 'N/A'))
+                log.info("  維持保證金: %s", data.get('MAMT1', 'N/A'))
+                log.info("  可用餘額: %s", data.get('EXCESS1', 'N/A'))
+                log.info("  浮動損益: %s", data.get('FloatProfit1', 'N/A'))
             else:
-                print(f"\n權益數查詢結果: 無資料（可能帳戶未開通或無資金）")
+                log.info("\n權益數查詢結果: 無資料（可能帳戶未開通或無資金）")
         
         # 部位彙總
         elif dt == 'P001616':
@@ -201,7 +218,7 @@ class FuturesTrader:
             self.position_data['positions'] = []
             
             if rows > 0:
-                print(f"\n部位彙總查詢結果:")
+                log.info("\n部位彙總查詢結果:")
                 for i in range(1, rows + 1):
                     position = {
                         'symbol': data.get(f'ComID{i}', 'N/A'),
@@ -212,49 +229,65 @@ class FuturesTrader:
                     }
                     self.position_data['positions'].append(position)
                     
-                    print(f"  部位 {i}:")
-                    print(f"    商品: {position['symbol']}")
-                    print(f"    買賣別: {'多單' if position['side'] == 'B' else '空單'}")
-                    print(f"    數量: {position['qty']}")
-                    print(f"    均價: {position['avg_price']}")
-                    print(f"    損益: {position['pnl']}")
+                    log.info("  部位 %s:", i)
+                    log.info("    商品: %s", position['symbol'])
+                    log.info("    買賣別: %s", '多單' if position['side'] == 'B' else '空單')
+                    log.info("    數量: %s", position['qty'])
+                    log.info("    均價: %s", position['avg_price'])
+                    log.info("    損益: %s", position['pnl'])
                 
                 self.position_data['has_position'] = True
             else:
-                print(f"\n目前無持倉部位")
+                log.info("\n目前無持倉部位")
                 self.position_data['has_position'] = False
+            
+            # 校正即時部位簿（回報依序送達，送出查詢前的成交已包含在彙總中）
+            since = self._position_marks.popleft() if self._position_marks else None
+            if data.get('Code', 0) == 0:
+                matched = self.positions.reconcile(self.position_data['positions'], since)
+                if matched is None:
+                    log.debug("[DEBUG] 部位查詢期間有新成交，略過這次校正")
+                elif not matched:
+                    log.debug("[DEBUG] 部位簿與部位彙總不一致，已以彙總為準")
         
         # 狀態訊息
         elif dt == 'STATUS':
-            if config.DEBUG_MODE:
-                print(f"[狀態] {data.get('status')}: {data.get('msg')}")
+            log.debug("[狀態] %s: %s", data.get('status'), data.get('msg'))
     
     def login(self):
         """登入交易系統"""
-        print(f"\n正在登入...")
+        log.info("\n正在登入...")
         # 使用 LOGIN_ACCOUNT 登入，如果沒有則使用 ACCOUNT
         login_account = getattr(config, 'LOGIN_ACCOUNT', config.ACCOUNT)
-        print(f"登入帳號: {login_account}")
-        print(f"交易帳號: {config.ACCOUNT}")
+        log.info("登入帳號: %s", login_account)
+        log.info("交易帳號: %s", config.ACCOUNT)
         
         # 設定自動訂閱回報
         self.trader.tradecom.AutoSubReport = True
         self.trader.tradecom.AutoRecoverReport = True
         self.trader.tradecom.AutoRetriveProductInfo = True
         
-        # 執行登入
-        self.trader.doLogin(login_account, config.PASSWORD)
-        sleep(3)  # 等待登入完成
+        # 執行登入（等待登入回覆，最多 ConnectTimeout）
+        if self.trader.doLogin(login_account, config.PASSWORD) is None:
+            log.error("✗ 等待登入回覆逾時")
         
         if self.is_logged_in and config.AUTO_CHECK_MARGIN:
             self.query_margin()
+        
+        # 部位簿初始校正，之後由成交回報更新並定期背景校正
+        if self.is_logged_in:
+            self.sync_positions()
+            interval = getattr(config, 'POSITION_SYNC_INTERVAL', 0)
+            if interval:
+                self.start_position_sync(interval)
     
     def logout(self):
         """登出交易系統"""
-        print("\n正在登出...")
+        self.stop_position_sync()
+        log.info("\n正在登出...")
         self.trader.logout()
         self.trader.dispose()
-        print("已登出")
+        log.info("已登出")
     
     def place_order(self, symbol=None, side='B', price_type=None, price=0, 
                    qty=1, tif=None, position_effect=None):
@@ -271,15 +304,15 @@ class FuturesTrader:
             position_effect: 'O'=新倉, 'C'=平倉, 'D'=當沖, 'A'=自動
         """
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return False
         
         # 正式環境警告
         if hasattr(config, 'SHOW_PRODUCTION_WARNING') and config.SHOW_PRODUCTION_WARNING:
-            print("\n" + "="*60)
-            print("⚠️⚠️⚠️  正式環境警告  ⚠️⚠️⚠️")
-            print("此為正式環境，下單會實際成交並產生費用！")
-            print("="*60)
+            log.info("\n" + "="*60)
+            log.warning("⚠️⚠️⚠️  正式環境警告  ⚠️⚠️⚠️")
+            log.info("此為正式環境，下單會實際成交並產生費用！")
+            log.info("="*60)
         
         # 使用預設值
         if symbol is None:
@@ -295,16 +328,15 @@ class FuturesTrader:
         # ⚠️ 重要：市價單和範圍市價單不允許 ROD，必須使用 IOC 或 FOK
         if price_type in ['M', 'MR'] and tif == 'R':
             tif = 'I'  # 市價單自動改為 IOC
-            if config.DEBUG_MODE:
-                print(f"[提示] {price_type}單不允許 ROD，已自動改為 IOC")
+            log.debug("[提示] %s單不允許 ROD，已自動改為 IOC", price_type)
         
         # 風險檢查
         if qty > config.MAX_ORDER_QTY:
-            print(f"✗ 委託口數 {qty} 超過單筆最大限制 {config.MAX_ORDER_QTY}")
+            log.error("✗ 委託口數 %s 超過單筆最大限制 %s", qty, config.MAX_ORDER_QTY)
             return False
         
         if self.daily_order_count + qty > config.MAX_DAILY_QTY:
-            print(f"✗ 今日累計口數將超過限制 {config.MAX_DAILY_QTY}")
+            log.error("✗ 今日累計口數將超過限制 %s", config.MAX_DAILY_QTY)
             return False
         
         # 顯示下單資訊
@@ -316,27 +348,27 @@ class FuturesTrader:
             'SS': '停損限價'
         }.get(price_type, price_type)
         
-        print(f"\n準備下單:")
-        print(f"  商品代碼: {symbol}")
-        print(f"  買賣別: {'買進' if side == 'B' else '賣出'}")
-        print(f"  價格類型: {price_type_text}")
-        print(f"  委託價格: {price if price_type == 'SP' else price_type_text}")
-        print(f"  委託口數: {qty}")
-        print(f"  有效期限: {'ROD' if tif == 'R' else ('IOC' if tif == 'I' else 'FOK')}")
-        print(f"  倉位類型: {position_effect}")
+        log.info("\n準備下單:")
+        log.info("  商品代碼: %s", symbol)
+        log.info("  買賣別: %s", '買進' if side == 'B' else '賣出')
+        log.info("  價格類型: %s", price_type_text)
+        log.info("  委託價格: %s", price if price_type == 'SP' else price_type_text)
+        log.info("  委託口數: %s", qty)
+        log.info("  有效期限: %s", 'ROD' if tif == 'R' else ('IOC' if tif == 'I' else 'FOK'))
+        log.info("  倉位類型: %s", position_effect)
         
         # 檢查是否需要確認（從設定檔讀取）
         require_confirm = getattr(config, 'REQUIRE_CONFIRMATION', False)
         if require_confirm:
-            confirm = input("\n確認下單? (y/n): ")
+            confirm = ask("\n確認下單? (y/n): ")
             if confirm.lower() != 'y':
-                print("✗ 已取消下單")
+                log.error("✗ 已取消下單")
                 return False
         else:
-            print("\n>> 自動送出下單...")
+            log.info("\n>> 自動送出下單...")
         
-        # 暫存下單資訊（等待 PT02002 回應時建立映射）
-        self.last_order_info = {
+        # 下單資訊隨 RequestId 送出（PT02002 回應時建立映射）
+        order_info = {
             'side': side,
             'position_effect': position_effect,
             'qty': qty
@@ -347,7 +379,7 @@ class FuturesTrader:
         # 參數順序（12個）：type, market, brokerId, account, symbolId, bs, pricefl, price, tif, qty, pf, off
         # 使用位置參數，不支援 trader 關鍵字參數
         
-        result = self.trader.order(
+        code, reply = self.trader.orderAsync(
             'O',        # 1. type: O=新單, C=取消, M=修改
             'F',        # 2. market: F=期貨
             config.BROKER_ID,   # 3. brokerId: 分公司代碼
@@ -359,8 +391,10 @@ class FuturesTrader:
             tif,        # 9. tif: R=ROD, I=IOC, F=FOK
             qty,        # 10. qty: 數量
             position_effect,  # 11. pf: O=新倉, C=平倉, D=當沖, A=自動
-            config.DEFAULT_OFFICE_FLAG  # 12. off: SP=SPEEDY, AS=AS400
+            config.DEFAULT_OFFICE_FLAG,  # 12. off: SP=SPEEDY, AS=AS400
+            tag=order_info
         )
+        result = self._wait_order_ack(code, reply)
         
         if result:
             self.daily_order_count += qty
@@ -371,10 +405,7 @@ class FuturesTrader:
                 'qty': qty,
                 'price': price
             })
-            print(f"\n✓ 下單請求已送出")
-        else:
-            # 下單失敗，清除暫存
-            self.last_order_info = None
+            log.info("\n✓ 下單請求已送出")
         
         return result
     
@@ -393,15 +424,15 @@ class FuturesTrader:
             bool: 平倉成功與否
         """
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return False
         
         # 正式環境警告
         if hasattr(config, 'SHOW_PRODUCTION_WARNING') and config.SHOW_PRODUCTION_WARNING:
-            print("\n" + "="*60)
-            print("⚠️⚠️⚠️  正式環境警告  ⚠️⚠️⚠️")
-            print("此為正式環境，平倉會實際成交並產生費用！")
-            print("="*60)
+            log.info("\n" + "="*60)
+            log.warning("⚠️⚠️⚠️  正式環境警告  ⚠️⚠️⚠️")
+            log.info("此為正式環境，平倉會實際成交並產生費用！")
+            log.info("="*60)
         
         # 使用預設值
         if symbol is None:
@@ -413,16 +444,15 @@ class FuturesTrader:
         # ⚠️ 重要：市價單和範圍市價單不允許 ROD，必須使用 IOC 或 FOK
         if price_type in ['M', 'MR'] and tif == 'R':
             tif = 'I'  # 市價單自動改為 IOC
-            if config.DEBUG_MODE:
-                print(f"[提示] {price_type}單不允許 ROD，已自動改為 IOC")
+            log.debug("[提示] %s單不允許 ROD，已自動改為 IOC", price_type)
         
         # 風險檢查
         if qty > config.MAX_ORDER_QTY:
-            print(f"✗ 平倉口數 {qty} 超過單筆最大限制 {config.MAX_ORDER_QTY}")
+            log.error("✗ 平倉口數 %s 超過單筆最大限制 %s", qty, config.MAX_ORDER_QTY)
             return False
         
         if self.daily_order_count + qty > config.MAX_DAILY_QTY:
-            print(f"✗ 今日累計口數將超過限制 {config.MAX_DAILY_QTY}")
+            log.error("✗ 今日累計口數將超過限制 %s", config.MAX_DAILY_QTY)
             return False
         
         # 顯示平倉資訊
@@ -434,27 +464,27 @@ class FuturesTrader:
             'SS': '停損限價'
         }.get(price_type, price_type)
         
-        print(f"\n準備平倉:")
-        print(f"  商品代碼: {symbol}")
-        print(f"  買賣別: {'買進平倉(平空單)' if side == 'B' else '賣出平倉(平多單)'}")
-        print(f"  價格類型: {price_type_text}")
-        print(f"  委託價格: {price if price_type == 'SP' else price_type_text}")
-        print(f"  平倉口數: {qty}")
-        print(f"  有效期限: {'ROD' if tif == 'R' else ('IOC' if tif == 'I' else 'FOK')}")
-        print(f"  倉位類型: C (平倉)")
+        log.info("\n準備平倉:")
+        log.info("  商品代碼: %s", symbol)
+        log.info("  買賣別: %s", '買進平倉(平空單)' if side == 'B' else '賣出平倉(平多單)')
+        log.info("  價格類型: %s", price_type_text)
+        log.info("  委託價格: %s", price if price_type == 'SP' else price_type_text)
+        log.info("  平倉口數: %s", qty)
+        log.info("  有效期限: %s", 'ROD' if tif == 'R' else ('IOC' if tif == 'I' else 'FOK'))
+        log.info("  倉位類型: C (平倉)")
         
         # 檢查是否需要確認
         require_confirm = getattr(config, 'REQUIRE_CONFIRMATION', False)
         if require_confirm:
-            confirm = input("\n確認平倉? (y/n): ")
+            confirm = ask("\n確認平倉? (y/n): ")
             if confirm.lower() != 'y':
-                print("✗ 已取消平倉")
+                log.error("✗ 已取消平倉")
                 return False
         else:
-            print("\n>> 自動送出平倉...")
+            log.info("\n>> 自動送出平倉...")
         
-        # 暫存下單資訊（等待 PT02002 回應時建立映射）
-        self.last_order_info = {
+        # 下單資訊隨 RequestId 送出（PT02002 回應時建立映射）
+        order_info = {
             'side': side,
             'position_effect': 'C',  # 平倉
             'qty': qty
@@ -462,7 +492,7 @@ class FuturesTrader:
         
         # 執行平倉
         # 根據 TradeStart.py 範例使用位置參數
-        result = self.trader.order(
+        code, reply = self.trader.orderAsync(
             'O',        # 1. type: O=新單
             'F',        # 2. market: F=期貨
             config.BROKER_ID,   # 3. brokerId
@@ -474,8 +504,10 @@ class FuturesTrader:
             tif,        # 9. tif
             qty,        # 10. qty
             'C',        # 11. pf: C=平倉
-            config.DEFAULT_OFFICE_FLAG  # 12. off
+            config.DEFAULT_OFFICE_FLAG,  # 12. off
+            tag=order_info
         )
+        result = self._wait_order_ack(code, reply)
         
         if result:
             self.daily_order_count += qty
@@ -487,13 +519,25 @@ class FuturesTrader:
                 'price': price,
                 'type': '平倉'
             })
-            print(f"\n✓ 平倉請求已送出")
-        else:
-            # 下單失敗，清除暫存
-            self.last_order_info = None
+            log.info("\n✓ 平倉請求已送出")
         
         return result
     
+    def _wait_order_ack(self, code, reply):
+        """
+        等待下單第二回覆（PT02002）
+        
+        Returns:
+            bool: 送出成功且回覆無錯誤；逾時仍視為已送出
+        """
+        if code != 0:
+            return False
+        ack = self.trader.waitReply(reply)
+        if ack is None:
+            log.warning("⚠️ 等待下單回覆逾時，請以委託回報確認")
+            return True
+        return ack.get('ErrorCode') == 0
+    
     def cancel_order(self, webid, cnt, orderno, symbol=None):
         """
         刪單功能
@@ -505,14 +549,14 @@ class FuturesTrader:
             symbol: 商品代碼
         """
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return False
         
         if symbol is None:
             symbol = self.trader.futSymbol(config.DEFAULT_SYMBOL, config.DEFAULT_MONTH)
         
-        print(f"\n準備刪單:")
-        print(f"  委託書號: {orderno}")
+        log.info("\n準備刪單:")
+        log.info("  委託書號: %s", orderno)
         
         trader = getattr(config, 'TRADER', '')
         result = self.trader.order(
@@ -544,86 +588,160 @@ class FuturesTrader:
             dict: 倉位資訊 {'has_position': bool, 'positions': list}
         """
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return {'has_position': False, 'positions': []}
         
-        print("\n查詢部位彙總...")
+        log.info("\n查詢部位彙總...")
         trader = getattr(config, 'TRADER', '')
-        result = self.trader.posSum('I', config.BROKER_ID, config.ACCOUNT, trader)
+        start = perfNow()
+        result, reply = self._send_position_query(trader)
         
         if result == 0:
-            sleep(2)  # 等待回應
+            # 等待 P001616 回應（on_callback 更新 position_data 後才完成）
+            if self.trader.waitReply(reply) is None:
+                log.error("✗ 等待部位回應逾時")
+            else:
+                PERF_POSITION_QUERY.since(start)
             return self.position_data
         else:
-            print(f"✗ 查詢失敗 (錯誤碼: {result})")
+            log.error("✗ 查詢失敗 (錯誤碼: %s)", result)
             if result == -1:
-                print("  可能原因: 非合法帳號/Trader")
+                log.info("  可能原因: 非合法帳號/Trader")
             return {'has_position': False, 'positions': []}
     
+    def _send_position_query(self, trader):
+        """送出 P001616，記下送出時的成交序號（回應時判斷彙總是否可能漏掉之後的成交）"""
+        mark = self.positions.mark()
+        self._position_marks.append(mark)
+        result, reply = self.trader.posSumAsync('I', config.BROKER_ID, config.ACCOUNT, trader)
+        if result != 0:
+            self._position_marks.remove(mark)
+        return result, reply
+    
+    def sync_positions(self, timeout=None):
+        """
+        向主機查詢部位彙總並校正部位簿
+        
+        Returns:
+            bool: 是否在時限內完成校正
+        """
+        trader = getattr(config, 'TRADER', '')
+        start = perfNow()
+        result, reply = self._send_position_query(trader)
+        if result != 0 or self.trader.waitReply(reply, timeout) is None:
+            return False
+        PERF_POSITION_QUERY.since(start)
+        return True
+    
+    def get_positions(self, max_age=None):
+        """
+        由即時部位簿取得部位（不向主機查詢），超過 max_age 秒未校正時先同步校正
+        
+        Args:
+            max_age: 容許的部位簿資料秒數，None 表示使用 POSITION_MAX_AGE
+        
+        Returns:
+            dict: {'has_position': bool, 'positions': [{'symbol', 'side', 'qty', 'avg_price'}, ...]}
+        """
+        if self.is_logged_in and self.positions.is_stale(max_age):
+            if not self.sync_positions():
+                log.warning("⚠️ 部位校正逾時，使用部位簿現有資料")
+        return self.positions.snapshot()
+    
+    def start_position_sync(self, interval):
+        """啟動背景部位校正（每 interval 秒查詢一次 P001616）"""
+        if self._sync_thread is not None:
+            return
+        self._sync_stop.clear()
+        self._sync_thread = threading.Thread(target=self._position_sync_loop, args=(interval,),
+                                             name="position-sync", daemon=True)
+        self._sync_thread.start()
+    
+    def stop_position_sync(self):
+        """停止背景部位校正"""
+        thread = self._sync_thread
+        if thread is None:
+            return
+        self._sync_stop.set()
+        thread.join(timeout=5)
+        self._sync_thread = None
+    
+    def _position_sync_loop(self, interval):
+        while not self._sync_stop.wait(interval):
+            if not self.is_logged_in:
+                continue
+            try:
+                self.sync_positions()
+            except Exception as e:
+                log.warning("⚠️ 背景部位校正失敗: %s", e)
+    
     def query_position_detail(self):
         """查詢部位明細"""
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return
         
-        print("\n查詢部位明細...")
+        log.info("\n查詢部位明細...")
         trader = getattr(config, 'TRADER', '')
-        result = self.trader.posDetail('I', config.BROKER_ID, config.ACCOUNT, trader)
+        result, reply = self.trader.posDetailAsync('I', config.BROKER_ID, config.ACCOUNT, trader)
         if result == 0:
-            sleep(1)
+            if self.trader.waitReply(reply) is None:
+                log.error("✗ 等待部位明細回應逾時")
         else:
-            print(f"✗ 查詢失敗 (錯誤碼: {result})")
+            log.error("✗ 查詢失敗 (錯誤碼: %s)", result)
             if result == -1:
-                print("  可能原因: 非合法帳號/Trader")
+                log.info("  可能原因: 非合法帳號/Trader")
     
     def query_margin(self):
         """查詢權益數"""
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return
         
-        print("\n查詢權益數...")
+        log.info("\n查詢權益數...")
         trader = getattr(config, 'TRADER', '')
-        result = self.trader.fMargin('I', config.BROKER_ID, config.ACCOUNT, trader)
+        result, reply = self.trader.fMarginAsync('I', config.BROKER_ID, config.ACCOUNT, trader)
         if result == 0:
-            sleep(1)
+            if self.trader.waitReply(reply) is None:
+                log.error("✗ 等待權益數回應逾時")
         else:
-            print(f"✗ 查詢失敗 (錯誤碼: {result})")
+            log.error("✗ 查詢失敗 (錯誤碼: %s)", result)
             if result == -1:
-                print("  可能原因: 非合法帳號/Trader")
-                print("  建議:")
-                print("  1. 檢查 money_config.py 中的 BROKER_ID 是否正確")
-                print("  2. 檢查 TRADER 設定（一般帳號應為空字串 ''）")
-                print("  3. 執行 check_account.py 確認帳號資訊")
+                log.info("  可能原因: 非合法帳號/Trader")
+                log.info("  建議:")
+                log.info("  1. 檢查 money_config.py 中的 BROKER_ID 是否正確")
+                log.info("  2. 檢查 TRADER 設定（一般帳號應為空字串 ''）")
+                log.info("  3. 執行 check_account.py 確認帳號資訊")
             else:
-                print(f"  請參考 TradeCom 說明文件，錯誤碼: {result}")
+                log.info("  請參考 TradeCom 說明文件，錯誤碼: %s", result)
     
     def query_cover(self):
         """查詢平倉資訊"""
         if not self.is_logged_in:
-            print("✗ 請先登入")
+            log.error("✗ 請先登入")
             return
         
-        print("\n查詢平倉資訊...")
+        log.info("\n查詢平倉資訊...")
         trader = getattr(config, 'TRADER', '')
-        result = self.trader.cover('I', config.BROKER_ID, config.ACCOUNT, trader)
+        result, reply = self.trader.coverAsync('I', config.BROKER_ID, config.ACCOUNT, trader)
         if result == 0:
-            sleep(1)
+            if self.trader.waitReply(reply) is None:
+                log.error("✗ 等待平倉回應逾時")
         else:
-            print(f"✗ 查詢失敗 (錯誤碼: {result})")
+            log.error("✗ 查詢失敗 (錯誤碼: %s)", result)
             if result == -1:
-                print("  可能原因: 非合法帳號/Trader")
+                log.info("  可能原因: 非合法帳號/Trader")
     
     def query_product_list(self):
         """查詢所有商品列表"""
-        print("\n查詢商品列表...")
+        log.info("\n查詢商品列表...")
         try:
             # 取得所有商品列表
             products = self.trader.pbList()
             
             if products and len(products) > 0:
-                print(f"\n共有 {len(products)} 個商品類別")
-                print("=" * 80)
+                log.info("\n共有 %s 個商品類別", len(products))
+                log.info("=" * 80)
                 
                 # 將商品分類顯示
                 futures = []  # 期貨
@@ -642,250 +760,247 @@ class FuturesTrader:
                 
                 # 顯示期貨商品
                 if futures:
-                    print("\n【期貨商品】")
-                    print("-" * 80)
+                    log.info("\n【期貨商品】")
+                    log.info("-" * 80)
                     for i in range(min(20, len(futures))):
-                        print(f"{i+1:2d}. {futures[i]}")
+                        log.info("%2d. %s", i+1, futures[i])
                     if len(futures) > 20:
-                        print(f"... 還有 {len(futures) - 20} 個期貨商品")
+                        log.info("... 還有 %s 個期貨商品", len(futures) - 20)
                 
                 # 顯示選擇權商品
                 if options:
-                    print("\n【選擇權商品】")
-                    print("-" * 80)
+                    log.info("\n【選擇權商品】")
+                    log.info("-" * 80)
                     for i in range(min(10, len(options))):
-                        print(f"{i+1:2d}. {options[i]}")
+                        log.info("%2d. %s", i+1, options[i])
                     if len(options) > 10:
-                        print(f"... 還有 {len(options) - 10} 個選擇權商品")
+                        log.info("... 還有 %s 個選擇權商品", len(options) - 10)
                 
                 # 顯示其他商品
                 if others:
-                    print("\n【其他商品】")
-                    print("-" * 80)
+                    log.info("\n【其他商品】")
+                    log.info("-" * 80)
                     for i in range(min(10, len(others))):
-                        print(f"{i+1:2d}. {others[i]}")
+                        log.info("%2d. %s", i+1, others[i])
                     if len(others) > 10:
-                        print(f"... 還有 {len(others) - 10} 個其他商品")
+                        log.info("... 還有 %s 個其他商品", len(others) - 10)
                 
-                print("=" * 80)
+                log.info("=" * 80)
             else:
-                print("✗ 無法取得商品列表")
+                log.error("✗ 無法取得商品列表")
         except Exception as e:
-            print(f"✗ 查詢失敗: {e}")
+            log.error("✗ 查詢失敗: %s", e)
     
     def query_product_detail(self, symbol=None):
         """查詢特定商品詳細資訊"""
         if symbol is None:
-            symbol = input("請輸入商品代碼 (如 TXF, MTX, TMF, TXO): ").strip().upper()
+            symbol = ask("請輸入商品代碼 (如 TXF, MTX, TMF, TXO): ").strip().upper()
         
         if not symbol:
-            print("✗ 商品代碼不能為空")
+            log.error("✗ 商品代碼不能為空")
             return
         
-        print(f"\n查詢商品 {symbol} 的詳細資訊...")
+        log.info("\n查詢商品 %s 的詳細資訊...", symbol)
         try:
             # 先查詢商品基本資料
             base_info = self.trader.getProductBase(symbol)
             if base_info:
-                print("\n" + "=" * 80)
-                print(f"【{symbol} 商品基本資料】")
-                print("=" * 80)
-                print(f"商品代碼: {base_info.ComId}")
-                print(f"商品名稱: {base_info.ComCName}")
-                print(f"商品類型: {base_info.ComType}")
-                print(f"價格小數位數: {base_info.PriceDecimal}")
-                print(f"履約價小數位數: {base_info.StkPriceDecimal}")
-                print(f"契約類型: {base_info.ContractType}")
-                print(f"契約價值: {base_info.ContractValue}")
-                print(f"稅率: {base_info.TaxRate}")
-                print(f"最小跳動點: {base_info.Tick}")
-                print("=" * 80)
+                log.info("\n" + "=" * 80)
+                log.info("【%s 商品基本資料】", symbol)
+                log.info("=" * 80)
+                log.info("商品代碼: %s", base_info.ComId)
+                log.info("商品名稱: %s", base_info.ComCName)
+                log.info("商品類型: %s", base_info.ComType)
+                log.info("價格小數位數: %s", base_info.PriceDecimal)
+                log.info("履約價小數位數: %s", base_info.StkPriceDecimal)
+                log.info("契約類型: %s", base_info.ContractType)
+                log.info("契約價值: %s", base_info.ContractValue)
+                log.info("稅率: %s", base_info.TaxRate)
+                log.info("最小跳動點: %s", base_info.Tick)
+                log.info("=" * 80)
             
             # 再查詢商品詳細列表
             detail_list = self.trader.pbListDtl(symbol)
             if detail_list and len(detail_list) > 0:
-                print(f"\n【{symbol} 可交易合約列表】（顯示前 20 個）")
-                print("=" * 80)
-                print(f"{'序號':<4} {'商品代碼':<20} {'到期日':<12} {'漲停價':<10} {'跌停價':<10}")
-                print("-" * 80)
+                log.info("\n【%s 可交易合約列表】（顯示前 20 個）", symbol)
+                log.info("=" * 80)
+                log.info("序號   商品代碼                 到期日          漲停價        跌停價")
+                log.info("-" * 80)
                 
                 max_items = min(20, len(detail_list))
                 for i in range(max_items):
                     detail = detail_list[i]
-                    print(f"{i+1:<4} {detail.ComId:<20} {detail.EndDate:<12} "
-                          f"{float(detail.RisePrice.ToString()):<10.2f} "
-                          f"{float(detail.FallPrice.ToString()):<10.2f}")
+                    log.info("%-4s %-20s %-12s %-10.2f %-10.2f", i+1, detail.ComId, detail.EndDate,
+                             float(detail.RisePrice.ToString()), float(detail.FallPrice.ToString()))
                 
                 if len(detail_list) > 20:
-                    print(f"\n... 還有 {len(detail_list) - 20} 個合約")
-                print("=" * 80)
+                    log.info("\n... 還有 %s 個合約", len(detail_list) - 20)
+                log.info("=" * 80)
             else:
-                print(f"✗ 無法取得 {symbol} 的詳細資料")
+                log.error("✗ 無法取得 %s 的詳細資料", symbol)
                 
         except Exception as e:
-            print(f"✗ 查詢失敗: {e}")
-            if config.DEBUG_MODE:
-                import traceback
-                traceback.print_exc()
+            if log.is_enabled(DEBUG):
+                log.exception("✗ 查詢失敗: %s", e)
+            else:
+                log.error("✗ 查詢失敗: %s", e)
     
     def query_all_categories(self):
         """查詢所有商品類別"""
-        print("\n查詢所有商品類別...")
+        log.info("\n查詢所有商品類別...")
         try:
             categories = self.trader.proListAll()
             if categories and len(categories) > 0:
-                print("\n" + "=" * 80)
-                print("【所有商品類別】")
-                print("=" * 80)
+                log.info("\n" + "=" * 80)
+                log.info("【所有商品類別】")
+                log.info("=" * 80)
                 for i, cat in enumerate(categories, 1):
-                    print(f"{i:2d}. {cat}")
-                print("=" * 80)
-                print(f"共 {len(categories)} 個類別")
+                    log.info("%2d. %s", i, cat)
+                log.info("=" * 80)
+                log.info("共 %s 個類別", len(categories))
             else:
-                print("✗ 無法取得商品類別")
+                log.error("✗ 無法取得商品類別")
         except Exception as e:
-            print(f"✗ 查詢失敗: {e}")
+            log.error("✗ 查詢失敗: %s", e)
     
     def search_product(self):
         """搜尋商品（互動式）"""
-        print("\n" + "=" * 60)
-        print("商品搜尋")
-        print("=" * 60)
-        print("常見商品代碼：")
-        print("  TXF  - 台指期貨")
-        print("  MTX  - 小型台指期貨") 
-        print("  TMF  - 微型台指期貨")
-        print("  TXO  - 台指選擇權")
-        print("  EXF  - 電子期貨")
-        print("  FXF  - 金融期貨")
-        print("=" * 60)
-        
-        keyword = input("請輸入商品代碼或關鍵字: ").strip().upper()
+        log.info("\n" + "=" * 60)
+        log.info("商品搜尋")
+        log.info("=" * 60)
+        log.info("常見商品代碼：")
+        log.info("  TXF  - 台指期貨")
+        log.info("  MTX  - 小型台指期貨") 
+        log.info("  TMF  - 微型台指期貨")
+        log.info("  TXO  - 台指選擇權")
+        log.info("  EXF  - 電子期貨")
+        log.info("  FXF  - 金融期貨")
+        log.info("=" * 60)
+        
+        keyword = ask("請輸入商品代碼或關鍵字: ").strip().upper()
         if not keyword:
-            print("✗ 搜尋關鍵字不能為空")
+            log.error("✗ 搜尋關鍵字不能為空")
             return
         
         self.query_product_detail(keyword)
     
     def show_product_menu(self):
         """顯示商品查詢子選單"""
-        print("\n" + "=" * 60)
-        print("商品查詢選單")
-        print("=" * 60)
-        print("1. 查詢所有商品列表")
-        print("2. 查詢特定商品詳情")
-        print("3. 查詢所有商品類別")
-        print("4. 搜尋商品")
-        print("0. 返回主選單")
-        print("=" * 60)
+        log.info("\n" + "=" * 60)
+        log.info("商品查詢選單")
+        log.info("=" * 60)
+        log.info("1. 查詢所有商品列表")
+        log.info("2. 查詢特定商品詳情")
+        log.info("3. 查詢所有商品類別")
+        log.info("4. 搜尋商品")
+        log.info("0. 返回主選單")
+        log.info("=" * 60)
     
     def show_menu(self):
         """顯示主選單"""
-        print("\n" + "=" * 60)
-        print("期貨交易系統選單")
-        print("=" * 60)
-        print("1. 買進期貨 (市價)")
-        print("2. 買進期貨 (限價)")
-        print("3. 賣出期貨 (市價)")
-        print("4. 賣出期貨 (限價)")
-        print("5. 平倉 (市價)")
-        print("6. 平倉 (限價)")
-        print("7. 查詢部位彙總")
-        print("8. 查詢部位明細")
-        print("9. 查詢權益數")
-        print("A. 查詢平倉資訊")
-        print("H. 顯示今日下單紀錄")
-        print("P. 商品查詢 (Product Query)")
-        print("0. 登出並結束")
-        print("=" * 60)
+        log.info("\n" + "=" * 60)
+        log.info("期貨交易系統選單")
+        log.info("=" * 60)
+        log.info("1. 買進期貨 (市價)")
+        log.info("2. 買進期貨 (限價)")
+        log.info("3. 賣出期貨 (市價)")
+        log.info("4. 賣出期貨 (限價)")
+        log.info("5. 平倉 (市價)")
+        log.info("6. 平倉 (限價)")
+        log.info("7. 查詢部位彙總")
+        log.info("8. 查詢部位明細")
+        log.info("9. 查詢權益數")
+        log.info("A. 查詢平倉資訊")
+        log.info("H. 顯示今日下單紀錄")
+        log.info("P. 商品查詢 (Product Query)")
+        log.info("0. 登出並結束")
+        log.info("=" * 60)
     
     def show_order_history(self):
         """顯示今日下單紀錄"""
-        print("\n" + "=" * 60)
-        print("今日下單紀錄")
-        print("=" * 60)
+        log.info("\n" + "=" * 60)
+        log.info("今日下單紀錄")
+        log.info("=" * 60)
         if not self.order_history:
-            print("今日尚無下單紀錄")
+            log.info("今日尚無下單紀錄")
         else:
             for i, order in enumerate(self.order_history, 1):
                 order_type = order.get('type', '')
                 side_text = '買進' if order['side'] == 'B' else '賣出'
                 if order_type == '平倉':
                     side_text += f"({order_type})"
-                print(f"{i}. {order['time'].strftime('%H:%M:%S')} | "
-                      f"{order['symbol']} | "
-                      f"{side_text} | "
-                      f"{order['qty']}口 @ {order['price']}")
-        print(f"\n今日累計下單口數: {self.daily_order_count}")
-        print("=" * 60)
+                log.info("%s. %s | %s | %s | %s口 @ %s", i, order['time'].strftime('%H:%M:%S'),
+                         order['symbol'], side_text, order['qty'], order['price'])
+        log.info("\n今日累計下單口數: %s", self.daily_order_count)
+        log.info("=" * 60)
     
     def run(self):
         """運行主程式"""
         try:
             # 顯示正式環境警告（但不需要確認）
             if hasattr(config, 'SHOW_PRODUCTION_WARNING') and config.SHOW_PRODUCTION_WARNING:
-                print("\n" + "="*60)
-                print("⚠️  正式交易環境")
-                print("所有下單操作都會實際成交並產生交易費用！")
-                print("="*60)
+                log.info("\n" + "="*60)
+                log.warning("⚠️  正式交易環境")
+                log.info("所有下單操作都會實際成交並產生交易費用！")
+                log.info("="*60)
             
             # 登入
             self.login()
             
             if not self.is_logged_in:
-                print("登入失敗，程式結束")
+                log.error("登入失敗，程式結束")
                 return
             
             # 主迴圈
             while True:
                 self.show_menu()
-                choice = input("\n請選擇功能 (0-9, A, H, P): ").strip().upper()
+                choice = ask("\n請選擇功能 (0-9, A, H, P): ").strip().upper()
                 
                 if choice == '1':
                     # 買進期貨 (市價)
-                    qty = int(input("請輸入口數: "))
+                    qty = int(ask("請輸入口數: "))
                     self.place_order(side='B', price_type='M', qty=qty)
                 
                 elif choice == '2':
                     # 買進期貨 (限價)
-                    qty = int(input("請輸入口數: "))
-                    price = float(input("請輸入價格: "))
+                    qty = int(ask("請輸入口數: "))
+                    price = float(ask("請輸入價格: "))
                     self.place_order(side='B', price_type='SP', price=price, qty=qty)
                 
                 elif choice == '3':
                     # 賣出期貨 (市價)
-                    qty = int(input("請輸入口數: "))
+                    qty = int(ask("請輸入口數: "))
                     self.place_order(side='S', price_type='M', qty=qty)
                 
                 elif choice == '4':
                     # 賣出期貨 (限價)
-                    qty = int(input("請輸入口數: "))
-                    price = float(input("請輸入價格: "))
+                    qty = int(ask("請輸入口數: "))
+                    price = float(ask("請輸入價格: "))
                     self.place_order(side='S', price_type='SP', price=price, qty=qty)
                 
                 elif choice == '5':
                     # 平倉 (市價)
-                    print("\n選擇平倉方向:")
-                    print("B. 買進平倉 (平空單)")
-                    print("S. 賣出平倉 (平多單)")
-                    side = input("請選擇 (B/S): ").strip().upper()
+                    log.info("\n選擇平倉方向:")
+                    log.info("B. 買進平倉 (平空單)")
+                    log.info("S. 賣出平倉 (平多單)")
+                    side = ask("請選擇 (B/S): ").strip().upper()
                     if side not in ['B', 'S']:
-                        print("✗ 無效的選項")
+                        log.error("✗ 無效的選項")
                         continue
-                    qty = int(input("請輸入平倉口數: "))
+                    qty = int(ask("請輸入平倉口數: "))
                     self.close_position(side=side, price_type='M', qty=qty)
                 
                 elif choice == '6':
                     # 平倉 (限價)
-                    print("\n選擇平倉方向:")
-                    print("B. 買進平倉 (平空單)")
-                    print("S. 賣出平倉 (平多單)")
-                    side = input("請選擇 (B/S): ").strip().upper()
+                    log.info("\n選擇平倉方向:")
+                    log.info("B. 買進平倉 (平空單)")
+                    log.info("S. 賣出平倉 (平多單)")
+                    side = ask("請選擇 (B/S): ").strip().upper()
                     if side not in ['B', 'S']:
-                        print("✗ 無效的選項")
+                        log.error("✗ 無效的選項")
                         continue
-                    qty = int(input("請輸入平倉口數: "))
-                    price = float(input("請輸入價格: "))
+                    qty = int(ask("請輸入平倉口數: "))
+                    price = float(ask("請輸入價格: "))
                     self.close_position(side=side, price_type='SP', price=price, qty=qty)
                 
                 elif choice == '7':
@@ -912,7 +1027,7 @@ class FuturesTrader:
                     # 商品查詢子選單
                     while True:
                         self.show_product_menu()
-                        prod_choice = input("\n請選擇功能 (0-4): ").strip()
+                        prod_choice = ask("\n請選擇功能 (0-4): ").strip()
                         
                         if prod_choice == '1':
                             # 查詢所有商品列表
@@ -930,7 +1045,7 @@ class FuturesTrader:
                             # 返回主選單
                             break
                         else:
-                            print("✗ 無效的選項，請重新選擇")
+                            log.error("✗ 無效的選項，請重新選擇")
                         
                         sleep(1)
                 
@@ -939,28 +1054,26 @@ class FuturesTrader:
                     break
                 
                 else:
-                    print("✗ 無效的選項，請重新選擇")
+                    log.error("✗ 無效的選項，請重新選擇")
                 
                 sleep(1)
         
         except KeyboardInterrupt:
-            print("\n\n收到中斷信號...")
+            log.info("\n\n收到中斷信號...")
         
         except Exception as e:
-            print(f"\n發生錯誤: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception("\n發生錯誤: %s", e)
         
         finally:
             # 清理資源
             if self.is_logged_in:
                 self.logout()
-            print("\n程式結束")
+            log.info("\n程式結束")
 
 
 def main():
     """主程式入口"""
-    print("""
+    log.info("""
     ╔════════════════════════════════════════════════════════════╗
     ║                                                            ║
     ║                   期貨交易系統 v1.0                        ║
@@ -107,6 +107,19 @@ AUTO_CHECK_MARGIN = True
 # 是否啟用自動查詢部位
 AUTO_CHECK_POSITION = True
 
+# 即時部位簿：成交回報即時更新，背景每 POSITION_SYNC_INTERVAL 秒以部位彙總校正（0 = 不啟用）
+POSITION_SYNC_INTERVAL = 10
+
+# 部位簿超過此秒數未校正時，讀取部位前先向主機同步查詢
+POSITION_MAX_AGE = 30
+
+# 目標部位下單後，等待成交回報使部位到達目標的秒數
+ORDER_FILL_TIMEOUT = 3
+
+# 回呼佇列容量：> 0 時 API 事件執行緒只把回報排入佇列，由背景執行緒處理（佇列滿時等待，不丟棄回報）
+# 0 = 在事件執行緒直接處理（舊模式）
+CALLBACK_QUEUE_SIZE = 0
+
 # ============================================================
 # 通知設定
 # ============================================================
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+order_pipeline.py - 單一寫入者的委託佇列
+webhook 端點只把訊號放入佇列並立即回傳 request_id，由一條專屬工作執行緒依序執行
+（持有 TradeExecutor 的唯一執行緒），同時間只會有一筆訊號在下單，
+執行結果以 status(request_id) 查詢。
+
+警報風暴處理：
+    冪等鍵    同一個 key 在 ttl 秒內重複送入時不再排隊，回傳第一次的 request_id；
+              consecutive=True 時只與該商品最後一筆訊號比對（內容雜湊當作 key 時使用，
+              多 → 空 → 多 的第二個「多」不會被當成重複）
+    合併視窗  工作執行緒取到訊號後等待 coalesce 秒，再一次取出佇列中所有訊號；
+              每個商品只執行最後一筆（最後的目標部位），其餘標記為 coalesced
+"""
+
+import os
+import queue
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from time import monotonic, sleep
+
+# ../kgilog
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from kgilog import get_logger
+
+log = get_logger('pipeline')
+
+
+class PipelineFull(Exception):
+    """佇列已滿"""
+
+
+def target_of(action, qty=1):
+    """
+    訊號對應的目標部位（多單為正、空單為負）
+
+    Returns:
+        int: buy/long -> +qty，sell/short -> -qty，close/exit -> 0；不支援的動作回傳 None
+    """
+    if action in ('buy', 'long'):
+        return int(qty)
+    if action in ('sell', 'short'):
+        return -int(qty)
+    if action in ('close', 'exit'):
+        return 0
+    return None
+
+
+class IdempotencyCache:
+    """冪等鍵快取（超過 ttl 秒自動淘汰）"""
+
+    def __init__(self, ttl=60.0):
+        self.ttl = ttl
+        self.entries = OrderedDict()    # {key: (request_id, 到期的 monotonic 時間)}，依到期時間排序
+
+    def get(self, key):
+        """取得仍有效的 request_id（不存在或已過期回傳 None）"""
+        self.evict()
+        entry = self.entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key, request_id):
+        self.entries[key] = (request_id, monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+
+    def evict(self):
+        """淘汰過期的鍵"""
+        now = monotonic()
+        entries = self.entries
+        while entries:
+            key, (_, expires) = next(iter(entries.items()))
+            if expires > now:
+                break
+            entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class OrderPipeline:
+    """委託佇列與工作執行緒"""
+
+    def __init__(self, handler, prepare=None, max_queue=1000, keep=10000, coalesce=0.0, idempotency_ttl=60.0):
+        """
+        初始化委託佇列
+
+        Args:
+            handler: 執行訊號的函數 handler(action, price, qty) -> dict（含 'success'）
+            prepare: 每筆訊號執行前呼叫的函數，回傳 False 表示交易執行器未就緒（例如 init_trader）
+            max_queue: 佇列上限，超過時 submit 丟出 PipelineFull
+            keep: 保留的執行紀錄筆數（供 /status 查詢）
+            coalesce: 合併視窗（秒），0 表示逐筆執行
+            idempotency_ttl: 冪等鍵保留秒數
+        """
+        self.handler = handler
+        self.prepare = prepare
+        self.queue = queue.Queue(max_queue)
+        self.keep = keep
+        self.coalesce = coalesce
+        self.jobs = OrderedDict()   # {request_id: 執行紀錄}
+        self.keys = IdempotencyCache(idempotency_ttl)
+        self.latest = {}            # {商品代碼: 最後一筆訊號的 request_id}
+        self.lock = threading.Lock()
+        self.thread = None
+        self.processed = 0
+        self.coalesced = 0
+        self.duplicates = 0
+
+    def start(self):
+        """啟動工作執行緒"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="order-pipeline", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """處理完已排入的訊號後停止"""
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout)
+            self.thread = None
+
+    def submit(self, action, price=None, qty=1, source='', symbol='', key=None, consecutive=False):
+        """
+        排入一筆訊號
+
+        Args:
+            action: 交易動作（'buy' / 'sell' / 'close'）
+            price: 參考價格
+            qty: 數量
+            source: 來源端點（紀錄用）
+            symbol: 商品代碼（合併視窗以商品分組）
+            key: 冪等鍵（None 表示不檢查重複）
+            consecutive: True 表示只有與該商品最後一筆訊號的 key 相同才視為重複
+
+        Returns:
+            tuple: (request_id, 是否為重複訊號)
+        """
+        request_id = uuid.uuid4().hex
+        job = {
+            'request_id': request_id,
+            'action': action,
+            'price': price,
+            'qty': qty,
+            'symbol': symbol,
+            'target': target_of(action, qty),
+            'source': source,
+            'status': 'queued',
+            'submitted_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'coalesced_into': None,
+            'result': None,
+            'error': None
+        }
+        with self.lock:
+            if key is not None:
+                previous = self.keys.get(key)
+                if previous is not None and (not consecutive or self.latest.get(symbol) == previous):
+                    self.duplicates += 1
+                    return previous, True
+                self.keys.put(key, request_id)
+            self.latest[symbol] = request_id
+            self.jobs[request_id] = job
+            while len(self.jobs) > self.keep:
+                self.jobs.popitem(last=False)
+        try:
+            self.queue.put_nowait((monotonic(), job))
+        except queue.Full:
+            with self.lock:
+                self.jobs.pop(request_id, None)
+                if key is not None:
+                    self.keys.entries.pop(key, None)
+            raise PipelineFull(f"委託佇列已滿（{self.queue.maxsize} 筆）")
+        return request_id, False
+
+    def status(self, request_id):
+        """查詢執行紀錄（不存在回傳 None）"""
+        with self.lock:
+            job = self.jobs.get(request_id)
+            return dict(job) if job is not None else None
+
+    @property
+    def depth(self):
+        """等待執行的筆數"""
+        return self.queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item[1]]
+            stopping = False
+            if self.coalesce > 0:
+                # 等到第一筆訊號的合併視窗結束，再取出期間排入的所有訊號
+                wait = item[0] + self.coalesce - monotonic()
+                if wait > 0:
+                    sleep(wait)
+                while True:
+                    try:
+                        item = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item[1])
+            for job in self._collapse(batch):
+                self._execute(job)
+                self.processed += 1
+            if stopping:
+                return
+
+    def _collapse(self, batch):
+        """每個商品只保留最後一筆訊號，其餘標記為 coalesced（回傳保留的訊號，依排入順序）"""
+        if len(batch) == 1:
+            return batch
+        latest = {}
+        for job in batch:
+            latest[job['symbol']] = job
+        keep = [job for job in batch if latest[job['symbol']] is job]
+        now = datetime.now().isoformat()
+        with self.lock:
+            for job in batch:
+                winner = latest[job['symbol']]
+                if winner is not job:
+                    job['status'] = 'coalesced'
+                    job['coalesced_into'] = winner['request_id']
+                    job['finished_at'] = now
+                    self.coalesced += 1
+        return keep
+
+    def _execute(self, job):
+        with self.lock:
+            job['status'] = 'running'
+            job['started_at'] = datetime.now().isoformat()
+        result, error = None, None
+        try:
+            if self.prepare is not None and not self.prepare():
+                error = '交易執行器未就緒'
+            else:
+                result = self.handler(job['action'], job['price'], job['qty'])
+                if not result.get('success'):
+                    error = result.get('error') or result.get('message') or '執行失敗'
+        except Exception as e:
+            log.exception("✗ 委託佇列執行訊號時發生錯誤: %s", e)
+            error = str(e)
+        with self.lock:
+            job['status'] = 'failed' if error else 'done'
+            job['result'] = result
+            job['error'] = error
+            job['finished_at'] = datetime.now().isoformat()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+position_book.py - 即時部位簿
+成交回報（PT02011）到達時即時累加部位，並定期以部位彙總（P001616）校正，
+讀取部位不需要向主機查詢。部位以商品代碼（ComID，例如 TMF）為鍵，與 P001616 相同；
+成交回報的完整代碼（例如 TMFB6）去掉月份碼後對應。
+"""
+
+import threading
+from time import monotonic
+
+
+def product_id(symbol):
+    """完整期貨代碼轉商品代碼（TMFB6 -> TMF），已是商品代碼時原樣回傳"""
+    symbol = str(symbol).strip()
+    if len(symbol) >= 5 and symbol[-1].isdigit() and symbol[-2].isalpha():
+        return symbol[:-2]
+    return symbol
+
+
+def to_float(value):
+    """API 的 Decimal（或數字 / 字串）轉 float"""
+    if hasattr(value, 'ToString'):
+        return float(value.ToString())
+    return float(value)
+
+
+class PositionBook:
+    """即時部位簿（成交回報累加、部位彙總校正）"""
+
+    def __init__(self, max_age=30.0):
+        """
+        初始化部位簿
+
+        Args:
+            max_age: 距離上次校正超過此秒數視為過期（None 表示不過期）
+        """
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)  # 部位變動時通知 wait_for
+        self.positions = {}     # {商品代碼: [淨口數, 均價]}
+        self.synced_at = None   # 上次校正的 monotonic 時間
+        self.fills = 0          # 上次校正後累加的成交筆數
+        self.seq = 0            # 累加過的成交總筆數（校正不歸零，見 mark）
+        self.drifts = 0         # 校正時發現與成交累加不一致的次數
+        self.deferred = 0       # 查詢期間有成交而略過的校正次數
+
+    def apply_fill(self, symbol, side, qty, price):
+        """
+        以成交回報更新部位
+
+        Args:
+            symbol: 商品代碼（完整代碼或 ComID）
+            side: 'B' 或 'S'
+            qty: 成交口數
+            price: 成交價
+        """
+        qty = int(qty)
+        if qty <= 0:
+            return
+        price = to_float(price)
+        signed = qty if side == 'B' else -qty
+        key = product_id(symbol)
+        with self.lock:
+            net, avg = self.positions.get(key, (0, 0.0))
+            total = net + signed
+            if net == 0 or (net > 0) == (signed > 0):
+                avg = (avg * abs(net) + price * qty) / abs(total)
+            elif total != 0 and (total > 0) != (net > 0):
+                avg = price  # 反手：剩餘部位以成交價起算
+            if total:
+                self.positions[key] = [total, avg]
+            else:
+                self.positions.pop(key, None)
+            self.fills += 1
+            self.seq += 1
+            self.changed.notify_all()
+
+    def mark(self):
+        """送出部位查詢時呼叫，回傳目前的成交序號（回應時傳給 reconcile 的 since）"""
+        with self.lock:
+            return self.seq
+
+    def reconcile(self, rows, since=None):
+        """
+        以部位彙總校正（取代目前部位）
+
+        查詢送出後才到達的成交不一定包含在彙總中，覆蓋會遺失（或重複）這些成交，
+        因此 since 與目前成交序號不同時不校正，維持成交累加的部位，
+        上次校正時間也不更新（部位簿仍視為過期，下次讀取時重新查詢）。
+
+        Args:
+            rows: FuturesTrader.position_data['positions'] 格式的列表
+                  [{'symbol': 'TMF', 'side': 'B'/'S', 'qty': int, 'avg_price': float}, ...]
+            since: 送出查詢時 mark() 的回傳值，None 表示不檢查
+
+        Returns:
+            bool: 校正前的部位是否與彙總一致；略過校正時回傳 None
+        """
+        positions = {}
+        for row in rows:
+            key = product_id(row['symbol'])
+            signed = int(row['qty']) if row['side'] == 'B' else -int(row['qty'])
+            net, avg = positions.get(key, (0, 0.0))
+            total = net + signed
+            if total:
+                positions[key] = [total, (avg * abs(net) + row['avg_price'] * abs(signed)) / (abs(net) + abs(signed))]
+            else:
+                positions.pop(key, None)
+        with self.lock:
+            if since is not None and since != self.seq:
+                self.deferred += 1
+                return None
+            matched = {k: v[0] for k, v in self.positions.items()} == {k: v[0] for k, v in positions.items()}
+            if not matched and self.synced_at is not None:
+                self.drifts += 1
+            self.positions = positions
+            self.synced_at = monotonic()
+            self.fills = 0
+            self.changed.notify_all()
+        return matched
+
+    def age(self):
+        """距離上次校正的秒數（從未校正回傳 None）"""
+        synced_at = self.synced_at
+        return None if synced_at is None else monotonic() - synced_at
+
+    def is_stale(self, max_age=None):
+        """是否需要重新校正"""
+        if max_age is None:
+            max_age = self.max_age
+        age = self.age()
+        return age is None or (max_age is not None and age > max_age)
+
+    def get(self, symbol):
+        """
+        取得單一商品部位
+
+        Returns:
+            tuple: (淨口數, 均價)，多單為正、空單為負，無部位回傳 (0, 0.0)
+        """
+        with self.lock:
+            net, avg = self.positions.get(product_id(symbol), (0, 0.0))
+        return net, avg
+
+    def wait_for(self, symbol, net, timeout):
+        """
+        等待單一商品的淨口數變為 net（成交回報或校正時喚醒）
+
+        Returns:
+            bool: 是否在 timeout 秒內達到
+        """
+        key = product_id(symbol)
+        with self.changed:
+            return self.changed.wait_for(lambda: self.positions.get(key, (0, 0.0))[0] == net, timeout)
+
+    def snapshot(self):
+        """
+        目前所有部位（與 FuturesTrader.position_data 相同格式）
+
+        Returns:
+            dict: {'has_position': bool, 'positions': [{'symbol', 'side', 'qty', 'avg_price'}, ...]}
+        """
+        with self.lock:
+            items = list(self.positions.items())
+        positions = [{'symbol': key, 'side': 'B' if net > 0 else 'S', 'qty': abs(net), 'avg_price': avg}
+                     for key, (net, avg) in items]
+        return {'has_position': bool(positions), 'positions': positions}
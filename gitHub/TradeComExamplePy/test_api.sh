@@ -117,6 +117,36 @@ else
     echo "已跳過平倉測試"
 fi
 
+# ============================================================
+# 6. 查詢執行結果（安全，不會下單）
+# ============================================================
+# 下單端點回傳 request_id 後即返回，實際執行結果以 /status/<request_id> 查詢
+echo ""
+read -p "請輸入要查詢的 request_id（直接 Enter 跳過）: " request_id
+
+if [ -n "$request_id" ]; then
+    echo ""
+    echo "【6. 查詢執行結果】（安全測試）"
+    echo "指令："
+    echo "curl $BASE_URL/status/$request_id"
+    echo ""
+    echo "執行結果："
+    curl $BASE_URL/status/$request_id
+    echo -e "\n"
+fi
+
+# ============================================================
+# 7. 監控指標（安全，不會下單）
+# ============================================================
+echo ""
+echo "【7. 監控指標】（安全測試）"
+echo "指令："
+echo "curl $BASE_URL/metrics"
+echo ""
+echo "執行結果："
+curl $BASE_URL/metrics
+echo ""
+
 echo ""
 echo "========================================================================"
 echo "測試完成"
@@ -3,202 +3,402 @@
 """
 trade_logger.py - 日內交易損益統計模組
 負責記錄開倉、平倉，並計算當日累計損益
+
+每筆開倉 / 平倉先寫入當日的 journal（logs/YYYYMMDD.journal，只附加、每筆寫出），再更新記憶體中的狀態；
+程式重啟時重播當日 journal 還原持倉、損益與統計，不會因為重啟而歸零。
+勝敗次數、累計損益與最大回撤在平倉時累加，get_daily_summary 不需要重新掃描交易紀錄。
+journal 與文字日誌（logs/YYYYMMDD.log）各保持一個開啟的檔案，不會每筆紀錄重新開檔。
+日期改變時切換到新的檔案，未平的持倉以 P 紀錄帶入新的 journal（統計要等 reset_daily 才歸零，
+但重啟後只重播當日 journal，統計從當日起算）。
+
+journal 格式（tab 分隔，一行一筆）：
+    時間  O  long/short  價格  口數            開倉（同方向已有持倉時加碼，開倉價加權平均）
+    時間  C  價格  口數                        平倉（損益於重播時重新計算）
+    時間  P  long/short  價格  口數  開倉時間  跨日帶入的持倉
+    時間  R                                    重置當日統計
 """
 
+import gc
 import os
+import sys
+import threading
 from datetime import datetime
 from pathlib import Path
-import json
+
+# ../kgilog
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from kgilog import get_logger
+
+log = get_logger('trade')
+
+POINT_VALUE = 200  # 期貨每點損益（元）
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _number(text):
+    """journal 中的價格 / 口數轉回數字（整數保持 int）"""
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
 
 
 class TradeLogger:
     """日內交易損益記錄器"""
-    
-    def __init__(self, log_dir="logs"):
+
+    def __init__(self, log_dir="logs", fsync=False, clock=datetime.now):
         """
-        初始化交易記錄器
-        
+        初始化交易記錄器（若當日 journal 已存在，重播還原狀態）
+
         Args:
             log_dir: 日誌檔案存放目錄
+            fsync: True = 每筆 journal 紀錄都 fsync（斷電也不遺失，較慢）；預設只寫到作業系統
+            clock: 取得目前時間的函式（測試與重播工具用）
         """
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        
+        self.fsync = fsync
+        self.clock = clock
+        self._lock = threading.RLock()
+
         # 當日累計損益
         self.daily_pnl = 0.0
         self.daily_trades = []
-        
+
+        # 平倉時累加的統計
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+
         # 當前持倉資訊
         self.current_position = None  # {'side': 'long/short', 'price': float, 'qty': int, 'time': str}
-    
-    def _get_log_file(self):
+
+        # 開啟中的檔案（依日期切換）
+        self.day = self.clock().strftime("%Y%m%d")
+        self._journal = None
+        self._log = None
+
+        self.replayed = self._replay()
+        if self.replayed:
+            log.info("✓ 已重播 %s 筆 journal 紀錄 | 當日損益: %s 元 | 交易次數: %s 次 | 持倉: %s",
+                     f"{self.replayed:,}", f"{self.daily_pnl:+,.0f}", len(self.daily_trades), self._position_text(),
+                     event='replay', entries=self.replayed, pnl=self.daily_pnl)
+
+    def _get_log_file(self, day=None):
         """取得當日日誌檔案路徑"""
-        date_str = datetime.now().strftime("%Y%m%d")
-        return self.log_dir / f"{date_str}.log"
-    
-    def _write_log(self, message):
+        return self.log_dir / f"{day or self.day}.log"
+
+    def _get_journal_file(self, day=None):
+        """取得當日 journal 檔案路徑"""
+        return self.log_dir / f"{day or self.day}.journal"
+
+    def _open_files(self):
+        if self._journal is None:
+            self._journal = open(self._get_journal_file(), 'a', encoding='utf-8', buffering=64 * 1024)
+            self._log = open(self._get_log_file(), 'a', encoding='utf-8', buffering=64 * 1024)
+
+    def _check_day(self, now):
+        """日期改變時切換到新的 journal / 日誌檔，並把未平的持倉帶入新的 journal"""
+        day = now.strftime("%Y%m%d")
+        if day == self.day:
+            return
+        self.close()
+        self.day = day
+        position = self.current_position
+        if position:
+            self._append(now.strftime(TIME_FORMAT), 'P', position['side'], position['price'],
+                         position['qty'], position['time'])
+
+    def _append(self, timestamp, *fields):
+        """寫入一筆 journal 紀錄（在更新記憶體狀態之前）"""
+        self._open_files()
+        self._journal.write('\t'.join((timestamp,) + tuple(map(str, fields))) + '\n')
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+
+    def _write_log(self, message, timestamp=None):
         """寫入日誌"""
-        log_file = self._get_log_file()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] {message}\n")
-    
-    def open_long(self, price, qty=1):
-        """
-        記錄做多開倉
-        
-        Args:
-            price: 開倉價格
-            qty: 交易數量
-        """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        self.current_position = {
-            'side': 'long',
-            'price': price,
-            'qty': qty,
-            'time': timestamp
-        }
-        
-        message = f"📈 做多開倉 | 價格: {price} | 數量: {qty}口"
-        self._write_log(message)
-        print(f"\n{message}")
-    
-    def open_short(self, price, qty=1):
+        if timestamp is None:
+            now = self.clock()
+            self._check_day(now)
+            timestamp = now.strftime(TIME_FORMAT)
+        self._open_files()
+        self._log.write(f"[{timestamp}] {message}\n")
+        self._log.flush()
+
+    def _replay(self):
         """
-        記錄做空開倉
-        
-        Args:
-            price: 開倉價格
-            qty: 交易數量
+        重播當日 journal 還原狀態
+
+        Returns:
+            int: 重播的紀錄數
         """
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
+        path = self._get_journal_file()
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+
+        # 最後一行沒有換行 = 寫到一半中斷，捨棄並截斷，之後的紀錄從完整的行尾接續
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            log.warning("⚠️ journal 最後一筆紀錄不完整，已捨棄: %s", path)
+            with open(path, 'r+b') as f:
+                f.truncate(end)
+
+        count = 0
+        bad = 0
+        apply_open = self._apply_open
+        apply_close = self._apply_close
+        # 重播會建立大量交易紀錄 dict，暫停循環垃圾回收避免反覆掃描
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for line in data[:end].decode('utf-8').splitlines():
+                fields = line.split('\t')
+                try:
+                    kind = fields[1]
+                    if kind == 'C':
+                        apply_close(_number(fields[2]), int(fields[3]), fields[0])
+                    elif kind == 'O':
+                        apply_open(fields[2], _number(fields[3]), int(fields[4]), fields[0])
+                    elif kind == 'P':
+                        apply_open(fields[2], _number(fields[3]), int(fields[4]), fields[5])
+                    elif kind == 'R':
+                        self._apply_reset()
+                    else:
+                        raise ValueError(kind)
+                    count += 1
+                except (IndexError, ValueError):
+                    bad += 1
+        finally:
+            if enabled:
+                gc.enable()
+        if bad:
+            log.warning("⚠️ journal 有 %s 筆無法解析的紀錄已略過: %s", bad, path)
+        return count
+
+    def _apply_open(self, side, price, qty, timestamp):
+        # 同方向加碼（例如一筆多口委託分多筆成交）：口數累加、開倉價加權平均，開倉時間不變
+        position = self.current_position
+        if position and position['side'] == side:
+            total = position['qty'] + qty
+            position['price'] = (position['price'] * position['qty'] + price * qty) / total
+            position['qty'] = total
+            return
         self.current_position = {
-            'side': 'short',
+            'side': side,
             'price': price,
             'qty': qty,
             'time': timestamp
         }
-        
-        message = f"📉 做空開倉 | 價格: {price} | 數量: {qty}口"
-        self._write_log(message)
-        print(f"\n{message}")
-    
-    def close_position(self, price, qty=None):
-        """
-        記錄平倉並計算損益
-        
-        Args:
-            price: 平倉價格
-            qty: 平倉數量（None表示全平）
-            
-        Returns:
-            dict: {'pnl': float, 'daily_total': float}
-        """
-        if not self.current_position:
-            message = "⚠️ 無持倉可平"
-            self._write_log(message)
-            print(f"\n{message}")
-            return {'pnl': 0.0, 'daily_total': self.daily_pnl}
-        
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 計算平倉數量
+
+    def _apply_close(self, price, qty, timestamp):
+        """平倉並累加統計，回傳交易紀錄（無持倉時回傳 None）"""
+        position = self.current_position
+        if not position:
+            return None
         if qty is None:
-            qty = self.current_position['qty']
-        
+            qty = position['qty']
+
         # 計算損益（期貨每點200元）
-        entry_price = self.current_position['price']
-        if self.current_position['side'] == 'long':
-            pnl = (price - entry_price) * 200 * qty
-            side_text = "做多"
+        entry_price = position['price']
+        if position['side'] == 'long':
+            pnl = (price - entry_price) * POINT_VALUE * qty
         else:  # short
-            pnl = (entry_price - price) * 200 * qty
-            side_text = "做空"
-        
-        # 更新當日累計損益
+            pnl = (entry_price - price) * POINT_VALUE * qty
+
+        # 更新當日累計損益與統計
         self.daily_pnl += pnl
-        
+        if pnl > 0:
+            self.winning_trades += 1
+        elif pnl < 0:
+            self.losing_trades += 1
+        if self.daily_pnl > self.peak_pnl:
+            self.peak_pnl = self.daily_pnl
+        elif self.peak_pnl - self.daily_pnl > self.max_drawdown:
+            self.max_drawdown = self.peak_pnl - self.daily_pnl
+
         # 記錄交易
         trade_record = {
-            'open_time': self.current_position['time'],
+            'open_time': position['time'],
             'close_time': timestamp,
-            'side': self.current_position['side'],
+            'side': position['side'],
             'entry_price': entry_price,
             'exit_price': price,
             'qty': qty,
             'pnl': pnl
         }
         self.daily_trades.append(trade_record)
-        
-        # 寫入日誌
-        message = (f"⏹️ {side_text}平倉 | 開倉: {entry_price} | 平倉: {price} | "
-                  f"數量: {qty}口 | 損益: {pnl:+,.0f} 元 | "
-                  f"當日累計: {self.daily_pnl:+,.0f} 元")
-        self._write_log(message)
-        print(f"\n{message}")
-        
+
         # 如果全部平倉，清除持倉資訊
-        if qty == self.current_position['qty']:
+        if qty >= position['qty']:
             self.current_position = None
         else:
-            self.current_position['qty'] -= qty
-        
+            position['qty'] -= qty
+        return trade_record
+
+    def _apply_reset(self):
+        self.daily_pnl = 0.0
+        self.daily_trades = []
+        self.winning_trades = 0
+        self.losing_trades = 0
+        self.peak_pnl = 0.0
+        self.max_drawdown = 0.0
+        self.current_position = None
+
+    def _position_text(self):
+        position = self.current_position
+        if not position:
+            return "無"
+        return f"{'做多' if position['side'] == 'long' else '做空'} {position['qty']}口 @ {position['price']}"
+
+    def _open(self, side, price, qty):
+        qty = int(qty)
+        with self._lock:
+            now = self.clock()
+            self._check_day(now)
+            timestamp = now.strftime(TIME_FORMAT)
+            self._append(timestamp, 'O', side, price, qty)
+            self._apply_open(side, price, qty, timestamp)
+
+            if side == 'long':
+                message = f"📈 做多開倉 | 價格: {price} | 數量: {qty}口"
+            else:
+                message = f"📉 做空開倉 | 價格: {price} | 數量: {qty}口"
+            self._write_log(message, timestamp)
+        log.info("\n%s", message, event='open', side=side, price=price, qty=qty)
+
+    def open_long(self, price, qty=1):
+        """
+        記錄做多開倉
+
+        Args:
+            price: 開倉價格
+            qty: 交易數量
+        """
+        self._open('long', price, qty)
+
+    def open_short(self, price, qty=1):
+        """
+        記錄做空開倉
+
+        Args:
+            price: 開倉價格
+            qty: 交易數量
+        """
+        self._open('short', price, qty)
+
+    def close_position(self, price, qty=None):
+        """
+        記錄平倉並計算損益
+
+        Args:
+            price: 平倉價格
+            qty: 平倉數量（None表示全平）
+
+        Returns:
+            dict: {'pnl': float, 'daily_total': float}
+        """
+        with self._lock:
+            if not self.current_position:
+                message = "⚠️ 無持倉可平"
+                self._write_log(message)
+                log.warning("\n%s", message)
+                return {'pnl': 0.0, 'daily_total': self.daily_pnl}
+
+            now = self.clock()
+            self._check_day(now)
+            timestamp = now.strftime(TIME_FORMAT)
+            if qty is None:
+                qty = self.current_position['qty']
+            qty = min(int(qty), self.current_position['qty'])
+            self._append(timestamp, 'C', price, qty)
+            trade = self._apply_close(price, qty, timestamp)
+
+            # 寫入日誌
+            side_text = "做多" if trade['side'] == 'long' else "做空"
+            pnl = trade['pnl']
+            message = (f"⏹️ {side_text}平倉 | 開倉: {trade['entry_price']} | 平倉: {price} | "
+                      f"數量: {qty}口 | 損益: {pnl:+,.0f} 元 | "
+                      f"當日累計: {self.daily_pnl:+,.0f} 元")
+            self._write_log(message, timestamp)
+            daily_total = self.daily_pnl
+        log.info("\n%s", message, event='close', side=trade['side'], price=price, qty=qty, pnl=pnl,
+                 daily_pnl=daily_total)
+
         return {
             'pnl': pnl,
-            'daily_total': self.daily_pnl
+            'daily_total': daily_total
         }
-    
+
     def get_daily_summary(self):
         """
-        取得當日交易摘要
-        
+        取得當日交易摘要（由累加的統計直接產生，不掃描交易紀錄）
+
         Returns:
             dict: 當日交易統計
         """
-        total_trades = len(self.daily_trades)
-        winning_trades = sum(1 for t in self.daily_trades if t['pnl'] > 0)
-        losing_trades = sum(1 for t in self.daily_trades if t['pnl'] < 0)
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        
-        summary = {
-            'date': datetime.now().strftime("%Y-%m-%d"),
-            'total_pnl': self.daily_pnl,
-            'total_trades': total_trades,
-            'winning_trades': winning_trades,
-            'losing_trades': losing_trades,
-            'win_rate': win_rate,
-            'current_position': self.current_position
-        }
-        
-        # 寫入摘要
-        message = (f"\n{'='*60}\n"
-                  f"📊 當日交易摘要\n"
-                  f"{'='*60}\n"
-                  f"日期: {summary['date']}\n"
-                  f"總損益: {summary['total_pnl']:+,.0f} 元\n"
-                  f"交易次數: {summary['total_trades']} 次\n"
-                  f"獲利次數: {summary['winning_trades']} 次\n"
-                  f"虧損次數: {summary['losing_trades']} 次\n"
-                  f"勝率: {summary['win_rate']:.1f}%\n"
-                  f"{'='*60}")
-        
-        self._write_log(message)
-        print(message)
-        
+        with self._lock:
+            total_trades = len(self.daily_trades)
+            winning_trades = self.winning_trades
+            win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+
+            summary = {
+                'date': f"{self.day[:4]}-{self.day[4:6]}-{self.day[6:]}",
+                'total_pnl': self.daily_pnl,
+                'total_trades': total_trades,
+                'winning_trades': winning_trades,
+                'losing_trades': self.losing_trades,
+                'win_rate': win_rate,
+                'max_drawdown': self.max_drawdown,
+                'current_position': dict(self.current_position) if self.current_position else None
+            }
+
+            # 寫入摘要
+            message = (f"\n{'='*60}\n"
+                      f"📊 當日交易摘要\n"
+                      f"{'='*60}\n"
+                      f"日期: {summary['date']}\n"
+                      f"總損益: {summary['total_pnl']:+,.0f} 元\n"
+                      f"交易次數: {summary['total_trades']} 次\n"
+                      f"獲利次數: {summary['winning_trades']} 次\n"
+                      f"虧損次數: {summary['losing_trades']} 次\n"
+                      f"勝率: {summary['win_rate']:.1f}%\n"
+                      f"最大回撤: {summary['max_drawdown']:,.0f} 元\n"
+                      f"{'='*60}")
+
+            self._write_log(message)
+        log.info(message)
+
         return summary
-    
+
     def reset_daily(self):
         """重置當日統計（跨日時使用）"""
-        if self.daily_pnl != 0 or self.daily_trades:
-            # 寫入最終摘要
-            self.get_daily_summary()
-        
-        self.daily_pnl = 0.0
-        self.daily_trades = []
-        self.current_position = None
-        
-        message = "🔄 日內統計已重置"
-        self._write_log(message)
-        print(f"\n{message}")
+        with self._lock:
+            if self.daily_pnl != 0 or self.daily_trades:
+                # 寫入最終摘要
+                self.get_daily_summary()
+
+            now = self.clock()
+            self._check_day(now)
+            self._append(now.strftime(TIME_FORMAT), 'R')
+            self._apply_reset()
+
+            message = "🔄 日內統計已重置"
+            self._write_log(message)
+        log.info("\n%s", message)
+
+    def close(self):
+        """寫出並關閉 journal 與日誌檔"""
+        with self._lock:
+            for f in (self._journal, self._log):
+                if f is not None:
+                    f.close()
+            self._journal = None
+            self._log = None
@@ -3,53 +3,57 @@
 """
 TradingView Webhook 接收服務
 接收 TradingView 發送的交易訊號並執行期貨交易
+
+下單端點（/webhook、/long、/short、/close）只把訊號排入委託佇列並立即回傳 request_id（HTTP 202），
+由委託佇列的工作執行緒依序執行；執行結果以 GET /status/<request_id> 查詢。
+重複的警報（相同冪等鍵）直接回傳第一次的 request_id；合併視窗內同一商品的多筆訊號只執行最後一筆。
+GET /metrics 回傳 Prometheus 文字格式的計數與延遲。
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from datetime import datetime
-import threading
-import json
-import os
-from execute import TradeExecutor
-from money_config import REQUIRE_CONFIRMATION
+import webhook_service as service
+from webhook_service import (SUPPORTED_ACTIONS, WEBHOOK_SECRET, REQUIRE_SECRET,
+                             init_trader, get_pipeline, log)
 
 app = Flask(__name__)
 
-# 全域執行器實例
-executor = None
-executor_lock = threading.Lock()
-
-# 簡單的驗證密鑰（建議在環境變數中設置）
-WEBHOOK_SECRET = os.getenv("TV_SECRET")
 
-# 安全設定：是否要求密鑰驗證
-# True = 必須提供正確的 secret（生產環境建議）
-# False = 不驗證密鑰（僅限開發測試）
-REQUIRE_SECRET = os.environ.get('REQUIRE_SECRET', 'true').lower() == 'true'
+def log_request(title, *lines, **fields):
+    """請求橫幅以一筆紀錄輸出（fields 另存於 JSON 紀錄）"""
+    body = ''.join(f"   {line}\n" for line in lines)
+    log.info("\n%s\n%s\n   時間: %s\n%s%s", "=" * 70, title, datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+             body, "=" * 70, event='request', **fields)
 
 
-def init_trader():
-    """初始化交易執行器（線程安全）"""
-    global executor
-    with executor_lock:
-        if executor is None:
-            try:
-                executor = TradeExecutor()
-                return True
-            except Exception as e:
-                print(f"✗ 初始化交易執行器失敗: {e}")
-                return False
-    return True
+def enqueue_signal(action, price=None, qty=1, source='', data=None):
+    """將訊號排入委託佇列，回傳 (JSON 回應, HTTP 狀態碼)"""
+    body, status = service.enqueue_signal(action, price, qty, source, data, request.headers)
+    return jsonify(body), status
 
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """健康檢查端點"""
-    return jsonify({
-        'status': 'ok',
-        'timestamp': datetime.now().isoformat(),
-        'trader_initialized': executor is not None and executor.trader.is_logged_in
-    })
+    return jsonify(service.health())
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 抓取端點"""
+    return Response(service.metrics(), content_type=service.METRICS_CONTENT_TYPE)
+
+
+@app.route('/status/<request_id>', methods=['GET'])
+def signal_status(request_id):
+    """
+    查詢訊號執行結果
+    
+    status: queued（排隊中）/ running（執行中）/ done（完成）/ failed（失敗）/
+            coalesced（被合併視窗內較新的訊號取代，見 coalesced_into）
+    """
+    body, status = service.signal_status(request_id)
+    return jsonify(body), status
 
 
 @app.route('/webhook', methods=['POST'])
@@ -75,7 +79,7 @@ def webhook():
         
         # 驗證密鑰
         if data.get('secret') != WEBHOOK_SECRET:
-            print(f"⚠️ 未授權的 webhook 請求")
+            log.warning("⚠️ 未授權的 webhook 請求")
             return jsonify({'error': '未授權'}), 401
         
         # 解析交易訊號
@@ -84,97 +88,27 @@ def webhook():
         price = data.get('price')
         
         # 記錄請求
-        print("\n" + "=" * 70)
-        print(f"📥 接收到 TradingView 訊號")
-        print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"   動作: {action}")
-        print(f"   數量: {qty}")
-        if price:
-            print(f"   參考價格: {price}")
-        print("=" * 70)
-        
-        # 確保交易執行器已初始化
-        if executor is None or not executor.trader.is_logged_in:
-            if not init_trader():
-                return jsonify({
-                    'success': False,
-                    'error': '交易執行器未就緒'
-                }), 500
+        log_request("📥 接收到 TradingView 訊號", f"動作: {action}", f"數量: {qty}",
+                    *([f"參考價格: {price}"] if price else []), source='webhook', action=action, qty=qty, price=price)
         
-        # 執行交易指令
-        result = execute_trade_signal(action, price, qty)
+        if action not in SUPPORTED_ACTIONS:
+            return jsonify({
+                'success': False,
+                'error': f'不支援的交易動作: {action}',
+                'message': '支援的動作: buy, sell, close'
+            }), 400
         
-        return jsonify(result), 200 if result['success'] else 500
+        # 排入委託佇列
+        return enqueue_signal(action, price, qty, 'webhook', data)
         
     except Exception as e:
-        print(f"\n✗ 處理 webhook 時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 處理 webhook 時發生錯誤: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
 
-def execute_trade_signal(action, price=None, qty=1):
-    """
-    執行交易訊號
-    
-    Args:
-        action: 交易動作 ('buy', 'sell', 'close')
-        price: 參考價格（可選）
-        qty: 交易數量
-        
-    Returns:
-        dict: 執行結果
-    """
-    try:
-        if action == 'buy' or action == 'long':
-            # 執行買入訊號（類似黃金交叉）
-            result = executor.execute_golden_cross_signal(price)
-            return {
-                'success': result['success'],
-                'action': 'buy',
-                'actions': result['actions'],
-                'message': '買入訊號執行完成'
-            }
-            
-        elif action == 'sell' or action == 'short':
-            # 執行賣出訊號（類似死亡交叉）
-            result = executor.execute_death_cross_signal(price)
-            return {
-                'success': result['success'],
-                'action': 'sell',
-                'actions': result['actions'],
-                'message': '賣出訊號執行完成'
-            }
-            
-        elif action == 'close' or action == 'exit':
-            # 平掉所有倉位
-            success = executor.close_all_positions(price)
-            return {
-                'success': success,
-                'action': 'close',
-                'message': '平倉訊號執行完成'
-            }
-            
-        else:
-            return {
-                'success': False,
-                'error': f'不支援的交易動作: {action}',
-                'message': '支援的動作: buy, sell, close'
-            }
-            
-    except Exception as e:
-        print(f"✗ 執行交易訊號時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
-        return {
-            'success': False,
-            'error': str(e)
-        }
-
-
 @app.route('/long', methods=['POST'])
 def long_position():
     """
@@ -198,39 +132,14 @@ def long_position():
         qty = data.get('qty', 1)
         price = data.get('price')
         
-        print("\n" + "=" * 70)
-        print(f"📈 接收到做多訊號")
-        print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"   數量: {qty}")
-        if price:
-            print(f"   參考價格: {price}")
-        print("=" * 70)
+        log_request("📈 接收到做多訊號", f"數量: {qty}", *([f"參考價格: {price}"] if price else []),
+                    source='long', qty=qty, price=price)
         
-        if executor is None or not executor.trader.is_logged_in:
-            if not init_trader():
-                return jsonify({
-                    'success': False,
-                    'error': '交易執行器未就緒'
-                }), 500
-        
-        # 步驟1: 先平掉所有倉位
-        # print("\n>>> 步驟1: 先平掉所有倉位...")
-        # executor.close_all_positions()
-        
-        # 步驟2: 執行做多開倉
-        print("\n>>> 步驟2: 執行做多開倉...")
-        result = executor.execute_golden_cross_signal(price)
-        return jsonify({
-            'success': result['success'],
-            'action': 'long',
-            'actions': result['actions'],
-            'message': '做多訊號執行完成'
-        }), 200 if result['success'] else 500
+        # 排入委託佇列（執行做多：有倉位先平倉再開倉）
+        return enqueue_signal('long', price, qty, 'long', data)
         
     except Exception as e:
-        print(f"\n✗ 執行做多時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 執行做多時發生錯誤: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -257,45 +166,20 @@ def short_position():
         if REQUIRE_SECRET:
             provided_secret = data.get('secret', '')
             if provided_secret != WEBHOOK_SECRET:
-                print(f"⚠️ 未授權的請求（密鑰不正確）")
+                log.warning("⚠️ 未授權的請求（密鑰不正確）")
                 return jsonify({'error': '未授權：密鑰錯誤或未提供'}), 401
         
         qty = data.get('qty', 1)
         price = data.get('price')
         
-        print("\n" + "=" * 70)
-        print(f"📉 接收到做空訊號")
-        print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"   數量: {qty}")
-        if price:
-            print(f"   參考價格: {price}")
-        print("=" * 70)
+        log_request("📉 接收到做空訊號", f"數量: {qty}", *([f"參考價格: {price}"] if price else []),
+                    source='short', qty=qty, price=price)
         
-        if executor is None or not executor.trader.is_logged_in:
-            if not init_trader():
-                return jsonify({
-                    'success': False,
-                    'error': '交易執行器未就緒'
-                }), 500
-        
-        # 步驟1: 先平掉所有倉位
-        # print("\n>>> 步驟1: 先平掉所有倉位...")
-        # executor.close_all_positions()
-        
-        # 步驟2: 執行做空開倉
-        print("\n>>> 步驟2: 執行做空開倉...")
-        result = executor.execute_death_cross_signal(price)
-        return jsonify({
-            'success': result['success'],
-            'action': 'short',
-            'actions': result['actions'],
-            'message': '做空訊號執行完成'
-        }), 200 if result['success'] else 500
+        # 排入委託佇列（執行做空：有倉位先平倉再開倉）
+        return enqueue_signal('short', price, qty, 'short', data)
         
     except Exception as e:
-        print(f"\n✗ 執行做空時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 執行做空時發生錯誤: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -321,36 +205,18 @@ def close_position():
         if REQUIRE_SECRET:
             provided_secret = data.get('secret', '')
             if provided_secret != WEBHOOK_SECRET:
-                print(f"⚠️ 未授權的請求（密鑰不正確）")
+                log.warning("⚠️ 未授權的請求（密鑰不正確）")
                 return jsonify({'error': '未授權：密鑰錯誤或未提供'}), 401
         
         price = data.get('price')
         
-        print("\n" + "=" * 70)
-        print(f"⏹️ 接收到平倉訊號")
-        print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        if price:
-            print(f"   平倉價格: {price}")
-        print("=" * 70)
+        log_request("⏹️ 接收到平倉訊號", *([f"平倉價格: {price}"] if price else []), source='close', price=price)
         
-        if executor is None or not executor.trader.is_logged_in:
-            if not init_trader():
-                return jsonify({
-                    'success': False,
-                    'error': '交易執行器未就緒'
-                }), 500
-        
-        success = executor.close_all_positions(price)
-        return jsonify({
-            'success': success,
-            'action': 'close',
-            'message': '平倉訊號執行完成'
-        }), 200 if success else 500
+        # 排入委託佇列
+        return enqueue_signal('close', price, 1, 'close', data)
         
     except Exception as e:
-        print(f"\n✗ 執行平倉時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 執行平倉時發生錯誤: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -377,15 +243,12 @@ def check_position():
             if REQUIRE_SECRET:
                 provided_secret = data.get('secret', '')
                 if provided_secret != WEBHOOK_SECRET:
-                    print(f"⚠️ 未授權的請求（密鑰不正確）")
+                    log.warning("⚠️ 未授權的請求（密鑰不正確）")
                     return jsonify({'error': '未授權：密鑰錯誤或未提供'}), 401
         
-        print("\n" + "=" * 70)
-        print(f"📊 接收到倉位查詢請求")
-        print(f"   時間: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("=" * 70)
+        log_request("📊 接收到倉位查詢請求", source='position')
         
-        if executor is None or not executor.trader.is_logged_in:
+        if service.executor is None or not service.executor.trader.is_logged_in:
             if not init_trader():
                 return jsonify({
                     'success': False,
@@ -393,12 +256,12 @@ def check_position():
                 }), 500
         
         # 查詢倉位
-        position_info = executor.check_position()
+        position_info = service.executor.check_position()
         
-        print(f"\n>>> 倉位查詢結果:")
-        print(f"    has_position: {position_info.get('has_position')}")
-        print(f"    position_side: {position_info.get('position_side')}")
-        print(f"    position_qty: {position_info.get('position_qty')}")
+        log.info("\n>>> 倉位查詢結果:\n    has_position: %s\n    position_side: %s\n    position_qty: %s",
+                 position_info.get('has_position'), position_info.get('position_side'),
+                 position_info.get('position_qty'), event='position', has_position=position_info.get('has_position'),
+                 position_side=position_info.get('position_side'), position_qty=position_info.get('position_qty'))
         
         return jsonify({
             'success': True,
@@ -409,9 +272,7 @@ def check_position():
         }), 200
         
     except Exception as e:
-        print(f"\n✗ 查詢倉位時發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("\n✗ 查詢倉位時發生錯誤: %s", e)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -427,35 +288,37 @@ def run_server(host='0.0.0.0', port=5000, debug=False):
         port: 監聽埠號
         debug: 是否啟用 debug 模式
     """
-    print("\n" + "=" * 70)
-    print("🚀 TradingView Webhook 服務啟動中...")
-    print("=" * 70)
+    log.info("\n" + "=" * 70)
+    log.info("🚀 TradingView Webhook 服務啟動中...")
+    log.info("=" * 70)
     
     # 初始化交易執行器
-    print("\n>>> 正在初始化交易執行器...")
+    log.info("\n>>> 正在初始化交易執行器...")
     if not init_trader():
-        print("✗ 無法啟動服務：交易執行器初始化失敗")
+        log.error("✗ 無法啟動服務：交易執行器初始化失敗")
         return
+    get_pipeline()
     
-    print(f"\n✓ 服務已就緒!")
-    print(f"  監聽地址: http://{host}:{port}")
-    print(f"\n📍 可用端點:")
-    print(f"  健康檢查: GET  http://{host}:{port}/health")
-    print(f"  倉位查詢: GET  http://{host}:{port}/position")
-    print(f"  檢查倉位: POST http://{host}:{port}/position")
-    print(f"  做多交易: POST http://{host}:{port}/long")
-    print(f"  做空交易: POST http://{host}:{port}/short")
-    print(f"  平倉操作: POST http://{host}:{port}/close")
-    print(f"  通用接口: POST http://{host}:{port}/webhook")
-    print(f"\n🔒 安全設定:")
-    print(f"  密鑰驗證: {'啟用' if REQUIRE_SECRET else '停用（⚠️ 僅供測試）'}")
+    log.info("\n✓ 服務已就緒!")
+    log.info("  監聽地址: http://%s:%s", host, port)
+    log.info("\n📍 可用端點:")
+    log.info("  健康檢查: GET  http://%s:%s/health", host, port)
+    log.info("  倉位查詢: GET  http://%s:%s/position", host, port)
+    log.info("  檢查倉位: POST http://%s:%s/position", host, port)
+    log.info("  做多交易: POST http://%s:%s/long", host, port)
+    log.info("  做空交易: POST http://%s:%s/short", host, port)
+    log.info("  平倉操作: POST http://%s:%s/close", host, port)
+    log.info("  通用接口: POST http://%s:%s/webhook", host, port)
+    log.info("  執行結果: GET  http://%s:%s/status/<request_id>", host, port)
+    log.info("\n🔒 安全設定:")
+    log.info("  密鑰驗證: %s", '啟用' if REQUIRE_SECRET else '停用（⚠️ 僅供測試）')
     if REQUIRE_SECRET:
-        print(f"  Webhook Secret: {WEBHOOK_SECRET}")
-        print(f"  ⚠️ 所有請求必須提供正確的 secret 參數")
+        log.info("  Webhook Secret: %s", WEBHOOK_SECRET)
+        log.warning("  ⚠️ 所有請求必須提供正確的 secret 參數")
     else:
-        print(f"  ⚠️ 警告：目前不驗證密鑰，任何人都可以下單！")
-        print(f"  ⚠️ 生產環境請設定 REQUIRE_SECRET=true")
-    print("=" * 70 + "\n")
+        log.warning("  ⚠️ 警告：目前不驗證密鑰，任何人都可以下單！")
+        log.warning("  ⚠️ 生產環境請設定 REQUIRE_SECRET=true")
+    log.info("=" * 70 + "\n")
     
     # 啟動 Flask
     app.run(host=host, port=port, debug=debug, use_reloader=False)
@@ -474,13 +337,9 @@ if __name__ == '__main__':
     try:
         run_server(host=args.host, port=args.port, debug=args.debug)
     except KeyboardInterrupt:
-        print("\n\n>>> 正在關閉服務...")
-        if executor:
-            executor.dispose()
-        print(">>> 服務已關閉")
+        log.info("\n\n>>> 正在關閉服務...")
+        service.shutdown()
+        log.info(">>> 服務已關閉")
     except Exception as e:
-        print(f"\n✗ 服務發生錯誤: {e}")
-        import traceback
-        traceback.print_exc()
-        if executor:
-            executor.dispose()
+        log.exception("\n✗ 服務發生錯誤: %s", e)
+        service.shutdown()
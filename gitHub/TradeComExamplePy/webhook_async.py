@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+webhook_async.py - TradingView Webhook 服務（asyncio / ASGI 版本）
+與 tradingview_webhook.py 相同的端點，但不經過 Flask 的單一工作執行緒：
+    /health、/position   直接讀取記憶體狀態（部位簿、委託佇列計數），不呼叫券商 API，
+                         下單進行中也不會被阻塞
+    /webhook、/long、/short、/close
+                         驗證後交給委託佇列（order_pipeline），立即回傳 request_id
+    /status/<request_id> 查詢執行結果
+    /metrics             Prometheus 文字格式的計數與延遲
+
+app 是標準的 ASGI 應用程式，可用 uvicorn 等伺服器執行（uvicorn webhook_async:app）；
+未安裝時使用內建的 asyncio HTTP/1.1 伺服器（支援 keep-alive，連線可重複使用）。
+
+執行方式: python webhook_async.py [--host 0.0.0.0] [--port 5000] [--server builtin|uvicorn]
+"""
+
+import asyncio
+import json
+from datetime import datetime
+from http import HTTPStatus
+
+import webhook_service as service
+from webhook_service import SUPPORTED_ACTIONS, WEBHOOK_SECRET, REQUIRE_SECRET, log
+
+# 內建伺服器的請求限制
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 75
+
+
+def _authorized(data, always=False):
+    """密鑰驗證（/webhook 一律驗證，其餘端點依 REQUIRE_SECRET）"""
+    if not (always or REQUIRE_SECRET):
+        return True
+    return data.get('secret') == WEBHOOK_SECRET
+
+
+def _order(path, data, headers):
+    """下單端點：驗證後排入委託佇列"""
+    if path == '/webhook':
+        if not data:
+            return {'error': '無效的 JSON 格式'}, 400
+        if not _authorized(data, always=True):
+            log.warning("⚠️ 未授權的 webhook 請求")
+            return {'error': '未授權'}, 401
+        action = str(data.get('action', '')).lower()
+        if action not in SUPPORTED_ACTIONS:
+            return {
+                'success': False,
+                'error': f'不支援的交易動作: {action}',
+                'message': '支援的動作: buy, sell, close'
+            }, 400
+        return service.enqueue_signal(action, data.get('price'), data.get('qty', 1), 'webhook', data, headers)
+
+    if not _authorized(data):
+        log.warning("⚠️ 未授權的請求（密鑰不正確）")
+        return {'error': '未授權：密鑰錯誤或未提供'}, 401
+    action = path[1:]
+    qty = 1 if action == 'close' else data.get('qty', 1)
+    return service.enqueue_signal(action, data.get('price'), qty, action, data, headers)
+
+
+def route(method, path, data, headers):
+    """
+    依路徑處理請求（只讀取記憶體狀態或排入佇列，不會阻塞）
+
+    Returns:
+        tuple: (回應 dict 或文字（/metrics）, HTTP 狀態碼)
+    """
+    if path == '/health' and method == 'GET':
+        return service.health(), 200
+    if path == '/metrics' and method == 'GET':
+        return service.metrics(), 200
+    if path == '/position' and method in ('GET', 'POST'):
+        if method == 'POST' and not _authorized(data):
+            return {'error': '未授權：密鑰錯誤或未提供'}, 401
+        return service.cached_position()
+    if path.startswith('/status/') and method == 'GET':
+        return service.signal_status(path[len('/status/'):])
+    if path in ('/webhook', '/long', '/short', '/close'):
+        if method != 'POST':
+            return {'error': 'Method Not Allowed'}, 405
+        return _order(path, data, headers)
+    return {'error': 'Not Found'}, 404
+
+
+def _parse_json(body):
+    """允許沒有 Content-Type 或空白內容的請求"""
+    if not body:
+        return {}
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def startup():
+    """在背景執行緒登入（不阻塞事件迴圈），並啟動委託佇列"""
+    loop = asyncio.get_running_loop()
+    ok = await loop.run_in_executor(None, service.init_trader)
+    service.get_pipeline()
+    return ok
+
+
+async def app(scope, receive, send):
+    """ASGI 應用程式"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, service.shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    chunks = []
+    more = True
+    while more:
+        message = await receive()
+        chunks.append(message.get('body', b''))
+        more = message.get('more_body', False)
+    headers = {k.decode('latin-1').title(): v.decode('latin-1') for k, v in scope.get('headers', [])}
+
+    try:
+        body, status = route(scope['method'], scope['path'], _parse_json(b''.join(chunks)), headers)
+    except Exception as e:
+        log.error("\n✗ 處理請求時發生錯誤: %s", e)
+        body, status = {'success': False, 'error': str(e)}, 500
+
+    if isinstance(body, str):
+        payload = body.encode('utf-8')
+        content_type = service.METRICS_CONTENT_TYPE.encode('latin-1')
+    else:
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        content_type = b'application/json; charset=utf-8'
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', content_type),
+                    (b'content-length', str(len(payload)).encode('ascii'))]
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+# ------------------------------------------------------------
+# 內建 asyncio HTTP/1.1 伺服器（執行 ASGI app）
+# ------------------------------------------------------------
+async def _handle_connection(reader, writer):
+    """同一條連線依序處理多個請求（keep-alive）"""
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                await _write_error(writer, 431)
+                return
+            lines = head.decode('latin-1').split('\r\n')
+            try:
+                method, target, version = lines[0].split(' ', 2)
+            except ValueError:
+                await _write_error(writer, 400)
+                return
+            raw_headers = []
+            header_map = {}
+            for line in lines[1:]:
+                if ':' in line:
+                    name, value = line.split(':', 1)
+                    name, value = name.strip().lower(), value.strip()
+                    raw_headers.append((name.encode('latin-1'), value.encode('latin-1')))
+                    header_map[name] = value
+            length = int(header_map.get('content-length') or 0)
+            if length > MAX_BODY_BYTES:
+                await _write_error(writer, 413)
+                return
+            body = await reader.readexactly(length) if length else b''
+
+            connection = header_map.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+            await _run_app(writer, method, target, raw_headers, body, keep_alive)
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run_app(writer, method, target, raw_headers, body, keep_alive):
+    path, _, query = target.partition('?')
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': method.upper(),
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode('latin-1'),
+        'query_string': query.encode('latin-1'),
+        'headers': raw_headers,
+    }
+    sent = [False]
+
+    async def receive():
+        if sent[0]:
+            return {'type': 'http.disconnect'}
+        sent[0] = True
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    response = []
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            reason = HTTPStatus(status).phrase
+            lines = [f'HTTP/1.1 {status} {reason}']
+            lines += [f"{k.decode('latin-1')}: {v.decode('latin-1')}" for k, v in message.get('headers', [])]
+            lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+            response.append(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        elif message['type'] == 'http.response.body':
+            response.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                writer.write(b''.join(response))
+                response.clear()
+
+    await app(scope, receive, send)
+    await writer.drain()
+
+
+async def _write_error(writer, status):
+    reason = HTTPStatus(status).phrase
+    writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    try:
+        await writer.drain()
+    except ConnectionError:
+        pass
+
+
+async def serve(host='0.0.0.0', port=5000, ready=None):
+    """
+    以內建伺服器執行 app
+
+    Args:
+        host: 監聽地址
+        port: 監聽埠號（0 表示自動選擇）
+        ready: 開始接受連線後呼叫 ready(實際埠號)
+    """
+    if not await startup():
+        log.error("✗ 無法啟動服務：交易執行器初始化失敗")
+        return
+    server = await asyncio.start_server(_handle_connection, host, port,
+                                        limit=MAX_HEADER_BYTES, backlog=1024)
+    actual_port = server.sockets[0].getsockname()[1]
+    log.info("\n✓ 服務已就緒（asyncio）: http://%s:%s  %s",
+             host, actual_port, datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+    if ready is not None:
+        ready(actual_port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await asyncio.get_running_loop().run_in_executor(None, service.shutdown)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='TradingView Webhook 接收服務（asyncio）')
+    parser.add_argument('--host', default='0.0.0.0', help='監聽地址 (預設: 0.0.0.0)')
+    parser.add_argument('--port', type=int, default=5000, help='監聽埠號 (預設: 5000)')
+    parser.add_argument('--server', choices=('builtin', 'uvicorn'), default='builtin',
+                        help='HTTP 伺服器 (預設: builtin)')
+    args = parser.parse_args()
+
+    log.info("\n" + "=" * 70)
+    log.info("🚀 TradingView Webhook 服務啟動中（asyncio）...")
+    log.info("=" * 70)
+    try:
+        if args.server == 'uvicorn':
+            import uvicorn
+            uvicorn.run(app, host=args.host, port=args.port, lifespan='on')
+        else:
+            asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        log.info("\n\n>>> 服務已關閉")
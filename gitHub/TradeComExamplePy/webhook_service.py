@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+webhook_service.py - Webhook 服務的共用狀態與邏輯（與網頁框架無關）
+tradingview_webhook.py（Flask）與 webhook_async.py（asyncio / ASGI）共用：
+交易執行器、委託佇列、訊號排隊與查詢。回傳值皆為 (dict, HTTP 狀態碼)，由各框架轉成 JSON 回應。
+
+健康檢查與倉位查詢只讀取記憶體中的狀態（部位簿、委託佇列計數），不呼叫券商 API，
+可在任何執行緒（包含事件迴圈）直接呼叫。
+
+metrics() 回傳 Prometheus 文字格式：訊號、委託送出 / 確認、券商錯誤代碼、行情封包數（kgiperf 計數器），
+委託佇列與回呼積壓（抓取時讀取），以及 kgiperf 各階段延遲（order.fill、position.query ...）。
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from execute import TradeExecutor
+from money_config import DEFAULT_SYMBOL
+from order_pipeline import OrderPipeline, PipelineFull
+import kgiperf
+from kgilog import get_logger
+
+log = get_logger('webhook')
+
+# 全域執行器實例
+executor = None
+executor_lock = threading.Lock()
+
+# 委託佇列（唯一執行下單的工作執行緒）
+pipeline = None
+pipeline_lock = threading.Lock()
+
+# 支援的交易動作
+SUPPORTED_ACTIONS = ('buy', 'long', 'sell', 'short', 'close', 'exit')
+
+# 簡單的驗證密鑰（建議在環境變數中設置）
+WEBHOOK_SECRET = os.getenv("TV_SECRET")
+
+# 安全設定：是否要求密鑰驗證
+# True = 必須提供正確的 secret（生產環境建議）
+# False = 不驗證密鑰（僅限開發測試）
+REQUIRE_SECRET = os.environ.get('REQUIRE_SECRET', 'true').lower() == 'true'
+
+# 警報風暴設定
+# 合併視窗（毫秒）：視窗內同一商品的多筆訊號只執行最後一筆（0 = 逐筆執行）
+COALESCE_MS = int(os.environ.get('WEBHOOK_COALESCE_MS', '200'))
+# 冪等鍵保留秒數：Idempotency-Key 標頭、JSON 的 id 欄位，或（兩者皆無時）請求內容的雜湊
+IDEMPOTENCY_TTL = int(os.environ.get('WEBHOOK_IDEMPOTENCY_TTL', '60'))
+
+# /metrics 回應格式
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# result: queued（排入佇列）/ duplicate（重複訊號）/ rejected（佇列已滿）
+SIGNALS = kgiperf.counter('kgi_signals_received_total', '收到的交易訊號數', labels=('source', 'action', 'result'))
+
+
+def init_trader():
+    """初始化交易執行器（線程安全）"""
+    global executor
+    with executor_lock:
+        if executor is None:
+            try:
+                executor = TradeExecutor()
+                return True
+            except Exception as e:
+                log.error("✗ 初始化交易執行器失敗: %s", e)
+                return False
+    return True
+
+
+def ensure_trader():
+    """確認交易執行器已登入，否則重新初始化"""
+    if executor is None or not executor.trader.is_logged_in:
+        return init_trader()
+    return True
+
+
+def get_pipeline():
+    """取得委託佇列（第一次呼叫時啟動工作執行緒）"""
+    global pipeline
+    with pipeline_lock:
+        if pipeline is None:
+            pipeline = OrderPipeline(execute_trade_signal, prepare=ensure_trader,
+                                     coalesce=COALESCE_MS / 1000, idempotency_ttl=IDEMPOTENCY_TTL).start()
+    return pipeline
+
+
+def shutdown():
+    """停止委託佇列並登出"""
+    if pipeline:
+        pipeline.stop()
+    if executor:
+        executor.dispose()
+
+
+def execute_trade_signal(action, price=None, qty=1):
+    """
+    執行交易訊號
+
+    Args:
+        action: 交易動作 ('buy', 'sell', 'close')
+        price: 參考價格（可選）
+        qty: 交易數量
+
+    Returns:
+        dict: 執行結果
+    """
+    try:
+        if action == 'buy' or action == 'long':
+            # 執行買入訊號（類似黃金交叉）
+            result = executor.execute_golden_cross_signal(price, qty)
+            return {
+                'success': result['success'],
+                'action': 'buy',
+                'actions': result['actions'],
+                'message': '買入訊號執行完成'
+            }
+
+        elif action == 'sell' or action == 'short':
+            # 執行賣出訊號（類似死亡交叉）
+            result = executor.execute_death_cross_signal(price, qty)
+            return {
+                'success': result['success'],
+                'action': 'sell',
+                'actions': result['actions'],
+                'message': '賣出訊號執行完成'
+            }
+
+        elif action == 'close' or action == 'exit':
+            # 平掉所有倉位
+            success = executor.close_all_positions(price)
+            return {
+                'success': success,
+                'action': 'close',
+                'message': '平倉訊號執行完成'
+            }
+
+        else:
+            return {
+                'success': False,
+                'error': f'不支援的交易動作: {action}',
+                'message': '支援的動作: buy, sell, close'
+            }
+
+    except Exception as e:
+        log.exception("✗ 執行交易訊號時發生錯誤: %s", e)
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+def idempotency_key(source, data, headers=None):
+    """
+    取得請求的冪等鍵
+
+    優先使用 Idempotency-Key 標頭或 JSON 的 id 欄位；兩者皆無時以端點與請求內容（去除 secret）的雜湊代替，
+    TradingView 重複送出的同一則警報內容完全相同。
+
+    Returns:
+        tuple: (冪等鍵, 是否為內容雜湊)
+    """
+    key = (headers or {}).get('Idempotency-Key') or data.get('id')
+    if key:
+        return f'{source}:{key}', False
+    body = {k: v for k, v in data.items() if k != 'secret'}
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'{source}:{digest}', True
+
+
+def enqueue_signal(action, price=None, qty=1, source='', data=None, headers=None):
+    """
+    將訊號排入委託佇列
+
+    Returns:
+        tuple: (回應 dict, HTTP 狀態碼)
+    """
+    data = data or {}
+    # execute_trade_signal 一律交易 DEFAULT_SYMBOL（close 平掉所有倉位），請求中的 symbol 不影響下單，
+    # 合併視窗與連續重複判斷以實際交易的商品分組，不同 symbol 的訊號仍只執行最後一筆
+    symbol = DEFAULT_SYMBOL
+    key, hashed = idempotency_key(source, data, headers)
+    try:
+        request_id, duplicate = get_pipeline().submit(action, price, qty, source, symbol=symbol,
+                                                      key=key, consecutive=hashed)
+    except PipelineFull as e:
+        SIGNALS.inc(source, action, 'rejected')
+        log.error("✗ %s", e, event='rejected', source=source, action=action)
+        return {
+            'success': False,
+            'error': str(e)
+        }, 503
+
+    if duplicate:
+        SIGNALS.inc(source, action, 'duplicate')
+        log.info(">>> 重複訊號，沿用: %s", request_id, event='duplicate', request_id=request_id,
+                 source=source, action=action)
+        job = pipeline.status(request_id)
+        return {
+            'success': True,
+            'request_id': request_id,
+            'status': job['status'] if job else 'done',
+            'duplicate': True,
+            'action': action,
+            'status_url': f'/status/{request_id}'
+        }, 200
+
+    SIGNALS.inc(source, action, 'queued')
+    log.info(">>> 已排入委託佇列: %s", request_id, event='queued', request_id=request_id,
+             source=source, action=action, qty=qty)
+    return {
+        'success': True,
+        'request_id': request_id,
+        'status': 'queued',
+        'duplicate': False,
+        'action': action,
+        'status_url': f'/status/{request_id}'
+    }, 202
+
+
+def signal_status(request_id):
+    """
+    查詢訊號執行結果
+
+    status: queued（排隊中）/ running（執行中）/ done（完成）/ failed（失敗）/
+            coalesced（被合併視窗內較新的訊號取代，見 coalesced_into）
+
+    Returns:
+        tuple: (回應 dict, HTTP 狀態碼)
+    """
+    job = get_pipeline().status(request_id)
+    if job is None:
+        return {
+            'success': False,
+            'error': f'查無 request_id: {request_id}'
+        }, 404
+    return dict(job, success=True), 200
+
+
+def health():
+    """健康檢查（只讀取記憶體狀態）"""
+    return {
+        'status': 'ok',
+        'timestamp': datetime.now().isoformat(),
+        'trader_initialized': executor is not None and executor.trader.is_logged_in,
+        'queue_depth': pipeline.depth if pipeline is not None else 0,
+        'coalesced': pipeline.coalesced if pipeline is not None else 0,
+        'duplicates': pipeline.duplicates if pipeline is not None else 0
+    }
+
+
+def _callback_backlog():
+    if executor is None:
+        return {}
+    backlog = executor.trader.trader.callbackBacklog()
+    return {(name,): depth for name, depth in backlog.items()}
+
+
+def _trader_ready():
+    return int(executor is not None and executor.trader.is_logged_in)
+
+
+kgiperf.gauge('kgi_trader_logged_in', '交易執行器是否已登入', _trader_ready)
+kgiperf.gauge('kgi_order_queue_depth', '委託佇列中等待執行的訊號數',
+              lambda: pipeline.depth if pipeline is not None else 0)
+kgiperf.gauge('kgi_signals_coalesced_total', '被合併視窗內較新訊號取代的訊號數',
+              lambda: pipeline.coalesced if pipeline is not None else 0, kind='counter')
+kgiperf.gauge('kgi_callback_backlog', '尚未處理的回覆 / 回呼數', _callback_backlog, labels=('source',))
+
+
+def metrics():
+    """Prometheus 文字格式（只在抓取時彙總各執行緒的計數）"""
+    return kgiperf.render()
+
+
+def cached_position():
+    """
+    由即時部位簿讀取倉位（不向主機查詢，資料由成交回報與背景校正維持）
+
+    Returns:
+        tuple: (回應 dict, HTTP 狀態碼)
+    """
+    if executor is None:
+        return {
+            'success': False,
+            'error': '交易執行器未就緒'
+        }, 503
+    book = executor.trader.positions
+    snapshot = book.snapshot()
+    first = snapshot['positions'][0] if snapshot['positions'] else None
+    age = book.age()
+    return {
+        'success': True,
+        'has_position': snapshot['has_position'],
+        'position_side': first['side'] if first else None,
+        'position_qty': first['qty'] if first else 0,
+        'positions': snapshot['positions'],
+        'synced_age': round(age, 3) if age is not None else None,
+        'timestamp': datetime.now().isoformat()
+    }, 200
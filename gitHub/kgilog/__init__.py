@@ -0,0 +1,16 @@
+"""
+kgilog - 取代 print 的非同步結構化日誌
+呼叫端只判斷等級並放入佇列，由背景執行緒格式化後寫到主控台（文字或 JSON）與 JSON lines 檔案。
+
+    from kgilog import get_logger
+    log = get_logger('money')
+    log.info('✓ 登入成功')
+    log.debug('order_no_map keys: %s', keys)    # 等級未開啟時不格式化
+    log.info('成交', order_no='A0001', qty=1)   # 額外欄位寫入 JSON 紀錄
+
+互動式選單以 ask(prompt) 取代 input(prompt)，先寫出之前的紀錄再顯示提示。
+設定見 logger.py（KGI_LOG_LEVEL / KGI_LOG_CONSOLE / KGI_LOG_FILE / KGI_LOG_SYNC）。
+"""
+
+from .logger import (DEBUG, INFO, WARNING, ERROR, Logger, LogWriter, get_logger, configure,
+                     flush, ask, shutdown, level_of)
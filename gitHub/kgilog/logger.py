@@ -0,0 +1,297 @@
+"""
+logger.py - 背景寫出的結構化日誌
+呼叫端只做等級判斷與放入佇列（queue.SimpleQueue），字串格式化、JSON 編碼與寫檔都在背景執行緒進行，
+下單回報與行情回呼不會因為主控台輸出而等待。
+
+等級判斷在格式化之前：
+    log.debug('order_no_map keys: %s', keys)     # DEBUG 未開啟時不會格式化
+    if log.is_enabled(DEBUG):                    # 參數本身很花時間時先判斷
+        log.debug('pending_orders: %s', list(pending_orders))
+
+每筆紀錄 = 時間、等級、名稱、訊息（msg % args）與額外欄位（log.info('成交', order_no='A0001', qty=1)）。
+輸出：
+    主控台   text（只有訊息，與原本 print 相同）/ json / off
+    檔案     JSON lines（每行一筆紀錄）
+
+環境變數：
+    KGI_LOG_LEVEL     DEBUG / INFO / WARNING / ERROR（預設 INFO）
+    KGI_LOG_CONSOLE   text / json / off（預設 text）
+    KGI_LOG_FILE      JSON lines 檔案路徑（預設不寫檔）
+    KGI_LOG_SYNC      1 = 在呼叫端直接寫出（除錯用，與 print 相同）
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+_LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+CONSOLE_MODES = ('text', 'json', 'off')
+
+_STOP = object()
+
+
+def level_of(value):
+    """等級名稱或數字轉成數字"""
+    if isinstance(value, int):
+        return value
+    try:
+        return _LEVELS[str(value).upper()]
+    except KeyError:
+        raise ValueError(f"不支援的日誌等級: {value}") from None
+
+
+class LogWriter:
+    """背景寫出執行緒與輸出設定（全域一個）"""
+
+    def __init__(self, level=INFO, console='text', file=None, background=True):
+        self.level = level_of(level)
+        self.console = console
+        self.path = None
+        self.file = None
+        self.background = background
+        self.written = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()   # 同步模式與背景執行緒共用輸出
+        self._idle = threading.Condition()
+        self._pending = 0
+        self.thread = None
+        self.open_file(file)
+
+    def open_file(self, path):
+        """切換 JSON lines 檔案（None 表示不寫檔）"""
+        with self._lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.path = path
+            if path:
+                directory = os.path.dirname(os.path.abspath(path))
+                os.makedirs(directory, exist_ok=True)
+                self.file = open(path, 'a', encoding='utf-8', buffering=64 * 1024)
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name='kgilog-writer', daemon=True)
+            self.thread.start()
+        return self
+
+    def put(self, record):
+        if not self.background:
+            with self._lock:
+                self._write(record)
+                self._flush_streams((record[7],))
+            return
+        with self._idle:
+            self._pending += 1
+        self._queue.put(record)
+
+    def _run(self):
+        get = self._queue.get
+        while True:
+            batch = [get()]
+            try:
+                while len(batch) < 1024:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            stop = False
+            streams = set()
+            with self._lock:
+                for record in batch:
+                    if record is _STOP:
+                        stop = True
+                        continue
+                    self._write(record)
+                    streams.add(record[7])
+                self._flush_streams(streams)
+            with self._idle:
+                self._pending -= len(batch) - batch.count(_STOP)
+                if not self._pending:
+                    self._idle.notify_all()
+            if stop:
+                return
+
+    def _write(self, record):
+        ts, level, name, msg, args, fields, exc, stream = record
+        try:
+            text = msg % args if args else str(msg)
+        except Exception as e:
+            text = f'{msg} {args!r}（格式錯誤: {e}）'
+        if exc:
+            text = f'{text}\n{exc}'.rstrip('\n')
+        try:
+            if self.console == 'text' and stream is not None:
+                stream.write(text + '\n')
+            if self.file is not None or self.console == 'json':
+                line = self._json(ts, level, name, text, fields)
+                if self.file is not None:
+                    self.file.write(line + '\n')
+                if self.console == 'json' and stream is not None:
+                    stream.write(line + '\n')
+            self.written += 1
+        except Exception:
+            self.errors += 1
+
+    @staticmethod
+    def _json(ts, level, name, text, fields):
+        data = {
+            'ts': datetime.fromtimestamp(ts).isoformat(timespec='microseconds'),
+            'level': LEVEL_NAMES.get(level, str(level)),
+            'logger': name,
+            'msg': text.strip('\n')
+        }
+        if fields:
+            data.update(fields)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+    def _flush_streams(self, streams):
+        for stream in streams:
+            if stream is not None:
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+        if self.file is not None:
+            self.file.flush()
+
+    def flush(self, timeout=5):
+        """等待已放入佇列的紀錄全部寫出"""
+        if not self.background or self.thread is None:
+            return True
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def stop(self, timeout=5):
+        """寫出剩餘紀錄並結束背景執行緒"""
+        if self.thread is not None and self.thread.is_alive():
+            self._queue.put(_STOP)
+            self.thread.join(timeout)
+        self.thread = None
+        with self._lock:
+            if self.file is not None:
+                self.file.flush()
+
+
+class Logger:
+    """具名的日誌入口（等級可個別設定，未設定時使用全域等級）"""
+    __slots__ = ('name', 'level')
+
+    def __init__(self, name, level=None):
+        self.name = name
+        self.level = level_of(level) if level is not None else None
+
+    def set_level(self, level):
+        self.level = level_of(level) if level is not None else None
+
+    def is_enabled(self, level):
+        threshold = self.level if self.level is not None else _writer.level
+        return level >= threshold
+
+    def log(self, level, msg, *args, **fields):
+        threshold = self.level if self.level is not None else _writer.level
+        if level < threshold:
+            return
+        _writer.put((time.time(), level, self.name, msg, args, fields, None, sys.stdout))
+
+    def debug(self, msg, *args, **fields):
+        threshold = self.level if self.level is not None else _writer.level
+        if DEBUG < threshold:
+            return
+        _writer.put((time.time(), DEBUG, self.name, msg, args, fields, None, sys.stdout))
+
+    def info(self, msg, *args, **fields):
+        threshold = self.level if self.level is not None else _writer.level
+        if INFO < threshold:
+            return
+        _writer.put((time.time(), INFO, self.name, msg, args, fields, None, sys.stdout))
+
+    def warning(self, msg, *args, **fields):
+        self.log(WARNING, msg, *args, **fields)
+
+    def error(self, msg, *args, **fields):
+        self.log(ERROR, msg, *args, **fields)
+
+    def exception(self, msg, *args, **fields):
+        """ERROR 等級並附上目前例外的 traceback（在呼叫端取得，須在 except 區塊內呼叫）"""
+        if not self.is_enabled(ERROR):
+            return
+        _writer.put((time.time(), ERROR, self.name, msg, args, fields, traceback.format_exc(), sys.stdout))
+
+
+_writer = LogWriter(level=os.environ.get('KGI_LOG_LEVEL', 'INFO'),
+                    console=os.environ.get('KGI_LOG_CONSOLE', 'text'),
+                    file=os.environ.get('KGI_LOG_FILE') or None,
+                    background=os.environ.get('KGI_LOG_SYNC', '0') != '1')
+if _writer.background:
+    _writer.start()
+atexit.register(_writer.stop)
+
+_loggers = {}
+
+
+def get_logger(name, level=None):
+    """取得具名的日誌入口（同名回傳同一個；指定 level 時更新該入口的等級）"""
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, Logger(name))
+    if level is not None:
+        logger.set_level(level)
+    return logger
+
+
+def configure(level=None, console=None, file=None, background=None):
+    """
+    變更全域設定（未指定的項目不變）
+
+    Args:
+        level: 全域等級（名稱或數字）
+        console: 'text' / 'json' / 'off'
+        file: JSON lines 檔案路徑，'' 表示停止寫檔
+        background: False = 在呼叫端直接寫出
+    """
+    if level is not None:
+        _writer.level = level_of(level)
+    if console is not None:
+        if console not in CONSOLE_MODES:
+            raise ValueError(f"不支援的主控台模式: {console}（可用: {', '.join(CONSOLE_MODES)}）")
+        _writer.console = console
+    if file is not None:
+        _writer.flush()
+        _writer.open_file(file or None)
+    if background is not None and background != _writer.background:
+        if background:
+            _writer.background = True
+            _writer.start()
+        else:
+            _writer.stop()
+            _writer.background = False
+    return _writer
+
+
+def flush(timeout=5):
+    """等待目前的紀錄全部寫出（例如在 input() 提示之前）"""
+    return _writer.flush(timeout)
+
+
+def ask(prompt=''):
+    """先寫出之前的紀錄再顯示輸入提示（取代 input，避免提示夾在日誌中間）"""
+    _writer.flush()
+    return input(prompt)
+
+
+def shutdown():
+    _writer.stop()
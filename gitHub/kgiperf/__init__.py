@@ -0,0 +1,27 @@
+"""
+kgiperf - 報價到下單熱路徑的低成本延遲量測
+以 perf_counter_ns 計時，每個階段一組固定記憶體的 log-linear 直方圖（HDR 風格），
+snapshot() 取得各階段的 p50 / p90 / p99 / p99.9。
+
+範例程式使用的階段：
+    quote.dispatch   行情封包進入 → 處理函式開始（分派查表）
+    quote.handler    處理函式建立封包物件
+    quote.callback   使用者回呼（指標計算、策略）
+    order.build      orderAsync 進入 → 呼叫 tradecom.Order 之前（參數轉換、RequestId）
+    order.call       tradecom.Order 呼叫
+    order.ack        呼叫 tradecom.Order → 下單第二回覆（PT02002）
+    order.fill       呼叫 tradecom.Order → 第一筆成交回報（PT02011）
+    tick_to_order    行情封包進入 → 呼叫 tradecom.Order（在行情回呼中同步下單時）
+
+設定環境變數 KGI_PERF=0 停止記錄。
+
+計數器（counter）與量值（gauge）只在 render() 時彙總，輸出 Prometheus 文字格式（/metrics）。
+
+CallbackQueue 讓 .NET 事件執行緒只把訊息排入有界佇列，由消費執行緒執行回呼（見 callback_queue.py）。
+"""
+
+from .histogram import Histogram, BUCKETS
+from .recorder import (Stage, Recorder, recorder, stage, snapshot, reset, report,
+                       now, mark, origin, clear)
+from .metrics import Counter, Gauge, Registry, registry, counter, gauge, render
+from .callback_queue import CallbackQueue, DROP_OLDEST, BLOCK
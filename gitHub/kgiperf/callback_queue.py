@@ -0,0 +1,217 @@
+"""
+callback_queue.py - 事件執行緒與 Python 回呼之間的有界佇列
+.NET（pythonnet）事件執行緒只把 (接收時間, 處理函式, 參數) 放入固定容量的環狀緩衝區就返回，
+由一或多條消費執行緒依序執行處理函式（封包轉換、使用者回呼、print ...），
+DLL 的接收執行緒不會因為回呼太慢而停住。
+
+佇列滿時的處理方式（policy）：
+    DROP_OLDEST   丟棄最舊的一筆（行情：只需要最新的報價）
+    BLOCK         事件執行緒等待消費者騰出空間，一筆都不丟（委託 / 成交回報）
+
+用法：
+    from kgiperf import CallbackQueue, DROP_OLDEST
+    queue = CallbackQueue(capacity=8192, policy=DROP_OLDEST, name='quote').start()
+    quoteCom.OnRcvMessage += queue.wrap(onQuoteRcvMessage)
+    ...
+    queue.stop()
+
+排入的是事件參數本身（sender 與 .NET 封包物件的參考，不複製、不讀取欄位）：
+在事件執行緒上轉成 tuple / 檢視物件需要逐一讀取 pythonnet 屬性，正是佇列要移出事件執行緒的成本，
+封包欄位一律由消費執行緒讀取（QuoteCom / TaiFexCom 每個訊息都是新的封包物件）。
+
+consumers=1 時依放入順序執行；多條消費執行緒時不保證順序。
+回呼中不可等待同一佇列後面的回覆（例如在回呼中呼叫 waitReply），否則要等到逾時。
+
+監控（/metrics）：kgi_callback_queue_depth、kgi_callback_queue_high_water、
+kgi_callback_queue_dropped_total（依 name 標籤），排隊時間記錄在 <name>.queue 階段。
+"""
+
+import threading
+import weakref
+from time import perf_counter_ns
+
+from kgilog import get_logger
+
+from .recorder import stage
+from .metrics import gauge
+
+log = get_logger('callback_queue')
+
+DROP_OLDEST = 'drop_oldest'
+BLOCK = 'block'
+POLICIES = (DROP_OLDEST, BLOCK)
+
+# 消費執行緒每次取出的最多筆數
+BATCH = 256
+
+_queues = weakref.WeakSet()
+
+
+class CallbackQueue:
+    """固定容量的環狀緩衝區 + 消費執行緒"""
+
+    def __init__(self, capacity=8192, policy=BLOCK, consumers=1, name='callback'):
+        """
+        Args:
+            capacity: 最多可排隊的筆數
+            policy: 佇列滿時的處理方式（DROP_OLDEST / BLOCK）
+            consumers: 消費執行緒數
+            name: 名稱（執行緒名稱、監控標籤、排隊時間階段 <name>.queue）
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity 必須大於 0: {capacity}")
+        if policy not in POLICIES:
+            raise ValueError(f"不支援的 policy: {policy}（可用: {', '.join(POLICIES)}）")
+        self.capacity = capacity
+        self.policy = policy
+        self.consumers = consumers
+        self.name = name
+        self.dropped = 0
+        self.high_water = 0
+        self.wait = stage(f'{name}.queue')
+        self._buf = [None] * capacity
+        self._head = 0   # 下一筆要取出的位置
+        self._size = 0
+        self._busy = 0   # 已取出、尚在執行的筆數
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self.threads = []
+        _queues.add(self)
+
+    @property
+    def depth(self):
+        """排隊中 + 執行中的筆數"""
+        return self._size + self._busy
+
+    def start(self):
+        """啟動消費執行緒"""
+        for i in range(self.consumers - len(self.threads)):
+            thread = threading.Thread(target=self._run, name=f'{self.name}-consumer-{len(self.threads)}',
+                                      daemon=True)
+            self.threads.append(thread)
+            thread.start()
+        return self
+
+    def put(self, fn, *args, block=None):
+        """
+        排入一筆 fn(*args)
+
+        Args:
+            block: 佇列滿時是否等待；None 依 policy，True 用於不可丟棄的訊息（例如連線狀態）
+
+        Returns:
+            bool: 是否排入（佇列已停止時回傳 False）
+        """
+        item = (perf_counter_ns(), fn, args)
+        if block is None:
+            block = self.policy == BLOCK
+        with self._lock:
+            if self._closed:
+                return False
+            if self._size == self.capacity:
+                if block:
+                    while self._size == self.capacity and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        return False
+                else:
+                    self._buf[self._head] = None
+                    self._head = (self._head + 1) % self.capacity
+                    self._size -= 1
+                    self.dropped += 1
+            self._buf[(self._head + self._size) % self.capacity] = item
+            self._size += 1
+            if self._size > self.high_water:
+                self.high_water = self._size
+            self._not_empty.notify()
+        return True
+
+    def wrap(self, fn, block=None):
+        """把事件處理函式包成「只排入佇列」的版本（掛在 .NET 事件上），事件參數原樣排入"""
+        def enqueue(*args):
+            self.put(fn, *args, block=block)
+        return enqueue
+
+    def _take(self):
+        """取出最多 BATCH 筆（佇列停止且清空時回傳空 list）"""
+        with self._lock:
+            while not self._size and not self._closed:
+                self._not_empty.wait()
+            n = min(self._size, BATCH)
+            head = self._head
+            items = []
+            for _ in range(n):
+                items.append(self._buf[head])
+                self._buf[head] = None
+                head = (head + 1) % self.capacity
+            self._head = head
+            self._size -= n
+            self._busy += n
+            if n:
+                self._not_full.notify_all()
+        return items
+
+    def _run(self):
+        while True:
+            items = self._take()
+            if not items:
+                return
+            for t, fn, args in items:
+                self.wait.since(t)
+                try:
+                    fn(*args)
+                except Exception:
+                    log.exception("✗ %s 回呼發生錯誤", self.name)
+            with self._lock:
+                self._busy -= len(items)
+                if not self._size and not self._busy:
+                    self._idle.notify_all()
+
+    def join(self, timeout=None):
+        """
+        等待目前排入的訊息全部執行完
+
+        Returns:
+            bool: 是否在時限內清空
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._size and not self._busy, timeout)
+
+    def stop(self, timeout=5):
+        """停止接收新訊息，執行完已排入的訊息後結束消費執行緒"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self.threads = []
+
+    def stats(self):
+        return {
+            'name': self.name,
+            'policy': self.policy,
+            'capacity': self.capacity,
+            'depth': self.depth,
+            'high_water': self.high_water,
+            'dropped': self.dropped
+        }
+
+
+def _by_name(attr):
+    values = {}
+    for queue in list(_queues):
+        key = (queue.name,)
+        values[key] = values.get(key, 0) + getattr(queue, attr)
+    return values
+
+
+gauge('kgi_callback_queue_depth', '回呼佇列中排隊與執行中的筆數', lambda: _by_name('depth'), labels=('queue',))
+gauge('kgi_callback_queue_high_water', '回呼佇列曾達到的最大排隊筆數', lambda: _by_name('high_water'),
+      labels=('queue',))
+gauge('kgi_callback_queue_dropped_total', '佇列滿時丟棄的筆數（DROP_OLDEST）', lambda: _by_name('dropped'),
+      labels=('queue',), kind='counter')
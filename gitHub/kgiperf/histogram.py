@@ -0,0 +1,108 @@
+"""
+histogram.py - 固定記憶體的延遲直方圖（HDR 風格的 log-linear 分桶）
+數值（奈秒）依二進位位數分成指數區段，每個區段再等分 SUB_COUNT 個子桶：
+    v < 2 * SUB_COUNT             每個整數一個桶（精確）
+    其餘                          e = v.bit_length() - SUB_BITS - 1，桶 = e * SUB_COUNT + (v >> e)
+相對誤差不超過 1 / SUB_COUNT（約 3%），2 ** MAX_BITS 奈秒（約 18 分鐘）以上併入最後一桶。
+桶數固定（BUCKETS），記錄只做一次查表累加，不配置記憶體。
+"""
+
+SUB_BITS = 5
+SUB_COUNT = 1 << SUB_BITS
+MAX_BITS = 40
+BUCKETS = (MAX_BITS - SUB_BITS + 1) * SUB_COUNT
+_LINEAR = 2 * SUB_COUNT
+_LAST = BUCKETS - 1
+_NO_MIN = 1 << 62
+
+
+def bucket_of(value):
+    """數值對應的桶索引"""
+    if value < _LINEAR:
+        return value if value > 0 else 0
+    e = value.bit_length() - SUB_BITS - 1
+    index = e * SUB_COUNT + (value >> e)
+    return index if index < _LAST else _LAST
+
+
+def bucket_value(index):
+    """桶代表的數值（桶區間的中點）"""
+    if index < _LINEAR:
+        return index
+    e = index // SUB_COUNT - 1
+    top = index - e * SUB_COUNT
+    return (top << e) + ((1 << e) >> 1)
+
+
+class Histogram:
+    """單一執行緒寫入的延遲直方圖（奈秒）"""
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = _NO_MIN
+        self.max = 0
+
+    def record(self, value):
+        if value < _LINEAR:
+            index = value if value > 0 else 0
+        else:
+            e = value.bit_length() - SUB_BITS - 1
+            index = e * SUB_COUNT + (value >> e)
+            if index > _LAST:
+                index = _LAST
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value < self.min:
+            self.min = value
+
+    def merge(self, other):
+        """累加另一個直方圖（快照用）"""
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        if other.max > self.max:
+            self.max = other.max
+        if other.min < self.min:
+            self.min = other.min
+
+    def percentile(self, p):
+        """第 p 百分位數（0 ~ 100）"""
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * p / 100.0 + 0.5))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n:
+                seen += n
+                if seen >= rank:
+                    return min(max(bucket_value(i), self.min), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = _NO_MIN
+        self.max = 0
+
+    def summary(self):
+        """統計摘要（奈秒）"""
+        return {
+            'count': self.count,
+            'min': self.min if self.count else 0,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max
+        }
@@ -0,0 +1,188 @@
+"""
+metrics.py - 計數器與 Prometheus 文字格式輸出
+計數器（Counter）在每條執行緒各有一個 dict（threading.local），累加時不需要鎖，
+執行緒結束時併入共用的基底（Flask 每個請求一條執行緒也不會累積）；
+量值（Gauge）以函式表示，兩者都只在 render()（/metrics 被抓取時）才彙總，
+下單與回報路徑不會因為統計而等待。
+
+用法：
+    from kgiperf import counter, gauge, render
+    ORDERS = counter('kgi_orders_sent_total', '送出的委託筆數')
+    ORDERS.inc()
+    ERRORS = counter('kgi_broker_errors_total', '券商錯誤代碼', labels=('code',))
+    ERRORS.inc('105')
+    gauge('kgi_queue_depth', '佇列深度', lambda: pipeline.depth)
+    text = render()
+
+kgiperf 的計時階段（Stage）以 summary 輸出（秒），名稱為 kgi_<階段>_seconds。
+"""
+
+import threading
+
+from .recorder import recorder as _recorder, on_thread_exit
+
+QUANTILES = (('0.5', 'p50'), ('0.9', 'p90'), ('0.99', 'p99'), ('0.999', 'p999'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def metric_name(stage_name):
+    """計時階段名稱轉 Prometheus 名稱（order.fill → kgi_order_fill_seconds）"""
+    return 'kgi_' + ''.join(c if c.isalnum() else '_' for c in stage_name) + '_seconds'
+
+
+class Counter:
+    """每條執行緒各自累加的計數器（結束的執行緒併入 _base）"""
+
+    def __init__(self, name, help='', labels=(), annotate=None):
+        """
+        Args:
+            name: 指標名稱
+            help: 說明
+            labels: 標籤名稱（inc 時依序給值）
+            annotate: 輸出時依標籤值補充的標籤 annotate(values) -> dict（例如錯誤代碼說明）
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.annotate = annotate
+        self._local = threading.local()
+        self._shards = {}   # id(shard) -> shard（dict 內容相同時仍須以物件區分）
+        self._base = {}
+        self._lock = threading.Lock()
+
+    def _new_shard(self):
+        shard = {}
+        self._local.shard = shard
+        with self._lock:
+            self._shards[id(shard)] = shard
+        on_thread_exit(self._local, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        """執行緒結束：計數併入基底"""
+        with self._lock:
+            self._shards.pop(id(shard), None)
+            base = self._base
+            for key, n in shard.items():
+                base[key] = base.get(key, 0) + n
+
+    def inc(self, *values, n=1):
+        """累加（values 依 labels 順序）"""
+        try:
+            shard = self._local.shard
+        except AttributeError:
+            shard = self._new_shard()
+        shard[values] = shard.get(values, 0) + n
+
+    def values(self):
+        """彙總所有執行緒：{標籤值 tuple: 總數}"""
+        with self._lock:
+            total = dict(self._base)
+            shards = list(self._shards.values())
+        for shard in shards:
+            for key, n in shard.copy().items():
+                total[key] = total.get(key, 0) + n
+        return total
+
+    def value(self, *values):
+        return self.values().get(values, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        items = sorted(self.values().items())
+        if not items and not self.labels:
+            items = [((), 0)]
+        for key, n in items:
+            pairs = list(zip(self.labels, key))
+            if self.annotate is not None:
+                pairs += list(self.annotate(key).items())
+            lines.append(f'{self.name}{_labels(pairs)} {n}')
+        return lines
+
+
+class Gauge:
+    """
+    抓取時才呼叫函式取得的量值；函式可回傳數字或 {標籤值 tuple: 數字}
+    kind='counter' 用於既有物件上只增不減的計數（例如委託佇列的合併筆數）
+    """
+
+    def __init__(self, name, help, fn, labels=(), kind='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+        self.kind = kind
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        try:
+            value = self.fn()
+        except Exception:
+            return lines
+        if isinstance(value, dict):
+            for key, n in sorted(value.items()):
+                lines.append(f'{self.name}{_labels(list(zip(self.labels, key)))} {n}')
+        elif value is not None:
+            lines.append(f'{self.name} {value}')
+        return lines
+
+
+class Registry:
+    """指標登錄表（同名重複登錄時回傳既有的計數器，量值以新函式取代）"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name, help='', labels=(), annotate=None):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = Counter(name, help, labels, annotate)
+        return metric
+
+    def gauge(self, name, help, fn, labels=(), kind='gauge'):
+        with self._lock:
+            metric = self.metrics[name] = Gauge(name, help, fn, labels, kind)
+        return metric
+
+    def render(self, stages=True):
+        """Prometheus 文字格式（text/plain; version=0.0.4）"""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines += metric.render()
+        if stages:
+            lines += render_stages()
+        return '\n'.join(lines) + '\n'
+
+
+def render_stages(recorder=_recorder):
+    """計時階段以 summary 輸出（秒）"""
+    lines = []
+    for name, stage in sorted(list(recorder.stages.items())):
+        hist = stage.histogram()
+        metric = metric_name(name)
+        lines.append(f'# HELP {metric} {name} 延遲（秒）')
+        lines.append(f'# TYPE {metric} summary')
+        summary = hist.summary()
+        for quantile, key in QUANTILES:
+            value = f'{summary[key] / 1e9:.9f}' if hist.count else 'NaN'
+            lines.append(f'{metric}{{quantile="{quantile}"}} {value}')
+        lines.append(f'{metric}_sum {hist.total / 1e9:.9f}')
+        lines.append(f'{metric}_count {hist.count}')
+    return lines
+
+
+registry = Registry()
+counter = registry.counter
+gauge = registry.gauge
+render = registry.render
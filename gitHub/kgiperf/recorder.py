@@ -0,0 +1,191 @@
+"""
+recorder.py - 熱路徑的階段計時
+每個階段（Stage）在每條執行緒各有一個 Histogram（threading.local），記錄時不需要鎖，
+快照時再合併；執行緒結束時其直方圖併入共用的基底，記憶體為 存活執行緒數 × 階段數 × BUCKETS
+（Flask 每個請求一條執行緒也不會持續增加）。
+
+用法：
+    from kgiperf import stage, now
+    ORDER_CALL = stage('order.call')
+    t = now()
+    ...
+    ORDER_CALL.since(t)
+
+封包起點：行情封包進入時以 mark(t) 記下接收時間（同一執行緒），之後下單時以
+origin() 取得，計算「封包接收 → 送單」的延遲；封包處理完以 clear() 清除。
+"""
+
+import os
+import threading
+import weakref
+from time import perf_counter_ns
+
+from .histogram import Histogram
+
+now = perf_counter_ns
+
+# KGI_PERF=0 時停止記錄（呼叫仍在，但立即返回）
+enabled = os.environ.get('KGI_PERF', '1') != '0'
+
+_origin = threading.local()
+
+
+def mark(t):
+    """記下目前執行緒正在處理的封包接收時間（perf_counter_ns）"""
+    _origin.t = t
+
+
+def origin():
+    """目前執行緒正在處理的封包接收時間，沒有則回傳 0"""
+    return getattr(_origin, 't', 0)
+
+
+def clear():
+    _origin.t = 0
+
+
+class _ThreadSentinel:
+    __slots__ = ('__weakref__',)
+
+
+def on_thread_exit(local, fn, *args):
+    """
+    目前執行緒結束時呼叫 fn(*args)
+    執行緒結束時 threading.local 中的值會被釋放，以放在 local 中的 sentinel 被回收觸發 finalize。
+    """
+    sentinel = _ThreadSentinel()
+    local.sentinel = sentinel
+    weakref.finalize(sentinel, fn, *args).atexit = False
+
+
+class Stage:
+    """單一階段的延遲統計（每條執行緒一個直方圖，結束的執行緒併入 _base）"""
+    __slots__ = ('name', '_local', '_hists', '_base', '_lock')
+
+    def __init__(self, name):
+        self.name = name
+        self._local = threading.local()
+        self._hists = []
+        self._base = Histogram()
+        self._lock = threading.Lock()
+
+    def _new_hist(self):
+        hist = Histogram()
+        self._local.hist = hist
+        with self._lock:
+            self._hists.append(hist)
+        on_thread_exit(self._local, self._retire, hist)
+        return hist
+
+    def _retire(self, hist):
+        """執行緒結束：直方圖併入基底"""
+        with self._lock:
+            self._hists = [h for h in self._hists if h is not hist]
+            self._base.merge(hist)
+
+    def record(self, ns):
+        """記錄一筆耗時（奈秒）"""
+        if not enabled:
+            return
+        try:
+            hist = self._local.hist
+        except AttributeError:
+            hist = self._new_hist()
+        hist.record(ns)
+
+    def since(self, start):
+        """記錄 start（now() 的回傳值）到現在的耗時，回傳現在時間（可接續下一階段）"""
+        t = perf_counter_ns()
+        if enabled:
+            try:
+                hist = self._local.hist
+            except AttributeError:
+                hist = self._new_hist()
+            hist.record(t - start)
+        return t
+
+    def span(self):
+        """以 with 區塊計時（多一次物件建立的成本，熱路徑建議用 since）"""
+        return _Span(self)
+
+    def histogram(self):
+        """合併所有執行緒的直方圖"""
+        merged = Histogram()
+        with self._lock:
+            merged.merge(self._base)
+            hists = list(self._hists)
+        for hist in hists:
+            merged.merge(hist)
+        return merged
+
+    def snapshot(self):
+        return self.histogram().summary()
+
+    def reset(self):
+        with self._lock:
+            self._base.reset()
+            for hist in self._hists:
+                hist.reset()
+
+
+class _Span:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.stage.since(self.start)
+        return False
+
+
+class Recorder:
+    """階段登錄表"""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name):
+        """取得階段（不存在時建立）"""
+        stage = self.stages.get(name)
+        if stage is None:
+            with self._lock:
+                stage = self.stages.get(name)
+                if stage is None:
+                    stage = self.stages[name] = Stage(name)
+        return stage
+
+    def snapshot(self):
+        """
+        所有階段的統計（奈秒）
+
+        Returns:
+            dict: {階段名稱: {'count', 'min', 'mean', 'p50', 'p90', 'p99', 'p999', 'max'}}
+        """
+        return {name: stage.snapshot() for name, stage in list(self.stages.items())}
+
+    def reset(self):
+        for stage in list(self.stages.values()):
+            stage.reset()
+
+    def report(self):
+        """以微秒為單位的文字報表"""
+        lines = [f"{'階段':<16}{'筆數':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'max':>10}  (µs)"]
+        for name, s in sorted(self.snapshot().items()):
+            if not s['count']:
+                continue
+            lines.append(f"{name:<16}{s['count']:>10,}" +
+                         ''.join(f"{s[k] / 1000:>10.1f}" for k in ('p50', 'p90', 'p99', 'p999', 'max')))
+        return '\n'.join(lines)
+
+
+recorder = Recorder()
+stage = recorder.stage
+snapshot = recorder.snapshot
+reset = recorder.reset
+report = recorder.report
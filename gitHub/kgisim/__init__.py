@@ -0,0 +1,24 @@
+"""
+kgisim - KGI QuoteCom / TaiFexCom 的純 Python 模擬器
+不需要 .NET 與 KGI 的 DLL，即可在任何平台執行報價與下單的完整流程（開發、壓力測試、重播）。
+
+類別、列舉與 .NET 型別的名稱與 DLL 相同，範例程式以環境變數切換：
+    KGI_BACKEND=dll   使用 pythonnet 與 DLL（預設）
+    KGI_BACKEND=sim   使用本模擬器
+
+重播資料：
+    from kgisim import default_market, synthetic_ticks, csv_ticks, TickReplayer
+    TickReplayer(default_market(), 'TMFB6', csv_ticks('TMFB6_tick_20260105.csv'), rate=100_000).start()
+
+下單由 MatchingEngine 撮合，回報延遲以 KGI_SIM_LATENCY_MS / KGI_SIM_JITTER_MS（毫秒）設定。
+"""
+
+from .clrtypes import Decimal, UInt16, Int64, Event
+from .enums import (MARKET_FLAG, COM_STATUS, RECOVER_STATUS, ORDER_TYPE, SIDE_FLAG, PRICE_FLAG,
+                    TIME_IN_FORCE, POSITION_EFFECT, OFFICE_FLAG, Currency_Excode, ProListQueryField)
+from .market import (SimMarket, default_market, synthetic_ticks, csv_ticks, array_ticks,
+                     TickReplayer)
+from .matching import MatchingEngine
+from .stream import ReportStream
+from .quote import QuoteCom
+from .trade import TaiFexCom
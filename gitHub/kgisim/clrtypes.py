@@ -0,0 +1,57 @@
+"""
+clrtypes.py - .NET 型別與事件的 Python 替代品
+只實作範例程式實際用到的部分：System.Decimal / UInt16 / Int64，
+以及 pythonnet 事件的 += / -= 註冊方式。
+"""
+
+
+class Decimal(float):
+    """System.Decimal：可直接當 float 運算，並提供 ToString()"""
+    __slots__ = ()
+
+    def ToString(self):
+        text = repr(float(self))
+        return text[:-2] if text.endswith('.0') else text
+
+
+def _checked(value, low, high, name):
+    value = int(value)
+    if not low <= value <= high:
+        raise OverflowError(f"{value} 超出 {name} 範圍")
+    return value
+
+
+def UInt16(value):
+    """System.UInt16（超出範圍時與 .NET 相同丟出溢位例外）"""
+    return _checked(value, 0, 0xFFFF, 'UInt16')
+
+
+def Int64(value):
+    """System.Int64"""
+    return _checked(value, -(1 << 63), (1 << 63) - 1, 'Int64')
+
+
+class Event:
+    """.NET 事件：以 += / -= 註冊處理函式，呼叫時依序通知"""
+    __slots__ = ('handlers',)
+
+    def __init__(self):
+        self.handlers = ()
+
+    def __iadd__(self, handler):
+        self.handlers = self.handlers + (handler,)
+        return self
+
+    def __isub__(self, handler):
+        handlers = list(self.handlers)
+        if handler in handlers:
+            handlers.remove(handler)
+        self.handlers = tuple(handlers)
+        return self
+
+    def __bool__(self):
+        return bool(self.handlers)
+
+    def __call__(self, *args):
+        for handler in self.handlers:
+            handler(*args)
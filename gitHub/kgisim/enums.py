@@ -0,0 +1,83 @@
+"""
+enums.py - Intelligence 命名空間的列舉
+成員名稱與 DLL 相同，ToString() 回傳成員名稱（與 .NET 列舉相同）。
+"""
+
+from enum import IntEnum
+
+
+class _NetEnum(IntEnum):
+    def ToString(self):
+        return self.name
+
+
+class MARKET_FLAG(_NetEnum):
+    MF_FUT = 0
+    MF_OPT = 1
+
+
+class COM_STATUS(_NetEnum):
+    CONNECT_READY = 0
+    CONNECT_FAIL = 1
+    DISCONNECTED = 2
+    LOGIN_READY = 3
+    LOGIN_FAIL = 4
+    SUBSCRIBE = 5
+    UNSUBSCRIBE = 6
+    ACK_REQUESTID = 7
+    QUEUE_WARNING = 8
+
+
+class RECOVER_STATUS(_NetEnum):
+    RS_DONE = 0
+    RS_BEGIN = 1
+    RS_NOINFO = 2
+
+
+class ORDER_TYPE(_NetEnum):
+    OT_NEW = 0
+    OT_CANCEL = 1
+    OT_MODIFY = 2
+    OT_MODIFY_PRICE = 3
+    OT_MODIFY_QTY = 4
+
+
+class SIDE_FLAG(_NetEnum):
+    SF_BUY = 0
+    SF_SELL = 1
+
+
+class PRICE_FLAG(_NetEnum):
+    PF_SPECIFIED = 0
+    PF_MARKET = 1
+    PF_STOP_MARKET = 2
+    PF_STOP_SPECIFID = 3
+    PF_MARKET_RANGE = 4
+
+
+class TIME_IN_FORCE(_NetEnum):
+    TIF_ROD = 0
+    TIF_IOC = 1
+    TIF_FOK = 2
+
+
+class POSITION_EFFECT(_NetEnum):
+    PE_OPEN = 0
+    PE_CLOSE = 1
+    PE_DAY_TRADE = 2
+    PE_AUTO = 3
+
+
+class OFFICE_FLAG(_NetEnum):
+    OF_SPEEDY = 0
+    OF_AS400 = 1
+
+
+class Currency_Excode(_NetEnum):
+    CE_TOFOREIGN = 1
+    CE_TONTD = 2
+
+
+class ProListQueryField(_NetEnum):
+    PLQF_STOCKNO = 0
+    PLQF_STOCKKIND = 1
@@ -0,0 +1,327 @@
+"""
+market.py - 模擬市場：商品行情狀態、成交推播與 tick 重播
+SimMarket 保存每個商品的最後成交、當日高低與累計量，發布成交時建立一個 PI20020
+封包並通知所有已連線的 QuoteCom（各自依訂閱過濾）；TaiFexCom 的委託由
+matching.MatchingEngine 以此成交價為中心的造市委託與穿價成交撮合。
+
+tick 來源為 (時間, 價格, 數量) 或 (時間, 價格, 數量, 累計量) 的序列：
+    synthetic_ticks()  隨機漫步產生
+    csv_ticks()        讀取 history.py 記錄的 *_tick_YYYYMMDD.csv
+    array_ticks()      由陣列組成（例如 tick_store.TickStoreReader 的欄位）
+TickReplayer 以指定速率（每秒筆數，最高約 10 萬筆）或不限速重播。
+"""
+
+import csv
+import random
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from time import perf_counter
+
+from .clrtypes import Decimal
+from .packets import PI20020, PI21020
+
+NIGHT_SESSION_START = (15, 0)
+NIGHT_SESSION_END = (5, 0)
+
+# 重播時只在領先預定時間超過此秒數才 sleep（避免每筆都讓出 CPU）
+_PACE_SLACK = 0.002
+
+
+def session_of(dt):
+    """盤別：0 日盤，1 夜盤"""
+    hm = (dt.hour, dt.minute)
+    return 1 if hm >= NIGHT_SESSION_START or hm < NIGHT_SESSION_END else 0
+
+
+def match_time(dt):
+    """datetime 轉成封包的 MatchTime（HHMMSS + 微秒 6 碼）"""
+    return '%02d%02d%02d%06d' % (dt.hour, dt.minute, dt.second, dt.microsecond)
+
+
+class SymbolQuote:
+    """單一商品的行情狀態"""
+    __slots__ = ('symbol', 'price_decimal', 'ref_price', 'last_price', 'last_qty', 'total_qty',
+                 'open', 'high', 'low', 'last_time', 'session', 'seq', 'history')
+
+    def __init__(self, symbol, price_decimal=0, ref_price=0.0, history=100_000):
+        self.symbol = symbol
+        self.price_decimal = price_decimal
+        self.ref_price = ref_price
+        self.last_price = None
+        self.last_qty = 0
+        self.total_qty = 0
+        self.open = None
+        self.high = None
+        self.low = None
+        self.last_time = None
+        self.session = None
+        self.seq = 0
+        self.history = deque(maxlen=history)  # 最近的成交（回補用）
+
+    @property
+    def rise_limit(self):
+        return round(self.ref_price * 1.1, self.price_decimal)
+
+    @property
+    def fall_limit(self):
+        return round(self.ref_price * 0.9, self.price_decimal)
+
+
+class SimMarket:
+    """模擬市場（同一處理程序內的 QuoteCom / TaiFexCom 共用）"""
+
+    def __init__(self, price_decimal=0, clock=datetime.now, history=100_000):
+        """
+        Args:
+            price_decimal: 新商品預設的價格小數位數
+            clock: 沒有指定成交時間時使用的時鐘
+            history: 每個商品保留的最近成交筆數（RetriveRecover 回補用）
+        """
+        self.price_decimal = price_decimal
+        self.clock = clock
+        self.history = history
+        self.quotes = {}
+        self.listeners = ()
+        self.lock = threading.Lock()
+        self.engine = None  # 撮合引擎（matching.MatchingEngine.for_market 建立）
+
+    def quote(self, symbol, ref_price=None):
+        """取得商品行情狀態（不存在時建立）"""
+        q = self.quotes.get(symbol)
+        if q is None:
+            with self.lock:
+                q = self.quotes.get(symbol)
+                if q is None:
+                    q = SymbolQuote(symbol, self.price_decimal, ref_price or 0.0, self.history)
+                    self.quotes[symbol] = q
+        if ref_price is not None:
+            q.ref_price = ref_price
+        return q
+
+    def last_price(self, symbol):
+        q = self.quotes.get(symbol)
+        return q.last_price if q is not None else None
+
+    def add_listener(self, listener):
+        """註冊成交推播 listener(symbol, pkg)"""
+        with self.lock:
+            if listener not in self.listeners:
+                self.listeners = self.listeners + (listener,)
+
+    def remove_listener(self, listener):
+        """移除 listener；以 == 比對（每次取得的 bound method 都是新物件）"""
+        with self.lock:
+            self.listeners = tuple(l for l in self.listeners if l != listener)
+
+    def publish(self, symbol, price, qty, time=None, total_qty=None, packet=PI20020):
+        """
+        發布一筆成交：更新行情狀態並推播成交價量封包
+
+        Args:
+            symbol: 商品代碼
+            price: 成交價
+            qty: 單筆成交量
+            time: 成交時間（datetime），None 表示目前時間
+            total_qty: 累計成交量，None 表示由單筆量累加
+            packet: 封包類別（PI20020 / PI20022）
+
+        Returns:
+            封包物件
+        """
+        q = self.quotes.get(symbol) or self.quote(symbol)
+        if time is None:
+            time = self.clock()
+        if total_qty is None:
+            total_qty = q.total_qty + qty
+        session = session_of(time)
+        if session != q.session:
+            # 新的盤別：重設開高低
+            q.session = session
+            q.open = q.high = q.low = price
+            if not q.ref_price:
+                q.ref_price = price
+        elif price > q.high:
+            q.high = price
+        elif price < q.low:
+            q.low = price
+        q.last_price = price
+        q.last_qty = qty
+        q.total_qty = total_qty
+        q.last_time = time
+        q.seq += 1
+        q.history.append((time, price, qty, total_qty))
+
+        pkg = packet('F', symbol, match_time(time), q.seq, 'Y', '', qty, q.price_decimal,
+                     total_qty, 0, 0, Decimal(price))
+        for listener in self.listeners:
+            listener(symbol, pkg)
+        return pkg
+
+    def recover_packets(self, symbol, start_hhmm, end_hhmm):
+        """回補 start_hhmm ~ end_hhmm（HHMM，含）之間的成交，回傳 PI21020 封包列表"""
+        q = self.quotes.get(symbol)
+        if q is None:
+            return []
+        start, end = int(start_hhmm), int(end_hhmm)
+        packets = []
+        for seq, (time, price, qty, total) in enumerate(q.history, q.seq - len(q.history) + 1):
+            if start <= time.hour * 100 + time.minute <= end:
+                packets.append(PI21020('F', symbol, match_time(time), seq, 'Y', '', qty,
+                                       q.price_decimal, total, 0, 0, Decimal(price)))
+        return packets
+
+
+_default_market = None
+
+
+def default_market():
+    """同一處理程序共用的模擬市場"""
+    global _default_market
+    if _default_market is None:
+        _default_market = SimMarket()
+    return _default_market
+
+
+# ============================================================
+# tick 來源
+# ============================================================
+
+def synthetic_ticks(count=None, start_price=23000.0, start=None, interval=0.05, tick_size=1.0,
+                    max_qty=5, seed=0):
+    """
+    隨機漫步的 tick
+
+    Args:
+        count: 筆數，None 表示無限
+        start_price: 起始價格
+        start: 第一筆時間，None 表示目前時間
+        interval: 每筆間隔秒數（成交時間用，與重播速率無關）
+        tick_size: 最小跳動點
+        max_qty: 單筆最大口數
+        seed: 亂數種子
+
+    Yields:
+        tuple: (時間, 價格, 數量)
+    """
+    rnd = random.Random(seed)
+    time = start or datetime.now()
+    step = timedelta(seconds=interval)
+    price = start_price
+    n = 0
+    while count is None or n < count:
+        price = max(tick_size, price + tick_size * rnd.randint(-2, 2))
+        yield time, price, rnd.randint(1, max_qty)
+        time += step
+        n += 1
+
+
+def csv_ticks(path):
+    """
+    讀取 history.py 記錄的 tick CSV（時間, 價格, 數量, 累計量）
+
+    Yields:
+        tuple: (時間, 價格, 數量, 累計量)
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 4:
+                continue
+            try:
+                yield (datetime.fromisoformat(row[0]), float(row[1]), int(float(row[2])),
+                       int(float(row[3])))
+            except ValueError:
+                continue
+
+
+def array_ticks(times, prices, quantities, totals=None):
+    """
+    由陣列組成 tick（times 為 datetime 或 epoch 微秒）
+
+    Yields:
+        tuple: (時間, 價格, 數量[, 累計量])
+    """
+    for i, t in enumerate(times):
+        if not isinstance(t, datetime):
+            t = datetime(1970, 1, 1) + timedelta(microseconds=int(t))
+        if totals is None:
+            yield t, float(prices[i]), int(quantities[i])
+        else:
+            yield t, float(prices[i]), int(quantities[i]), int(totals[i])
+
+
+class TickReplayer:
+    """以固定速率將 tick 序列發布到 SimMarket"""
+
+    def __init__(self, market, symbol, ticks, rate=None, packet=PI20020, on_done=None):
+        """
+        Args:
+            market: SimMarket
+            symbol: 商品代碼
+            ticks: tick 序列（見本模組說明）
+            rate: 每秒筆數，None 或 0 表示不限速
+            packet: 封包類別（PI20020 / PI20022）
+            on_done: 重播結束回呼 on_done(replayer)
+        """
+        self.market = market
+        self.symbol = symbol
+        self.ticks = ticks
+        self.rate = rate
+        self.packet = packet
+        self.on_done = on_done
+        self.sent = 0
+        self.elapsed = 0.0
+        self.thread = None
+        self._stop = threading.Event()
+
+    @property
+    def actual_rate(self):
+        """實際達成的每秒筆數"""
+        return self.sent / self.elapsed if self.elapsed > 0 else 0.0
+
+    def run(self):
+        """在目前執行緒重播（直到序列結束或 stop()），回傳已發布筆數"""
+        publish = self.market.publish
+        symbol = self.symbol
+        packet = self.packet
+        stop = self._stop
+        interval = 1.0 / self.rate if self.rate else 0.0
+        start = perf_counter()
+        sent = 0
+        try:
+            for tick in self.ticks:
+                if len(tick) > 3:
+                    publish(symbol, tick[1], tick[2], tick[0], tick[3], packet)
+                else:
+                    publish(symbol, tick[1], tick[2], tick[0], None, packet)
+                sent += 1
+                if interval:
+                    ahead = start + sent * interval - perf_counter()
+                    if ahead > _PACE_SLACK:
+                        if stop.wait(ahead):
+                            break
+                    elif stop.is_set():
+                        break
+                elif not sent & 0x3FF and stop.is_set():
+                    break
+        finally:
+            self.sent = sent
+            self.elapsed = perf_counter() - start
+        if self.on_done is not None:
+            self.on_done(self)
+        return sent
+
+    def start(self):
+        """在背景執行緒重播"""
+        self.thread = threading.Thread(target=self.run, name=f"replay-{self.symbol}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self.thread is not None:
+            self.thread.join(timeout)
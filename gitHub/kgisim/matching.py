@@ -0,0 +1,331 @@
+"""
+matching.py - 模擬撮合引擎（價格優先、時間優先）
+每個商品一本委託簿，同一 SimMarket 上所有 TaiFexCom 的委託在此互相撮合。
+
+流動性：
+    造市委託  每筆行情成交後，以成交價為中心掛出 depth 檔、每檔 level_qty 口的買賣委託
+              （買 = 成交價 - k 檔，賣 = 成交價 + k 檔），撤換前一筆行情的造市委託
+    穿價成交  行情成交價穿過留在委託簿的客戶委託時，以委託價成交；
+              成交價剛好等於委託價時，最多成交該筆行情的數量（依時間優先分配）
+客戶委託之間的成交不會發布到 SimMarket（行情仍以重播 / 外部 tick 為準）。
+
+委託條件（與 money.py 使用的組合相同）：
+    SP  限價：可成交部分依價格 / 時間優先成交，ROD 剩餘留在委託簿，IOC 剩餘取消
+    M   市價：掃對手方到沒有委託為止，剩餘取消
+    MR  範圍市價：以對手方最佳價 ± mr_ticks 檔為限價，剩餘取消
+    FOK 先檢查可全部成交，否則整筆取消
+
+委託物件只需要 side / qty / cum_qty / status / price / price_flag / tif / rest_price / owner，
+owner 不為 None 時以 owner._on_fill(order, price, qty) 與
+owner._on_cancel(order, before_qty, code) 通知成交與取消（在撮合鎖內呼叫）。
+"""
+
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+
+from .enums import SIDE_FLAG, PRICE_FLAG, TIME_IN_FORCE
+
+BUY = SIDE_FLAG.SF_BUY
+SELL = SIDE_FLAG.SF_SELL
+
+# 取消原因（對應 TaiFexCom.GetMessageMap）
+CANCEL_NO_PRICE = 2
+CANCEL_FOK = 3
+CANCEL_IOC = 4
+
+_engines_lock = threading.Lock()
+
+
+class MakerOrder:
+    """造市委託（沒有 owner，不產生回報）"""
+    __slots__ = ('side', 'price', 'qty', 'cum_qty', 'status', 'rest_price', 'owner')
+
+    def __init__(self, side, price, qty):
+        self.side = side
+        self.price = price
+        self.qty = qty
+        self.cum_qty = 0
+        self.status = 'working'
+        self.rest_price = None
+        self.owner = None
+
+    @property
+    def leave_qty(self):
+        return self.qty - self.cum_qty
+
+
+class OrderBook:
+    """單一商品的委託簿：{價格: deque[委託]} 與排序後的價格列表"""
+    __slots__ = ('symbol', 'bids', 'asks', 'bid_prices', 'ask_prices', 'makers', 'quoted_at')
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.bids = {}
+        self.asks = {}
+        self.bid_prices = []    # 由低到高，最佳買價在最後
+        self.ask_prices = []    # 由低到高，最佳賣價在最前
+        self.makers = []
+        self.quoted_at = None
+
+    def add(self, order, price):
+        """委託掛入委託簿（同價位排在最後）"""
+        if order.side == BUY:
+            levels, prices = self.bids, self.bid_prices
+        else:
+            levels, prices = self.asks, self.ask_prices
+        queue = levels.get(price)
+        if queue is None:
+            queue = levels[price] = deque()
+            insort(prices, price)
+        queue.append(order)
+        order.rest_price = price
+
+    def remove(self, order):
+        """自委託簿移除（刪單或造市撤換）"""
+        price = order.rest_price
+        if price is None:
+            return
+        order.rest_price = None
+        if order.side == BUY:
+            levels, prices = self.bids, self.bid_prices
+        else:
+            levels, prices = self.asks, self.ask_prices
+        queue = levels.get(price)
+        if queue is None:
+            return
+        try:
+            queue.remove(order)
+        except ValueError:
+            return
+        if not queue:
+            self._drop_level(levels, prices, price)
+
+    @staticmethod
+    def _drop_level(levels, prices, price):
+        del levels[price]
+        i = bisect_left(prices, price)
+        if i < len(prices) and prices[i] == price:
+            del prices[i]
+
+    def best_bid(self):
+        return self.bid_prices[-1] if self.bid_prices else None
+
+    def best_ask(self):
+        return self.ask_prices[0] if self.ask_prices else None
+
+    def head(self, side):
+        """
+        對手方最佳價位的第一筆委託
+
+        Args:
+            side: 進場委託的買賣別（買單取賣方，賣單取買方）
+
+        Returns:
+            tuple: (價格, 委託) 或 (None, None)
+        """
+        if side == BUY:
+            levels, prices, index = self.asks, self.ask_prices, 0
+        else:
+            levels, prices, index = self.bids, self.bid_prices, -1
+        while prices:
+            price = prices[index]
+            queue = levels[price]
+            while queue and (queue[0].status != 'working' or queue[0].leave_qty <= 0):
+                queue.popleft().rest_price = None
+            if queue:
+                return price, queue[0]
+            self._drop_level(levels, prices, price)
+        return None, None
+
+    def available(self, side, limit, qty):
+        """對手方在限價內可成交的口數（累計到 qty 即停止）"""
+        if side == BUY:
+            levels, prices = self.asks, self.ask_prices
+            walk = prices
+            acceptable = limit.__ge__
+        else:
+            levels, prices = self.bids, self.bid_prices
+            walk = reversed(prices)
+            acceptable = limit.__le__
+        total = 0
+        for price in walk:
+            if not acceptable(price):
+                break
+            for order in levels[price]:
+                if order.status == 'working':
+                    total += order.leave_qty
+                    if total >= qty:
+                        return total
+        return total
+
+
+class MatchingEngine:
+    """SimMarket 上的撮合引擎（同一市場共用一個，見 for_market）"""
+
+    def __init__(self, market, tick_size=1.0, depth=5, level_qty=10, mr_ticks=10):
+        """
+        Args:
+            market: SimMarket
+            tick_size: 最小跳動點
+            depth: 造市委託的檔數（每邊）
+            level_qty: 造市委託每檔口數，0 表示不掛造市委託
+            mr_ticks: 範圍市價單的保護範圍（對手方最佳價 ± 檔數）
+        """
+        self.market = market
+        self.tick_size = tick_size
+        self.depth = depth
+        self.level_qty = level_qty
+        self.mr_ticks = mr_ticks
+        self.books = {}
+        self.lock = threading.RLock()
+        self.trades = 0
+        market.add_listener(self._on_market)
+
+    @classmethod
+    def for_market(cls, market, **kwargs):
+        """取得市場共用的撮合引擎（不存在時建立）"""
+        with _engines_lock:
+            if market.engine is None:
+                market.engine = cls(market, **kwargs)
+        return market.engine
+
+    def _price(self, price):
+        return round(price, 6)
+
+    def book(self, symbol):
+        """取得商品委託簿（不存在時建立，並依最後成交價掛出造市委託）"""
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = OrderBook(symbol)
+            last = self.market.last_price(symbol)
+            if last is not None:
+                self._requote(book, last)
+        return book
+
+    # ------------------------------------------------------------
+    # 委託
+    # ------------------------------------------------------------
+    def submit(self, order, symbol):
+        """新委託進入撮合，回傳 True 表示仍留在委託簿"""
+        with self.lock:
+            book = self.book(symbol)
+            limit = self._limit(book, order)
+            if limit is None:
+                self._cancel(order, CANCEL_NO_PRICE)
+                return False
+            if order.tif == TIME_IN_FORCE.TIF_FOK and \
+                    book.available(order.side, limit, order.leave_qty) < order.leave_qty:
+                self._cancel(order, CANCEL_FOK)
+                return False
+            self._cross(book, order, limit)
+            if order.leave_qty <= 0:
+                return False
+            if order.tif == TIME_IN_FORCE.TIF_ROD and order.price_flag == PRICE_FLAG.PF_SPECIFIED:
+                book.add(order, limit)
+                return True
+            self._cancel(order, CANCEL_IOC)
+            return False
+
+    def cancel(self, order, symbol):
+        """刪除留在委託簿的委託（不產生回報，由呼叫端回報）"""
+        with self.lock:
+            book = self.books.get(symbol)
+            if book is not None:
+                book.remove(order)
+
+    def _limit(self, book, order):
+        """委託在撮合時可接受的最差價格，None 表示無法成交也不能留在委託簿"""
+        flag = order.price_flag
+        if flag == PRICE_FLAG.PF_SPECIFIED:
+            return self._price(order.price)
+        price, _ = book.head(order.side)
+        if price is None:
+            return None
+        if flag == PRICE_FLAG.PF_MARKET:
+            return float('inf') if order.side == BUY else float('-inf')
+        offset = self.mr_ticks * self.tick_size
+        return self._price(price + offset if order.side == BUY else price - offset)
+
+    def _cross(self, book, order, limit):
+        """依價格 / 時間優先與對手方成交"""
+        side = order.side
+        while order.leave_qty > 0:
+            price, resting = book.head(side)
+            if price is None or (price > limit if side == BUY else price < limit):
+                break
+            qty = min(order.leave_qty, resting.leave_qty)
+            self._trade(resting, price, qty)
+            self._trade(order, price, qty)
+            if resting.leave_qty <= 0:
+                book.remove(resting)
+
+    def _trade(self, order, price, qty):
+        order.cum_qty += qty
+        if order.leave_qty <= 0:
+            order.status = 'filled'
+        owner = order.owner
+        if owner is not None:
+            self.trades += 1
+            owner._on_fill(order, price, qty)
+
+    def _cancel(self, order, code):
+        before = order.leave_qty
+        order.qty = order.cum_qty
+        order.status = 'cancelled'
+        if order.owner is not None:
+            order.owner._on_cancel(order, before, code)
+
+    # ------------------------------------------------------------
+    # 行情
+    # ------------------------------------------------------------
+    def _on_market(self, symbol, pkg):
+        """行情成交：撤換造市委託並撮合被穿價的客戶委託"""
+        book = self.books.get(symbol)
+        if book is None:
+            return
+        price = self._price(float(pkg.Price))
+        with self.lock:
+            self._withdraw(book)
+            self._trade_through(book, price, pkg.MatchQuantity)
+            self._requote(book, price)
+
+    def _withdraw(self, book):
+        for maker in book.makers:
+            book.remove(maker)
+        book.makers.clear()
+
+    def _trade_through(self, book, price, volume):
+        """行情成交價穿過（或等於）客戶委託價時成交"""
+        # 買方：委託價 >= 成交價；賣方：委託價 <= 成交價
+        for side in (SELL, BUY):
+            while True:
+                rest_price, resting = book.head(side)
+                if rest_price is None:
+                    break
+                if side == SELL and rest_price < price or side == BUY and rest_price > price:
+                    break
+                if rest_price == price:
+                    if volume <= 0:
+                        break
+                    qty = min(resting.leave_qty, volume)
+                    volume -= qty
+                else:
+                    qty = resting.leave_qty
+                self._trade(resting, rest_price, qty)
+                if resting.leave_qty <= 0:
+                    book.remove(resting)
+
+    def _requote(self, book, price):
+        """以 price 為中心掛出造市委託"""
+        book.quoted_at = price
+        if not self.level_qty:
+            return
+        tick = self.tick_size
+        for k in range(1, self.depth + 1):
+            bid = MakerOrder(BUY, self._price(price - k * tick), self.level_qty)
+            ask = MakerOrder(SELL, self._price(price + k * tick), self.level_qty)
+            book.add(bid, bid.price)
+            book.add(ask, ask.price)
+            book.makers.append(bid)
+            book.makers.append(ask)
@@ -0,0 +1,300 @@
+"""
+packets.py - 模擬器回傳的封包物件
+欄位名稱與 DLL 的封包相同（請參考格式附件），範例程式可直接以 pkg.欄位 讀取；
+每種封包一個 __slots__ 類別，DT 為封包代碼（int，與 pkg.DT 相同）。
+價格類欄位使用 clrtypes.Decimal（可 float() 也可 ToString()）。
+"""
+
+from .clrtypes import Decimal
+
+_ZERO = Decimal(0)
+
+
+class Packet:
+    """封包基底類別
+
+    子類別以 FIELDS 宣告欄位（同時作為 __slots__）、DEFAULTS 指定非 0 的預設值；
+    建構時可依 FIELDS 順序傳入位置參數，或以關鍵字指定欄位。
+    """
+    __slots__ = ()
+    DT = 0
+    FIELDS = ()
+    DEFAULTS = {}
+    _DEFAULTS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'FIELDS' in cls.__dict__:
+            cls._DEFAULTS = tuple(cls.DEFAULTS.get(name, 0) for name in cls.FIELDS)
+
+    def __init__(self, *args, **kwargs):
+        values = self._DEFAULTS
+        if args:
+            values = args + values[len(args):]
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __repr__(self):
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+
+# ============================================================
+# 共用
+# ============================================================
+
+class P001503_2(Packet):
+    """登入帳號明細"""
+    FIELDS = ('BrokeId', 'Account', 'AccountFlag', 'IB')
+    __slots__ = FIELDS
+    DEFAULTS = {'BrokeId': '', 'Account': '', 'AccountFlag': '', 'IB': ''}
+
+
+class P001503(Packet):
+    """登入成功後的資訊"""
+    FIELDS = ('Code', 'ID', 'Name', 'CA_YMD', 'CA_FLAG', 'CA_TYPE', 'CA_YMDW', 'Qnum',
+              'LoginType', 'ActCntMatch', 'QIdx', 'Count', 'p001503_2')
+    __slots__ = FIELDS
+    DT = 1503
+    DEFAULTS = {'ID': '', 'Name': '', 'CA_YMD': '', 'CA_FLAG': '', 'CA_TYPE': '',
+                'CA_YMDW': '', 'p001503_2': ()}
+
+
+# ============================================================
+# 報價（QuoteCom）
+# ============================================================
+
+class DepthItem(Packet):
+    """五檔價量"""
+    FIELDS = ('PRICE', 'QUANTITY')
+    __slots__ = FIELDS
+
+
+class PI20020(Packet):
+    """成交價量揭示"""
+    FIELDS = ('Market', 'Symbol', 'MatchTime', 'InfoSeq', 'LastItem', 'PriceSign',
+              'MatchQuantity', 'PriceDecimal', 'MatchTotalQty', 'MatchBuyCnt', 'MatchSellCnt',
+              'Price')
+    __slots__ = FIELDS
+    DT = 20020
+    DEFAULTS = {'Market': 'F', 'Symbol': '', 'MatchTime': '', 'LastItem': 'Y', 'PriceSign': '',
+                'Price': _ZERO}
+
+
+class PI20022(PI20020):
+    """成交價量揭示 – 盤前"""
+    __slots__ = ()
+    DT = 20022
+
+
+class PI21020(PI20020):
+    """回補成交價量揭示"""
+    __slots__ = ()
+    DT = 21020
+
+
+class PI20021(Packet):
+    """盤中最高(低)價揭示"""
+    FIELDS = ('Market', 'Symbol', 'DayLowPrice', 'DayHighPrice', 'MatchTime', 'PriceDecimal')
+    __slots__ = FIELDS
+    DT = 20021
+    DEFAULTS = {'Market': 'F', 'Symbol': '', 'MatchTime': '', 'DayLowPrice': _ZERO,
+                'DayHighPrice': _ZERO}
+
+
+class PI20026(Packet):
+    """查詢商品最後價格"""
+    FIELDS = ('Symbol', 'PriceDecimal', '_MatchPrice', 'MatchPrice', 'DayHighPrice',
+              'MatchTotalQty', 'Break_Mark', 'FirstDerivedBuyPrice', 'FirstDerivedBuyQty',
+              'Session', 'DayLowPrice', 'FirstMatchPrice', 'FirstMatchQty', 'ReferencePrice',
+              'BUY_DEPTH', 'SELL_DEPTH', 'FirstDerivedSellPrice', 'FirstDerivedSellQty')
+    __slots__ = FIELDS
+    DT = 20026
+    DEFAULTS = {'Symbol': '', 'Break_Mark': '', 'BUY_DEPTH': (), 'SELL_DEPTH': (), 'MatchPrice': _ZERO,
+                'DayHighPrice': _ZERO, 'DayLowPrice': _ZERO, 'FirstDerivedBuyPrice': _ZERO,
+                'FirstDerivedSellPrice': _ZERO, 'FirstMatchPrice': _ZERO, 'ReferencePrice': _ZERO}
+
+
+class PI20080(Packet):
+    """委託簿揭示訊息"""
+    FIELDS = ('Market', 'Symbol', 'BUY_DEPTH', 'SELL_DEPTH', 'FIRST_DERIVED_BUY_PRICE',
+              'FIRST_DERIVED_BUY_DTY', 'FIRST_DERIVED_SELL_PRICE', 'FIRST_DERIVED_SELL_QTY',
+              'DATA_TIME')
+    __slots__ = FIELDS
+    DT = 20080
+    DEFAULTS = {'Market': 'F', 'Symbol': '', 'BUY_DEPTH': (), 'SELL_DEPTH': (), 'DATA_TIME': ''}
+
+
+class PI05005(Packet):
+    """盤別資訊"""
+    FIELDS = ('Market', 'Symbol', 'FallLimitPrice', 'RiseLimitPrice', 'RefPrice',
+              'PriceDecimal', 'Session', 'Status')
+    __slots__ = FIELDS
+    DT = 5005
+    DEFAULTS = {'Market': 'F', 'Symbol': '', 'FallLimitPrice': _ZERO, 'RiseLimitPrice': _ZERO,
+                'RefPrice': _ZERO}
+
+
+# ============================================================
+# 交易（TaiFexCom）
+# ============================================================
+
+class PT02002(Packet):
+    """期權下單第二回覆"""
+    FIELDS = ('RequestId', 'WEBID', 'CNT', 'OrderNo', 'FrontOffice', 'ErrorCode')
+    __slots__ = FIELDS
+    DT = 2002
+    DEFAULTS = {'WEBID': '', 'CNT': '', 'OrderNo': '', 'FrontOffice': ''}
+
+
+class PT02006(PT02002):
+    """期/選刪改單回覆"""
+    __slots__ = ()
+    DT = 2006
+
+
+class PT02010(Packet):
+    """委託回報"""
+    FIELDS = ('OrderFunc', 'FrontOffice', 'BrokerId', 'OrderNo', 'Account', 'TradeDate',
+              'ReportTime', 'ClientOrderTime', 'WebID', 'CNT', 'TaiDelCode', 'TimeInForce',
+              'Symbol', 'Side', 'PriceMark', 'Price', 'PositionEffect', 'BeforeQty', 'AfterQty',
+              'Code', 'ErrMsg', 'Trader')
+    __slots__ = FIELDS
+    DT = 2010
+    DEFAULTS = {'OrderFunc': '', 'FrontOffice': '', 'BrokerId': '', 'OrderNo': '', 'Account': '',
+                'TradeDate': '', 'ReportTime': '', 'ClientOrderTime': '', 'WebID': '', 'CNT': '',
+                'TaiDelCode': '', 'TimeInForce': '', 'Symbol': '', 'Side': '', 'PriceMark': '',
+                'PositionEffect': '', 'ErrMsg': '', 'Trader': ''}
+
+
+class PT02011(Packet):
+    """成交回報"""
+    FIELDS = ('OrderFunc', 'BrokerId', 'OrderNo', 'Account', 'TradeDate', 'ReportTime', 'WEBID',
+              'CNT', 'Symbol', 'Side', 'Market', 'DealPrice', 'DealQty', 'CumQty', 'LeaveQty',
+              'MarketNo', 'Symbol1', 'DealPrice1', 'Qty1', 'BS1', 'Symbol2', 'DealPrice2',
+              'Qty2', 'BS2')
+    __slots__ = FIELDS
+    DT = 2011
+    DEFAULTS = {'OrderFunc': '', 'BrokerId': '', 'OrderNo': '', 'Account': '', 'TradeDate': '',
+                'ReportTime': '', 'WEBID': '', 'CNT': '', 'Symbol': '', 'Side': '', 'Market': 'F',
+                'MarketNo': '', 'Symbol1': '', 'BS1': '', 'Symbol2': '', 'BS2': ''}
+
+
+class P001616_2(Packet):
+    """最新部位彙總明細"""
+    FIELDS = ('BrokerId', 'Account', 'Group', 'Trader', 'Exchange', 'ComType', 'ComID', 'ComYM',
+              'StrikePrice', 'CloseDate', 'CP', 'BS', 'DeliveryDate', 'Currency', 'OTQty',
+              'TrdPrice', 'MPrice', 'PRTLOS', 'DealPrice')
+    __slots__ = FIELDS
+    DEFAULTS = {'BrokerId': '', 'Account': '', 'Group': '', 'Trader': '', 'Exchange': 'TAIFEX',
+                'ComType': 'F', 'ComID': '', 'ComYM': '', 'CloseDate': '', 'CP': '', 'BS': '',
+                'DeliveryDate': '', 'Currency': 'NTD'}
+
+
+class P001616(Packet):
+    """分帳客戶最新部位彙總"""
+    FIELDS = ('Code', 'Rows', 'p001616_2')
+    __slots__ = FIELDS
+    DT = 1616
+    DEFAULTS = {'p001616_2': ()}
+
+
+class P001626_2(Packet):
+    """權益數明細"""
+    FIELDS = ('BrokerId', 'Account', 'Group', 'Trader', 'Currency', 'LCTDAB', 'ORIGNFEE',
+              'TAXAMT', 'CTAXAMT', 'DWAMT', 'OSPRTLOS', 'PRTLOS', 'BMKTVAL', 'SMKTVAL',
+              'OPREMIUM', 'TPREMIUM', 'EQUITY', 'IAMT', 'MAMT', 'EXCESS', 'ORDEXCESS', 'ORDAMT',
+              'ExProfit', 'ORDAMTNOCN', 'WithdrawMnt', 'Premium', 'PTime', 'FloatProfit',
+              'LASSPRTLOS', 'CLOSEAMT', 'ORDIAMT', 'ORDMAMT', 'DayTradeAMT', 'ReductionAMT',
+              'CreditAMT', 'balance', 'IPremium', 'OPremium', 'Securities', 'SecuritiesOffset',
+              'OffsetAMT', 'Offset', 'FULLMTRISK', 'FULLRISK', 'MarginCall', 'SellVerticalSpread',
+              'StrikePrice', 'ActMarketValue', 'TPRTLOS', 'MarginCall1', 'AddMargin')
+    __slots__ = FIELDS
+    DEFAULTS = {'BrokerId': '', 'Account': '', 'Group': '', 'Trader': '', 'Currency': 'NTD',
+                'PTime': ''}
+
+
+class P001626(Packet):
+    """分帳客戶權益數查詢_NEW"""
+    FIELDS = ('Code', 'Count', 'p001626_2')
+    __slots__ = FIELDS
+    DT = 1626
+    DEFAULTS = {'p001626_2': ()}
+
+
+class P001614(Packet):
+    """分帳客戶平倉查詢"""
+    FIELDS = ('Code', 'Rows', 'p001614_2')
+    __slots__ = FIELDS
+    DT = 1614
+    DEFAULTS = {'p001614_2': ()}
+
+
+class P001618(Packet):
+    """分帳客戶部位明細"""
+    FIELDS = ('Code', 'Rows', 'p001618_2')
+    __slots__ = FIELDS
+    DT = 1618
+    DEFAULTS = {'p001618_2': ()}
+
+
+class P001624(Packet):
+    """平倉明細查詢"""
+    FIELDS = ('Code', 'Rows', 'p001624_2')
+    __slots__ = FIELDS
+    DT = 1624
+    DEFAULTS = {'p001624_2': ()}
+
+
+class P001628(Packet):
+    """台外幣互轉作業"""
+    FIELDS = ('Code', 'ErrorMsg')
+    __slots__ = FIELDS
+    DT = 1628
+    DEFAULTS = {'ErrorMsg': ''}
+
+
+class P001643(Packet):
+    """到期&無效履約查詢"""
+    FIELDS = ('Rows', 'Detail')
+    __slots__ = FIELDS
+    DT = 1643
+    DEFAULTS = {'Detail': ()}
+
+
+class P001645(Packet):
+    """歷史平倉查詢"""
+    FIELDS = ('Code', 'Rows', 'Detail')
+    __slots__ = FIELDS
+    DT = 1645
+    DEFAULTS = {'Detail': ()}
+
+
+class P001647(Packet):
+    """大小台互抵"""
+    FIELDS = ('Code', 'BrokerId', 'Account', 'Qty1', 'Qty2', 'Status')
+    __slots__ = FIELDS
+    DT = 1647
+    DEFAULTS = {'BrokerId': '', 'Account': '', 'Status': ''}
+
+
+class P001801(Packet):
+    """商品名稱"""
+    FIELDS = ('ComId', 'ComType', 'PriceDecimal', 'StkPriceDecimal', 'ContractType',
+              'ContractValue', 'TaxRate', 'Tick', 'ComCName')
+    __slots__ = FIELDS
+    DT = 1801
+    DEFAULTS = {'ComId': '', 'ComType': 'F', 'ContractType': '', 'ComCName': '',
+                'ContractValue': _ZERO, 'TaxRate': _ZERO, 'Tick': _ZERO}
+
+
+class P001802(Packet):
+    """商品明細"""
+    FIELDS = ('ComId', 'ComType', 'PriceDecimal', 'StkPriceDecimal', 'Hot', 'RisePrice',
+              'FallPrice', 'EndDate')
+    __slots__ = FIELDS
+    DT = 1802
+    DEFAULTS = {'ComId': '', 'ComType': 'F', 'Hot': '', 'EndDate': '', 'RisePrice': _ZERO,
+                'FallPrice': _ZERO}
@@ -0,0 +1,205 @@
+"""
+quote.py - QuoteCom 的純 Python 模擬
+事件與方法名稱與 DLL 相同（OnRcvMessage / OnGetStatus / OnRecoverStatus / OnRcvServerTime，
+Connect2Quote / SubQuote / RetriveLastPrice ...），回傳碼 0 表示成功。
+查詢類方法在呼叫的執行緒上同步回呼；成交推播由 SimMarket 的發布端（例如 TickReplayer
+的背景執行緒）回呼，與 DLL 由背景執行緒推播相同。
+
+環境變數 KGI_SIM_RATE（每秒筆數）設定後，SubQuote 會自動為該商品啟動重播：
+KGI_SIM_TICKS 指定 tick CSV 時重播該檔案，否則產生隨機漫步的 tick。
+"""
+
+import os
+from datetime import datetime
+
+from .clrtypes import Decimal, Event
+from .enums import COM_STATUS, RECOVER_STATUS, MARKET_FLAG
+from .market import default_market, session_of, synthetic_ticks, csv_ticks, TickReplayer
+from .packets import P001503, PI20026, PI05005, DepthItem
+
+VERSION = "SIM 1.0"
+
+MESSAGES = {
+    0: "成功",
+    -1: "尚未登入",
+    -2: "商品代碼錯誤",
+    -3: "尚未訂閱此商品",
+}
+
+
+class QuoteCom:
+    """Intelligence.QuoteCom 的模擬"""
+
+    def __init__(self, host="", port=0, sid="", token="", market=None, feed_rate=None, feed_ticks=None):
+        """
+        Args:
+            host / port / sid / token: 與 DLL 相同（模擬器不使用）
+            market: SimMarket，預設為同一處理程序共用的市場
+            feed_rate: 訂閱時自動重播的每秒筆數，預設讀取環境變數 KGI_SIM_RATE（0 表示不自動重播）
+            feed_ticks: 自動重播的 tick CSV，預設讀取環境變數 KGI_SIM_TICKS（未設定時為隨機漫步）
+        """
+        self.host = host
+        self.port = port
+        self.sid = sid
+        self.token = token
+        self.version = VERSION
+        self.market = market if market is not None else default_market()
+        if feed_rate is None:
+            feed_rate = float(os.environ.get('KGI_SIM_RATE', '0') or 0)
+        self.feed_rate = feed_rate
+        self.feed_ticks = feed_ticks if feed_ticks is not None else os.environ.get('KGI_SIM_TICKS') or None
+        self.feeds = {}
+
+        self.OnRcvMessage = Event()
+        self.OnGetStatus = Event()
+        self.OnRecoverStatus = Event()
+        self.OnRcvServerTime = Event()
+
+        self.is_logged_in = False
+        self.subscribed = set()
+        self.products_loaded = False
+
+    # ------------------------------------------------------------
+    # 內部
+    # ------------------------------------------------------------
+    def _status(self, status, msg=""):
+        self.OnGetStatus(self, status, msg.encode('utf-8'))
+
+    def _send(self, pkg):
+        self.OnRcvMessage(self, pkg)
+
+    def _on_market(self, symbol, pkg):
+        """SimMarket 成交推播（只轉送已訂閱的商品）"""
+        if symbol in self.subscribed:
+            self.OnRcvMessage(self, pkg)
+
+    def _start_feed(self, symbol):
+        if not self.feed_rate or symbol in self.feeds:
+            return
+        q = self.market.quotes.get(symbol)
+        if self.feed_ticks:
+            ticks = csv_ticks(self.feed_ticks)
+        else:
+            start_price = q.last_price if q is not None and q.last_price else 23000.0
+            ticks = synthetic_ticks(start_price=start_price, start=datetime.now(),
+                                    interval=1.0 / self.feed_rate, seed=sum(map(ord, symbol)))
+        self.feeds[symbol] = TickReplayer(self.market, symbol, ticks, self.feed_rate).start()
+
+    # ------------------------------------------------------------
+    # 連線 / 登入
+    # ------------------------------------------------------------
+    def Connect2Quote(self, host, port, uid, pwd, sType=' ', reserve=''):
+        """連線並登入（同步回呼 CONNECT_READY、LOGIN_READY 與 P001503）"""
+        self._status(COM_STATUS.CONNECT_READY, f"SIM {host}:{port}")
+        self.is_logged_in = True
+        self.market.add_listener(self._on_market)
+        self._status(COM_STATUS.LOGIN_READY, "登入成功")
+        self._send(P001503(0, uid, "模擬帳號", datetime.now().strftime('%Y%m%d'),
+                           Qnum=1, LoginType=0, ActCntMatch=0, QIdx=0, Count=0))
+        self.OnRcvServerTime(self, datetime.now().strftime('%H:%M:%S.%f')[:12], 0)
+        return 0
+
+    def Logout(self):
+        self.market.remove_listener(self._on_market)
+        for replayer in self.feeds.values():
+            replayer.stop()
+        self.feeds.clear()
+        self.subscribed.clear()
+        if self.is_logged_in:
+            self.is_logged_in = False
+            self._status(COM_STATUS.DISCONNECTED, "登出")
+
+    def Dispose(self):
+        self.Logout()
+
+    def GetSubQuoteMsg(self, code):
+        return MESSAGES.get(code, f"模擬錯誤碼 {code}")
+
+    # ------------------------------------------------------------
+    # 商品資料
+    # ------------------------------------------------------------
+    def RetriveQuoteList(self):
+        if not self.is_logged_in:
+            return -1
+        self.products_loaded = True
+        return 0
+
+    def LoadTaifexProductXMLT1(self):
+        self.products_loaded = True
+
+    def GetTaifexProductListT1(self, market_flag):
+        return self.GetProductBaseList(market_flag)
+
+    def GetProductBaseList(self, market_flag):
+        """已知商品列表（模擬器只有期貨）"""
+        if market_flag not in (MARKET_FLAG.MF_FUT, 'F'):
+            return []
+        return sorted(self.market.quotes)
+
+    def GetProductBase(self, symbol):
+        return 0 if symbol in self.market.quotes else -2
+
+    # ------------------------------------------------------------
+    # 訂閱 / 查詢
+    # ------------------------------------------------------------
+    def SubQuote(self, symbol):
+        """訂閱商品成交推播"""
+        if not self.is_logged_in:
+            return -1
+        symbol = str(symbol).strip()
+        self.market.quote(symbol)
+        self.subscribed.add(symbol)
+        self._status(COM_STATUS.SUBSCRIBE, symbol)
+        self._start_feed(symbol)
+        return 0
+
+    def UnsubQuotes(self, symbol):
+        symbol = str(symbol).strip()
+        self.subscribed.discard(symbol)
+        replayer = self.feeds.pop(symbol, None)
+        if replayer is not None:
+            replayer.stop()
+        self._status(COM_STATUS.UNSUBSCRIBE, symbol)
+        return 0
+
+    def RetriveLastPrice(self, symbol):
+        """查詢最後價格（同步回呼 PI20026）"""
+        if not self.is_logged_in:
+            return -1
+        symbol = str(symbol).strip()
+        q = self.market.quote(symbol)
+        last = q.last_price or 0.0
+        scale = 10 ** q.price_decimal
+        self._send(PI20026(
+            symbol, q.price_decimal, int(round(last * scale)), Decimal(last), Decimal(q.high or 0.0),
+            q.total_qty, '', Decimal(last), 1, session_of(q.last_time or datetime.now()),
+            Decimal(q.low or 0.0), Decimal(q.open or 0.0), 0, Decimal(q.ref_price),
+            (DepthItem(Decimal(last), 1),), (DepthItem(Decimal(last), 1),), Decimal(last), 1))
+        return 0
+
+    def AskTaifexSession(self, symbol):
+        """查詢盤別（同步回呼 PI05005）"""
+        if not self.is_logged_in:
+            return -1
+        symbol = str(symbol).strip()
+        q = self.market.quote(symbol)
+        self._send(PI05005('F', symbol, Decimal(q.fall_limit), Decimal(q.rise_limit),
+                           Decimal(q.ref_price), q.price_decimal, session_of(datetime.now()), 0))
+        return 0
+
+    def RetriveClosePrice(self):
+        return 0 if self.is_logged_in else -1
+
+    def RetriveRecover(self, symbol, stime, etime):
+        """回補 stime ~ etime（HHMM）的成交（PI21020），並以 OnRecoverStatus 通知筆數"""
+        if not self.is_logged_in:
+            return -1
+        symbol = str(symbol).strip()
+        packets = self.market.recover_packets(symbol, stime, etime)
+        self.OnRecoverStatus(self, symbol, RECOVER_STATUS.RS_BEGIN, len(packets))
+        for pkg in packets:
+            self._send(pkg)
+        self.OnRecoverStatus(self, symbol,
+                             RECOVER_STATUS.RS_DONE if packets else RECOVER_STATUS.RS_NOINFO,
+                             len(packets))
+        return 0
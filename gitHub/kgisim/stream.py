@@ -0,0 +1,108 @@
+"""
+stream.py - 模擬券商回報連線的延遲與保序
+DLL 的回覆（ACK、PT02002、PT02010、PT02011、帳務查詢）經由同一條連線依序送達，
+ReportStream 以單一 FIFO 佇列與一條背景執行緒模擬：每筆訊息在 post() 之後
+latency（加上 0 ~ jitter 的隨機值）秒送達，且不會超越先送出的訊息。
+latency 與 jitter 皆為 0 時在呼叫的執行緒上同步回呼（與先前行為相同）。
+"""
+
+import random
+import threading
+from collections import deque
+from time import perf_counter
+
+
+class ReportStream:
+    """依延遲遞送回呼的 FIFO 串流"""
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0, name="report-stream"):
+        """
+        Args:
+            latency: 每筆訊息的固定延遲（秒）
+            jitter: 額外的隨機延遲上限（秒）
+            seed: jitter 亂數種子
+            name: 背景執行緒名稱
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.name = name
+        self.delivered = 0
+        self._rnd = random.Random(seed)
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._last_due = 0.0
+        self._busy = False
+        self._closed = False
+        self.thread = None
+
+    @property
+    def synchronous(self):
+        return not self.latency and not self.jitter
+
+    @property
+    def pending(self):
+        """尚未送達的訊息筆數"""
+        return len(self._queue) + self._busy
+
+    def post(self, fn, *args):
+        """送出一筆訊息：延遲後以 fn(*args) 回呼"""
+        if not self.latency and not self.jitter:
+            fn(*args)
+            self.delivered += 1
+            return
+        delay = self.latency + (self._rnd.uniform(0.0, self.jitter) if self.jitter else 0.0)
+        with self._cond:
+            if self._closed:
+                return
+            # 保序：不早於前一筆的送達時間
+            due = max(perf_counter() + delay, self._last_due)
+            self._last_due = due
+            self._queue.append((due, fn, args))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            elif len(self._queue) == 1:
+                self._cond.notify_all()
+
+    def _run(self):
+        queue = self._queue
+        cond = self._cond
+        while True:
+            with cond:
+                while not queue and not self._closed:
+                    self._busy = False
+                    cond.notify_all()
+                    cond.wait()
+                if not queue:
+                    self._busy = False
+                    cond.notify_all()
+                    return
+                due, fn, args = queue[0]
+                wait = due - perf_counter()
+                if wait > 0:
+                    cond.wait(wait)
+                    continue
+                queue.popleft()
+                self._busy = True
+            fn(*args)
+            self.delivered += 1
+
+    def flush(self, timeout=None):
+        """等待所有已送出的訊息送達，回傳是否在 timeout 內完成"""
+        if self.thread is None:
+            return True
+        deadline = None if timeout is None else perf_counter() + timeout
+        with self._cond:
+            while self._queue or self._busy:
+                remaining = None if deadline is None else deadline - perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self):
+        """停止背景執行緒（未送達的訊息丟棄）"""
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
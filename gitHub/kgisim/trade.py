@@ -0,0 +1,452 @@
+"""
+trade.py - TaiFexCom（Smart.TaiFexCom）的純 Python 模擬
+事件與方法名稱與 DLL 相同，下單後依序回呼：
+    OnGetStatus(ACK_REQUESTID)  第一次回覆（msg[8] = 1 表示收單成功）
+    PT02002                     下單第二回覆（委託書號）
+    PT02010                     委託回報
+    PT02011                     成交回報
+委託由同一市場共用的 matching.MatchingEngine 撮合（價格 / 時間優先，SP / M / MR 與
+ROD / IOC / FOK，詳見該模組）；停損單（SM / SS）不支援，回傳 -6。
+所有回覆經 stream.ReportStream 依序送達：環境變數 KGI_SIM_LATENCY_MS / KGI_SIM_JITTER_MS
+設定回報延遲（毫秒），未設定時在呼叫的執行緒上同步回呼。
+部位與損益依成交累計，供 RetrivePositionSum（P001616）/ RetriveFMargin（P001626）查詢。
+"""
+
+import itertools
+import os
+import string
+from datetime import datetime, timedelta
+
+from .clrtypes import Decimal, Event
+from .enums import (COM_STATUS, ORDER_TYPE, SIDE_FLAG, PRICE_FLAG, TIME_IN_FORCE,
+                    POSITION_EFFECT)
+from .market import default_market
+from .matching import MatchingEngine
+from .packets import (P001503, P001503_2, PT02002, PT02006, PT02010, PT02011, P001614,
+                      P001616, P001616_2, P001618, P001624, P001626, P001626_2, P001628,
+                      P001643, P001645, P001647, P001801, P001802)
+from .stream import ReportStream
+
+VERSION = "SIM 1.0"
+
+MONTH_CODES = 'ABCDEFGHIJKL'     # 期貨 / 買權 1~12 月
+PUT_MONTH_CODES = 'MNOPQRSTUVWX'  # 賣權 1~12 月
+
+ORDER_ERRORS = {
+    0: "成功",
+    -1: "尚未登入",
+    -2: "委託數量錯誤",
+    -3: "委託價格錯誤",
+    -4: "查無委託",
+    -5: "市價單不可為 ROD",
+    -6: "模擬器不支援停損單",
+    -15: "商品代碼長度錯誤",
+}
+
+MESSAGES = {
+    0: "成功",
+    1: "委託已全部成交或已取消",
+    2: "無對手價，市價單無法成交",
+    3: "FOK 無法全部成交",
+    4: "IOC 未成交部分取消",
+}
+
+_ORDER_NO_CHARS = string.digits + string.ascii_uppercase
+
+SIDE_TEXT = {SIDE_FLAG.SF_BUY: 'B', SIDE_FLAG.SF_SELL: 'S'}
+TIF_TEXT = {TIME_IN_FORCE.TIF_ROD: 'R', TIME_IN_FORCE.TIF_IOC: 'I', TIME_IN_FORCE.TIF_FOK: 'F'}
+PRICE_TEXT = {PRICE_FLAG.PF_SPECIFIED: 'SP', PRICE_FLAG.PF_MARKET: 'M', PRICE_FLAG.PF_STOP_MARKET: 'SM',
+              PRICE_FLAG.PF_STOP_SPECIFID: 'SS', PRICE_FLAG.PF_MARKET_RANGE: 'MR'}
+EFFECT_TEXT = {POSITION_EFFECT.PE_OPEN: 'O', POSITION_EFFECT.PE_CLOSE: 'C',
+               POSITION_EFFECT.PE_DAY_TRADE: 'D', POSITION_EFFECT.PE_AUTO: 'A'}
+
+
+def order_no_text(n):
+    """流水號轉成 5 碼委託書號（36 進位）"""
+    chars = []
+    for _ in range(5):
+        n, r = divmod(n, 36)
+        chars.append(_ORDER_NO_CHARS[r])
+    return ''.join(reversed(chars))
+
+
+def trading_day(dt):
+    """交易日（15:00 之後屬於下一個交易日，跳過週末）"""
+    day = dt.date()
+    if (dt.hour, dt.minute) >= (15, 0):
+        day += timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.strftime('%Y%m%d')
+
+
+class SimOrder:
+    """模擬委託"""
+    __slots__ = ('request_id', 'order_no', 'web_id', 'cnt', 'broker', 'account', 'symbol', 'side',
+                 'price_flag', 'price', 'tif', 'qty', 'effect', 'cum_qty', 'status', 'rest_price',
+                 'owner')
+
+    def __init__(self, request_id, order_no, web_id, cnt, broker, account, symbol, side,
+                 price_flag, price, tif, qty, effect, owner=None):
+        self.request_id = request_id
+        self.order_no = order_no
+        self.web_id = web_id
+        self.cnt = cnt
+        self.broker = broker
+        self.account = account
+        self.symbol = symbol
+        self.side = side
+        self.price_flag = price_flag
+        self.price = price
+        self.tif = tif
+        self.qty = qty
+        self.effect = effect
+        self.cum_qty = 0
+        self.status = 'working'
+        self.rest_price = None  # 留在委託簿的價位（撮合引擎使用）
+        self.owner = owner
+
+    @property
+    def leave_qty(self):
+        return self.qty - self.cum_qty
+
+
+class TaiFexCom:
+    """Smart.TaiFexCom 的模擬"""
+
+    def __init__(self, host="", port=0, sid="", market=None, point_value=200, capital=1_000_000,
+                 broker_id="F004000", clock=datetime.now, engine=None, latency=None, jitter=None):
+        """
+        Args:
+            host / port / sid: 與 DLL 相同（模擬器不使用）
+            market: SimMarket，預設為同一處理程序共用的市場
+            point_value: 每點價值（損益計算用，與 TradeLogger 相同預設 200）
+            capital: 初始權益數
+            broker_id: 登入回覆的分公司代碼
+            clock: 回報時間使用的時鐘
+            engine: MatchingEngine，預設為 market 共用的撮合引擎
+            latency: 回報延遲（秒），預設讀取環境變數 KGI_SIM_LATENCY_MS（毫秒，0 表示同步回呼）
+            jitter: 額外的隨機延遲上限（秒），預設讀取環境變數 KGI_SIM_JITTER_MS（毫秒）
+        """
+        self.host = host
+        self.port = port
+        self.sid = sid
+        self.version = VERSION
+        self.market = market if market is not None else default_market()
+        self.point_value = point_value
+        self.capital = capital
+        self.broker_id = broker_id
+        self.clock = clock
+        self.engine = engine if engine is not None else MatchingEngine.for_market(self.market)
+        if latency is None:
+            latency = float(os.environ.get('KGI_SIM_LATENCY_MS', '0') or 0) / 1000
+        if jitter is None:
+            jitter = float(os.environ.get('KGI_SIM_JITTER_MS', '0') or 0) / 1000
+        self.stream = ReportStream(latency, jitter, name=f"taifex-{id(self):x}")
+        self.ConnectTimeout = 0
+        self.AutoSubReport = False
+        self.AutoRecoverReport = False
+        self.AutoRetriveProductInfo = False
+
+        self.OnRcvMessage = Event()
+        self.OnGetStatus = Event()
+        self.OnRecoverStatus = Event()
+        self.OnRcvServerTime = Event()
+
+        self.is_logged_in = False
+        self.accounts = []
+        self.orders = {}        # {委託書號: SimOrder}
+        self.positions = {}     # {(分公司, 帳號, 商品): [淨口數, 均價]}
+        self.realized = {}      # {(分公司, 帳號): 已實現損益}
+        self.lock = self.engine.lock  # 與撮合引擎共用（成交回呼在撮合鎖內執行）
+        self._request_ids = itertools.count(1)
+        self._order_seq = itertools.count(1)
+
+    # ------------------------------------------------------------
+    # 內部
+    # ------------------------------------------------------------
+    def _status(self, status, msg=b""):
+        self.stream.post(self.OnGetStatus, self, status,
+                         msg if isinstance(msg, bytes) else msg.encode('utf-8'))
+
+    def _send(self, pkg):
+        self.stream.post(self.OnRcvMessage, self, pkg)
+
+    def _times(self):
+        now = self.clock()
+        return trading_day(now), now.strftime('%H%M%S%f')[:9]
+
+    def _report(self, order, func, before_qty, after_qty, code=0, err=''):
+        """委託回報 PT02010"""
+        day, now = self._times()
+        self._send(PT02010(func, 'SP', order.broker, order.order_no, order.account, day, now, now,
+                           order.web_id, order.cnt, '', TIF_TEXT[order.tif], order.symbol,
+                           SIDE_TEXT[order.side], PRICE_TEXT[order.price_flag], Decimal(order.price),
+                           EFFECT_TEXT[order.effect], before_qty, after_qty, code, err, ''))
+
+    def _on_fill(self, order, price, qty):
+        """撮合引擎成交通知：更新部位並回呼 PT02011（委託的累計成交量已由引擎更新）"""
+        self._apply_position(order.broker, order.account, order.symbol,
+                             qty if order.side == SIDE_FLAG.SF_BUY else -qty, price)
+        day, now = self._times()
+        self._send(PT02011('N', order.broker, order.order_no, order.account, day, now, order.web_id,
+                           order.cnt, order.symbol, SIDE_TEXT[order.side], 'F', Decimal(price), qty,
+                           order.cum_qty, order.leave_qty, order.order_no, order.symbol,
+                           Decimal(price), qty, SIDE_TEXT[order.side], '', 0, 0, ''))
+
+    def _apply_position(self, broker, account, symbol, signed_qty, price):
+        key = (broker, account, symbol)
+        net, avg = self.positions.get(key, (0, 0.0))
+        if net == 0 or (net > 0) == (signed_qty > 0):
+            total = net + signed_qty
+            avg = (avg * abs(net) + price * abs(signed_qty)) / abs(total)
+            net = total
+        else:
+            closed = min(abs(net), abs(signed_qty))
+            pnl = (price - avg) * closed * (1 if net > 0 else -1) * self.point_value
+            self.realized[(broker, account)] = self.realized.get((broker, account), 0.0) + pnl
+            net += signed_qty
+            if net == 0:
+                avg = 0.0
+            elif (net > 0) == (signed_qty > 0):
+                avg = price  # 反手
+        if net:
+            self.positions[key] = [net, avg]
+        else:
+            self.positions.pop(key, None)
+
+    def _on_cancel(self, order, before_qty, code):
+        """撮合引擎取消通知（IOC / FOK 剩餘、無對手價）"""
+        self._report(order, 'C', before_qty, 0, code, self.GetMessageMap(code))
+
+    # ------------------------------------------------------------
+    # 連線 / 登入
+    # ------------------------------------------------------------
+    def LoginDirect(self, host, port, uid, pwd, reserve=' '):
+        """登入（同步回呼 CONNECT_READY、LOGIN_READY 與 P001503）"""
+        self._status(COM_STATUS.CONNECT_READY, f"SIM {host}:{port}")
+        self.is_logged_in = True
+        self.accounts = [(self.broker_id, uid)]
+        self._status(COM_STATUS.LOGIN_READY, "登入成功")
+        subs = tuple(P001503_2(broker, account, 'F', '') for broker, account in self.accounts)
+        self._send(P001503(0, uid, "模擬帳號", '', 'N', '', '', 1, Count=len(subs), p001503_2=subs))
+        self.stream.post(self.OnRcvServerTime, self, self.clock().strftime('%H:%M:%S.%f')[:12], 0)
+        return 0
+
+    def Logout(self):
+        if self.is_logged_in:
+            self.is_logged_in = False
+            self._status(COM_STATUS.DISCONNECTED, "登出")
+
+    def Dispose(self):
+        self.Logout()
+        self.stream.close()
+
+    def GetAccountList(self):
+        return [f"{broker}-{account}" for broker, account in self.accounts]
+
+    def GetRequestId(self):
+        return next(self._request_ids)
+
+    def GetOrderErrMsg(self, code):
+        return ORDER_ERRORS.get(code, f"模擬錯誤碼 {code}")
+
+    def GetMessageMap(self, code):
+        return MESSAGES.get(code, f"模擬訊息碼 {code}")
+
+    # ------------------------------------------------------------
+    # 下單
+    # ------------------------------------------------------------
+    def Order(self, order_type, market_flag, request_id, broker_id, account, sub_account, symbol,
+              side, price_flag, price, tif, qty, effect, office, web_id='', cnt='', order_no=''):
+        """
+        國內期權下單（參數順序與 DLL 相同）
+
+        Returns:
+            int: 0 表示送出，其餘請以 GetOrderErrMsg() 查詢
+        """
+        if not self.is_logged_in:
+            return -1
+        symbol = str(symbol).strip()
+        if not 5 <= len(symbol) < 20:
+            return -15
+        request_id = int(request_id)
+        if order_type != ORDER_TYPE.OT_NEW:
+            return self._modify(order_type, request_id, order_no, qty)
+        qty = int(qty)
+        price = float(price)
+        if qty <= 0:
+            return -2
+        if price_flag == PRICE_FLAG.PF_SPECIFIED and price <= 0:
+            return -3
+        if price_flag in (PRICE_FLAG.PF_MARKET, PRICE_FLAG.PF_MARKET_RANGE) and tif == TIME_IN_FORCE.TIF_ROD:
+            return -5
+        if price_flag in (PRICE_FLAG.PF_STOP_MARKET, PRICE_FLAG.PF_STOP_SPECIFID):
+            return -6
+
+        with self.lock:
+            seq = next(self._order_seq)
+            order = SimOrder(request_id, order_no_text(seq), 'SIM', '%08d' % seq, broker_id, account,
+                             symbol, side, price_flag, price, tif, qty, effect, self)
+            self.orders[order.order_no] = order
+            self._status(COM_STATUS.ACK_REQUESTID, b'%08d\x01' % (request_id % 10 ** 8))
+            self._send(PT02002(request_id, order.web_id, order.cnt, order.order_no, 'SP', 0))
+            self._report(order, 'N', 0, qty)
+            self.engine.submit(order, symbol)
+        return 0
+
+    def _modify(self, order_type, request_id, order_no, qty):
+        """刪單 / 減量（改價與改單模擬器不支援）"""
+        with self.lock:
+            order = self.orders.get(str(order_no).strip())
+            if order is None:
+                return -4
+            code = 0
+            if order.status != 'working':
+                code = 1
+            elif order_type == ORDER_TYPE.OT_CANCEL:
+                before = order.leave_qty
+                self.engine.cancel(order, order.symbol)
+                order.qty = order.cum_qty
+                order.status = 'cancelled'
+                self._report(order, 'C', before, 0)
+            elif order_type == ORDER_TYPE.OT_MODIFY_QTY:
+                before = order.leave_qty
+                cut = min(int(qty), before)
+                order.qty -= cut
+                if order.leave_qty == 0:
+                    self.engine.cancel(order, order.symbol)
+                    order.status = 'cancelled'
+                self._report(order, 'R', before, order.leave_qty)
+            else:
+                return -3
+            self._send(PT02006(request_id, order.web_id, order.cnt, order.order_no, 'SP', code))
+        return 0
+
+    # ------------------------------------------------------------
+    # 帳務查詢
+    # ------------------------------------------------------------
+    def RetrivePositionSum(self, market, broker_id, account, trader=''):
+        """最新部位彙總（同步回呼 P001616）"""
+        if not self.is_logged_in:
+            return -1
+        rows = []
+        with self.lock:
+            for (broker, acc, symbol), (net, avg) in self.positions.items():
+                if broker != broker_id or acc != account:
+                    continue
+                last = self.market.last_price(symbol)
+                mark = last if last is not None else avg
+                rows.append(P001616_2(
+                    broker, acc, '', trader, 'TAIFEX', 'F', symbol[:3], '', 0, '', '',
+                    'B' if net > 0 else 'S', '', 'NTD', abs(net), Decimal(avg), Decimal(mark),
+                    Decimal((mark - avg) * net * self.point_value), Decimal(avg)))
+        self._send(P001616(0, len(rows), tuple(rows)))
+        return 0
+
+    def RetriveFMargin(self, market, broker_id, account, trader=''):
+        """權益數（同步回呼 P001626）"""
+        if not self.is_logged_in:
+            return -1
+        with self.lock:
+            realized = self.realized.get((broker_id, account), 0.0)
+            floating = 0.0
+            for (broker, acc, symbol), (net, avg) in self.positions.items():
+                if broker == broker_id and acc == account:
+                    last = self.market.last_price(symbol)
+                    if last is not None:
+                        floating += (last - avg) * net * self.point_value
+        equity = self.capital + realized + floating
+        sub = P001626_2(broker_id, account, '', trader, 'NTD', self.capital, PRTLOS=realized,
+                        EQUITY=equity, EXCESS=equity, ORDEXCESS=equity, FloatProfit=floating,
+                        balance=self.capital + realized, PTime=self.clock().strftime('%H%M%S'))
+        self._send(P001626(0, 1, (sub,)))
+        return 0
+
+    def RetrivePositionDetail(self, market, broker_id, account, trader=''):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001618(0, 0))
+        return 0
+
+    def RetriveCOVER(self, market, broker_id, account, trader='', *args):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001614(0, 0))
+        return 0
+
+    def RetriveCOVERDetail(self, market, broker_id, account, trader='', *args, **kwargs):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001624(0, 0))
+        return 0
+
+    def RetriveCoverDHistory(self, market, broker_id, account, trader, group, sdate, edate):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001645(0, 0))
+        return 0
+
+    def RetriveStrikeDetail(self, market, broker_id, account, trader, group, dtype, sdate, edate,
+                            exchange='', com_id=''):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001643(0))
+        return 0
+
+    def ExchangeCurrency(self, broker_id, account, code, amount):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001628(0, ''))
+        return 0
+
+    def SendReciprocateRequest(self, broker_id, account, month, side, qty):
+        if not self.is_logged_in:
+            return -1
+        self._send(P001647(0, broker_id, account, qty, qty, 'Y'))
+        return 0
+
+    # ------------------------------------------------------------
+    # 商品資料
+    # ------------------------------------------------------------
+    def GenFutSymbol(self, symbol, date1, date2=''):
+        """期貨下單商品代碼，例如 ('TMF', '202602') -> 'TMFB6'"""
+        code = f"{symbol}{MONTH_CODES[int(date1[4:6]) - 1]}{date1[3]}"
+        if date2:
+            code += f"/{MONTH_CODES[int(date2[4:6]) - 1]}{date2[3]}"
+        return code
+
+    def GenOptSymbol(self, symbol, date, strike, cp):
+        codes = MONTH_CODES if str(cp).upper() == 'C' else PUT_MONTH_CODES
+        return f"{symbol}{int(float(strike)):05d}{codes[int(date[4:6]) - 1]}{date[3]}"
+
+    def GenOptDoubleSymbol(self, symbol, date1, strike1, cp1, bs1, date2, strike2, cp2, bs2):
+        first = self.GenOptSymbol(symbol, date1, strike1, cp1)
+        second = self.GenOptSymbol(symbol, date2, strike2, cp2)
+        return f"{first}:{second[len(symbol):]}"
+
+    def RetriveProductDetail(self):
+        return 0
+
+    def GetProductBase(self, symbol):
+        q = self.market.quotes.get(symbol)
+        decimal = q.price_decimal if q is not None else self.market.price_decimal
+        return P001801(symbol, 'F', decimal, 0, 'I', Decimal(self.point_value), Decimal(0.00002),
+                       Decimal(1), symbol)
+
+    def GetProductInfo(self, symbol):
+        q = self.market.quote(symbol)
+        return P001802(symbol, 'F', q.price_decimal, 0, '', Decimal(q.rise_limit),
+                       Decimal(q.fall_limit), '')
+
+    def GetProcuctDetailList(self, symbol):
+        return [self.GetProductInfo(s) for s in sorted(self.market.quotes) if s.startswith(symbol)]
+
+    def GetProcuctBaseList(self):
+        return sorted({s[:3] for s in self.market.quotes})
+
+    def GetProListAllKind(self):
+        return ['F']
+
+    def GetProListByStockKind(self, field, value):
+        return []